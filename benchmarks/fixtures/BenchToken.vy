@@ -0,0 +1,54 @@
+# @version 0.3.10
+"""
+Minimal ERC20 token deployed on the local benchmark chain.
+Compile with: vyper --evm-version paris -f abi,bytecode BenchToken.vy
+"""
+
+event Transfer:
+    sender: indexed(address)
+    receiver: indexed(address)
+    value: uint256
+
+event Approval:
+    owner: indexed(address)
+    spender: indexed(address)
+    value: uint256
+
+symbol: public(String[32])
+decimals: public(uint8)
+totalSupply: public(uint256)
+balanceOf: public(HashMap[address, uint256])
+allowance: public(HashMap[address, HashMap[address, uint256]])
+
+
+@external
+def __init__(_symbol: String[32], _decimals: uint8, _supply: uint256):
+    self.symbol = _symbol
+    self.decimals = _decimals
+    self.totalSupply = _supply
+    self.balanceOf[msg.sender] = _supply
+    log Transfer(empty(address), msg.sender, _supply)
+
+
+@external
+def transfer(_to: address, _value: uint256) -> bool:
+    self.balanceOf[msg.sender] -= _value
+    self.balanceOf[_to] += _value
+    log Transfer(msg.sender, _to, _value)
+    return True
+
+
+@external
+def transferFrom(_from: address, _to: address, _value: uint256) -> bool:
+    self.allowance[_from][msg.sender] -= _value
+    self.balanceOf[_from] -= _value
+    self.balanceOf[_to] += _value
+    log Transfer(_from, _to, _value)
+    return True
+
+
+@external
+def approve(_spender: address, _value: uint256) -> bool:
+    self.allowance[msg.sender][_spender] = _value
+    log Approval(msg.sender, _spender, _value)
+    return True
@@ -0,0 +1,278 @@
+"""
+Benchmark harness for the cryptocurrency trading agent.
+This module provides deterministic fixtures (synthetic candles, a tweet corpus
+and a local blockchain) and the timing/memory measurement helpers used by
+run_benchmarks.py.
+"""
+
+import gc
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the src directory to the Python path
+src_dir = Path(__file__).parent.parent / "src"
+sys.path.append(str(src_dir))
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Fixed reference time so generated data is identical between runs
+REFERENCE_TIME = datetime(2024, 1, 1)
+
+
+def synthetic_candles(count: int, seed: int = 42, base_price: float = 1000.0,
+                      interval_minutes: int = 60) -> List[Dict[str, Any]]:
+    """
+    Generate a deterministic random-walk candle series.
+
+    Args:
+        count: Number of candles to generate
+        seed: Random seed
+        base_price: Starting price
+        interval_minutes: Candle interval in minutes
+
+    Returns:
+        List[Dict]: Candles in the format returned by TradingStrategy._get_price_data
+    """
+    rng = random.Random(seed)
+    start = REFERENCE_TIME - timedelta(minutes=interval_minutes * count)
+    timestamp = int(start.timestamp() * 1000)
+    step = interval_minutes * 60 * 1000
+    price = base_price
+
+    candles = []
+    for _ in range(count):
+        price *= (1 + rng.uniform(-0.02, 0.02))
+        candles.append({
+            "timestamp": timestamp,
+            "open": price * (1 - rng.uniform(0, 0.005)),
+            "high": price * (1 + rng.uniform(0, 0.01)),
+            "low": price * (1 - rng.uniform(0, 0.01)),
+            "close": price,
+            "volume": rng.uniform(10, 100) * price
+        })
+        timestamp += step
+
+    return candles
+
+
+def load_tweet_corpus() -> Dict[str, Any]:
+    """Load the tweet templates and authors from the fixture corpus."""
+    with open(FIXTURES_DIR / "tweet_corpus.json", 'r') as f:
+        return json.load(f)
+
+
+def synthetic_tweets(count: int, token_symbol: str = "ETH", seed: int = 42,
+                     influencers: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Build a deterministic list of tweets from the fixture corpus.
+
+    Args:
+        count: Number of tweets to generate
+        token_symbol: Symbol substituted into the tweet templates
+        seed: Random seed
+        influencers: Usernames flagged as influencers
+
+    Returns:
+        List[Dict]: Tweets in the format returned by SentimentAnalyzer.search_tweets
+    """
+    corpus = load_tweet_corpus()
+    rng = random.Random(seed)
+    influencers = influencers or []
+
+    tweets = []
+    for i in range(count):
+        template = rng.choice(corpus["templates"])
+        author = rng.choice(corpus["authors"])
+        tweets.append({
+            "id": 1_000_000 + i,
+            "text": template.format(sym=token_symbol),
+            "created_at": REFERENCE_TIME - timedelta(minutes=i),
+            "retweet_count": rng.randint(0, 80),
+            "like_count": rng.randint(0, 200),
+            "reply_count": rng.randint(0, 20),
+            "author_id": zlib.crc32(author["username"].encode()),
+            "username": author["username"],
+            "followers_count": author["followers_count"],
+            "is_influencer": author["username"] in influencers
+        })
+
+    return tweets
+
+
+class LocalChain:
+    """
+    A local blockchain with deployed ERC20 tokens for wallet benchmarks.
+    Uses eth-tester (py-evm) in-process, or an Anvil node when a URL is given.
+    """
+
+    def __init__(self, anvil_url: Optional[str] = None):
+        """
+        Start the local chain.
+
+        Args:
+            anvil_url: HTTP URL of a running Anvil node, or None for eth-tester
+        """
+        from web3 import Web3
+
+        if anvil_url:
+            self.w3 = Web3(Web3.HTTPProvider(anvil_url))
+            self.backend = "anvil"
+        else:
+            # eth-tester is an optional dependency (pip install "web3[tester]")
+            from web3 import EthereumTesterProvider
+            self.w3 = Web3(EthereumTesterProvider())
+            self.backend = "eth-tester"
+
+        self.account = self.w3.eth.accounts[0]
+        self.token_addresses: List[str] = []
+
+        with open(FIXTURES_DIR / "BenchToken.json", 'r') as f:
+            self._token_artifact = json.load(f)
+
+    def deploy_tokens(self, count: int) -> List[str]:
+        """
+        Deploy additional ERC20 tokens until `count` tokens exist.
+
+        Args:
+            count: Total number of tokens required
+
+        Returns:
+            List[str]: Token contract addresses
+        """
+        contract = self.w3.eth.contract(
+            abi=self._token_artifact["abi"],
+            bytecode=self._token_artifact["bytecode"]
+        )
+
+        while len(self.token_addresses) < count:
+            index = len(self.token_addresses)
+            tx_hash = contract.constructor(f"BT{index}", 18, 10 ** 24).transact({'from': self.account})
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            self.token_addresses.append(receipt.contractAddress)
+
+        return self.token_addresses[:count]
+
+    def token_config(self, count: int, chain: str = "ethereum") -> List[Dict[str, Any]]:
+        """
+        Build a tokens_of_interest list backed by deployed tokens.
+
+        Args:
+            count: Number of tokens
+            chain: Chain name used in the wallet configuration
+
+        Returns:
+            List[Dict]: Token entries in the config format
+        """
+        return [
+            {
+                "symbol": f"BT{i}",
+                "address": address,
+                "chain": chain,
+                "min_holding": 0.1,
+                "max_holding": 5.0
+            }
+            for i, address in enumerate(self.deploy_tokens(count))
+        ]
+
+    def attach(self, wallet, tokens: List[Dict[str, Any]], chain: str = "ethereum"):
+        """
+        Point a BlockchainWallet at this chain and set its tokens of interest.
+        The wallet's gas oracles and balance trackers are rebuilt on this chain too.
+
+        Args:
+            wallet: BlockchainWallet instance
+            tokens: Token entries in the config format
+            chain: Chain name to replace
+        """
+        wallet.web3_connections = {chain: self.w3}
+        wallet.wallets = {chain: {"address": self.account, "private_key": None}}
+        wallet.config["tokens_of_interest"] = tokens
+        wallet.initialize_chain_services()
+
+        # Fixed prices instead of the live price sources
+        wallet.price_oracle.watch(token["symbol"] for token in tokens)
+        wallet.price_oracle._fetch = lambda source, symbols: {symbol: 1000.0 for symbol in symbols}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Linear-interpolated percentile of an already sorted list.
+
+    Args:
+        sorted_values: Sorted sample values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        float: The percentile value
+    """
+    if not sorted_values:
+        return float('nan')
+
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+
+    if lower == upper:
+        return sorted_values[lower]
+
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def measure(fn: Callable[[], Any], repeat: int = 20, warmup: int = 2,
+            ops_per_call: int = 1) -> Dict[str, Any]:
+    """
+    Measure latency percentiles, throughput and peak memory of a callable.
+
+    Timing and memory are measured in separate passes because tracemalloc
+    adds significant overhead to every allocation.
+
+    Args:
+        fn: Zero-argument callable to benchmark
+        repeat: Number of timed calls
+        warmup: Number of untimed calls before measuring
+        ops_per_call: Units of work done per call, used for throughput
+
+    Returns:
+        Dict: Latency, throughput and memory statistics
+    """
+    for _ in range(warmup):
+        fn()
+
+    gc.collect()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    # Peak memory of a single call
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    total = sum(timings)
+
+    return {
+        "samples": len(timings),
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "max_ms": timings[-1] * 1000,
+        "throughput_per_s": (len(timings) * ops_per_call) / total if total > 0 else float('inf'),
+        "peak_memory_kb": peak / 1024
+    }
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the cryptocurrency trading agent.
+This script measures the hot paths of the agent (technical analysis, signal
+generation, sentiment scoring, chart data, portfolio valuation, paper order execution and the full
+strategy run)
+against deterministic fixtures, stores the results as JSON and compares them
+with a previous run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from harness import LocalChain, measure, synthetic_candles, synthetic_tweets
+
+from loguru import logger
+
+from technical_analysis import TechnicalAnalyzer
+from sentiment_analysis import SentimentAnalyzer
+from score_cache import ScoreCache
+from wallet import BlockchainWallet
+from trading_strategy import TradingStrategy
+from paper_exchange import PaperExchange
+from web.chart_data import ChartDataService
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Scaling axes for each benchmark
+CANDLE_SIZES = [200, 1000, 5000]
+CHART_CANDLE_SIZES = [1000, 5000, 50000]
+TWEET_SIZES = [100, 1000, 5000]
+TOKEN_SIZES = [1, 10, 50]
+STRATEGY_TOKEN_SIZES = [1, 5, 10]
+PAPER_ORDER_SIZES = [1000, 10000]
+
+QUICK_CANDLE_SIZES = [200, 1000]
+QUICK_CHART_CANDLE_SIZES = [1000, 5000]
+QUICK_TWEET_SIZES = [100, 500]
+QUICK_TOKEN_SIZES = [1, 5]
+QUICK_STRATEGY_TOKEN_SIZES = [1, 2]
+QUICK_PAPER_ORDER_SIZES = [1000]
+
+
+def setup_logger():
+    """Only log warnings so log output does not dominate the measurements."""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+
+def bench_technical_analyze(config_path: str, sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark TechnicalAnalyzer.analyze across candle counts."""
+    analyzer = TechnicalAnalyzer(config_path)
+    results = []
+
+    for size in sizes:
+        candles = synthetic_candles(size)
+        stats = measure(lambda: analyzer.analyze(candles), repeat=repeat)
+        results.append({"name": "technical.analyze", "axis": "candles", "size": size, **stats})
+
+    return results
+
+
+def bench_generate_signals(config_path: str, sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark TechnicalAnalyzer.generate_signals across candle counts."""
+    analyzer = TechnicalAnalyzer(config_path)
+    results = []
+
+    for size in sizes:
+        df = analyzer.add_indicators(analyzer.preprocess_data(synthetic_candles(size)))
+        stats = measure(lambda: analyzer.generate_signals(df), repeat=repeat * 5)
+        results.append({"name": "technical.generate_signals", "axis": "candles", "size": size, **stats})
+
+    return results
+
+
+def bench_analyze_sentiment(config_path: str, sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark SentimentAnalyzer.analyze_sentiment across tweet counts, with new and already scored tweets."""
+    analyzer = SentimentAnalyzer(config_path)
+    results = []
+
+    def analyze_new():
+        analyzer.score_cache = ScoreCache()
+        return analyzer.analyze_sentiment("ETH")
+
+    for size in sizes:
+        tweets = synthetic_tweets(size, influencers=analyzer.influencers)
+        analyzer.search_tweets = lambda query, max_results=100, days_back=1: tweets
+        analyzer.fetch_scheduler.acquire = lambda token_symbol, requests=1: True
+        stats = measure(analyze_new, repeat=repeat, ops_per_call=size)
+        results.append({"name": "sentiment.analyze_sentiment", "axis": "tweets", "size": size, **stats})
+
+        # The same search again: every tweet's score comes from the cache
+        stats = measure(lambda: analyzer.analyze_sentiment("ETH"), repeat=repeat, ops_per_call=size)
+        results.append({"name": "sentiment.analyze_cached", "axis": "tweets", "size": size, **stats})
+
+    return results
+
+
+def bench_chart_data(sizes: List[int], repeat: int, width: int = 800) -> List[Dict[str, Any]]:
+    """Benchmark ChartDataService downsampling (cold) and cached lookups (warm) across history lengths."""
+    results = []
+
+    for size in sizes:
+        candles = synthetic_candles(size)
+        service = ChartDataService(lambda token, timeframe, limit: candles, max_candles=size, history_days=10 ** 6)
+
+        def cold():
+            service.invalidate()
+            service.get_chart("ETH", width=width)
+
+        stats = measure(cold, repeat=repeat)
+        results.append({"name": "chart.get_chart.cold", "axis": "candles", "size": size, **stats})
+
+        stats = measure(lambda: service.get_chart("ETH", width=width), repeat=repeat * 5)
+        results.append({"name": "chart.get_chart.warm", "axis": "candles", "size": size, **stats})
+
+    return results
+
+
+def bench_paper_exchange(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark PaperExchange.execute across order batch sizes (without simulated latency)."""
+    results = []
+
+    for size in sizes:
+        exchange = PaperExchange({"initial_balances": {"USD": 10 ** 12}, "latency_ms": 0, "latency_jitter_ms": 0},
+                                 lambda symbol: 1000.0)
+
+        def orders():
+            for i in range(size):
+                exchange.execute("ETH", "ethereum", "buy" if i % 2 == 0 else "sell", Decimal("0.01"))
+
+        stats = measure(orders, repeat=max(3, repeat // 4), ops_per_call=size)
+        results.append({"name": "paper.execute", "axis": "orders", "size": size, **stats})
+
+    return results
+
+
+def bench_portfolio_value(config_path: str, chain: LocalChain, sizes: List[int],
+                          repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark BlockchainWallet.get_portfolio_value across token counts."""
+    wallet = BlockchainWallet(config_path)
+    results = []
+
+    for size in sizes:
+        chain.attach(wallet, chain.token_config(size))
+        stats = measure(lambda: wallet.get_portfolio_value(), repeat=repeat)
+        results.append({"name": "wallet.get_portfolio_value", "axis": "tokens", "size": size,
+                        "backend": chain.backend, **stats})
+
+    return results
+
+
+def bench_run_strategy(config_path: str, chain: LocalChain, sizes: List[int],
+                       repeat: int, tweets_per_token: int = 200,
+                       candles_per_token: int = 200) -> List[Dict[str, Any]]:
+    """Benchmark one TradingStrategy.run_strategy cycle across token counts."""
+    strategy = TradingStrategy(config_path)
+
+    # Feed fixtures instead of live sources and keep the trade history file untouched
+    candles = synthetic_candles(candles_per_token)
+    tweets = synthetic_tweets(tweets_per_token, influencers=strategy.sentiment_analyzer.influencers)
+    strategy._get_price_data = lambda token_symbol, timeframe="1h", limit=200: candles
+    strategy.sentiment_analyzer.search_tweets = lambda query, max_results=100, days_back=1: tweets
+    # Fixture searches don't spend the X API quota
+    strategy.sentiment_analyzer.fetch_scheduler.acquire = lambda token_symbol, requests=1: True
+    strategy._save_trade_history = lambda: None
+
+    results = []
+    for size in sizes:
+        tokens = chain.token_config(size)
+        chain.attach(strategy.wallet, tokens)
+
+        def cycle():
+            for token in tokens:
+                strategy.run_strategy(token)
+
+        stats = measure(cycle, repeat=max(3, repeat // 4), warmup=1, ops_per_call=size)
+        results.append({"name": "strategy.run_strategy", "axis": "tokens", "size": size,
+                        "backend": chain.backend, **stats})
+
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """Return the current git commit hash, if available."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def save_results(results: List[Dict[str, Any]], output_dir: Path) -> Path:
+    """
+    Save benchmark results to a timestamped JSON file.
+
+    Args:
+        results: Benchmark result entries
+        output_dir: Directory to write the results file to
+
+    Returns:
+        Path: Path of the written file
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.utcnow()
+
+    report = {
+        "timestamp": timestamp.isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+
+    output_path = output_dir / f"bench_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    return output_path
+
+
+def find_previous_results(output_dir: Path, exclude: Optional[Path] = None) -> Optional[Path]:
+    """Find the most recent results file in the output directory."""
+    if not output_dir.exists():
+        return None
+
+    candidates = sorted(p for p in output_dir.glob("bench_*.json") if p != exclude)
+    return candidates[-1] if candidates else None
+
+
+def compare_results(current: List[Dict[str, Any]], baseline_path: Path,
+                    threshold: float) -> int:
+    """
+    Print a comparison against a previous run and count regressions.
+
+    Args:
+        current: Current benchmark result entries
+        baseline_path: Path of the previous results file
+        threshold: Relative p50 slowdown (e.g. 0.1 for 10%) counted as a regression
+
+    Returns:
+        int: Number of regressions found
+    """
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+
+    previous = {(r["name"], r["size"]): r for r in baseline["results"]}
+
+    print(f"\n=== Comparison with {baseline_path.name} (commit {baseline.get('git_commit')}) ===")
+    print(f"{'benchmark':<32}{'size':>8}{'p50 before':>14}{'p50 now':>12}{'change':>10}{'mem change':>12}")
+
+    regressions = 0
+    for result in current:
+        before = previous.get((result["name"], result["size"]))
+        if before is None:
+            continue
+
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] if before["p50_ms"] else 0.0
+        mem_change = ((result["peak_memory_kb"] - before["peak_memory_kb"]) / before["peak_memory_kb"]
+                      if before["peak_memory_kb"] else 0.0)
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  ❌ regression"
+
+        print(f"{result['name']:<32}{result['size']:>8}{before['p50_ms']:>12.2f}ms"
+              f"{result['p50_ms']:>10.2f}ms{change:>+10.1%}{mem_change:>+12.1%}{flag}")
+
+    return regressions
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """Print benchmark results as a table."""
+    print(f"\n{'benchmark':<32}{'axis':>8}{'size':>8}{'p50':>11}{'p95':>11}{'p99':>11}"
+          f"{'ops/s':>12}{'peak mem':>12}")
+
+    for r in results:
+        print(f"{r['name']:<32}{r['axis']:>8}{r['size']:>8}{r['p50_ms']:>9.2f}ms{r['p95_ms']:>9.2f}ms"
+              f"{r['p99_ms']:>9.2f}ms{r['throughput_per_s']:>12.1f}{r['peak_memory_kb']:>10.0f}KB")
+
+
+def main():
+    """Main entry point for the benchmark script."""
+    parser = argparse.ArgumentParser(description="Benchmark the cryptocurrency trading agent")
+
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="./config/config.json",
+        help="Path to configuration file"
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=20,
+        help="Number of timed iterations per benchmark"
+    )
+
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Use smaller scaling axes for a fast smoke run"
+    )
+
+    parser.add_argument(
+        "--only",
+        type=str,
+        nargs="+",
+        choices=["technical", "signals", "sentiment", "chart", "paper", "wallet", "strategy"],
+        help="Run only the selected benchmarks"
+    )
+
+    parser.add_argument(
+        "--anvil-url",
+        type=str,
+        default=None,
+        help="Use a running Anvil node instead of the in-process eth-tester chain"
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=str(RESULTS_DIR),
+        help="Directory where results are stored"
+    )
+
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default="latest",
+        help="Results file to compare against ('latest' for the previous run, 'none' to skip)"
+    )
+
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative p50 slowdown reported as a regression (default: 0.10)"
+    )
+
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with a non-zero status when a regression is found"
+    )
+
+    args = parser.parse_args()
+    setup_logger()
+
+    config_path = os.path.abspath(args.config)
+    selected = set(args.only or ["technical", "signals", "sentiment", "chart", "paper", "wallet", "strategy"])
+
+    candle_sizes = QUICK_CANDLE_SIZES if args.quick else CANDLE_SIZES
+    chart_sizes = QUICK_CHART_CANDLE_SIZES if args.quick else CHART_CANDLE_SIZES
+    tweet_sizes = QUICK_TWEET_SIZES if args.quick else TWEET_SIZES
+    token_sizes = QUICK_TOKEN_SIZES if args.quick else TOKEN_SIZES
+    strategy_sizes = QUICK_STRATEGY_TOKEN_SIZES if args.quick else STRATEGY_TOKEN_SIZES
+    paper_sizes = QUICK_PAPER_ORDER_SIZES if args.quick else PAPER_ORDER_SIZES
+
+    print("Starting benchmarks for the cryptocurrency trading agent...")
+    print(f"Using configuration file: {config_path}")
+
+    results = []
+
+    if "technical" in selected:
+        results.extend(bench_technical_analyze(config_path, candle_sizes, args.repeat))
+
+    if "signals" in selected:
+        results.extend(bench_generate_signals(config_path, candle_sizes, args.repeat))
+
+    if "sentiment" in selected:
+        results.extend(bench_analyze_sentiment(config_path, tweet_sizes, args.repeat))
+
+    if "chart" in selected:
+        results.extend(bench_chart_data(chart_sizes, args.repeat))
+
+    if "paper" in selected:
+        results.extend(bench_paper_exchange(paper_sizes, args.repeat))
+
+    if selected & {"wallet", "strategy"}:
+        try:
+            chain = LocalChain(args.anvil_url)
+        except ImportError as e:
+            print(f"ℹ️ Skipping wallet and strategy benchmarks (local chain unavailable: {str(e)})")
+            print("ℹ️ Install eth-tester with: pip install \"web3[tester]\"")
+            chain = None
+
+        if chain is not None:
+            if "wallet" in selected:
+                results.extend(bench_portfolio_value(config_path, chain, token_sizes, args.repeat))
+
+            if "strategy" in selected:
+                results.extend(bench_run_strategy(config_path, chain, strategy_sizes, args.repeat))
+
+    print_results(results)
+
+    output_dir = Path(args.output_dir)
+    output_path = save_results(results, output_dir)
+    print(f"\nResults saved to {output_path}")
+
+    regressions = 0
+    if args.compare != "none":
+        if args.compare == "latest":
+            baseline_path = find_previous_results(output_dir, exclude=output_path)
+        else:
+            baseline_path = Path(args.compare)
+
+        if baseline_path is not None and baseline_path.exists():
+            regressions = compare_results(results, baseline_path, args.threshold)
+            print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+        else:
+            print("\nNo previous results to compare against")
+
+    if args.fail_on_regression and regressions > 0:
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
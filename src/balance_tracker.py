@@ -0,0 +1,344 @@
+"""
+Balance tracker module for the cryptocurrency trading agent.
+This module keeps an in-memory ledger of a wallet's native and token balances
+on one chain. It follows new blocks, applies the ERC20 Transfer logs and
+native value transfers that involve the wallet as deltas, and does a full
+read of every balance (a reconcile) only on a slow schedule. Portfolio reads
+are lookups in the ledger.
+
+A block range costs two log queries for the token transfers. Native
+transfers and gas fees are found by bisecting the range on the wallet's
+balance and nonce, so only the blocks where they changed are fetched with
+their transactions, and only blocks with a change get their timestamp read.
+The RPC load therefore follows the activity of the wallet, not the number of
+blocks. A node that has pruned the state of a range (reads of old blocks on
+a non-archive node) makes the scan fetch every block of that range instead.
+"""
+
+import threading
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from hexbytes import HexBytes
+from loguru import logger
+
+from metrics import metrics
+from records import WalletEvent
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Asset name of the chain's native token in events
+NATIVE_ASSET = "native"
+
+# Positions of a transaction's native value and gas fee among its balance changes (logs are 0 and up)
+VALUE_INDEX = -1
+FEE_INDEX = -2
+
+# Default tracker settings (overridden by the "balance_tracker" config section)
+DEFAULT_SETTINGS = {
+    "poll_seconds": 12,
+    "reconcile_minutes": 60,
+    "max_blocks_per_poll": 50
+}
+
+
+def address_topic(address: str) -> str:
+    """Get the 32-byte log topic of an address."""
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+def _topic_address(topic: Any) -> str:
+    """Get the lowercase address stored in a 32-byte log topic."""
+    return "0x" + HexBytes(topic)[-20:].hex().replace("0x", "")
+
+
+class BalanceTracker:
+    """
+    Balances of one wallet on one chain, kept up to date from new blocks.
+
+    Listeners get on_events(tracker, from_block, to_block, events) for every
+    applied block range and on_reconcile(tracker, block, timestamp, balances)
+    after every reconcile.
+
+    Value moved by contracts to the wallet without a log (internal native
+    transfers) and chain reorganizations are not seen between reconciles;
+    the next reconcile corrects them.
+    """
+
+    def __init__(self, w3, chain: str, address: str, tokens: Dict[str, str], abi: List[Dict[str, Any]],
+                 settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the tracker.
+
+        Args:
+            w3: Web3 connection of the chain
+            chain: Chain name (for logs and metrics)
+            address: Wallet address
+            tokens: Token contract address by symbol
+            abi: ERC20 ABI used to read balances and decimals
+            settings: Tracker settings (see DEFAULT_SETTINGS)
+        """
+        self.w3 = w3
+        self.chain = chain
+        self.address = address
+        self.tokens = dict(tokens)
+        self.abi = abi
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+
+        self._lock = threading.Lock()
+        self._native = 0
+        self._token_balances: Dict[str, int] = {}
+        self._decimals: Dict[str, int] = {}
+        self._symbols = {address.lower(): symbol for symbol, address in self.tokens.items()}
+        self.last_block: Optional[int] = None
+        self._state_pruned = False
+
+        # Objects notified of applied blocks and reconciles (see EventIndex)
+        self.listeners: List[Any] = []
+
+    @property
+    def synced(self) -> bool:
+        """Check whether the ledger has been reconciled at least once."""
+        return self.last_block is not None
+
+    def _token_decimals(self, token_address: str) -> int:
+        """Get a token's decimals (read once)."""
+        if token_address not in self._decimals:
+            contract = self.w3.eth.contract(address=token_address, abi=self.abi)
+            self._decimals[token_address] = contract.functions.decimals().call()
+        return self._decimals[token_address]
+
+    def _read_token(self, token_address: str, block: int) -> Tuple[int, int]:
+        """Read a token's raw balance at a block and its decimals."""
+        decimals = self._token_decimals(token_address)
+        contract = self.w3.eth.contract(address=token_address, abi=self.abi)
+        raw = contract.functions.balanceOf(self.address).call(block_identifier=block)
+        return raw, decimals
+
+    def reconcile(self):
+        """Read every balance from the chain and replace the ledger with them."""
+        with metrics.timer("balance_tracker.reconcile", chain=self.chain):
+            block = self.w3.eth.block_number
+            native = self.w3.eth.get_balance(self.address, block_identifier=block)
+
+            token_balances = {}
+            for symbol, token_address in self.tokens.items():
+                try:
+                    token_balances[symbol], _ = self._read_token(token_address, block)
+                except Exception as e:
+                    logger.error(f"Error reading {symbol} balance on {self.chain}: {str(e)}")
+                    token_balances[symbol] = self._token_balances.get(symbol, 0)
+
+        with self._lock:
+            drift = self.synced and (native != self._native or token_balances != self._token_balances)
+            self._native = native
+            self._token_balances = token_balances
+            self.last_block = block
+
+        if drift:
+            logger.info(f"Balance ledger on {self.chain} corrected by reconcile at block {block}")
+
+        if self.listeners:
+            timestamp = self.w3.eth.get_block(block)["timestamp"]
+            balances = self.balances()
+            snapshot = {NATIVE_ASSET: balances["native_balance"]}
+            snapshot.update({symbol: token["balance"] for symbol, token in balances["tokens"].items()})
+            for listener in self.listeners:
+                listener.on_reconcile(self, block, timestamp, snapshot)
+
+    def _transfer_logs(self, from_block: int, to_block: int) -> List[Any]:
+        """Get the Transfer logs of the tracked tokens that send to or from the wallet."""
+        if not self.tokens:
+            return []
+
+        wallet_topic = address_topic(self.address)
+        base = {"fromBlock": from_block, "toBlock": to_block, "address": list(self.tokens.values())}
+
+        # Topics can't be OR-ed across positions, so incoming and outgoing transfers are two queries
+        logs = {}
+        for topics in ([TRANSFER_TOPIC, wallet_topic], [TRANSFER_TOPIC, None, wallet_topic]):
+            for log in self.w3.eth.get_logs({**base, "topics": topics}):
+                logs[(HexBytes(log["transactionHash"]), log["logIndex"])] = log
+        return list(logs.values())
+
+    def _account_state(self, block: int) -> Tuple[int, int]:
+        """Read the wallet's native balance and nonce at a block."""
+        return (self.w3.eth.get_balance(self.address, block_identifier=block),
+                self.w3.eth.get_transaction_count(self.address, block_identifier=block))
+
+    def _native_blocks(self, from_block: int, to_block: int) -> List[int]:
+        """
+        Find the blocks of a range in which the wallet's native balance or nonce changed.
+
+        Sending needs a nonce, so while the nonce stays the same the balance
+        can only grow: equal states at both ends of a range mean nothing
+        changed in between. Ranges with different ends are halved until they
+        are a single block, which costs about 2·log2(n) state reads per
+        changed block among n.
+
+        Args:
+            from_block: First block
+            to_block: Last block (inclusive)
+
+        Returns:
+            List[int]: The changed blocks in order (every block if the node has pruned the state)
+        """
+        try:
+            stack = [(from_block - 1, self._account_state(from_block - 1) if from_block > 0 else (0, 0),
+                      to_block, self._account_state(to_block))]
+            changed = []
+            while stack:
+                low, low_state, high, high_state = stack.pop()
+                if low_state == high_state:
+                    continue
+                if high - low == 1:
+                    changed.append(high)
+                    continue
+                middle = (low + high) // 2
+                middle_state = self._account_state(middle)
+                stack.append((middle, middle_state, high, high_state))
+                stack.append((low, low_state, middle, middle_state))
+            return sorted(changed)
+        except Exception as e:
+            if not self._state_pruned:
+                logger.warning(f"Account state of blocks {from_block}-{to_block} unavailable on {self.chain}, "
+                               f"scanning every block: {str(e)}")
+                self._state_pruned = True
+            return list(range(from_block, to_block + 1))
+
+    def _native_events(self, block: Dict[str, Any]) -> List[WalletEvent]:
+        """Get the native value transfers and gas fees of the wallet in a block."""
+        wallet = self.address.lower()
+        events = []
+
+        def event(tx_hash: str, log_index: int, kind: str, raw: int) -> WalletEvent:
+            return WalletEvent(self.chain, block["number"], block["timestamp"], tx_hash, log_index, kind,
+                               NATIVE_ASSET, Decimal(raw) / Decimal(10 ** 18), raw)
+
+        for tx in block["transactions"]:
+            sender = tx["from"].lower()
+            recipient = (tx.get("to") or "").lower()
+            if wallet not in (sender, recipient):
+                continue
+
+            tx_hash = HexBytes(tx["hash"]).hex()
+            receipt = self.w3.eth.get_transaction_receipt(tx["hash"])
+            if sender == wallet:
+                # Gas is paid even if the transaction reverts
+                fee = receipt["gasUsed"] * receipt.get("effectiveGasPrice", tx.get("gasPrice", 0))
+                events.append(event(tx_hash, FEE_INDEX, "fee", -fee))
+
+            value = (recipient == wallet) - (sender == wallet)
+            if receipt["status"] == 1 and value and tx["value"]:
+                events.append(event(tx_hash, VALUE_INDEX, "native", value * tx["value"]))
+
+        return events
+
+    def scan(self, from_block: int, to_block: int) -> List[WalletEvent]:
+        """
+        Get the wallet's balance changes in a block range.
+
+        Args:
+            from_block: First block to scan
+            to_block: Last block to scan (inclusive)
+
+        Returns:
+            List[WalletEvent]: Native transfers, gas fees and token transfers, in chain order
+        """
+        events = []
+        timestamps = {}
+        for number in self._native_blocks(from_block, to_block):
+            block = self.w3.eth.get_block(number, full_transactions=True)
+            timestamps[number] = block["timestamp"]
+            events.extend(self._native_events(block))
+
+        wallet = self.address.lower()
+        for log in self._transfer_logs(from_block, to_block):
+            symbol = self._symbols.get(log["address"].lower())
+            if symbol is None or len(log["topics"]) < 3:
+                continue
+
+            value = int.from_bytes(HexBytes(log["data"]), "big")
+            raw = value * ((_topic_address(log["topics"][2]) == wallet) - (_topic_address(log["topics"][1]) == wallet))
+            if not raw:
+                continue
+
+            # Only the header, for the timestamp
+            if log["blockNumber"] not in timestamps:
+                timestamps[log["blockNumber"]] = self.w3.eth.get_block(log["blockNumber"])["timestamp"]
+
+            decimals = self._token_decimals(log["address"])
+            events.append(WalletEvent(self.chain, log["blockNumber"], timestamps[log["blockNumber"]],
+                                      HexBytes(log["transactionHash"]).hex(), log["logIndex"], "transfer", symbol,
+                                      Decimal(raw) / Decimal(10 ** decimals), raw))
+
+        events.sort(key=lambda event: (event.block, event.log_index))
+        return events
+
+    def poll(self) -> int:
+        """
+        Apply the wallet's transfers in the blocks since the last poll.
+
+        Reconciles instead if the ledger was never synced or fell more than
+        max_blocks_per_poll blocks behind.
+
+        Returns:
+            int: Number of new blocks processed
+        """
+        head = self.w3.eth.block_number
+        last = self.last_block
+        if last is not None and head <= last:
+            return 0
+
+        if last is None or head - last > self.settings["max_blocks_per_poll"]:
+            self.reconcile()
+            return head - last if last is not None else 0
+
+        with metrics.timer("balance_tracker.poll", chain=self.chain):
+            events = self.scan(last + 1, head)
+
+        deltas: Dict[str, int] = {}
+        for event in events:
+            deltas[event.asset] = deltas.get(event.asset, 0) + event.raw
+
+        with self._lock:
+            # A reconcile may have run meanwhile and already covered these blocks
+            if self.last_block != last:
+                return 0
+            self._native += deltas.pop(NATIVE_ASSET, 0)
+            for symbol, delta in deltas.items():
+                self._token_balances[symbol] = self._token_balances.get(symbol, 0) + delta
+            self.last_block = head
+
+        if events:
+            metrics.increment("agent_balance_updates_total", value=len(events), chain=self.chain)
+        for listener in self.listeners:
+            listener.on_events(self, last + 1, head, events)
+        return head - last
+
+    def balances(self) -> Dict[str, Any]:
+        """
+        Get the balances from the ledger (reconciling first if it was never synced).
+
+        Returns:
+            Dict: native_balance and a {"balance", "address"} entry per token symbol,
+                  in the format of BlockchainWallet.get_portfolio_value
+        """
+        if not self.synced:
+            self.reconcile()
+
+        with self._lock:
+            native = self._native
+            token_balances = dict(self._token_balances)
+
+        return {
+            "native_balance": Decimal(native) / Decimal(10 ** 18),
+            "tokens": {
+                symbol: {
+                    "balance": Decimal(token_balances.get(symbol, 0)) / Decimal(10 ** self._decimals.get(address, 18)),
+                    "address": address
+                }
+                for symbol, address in self.tokens.items()
+            }
+        }
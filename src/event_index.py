@@ -0,0 +1,473 @@
+"""
+Event index module for the cryptocurrency trading agent.
+This module keeps a local SQLite index of the wallet's balance changes (token
+and native transfers, gas fees) and of the strategy's trades. The index is
+fed by the balance trackers as they follow new blocks, backfilled in parallel
+block ranges for the blocks they skipped, records the price oracle's quotes
+of the held assets at every reconcile, and answers portfolio history
+queries (balance of an asset over time, value and PnL per day) without
+touching the chain.
+"""
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from balance_tracker import NATIVE_ASSET
+from metrics import metrics
+from records import TradeRecord, WalletEvent
+
+# Default database path, relative to src/ like the state store
+DEFAULT_PATH = "../data/wallet_events.db"
+
+# Default index settings (overridden by the "event_index" config section)
+DEFAULT_SETTINGS = {
+    "path": DEFAULT_PATH,
+    "backfill_blocks": 10000,
+    "chunk_blocks": 500,
+    "workers": 4,
+    "sync_minutes": 10
+}
+
+DAY_SECONDS = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    chain TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    block INTEGER,
+    timestamp REAL NOT NULL,
+    kind TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    amount REAL NOT NULL,
+    raw TEXT,
+    price REAL,
+    value_usd REAL,
+    PRIMARY KEY (chain, tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_asset_time ON events (chain, asset, timestamp);
+CREATE INDEX IF NOT EXISTS events_asset_block ON events (chain, asset, block);
+CREATE TABLE IF NOT EXISTS snapshots (
+    chain TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    balance REAL NOT NULL,
+    PRIMARY KEY (chain, asset, block)
+);
+CREATE TABLE IF NOT EXISTS prices (
+    chain TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (chain, asset, timestamp)
+);
+CREATE TABLE IF NOT EXISTS ranges (
+    chain TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (chain, start)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Balance changes, as opposed to trades
+_BALANCE_KINDS = "kind != 'trade'"
+
+
+def _day(timestamp: float) -> str:
+    """Get the UTC date of a Unix time as YYYY-MM-DD."""
+    return datetime.utcfromtimestamp(timestamp).strftime("%Y-%m-%d")
+
+
+class EventIndex:
+    """
+    A local index of wallet events shared between processes through SQLite.
+
+    Like the state store, the database runs in WAL mode and each thread gets
+    its own connection. Block ranges that have been indexed are recorded, so
+    backfills resume where they stopped and never index a block twice.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, native_symbols: Optional[Dict[str, str]] = None,
+                 price_oracle=None):
+        """
+        Open (and create if needed) the index.
+
+        Args:
+            settings: Index settings (see DEFAULT_SETTINGS)
+            native_symbols: Symbol of each chain's native token (trades of it are indexed as "native")
+            price_oracle: PriceOracle quoting the assets at every reconcile (None to record no prices)
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.path = self.settings["path"]
+        self.native_symbols = dict(native_symbols or {})
+        self.price_oracle = price_oracle
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection to the database."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the block's writes in one transaction and bump the index version."""
+        conn = self._conn()
+        with metrics.timer("event_index.write"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("INSERT INTO meta (key, value) VALUES ('version', 1) "
+                             "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def version(self) -> int:
+        """Get the index version, which changes with every write."""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _event_rows(events: Iterable[WalletEvent]) -> List[Tuple]:
+        return [(e.chain, e.tx_hash, e.log_index, e.block, e.timestamp, e.kind, e.asset, float(e.amount),
+                 None if e.raw is None else str(e.raw), e.price, e.value_usd) for e in events]
+
+    def add(self, events: List[WalletEvent], chain: Optional[str] = None,
+            block_range: Optional[Tuple[int, int]] = None):
+        """
+        Add events, and optionally record the block range they cover as indexed.
+
+        Args:
+            events: Events to add (already indexed ones are ignored)
+            chain: Chain of the block range
+            block_range: (first, last) block that the events cover completely
+        """
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             self._event_rows(events))
+            if block_range is not None:
+                conn.execute("INSERT OR REPLACE INTO ranges (chain, start, end) VALUES (?, ?, ?)",
+                             (chain, block_range[0], block_range[1]))
+                self._merge_ranges(conn, chain)
+
+    @staticmethod
+    def _merge_ranges(conn: sqlite3.Connection, chain: str):
+        """Coalesce adjacent or overlapping indexed ranges of a chain into single rows."""
+        rows = conn.execute("SELECT start, end FROM ranges WHERE chain = ? ORDER BY start", (chain,)).fetchall()
+
+        merged: List[List[int]] = []
+        for start, end in rows:
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        if len(merged) < len(rows):
+            conn.execute("DELETE FROM ranges WHERE chain = ?", (chain,))
+            conn.executemany("INSERT INTO ranges (chain, start, end) VALUES (?, ?, ?)",
+                             [(chain, start, end) for start, end in merged])
+
+    def missing_ranges(self, chain: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Get the block ranges between two blocks that are not indexed yet.
+
+        Args:
+            chain: Chain name
+            start: First block
+            end: Last block (inclusive)
+
+        Returns:
+            List: (first, last) block of each gap
+        """
+        rows = self._conn().execute(
+            "SELECT start, end FROM ranges WHERE chain = ? AND end >= ? AND start <= ? ORDER BY start",
+            (chain, start, end)
+        ).fetchall()
+
+        gaps = []
+        cursor = start
+        for range_start, range_end in rows:
+            if range_start > cursor:
+                gaps.append((cursor, range_start - 1))
+            cursor = max(cursor, range_end + 1)
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def record_trade(self, trade: TradeRecord):
+        """
+        Add a trade made by the strategy.
+
+        Args:
+            trade: The trade (failed trades are ignored)
+        """
+        if not trade.success:
+            return
+
+        # Trades of the native token share the asset of its transfers and fees
+        asset = NATIVE_ASSET if trade.token == self.native_symbols.get(trade.chain) else trade.token
+        sign = 1 if trade.action == "buy" else -1
+        event = WalletEvent(trade.chain, None, trade.timestamp, f"trade:{trade.token}:{trade.timestamp}", 0,
+                            "trade", asset, sign * trade.amount, price=trade.price,
+                            value_usd=sign * trade.value_usd)
+        self.add([event])
+
+    def record_prices(self, chain: str, timestamp: float, prices: Dict[str, float]):
+        """
+        Add USD prices of assets at a time.
+
+        Args:
+            chain: Chain name
+            timestamp: Unix time of the prices
+            prices: Price by asset (token symbol, or "native")
+        """
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)",
+                             [(chain, asset, timestamp, float(price)) for asset, price in prices.items()])
+
+    # Balance tracker listener
+
+    def on_events(self, tracker, from_block: int, to_block: int, events: List[WalletEvent]):
+        """Index the events of a block range a balance tracker applied."""
+        self.add(events, tracker.chain, (from_block, to_block))
+
+    def on_reconcile(self, tracker, block: int, timestamp: float, balances: Dict[str, Decimal]):
+        """Store the balances a balance tracker read from the chain, as anchors for the history."""
+        rows = [(tracker.chain, asset, block, timestamp, float(balance)) for asset, balance in balances.items()]
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)", rows)
+            # The first reconcile sets how far back the history goes
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                         (f"origin:{tracker.chain}", max(0, block - self.settings["backfill_blocks"])))
+
+        prices = self.quote_assets(tracker.chain, balances)
+        if prices:
+            self.record_prices(tracker.chain, timestamp, prices)
+
+    def quote_assets(self, chain: str, assets: Iterable[str]) -> Dict[str, float]:
+        """
+        Get the price oracle's USD prices of assets.
+
+        Args:
+            chain: Chain name
+            assets: Token symbols, or "native"
+
+        Returns:
+            Dict: Price by asset, for the assets that have one (none without a price oracle)
+        """
+        if self.price_oracle is None:
+            return {}
+        symbols = {asset: self.native_symbols.get(chain) if asset == NATIVE_ASSET else asset for asset in assets}
+        quotes = self.price_oracle.snapshot(symbol for symbol in symbols.values() if symbol is not None)
+        return {asset: quotes[symbol] for asset, symbol in symbols.items() if symbol in quotes}
+
+    def sync(self, tracker) -> int:
+        """
+        Index the blocks the balance tracker has passed but the index is missing,
+        back to the history origin, scanning chunks of blocks in parallel.
+
+        Args:
+            tracker: The chain's BalanceTracker
+
+        Returns:
+            int: Number of blocks indexed
+        """
+        end = tracker.last_block
+        if end is None:
+            return 0
+
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (f"origin:{tracker.chain}",)).fetchone()
+        origin = row[0] if row else max(0, end - self.settings["backfill_blocks"])
+
+        chunk = self.settings["chunk_blocks"]
+        chunks = [(start, min(start + chunk - 1, gap_end))
+                  for gap_start, gap_end in self.missing_ranges(tracker.chain, origin, end)
+                  for start in range(gap_start, gap_end + 1, chunk)]
+        if not chunks:
+            return 0
+
+        logger.info(f"Indexing {len(chunks)} block ranges on {tracker.chain}")
+        indexed = 0
+        with metrics.timer("event_index.sync", chain=tracker.chain):
+            with ThreadPoolExecutor(max_workers=self.settings["workers"], thread_name_prefix="event-index") as pool:
+                futures = {pool.submit(tracker.scan, first, last): (first, last) for first, last in chunks}
+                for future in as_completed(futures):
+                    block_range = futures[future]
+                    try:
+                        self.add(future.result(), tracker.chain, block_range)
+                        indexed += block_range[1] - block_range[0] + 1
+                    except Exception as e:
+                        # Left as a gap for the next sync
+                        logger.error(f"Error indexing blocks {block_range} on {tracker.chain}: {str(e)}")
+
+        return indexed
+
+    # Queries
+
+    def assets(self, chain: str) -> List[str]:
+        """Get the assets that have events or snapshots on a chain."""
+        rows = self._conn().execute(
+            "SELECT asset FROM events WHERE chain = ? UNION SELECT asset FROM snapshots WHERE chain = ?",
+            (chain, chain)
+        ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def _offset(self, conn: sqlite3.Connection, chain: str, asset: str) -> float:
+        """
+        Get the balance before the first indexed event of an asset.
+
+        The latest snapshot anchors the history: the balance before all events
+        is the snapshot minus the changes up to the snapshot's block.
+        """
+        snapshot = conn.execute(
+            "SELECT block, balance FROM snapshots WHERE chain = ? AND asset = ? ORDER BY block DESC LIMIT 1",
+            (chain, asset)
+        ).fetchone()
+        if snapshot is None:
+            return 0.0
+
+        before = conn.execute(
+            f"SELECT COALESCE(SUM(amount), 0) FROM events WHERE chain = ? AND asset = ? AND block <= ? "
+            f"AND {_BALANCE_KINDS}",
+            (chain, asset, snapshot[0])
+        ).fetchone()[0]
+        return snapshot[1] - before
+
+    def balance_history(self, chain: str, asset: str, start: Optional[float] = None,
+                        end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get the balance of an asset after each block that changed it.
+
+        Args:
+            chain: Chain name
+            asset: Token symbol, or "native"
+            start: Earliest Unix time (None for no lower bound); the balance at
+                   start is included as the first point
+            end: Latest Unix time (None for no upper bound)
+
+        Returns:
+            List[Dict]: Points with t (Unix seconds), block and balance, oldest first
+        """
+        conn = self._conn()
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+
+        with metrics.timer("event_index.balance_history"):
+            balance = self._offset(conn, chain, asset) + conn.execute(
+                f"SELECT COALESCE(SUM(amount), 0) FROM events WHERE chain = ? AND asset = ? AND timestamp < ? "
+                f"AND {_BALANCE_KINDS}",
+                (chain, asset, start)
+            ).fetchone()[0]
+
+            rows = conn.execute(
+                f"SELECT block, timestamp, SUM(amount) OVER (ORDER BY block, log_index, tx_hash "
+                f"ROWS UNBOUNDED PRECEDING) FROM events WHERE chain = ? AND asset = ? "
+                f"AND timestamp >= ? AND timestamp <= ? AND {_BALANCE_KINDS} ORDER BY block, log_index, tx_hash",
+                (chain, asset, start, end)
+            ).fetchall()
+
+        points = [{"t": start, "block": None, "balance": balance}] if start != float("-inf") else []
+        for block, timestamp, running in rows:
+            point = {"t": timestamp, "block": block, "balance": balance + running}
+            # One point per block, with the balance after all of its changes
+            if points and points[-1]["block"] == block:
+                points[-1] = point
+            else:
+                points.append(point)
+        return points
+
+    def _prices(self, conn: sqlite3.Connection, chain: str, asset: str, end: float) -> List[Tuple[float, float]]:
+        """Get the recorded (timestamp, price) of an asset up to a time."""
+        return conn.execute(
+            "SELECT timestamp, price FROM prices WHERE chain = ? AND asset = ? AND timestamp <= ? ORDER BY timestamp",
+            (chain, asset, end)
+        ).fetchall()
+
+    def daily_values(self, chain: str, start: float, end: float) -> List[Dict[str, Any]]:
+        """
+        Get the end-of-day balance, value and PnL of every asset on a chain.
+
+        Assets are valued at the latest price recorded for them by the end of
+        the day (see record_prices); an asset without one has no value. The PnL of a day is the change in value not
+        explained by the day's trades.
+
+        Args:
+            chain: Chain name
+            start: First Unix time (its day is the first row)
+            end: Last Unix time
+
+        Returns:
+            List[Dict]: One row per UTC day with date, value_usd, pnl_usd and
+                        per-asset balance, price, value_usd, net_trades_usd and pnl_usd
+        """
+        conn = self._conn()
+        day_start = int(start - start % DAY_SECONDS)
+        day_ends = [(_day(t), t + DAY_SECONDS) for t in range(day_start, int(end) + 1, DAY_SECONDS)]
+        rows = [{"date": date, "assets": {}, "value_usd": 0.0, "pnl_usd": 0.0} for date, _ in day_ends]
+
+        for asset in self.assets(chain):
+            history = self.balance_history(chain, asset, day_start, end)
+            prices = self._prices(conn, chain, asset, end)
+            trades = conn.execute(
+                "SELECT timestamp, value_usd FROM events WHERE chain = ? AND asset = ? AND kind = 'trade' "
+                "AND timestamp >= ? AND timestamp <= ?",
+                (chain, asset, day_start, end)
+            ).fetchall()
+
+            flows: Dict[str, float] = {}
+            for timestamp, value_usd in trades:
+                flows[_day(timestamp)] = flows.get(_day(timestamp), 0.0) + value_usd
+
+            point, price_index, price, previous_value = 0, 0, None, None
+            balance = history[0]["balance"] if history else 0.0
+            for row, (date, day_end) in zip(rows, day_ends):
+                while point < len(history) and history[point]["t"] < day_end:
+                    balance = history[point]["balance"]
+                    point += 1
+                while price_index < len(prices) and prices[price_index][0] < day_end:
+                    price = prices[price_index][1]
+                    price_index += 1
+
+                value = balance * price if price is not None else None
+                net_trades = flows.get(date, 0.0)
+                pnl = value - previous_value - net_trades if value is not None and previous_value is not None else None
+
+                row["assets"][asset] = {
+                    "balance": balance,
+                    "price": price,
+                    "value_usd": value,
+                    "net_trades_usd": net_trades,
+                    "pnl_usd": pnl
+                }
+                if value is not None:
+                    row["value_usd"] += value
+                if pnl is not None:
+                    row["pnl_usd"] += pnl
+                previous_value = value
+
+        return rows
@@ -0,0 +1,184 @@
+"""
+Fetch scheduler module for the cryptocurrency trading agent.
+This module decides whether a token's X.com search may be sent now. It keeps
+the search endpoint's quota as reported by the x-rate-limit-* response headers
+and paces requests with a token bucket that refills at the rate that spends
+the remaining quota evenly over the rest of the rate-limit window. Tokens with
+an active trade or volatile prices may fetch ahead of the pace; the others
+also leave a reserve of requests for them.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+from loguru import logger
+
+from metrics import metrics
+
+# Default scheduler settings (overridden by the "fetch_scheduler" config section)
+DEFAULT_SETTINGS = {
+    "limit": 450,
+    "window_seconds": 900,
+    "burst": 5,
+    "reserve_requests": 10,
+    "volatility_threshold": 0.02
+}
+
+
+class FetchScheduler:
+    """
+    Token bucket pacing of a rate-limited API, with priority tokens.
+
+    The quota (limit, remaining and reset time) starts from the settings and
+    follows the rate-limit headers of every response passed to update(). Until
+    a header says otherwise, a window that has passed is assumed to restart
+    with the full limit.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, clock: Callable[[], float] = time.time):
+        """
+        Initialize the scheduler.
+
+        Args:
+            settings: Scheduler settings (see DEFAULT_SETTINGS)
+            clock: Function giving the current Unix time (the rate-limit resets are Unix times)
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.clock = clock
+
+        now = clock()
+        self._lock = threading.Lock()
+        self.limit = int(self.settings["limit"])
+        self.remaining = self.limit
+        self.reset = now + self.settings["window_seconds"]
+        self._tokens = float(self.settings["burst"])
+        self._refilled = now
+
+        self._active: frozenset = frozenset()
+        self._volatility: Dict[str, float] = {}
+
+    def _roll(self, now: float):
+        """Start a new window if the current one has passed (called with the lock held)."""
+        if now >= self.reset:
+            self.remaining = self.limit
+            self.reset = now + self.settings["window_seconds"]
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last refill (called with the lock held)."""
+        rate = self.remaining / max(self.reset - now, 1.0)
+        self._tokens = min(float(self.settings["burst"]), self._tokens + rate * max(now - self._refilled, 0.0))
+        self._refilled = now
+
+    def update(self, headers: Mapping[str, str]):
+        """
+        Follow the rate-limit headers of a response.
+
+        Args:
+            headers: Response headers (x-rate-limit-limit, x-rate-limit-remaining, x-rate-limit-reset)
+        """
+        try:
+            limit = headers.get("x-rate-limit-limit")
+            remaining = headers.get("x-rate-limit-remaining")
+            reset = headers.get("x-rate-limit-reset")
+            with self._lock:
+                self._refill(self.clock())
+                if limit is not None:
+                    self.limit = int(limit)
+                if remaining is not None:
+                    self.remaining = int(remaining)
+                if reset is not None:
+                    self.reset = float(reset)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring malformed rate-limit headers: {str(e)}")
+
+    def rate_limited(self, headers: Optional[Mapping[str, str]] = None):
+        """
+        Record a rate-limited (429) response: nothing is fetched until the window resets.
+
+        Args:
+            headers: Response headers, for the reset time
+        """
+        self.update(headers or {})
+        with self._lock:
+            self.remaining = 0
+            self._tokens = min(self._tokens, 0.0)
+
+    def set_active(self, token_symbols: Iterable[str]):
+        """Set the tokens with an active trade."""
+        with self._lock:
+            self._active = frozenset(token_symbols)
+
+    def set_volatility(self, token_symbol: str, volatility: Optional[float]):
+        """Set a token's latest price volatility (None if unknown)."""
+        with self._lock:
+            if volatility is None or volatility != volatility:
+                self._volatility.pop(token_symbol, None)
+            else:
+                self._volatility[token_symbol] = float(volatility)
+
+    def is_priority(self, token_symbol: str) -> bool:
+        """Check whether a token has an active trade or volatile prices."""
+        with self._lock:
+            return self._is_priority(token_symbol)
+
+    def _is_priority(self, token_symbol: str) -> bool:
+        """Check whether a token is a priority token (called with the lock held)."""
+        return (token_symbol in self._active or
+                self._volatility.get(token_symbol, 0.0) >= self.settings["volatility_threshold"])
+
+    def acquire(self, token_symbol: str, requests: int = 1) -> bool:
+        """
+        Take a fetch's requests from the quota for a token, if it may be sent now.
+
+        Priority tokens may fetch whenever quota remains, borrowing from the
+        bucket so the other tokens wait longer. The other tokens need enough
+        tokens in the bucket and leave reserve_requests of the quota untouched.
+
+        Args:
+            token_symbol: Token the fetch is for
+            requests: Number of requests the fetch may send (e.g. pages of a search)
+
+        Returns:
+            bool: True if the fetch may be sent, False if it should be deferred
+        """
+        now = self.clock()
+        with self._lock:
+            self._roll(now)
+            self._refill(now)
+            priority = self._is_priority(token_symbol)
+
+            if self.remaining <= 0:
+                reason = "quota"
+            elif priority:
+                reason = None
+            elif self.remaining - requests < self.settings["reserve_requests"]:
+                reason = "reserve"
+            elif self._tokens < min(requests, self.settings["burst"]):
+                reason = "pacing"
+            else:
+                reason = None
+
+            if reason is None:
+                self.remaining = max(self.remaining - requests, 0)
+                self._tokens = max(self._tokens - requests, -float(self.settings["burst"]))
+
+        if reason is not None:
+            metrics.increment("agent_fetch_deferred_total", api="x", reason=reason)
+            logger.info(f"Deferred X.com fetch for {token_symbol} ({reason})")
+            return False
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the quota as last known.
+
+        Returns:
+            Dict: limit, remaining, reset_in_seconds and tokens (the bucket's level)
+        """
+        now = self.clock()
+        with self._lock:
+            self._roll(now)
+            self._refill(now)
+            return {"limit": self.limit, "remaining": self.remaining,
+                    "reset_in_seconds": max(self.reset - now, 0.0), "tokens": self._tokens}
@@ -0,0 +1,127 @@
+"""
+Gas oracle module for the cryptocurrency trading agent.
+This module keeps a cached fee suggestion per chain so that sending a
+transaction does not need its own gas price request. Suggestions are refreshed
+in the background from eth_feeHistory: on EIP-1559 chains the priority fee is
+a percentile of recent block rewards and the max fee leaves headroom for base
+fee increases; chains without a base fee fall back to a legacy gas price.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from metrics import metrics
+
+# Default oracle settings (overridden by the "gas_oracle" config section)
+DEFAULT_SETTINGS = {
+    "refresh_seconds": 12,
+    "max_age_seconds": 60,
+    "block_count": 10,
+    "priority_fee_percentile": 50,
+    "base_fee_multiplier": 2.0
+}
+
+
+class GasOracle:
+    """
+    Cached fee suggestions for one chain.
+
+    fees() returns the latest suggestion without a network request while it
+    is younger than max_age_seconds; refresh() is meant to be called
+    periodically (see CryptoTradingAgent._build_scheduler).
+    """
+
+    def __init__(self, w3, chain: str, multiplier: float = 1.0, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the oracle.
+
+        Args:
+            w3: Web3 connection of the chain
+            chain: Chain name (for logs and metrics)
+            multiplier: Multiplier applied to the priority fee or legacy gas price
+            settings: Oracle settings (see DEFAULT_SETTINGS)
+        """
+        self.w3 = w3
+        self.chain = chain
+        self.multiplier = multiplier
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+
+        self._lock = threading.Lock()
+        self._fees: Optional[Dict[str, int]] = None
+        self._updated = 0.0
+        self._chain_id: Optional[int] = None
+
+    @property
+    def age(self) -> Optional[float]:
+        """Get the age in seconds of the cached suggestion (None if there is none)."""
+        with self._lock:
+            return time.monotonic() - self._updated if self._fees is not None else None
+
+    def _eip1559_fees(self) -> Optional[Dict[str, int]]:
+        """Get a suggestion from the fee history, or None if the chain has no base fee."""
+        percentile = self.settings["priority_fee_percentile"]
+        try:
+            history = self.w3.eth.fee_history(self.settings["block_count"], "latest", [percentile])
+        except Exception as e:
+            logger.debug(f"Fee history unavailable on {self.chain}: {str(e)}")
+            return None
+
+        base_fees = history.get("baseFeePerGas") or []
+        if not base_fees or not base_fees[-1]:
+            return None
+
+        # The last base fee is the one of the next block
+        next_base_fee = base_fees[-1]
+        rewards = sorted(reward[0] for reward in history.get("reward") or [] if reward)
+        priority_fee = rewards[len(rewards) // 2] if rewards else self.w3.eth.max_priority_fee
+        priority_fee = int(priority_fee * self.multiplier)
+
+        # Typed transactions must carry the chain id; it never changes, so it is fetched once
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+
+        return {
+            "maxFeePerGas": int(next_base_fee * self.settings["base_fee_multiplier"]) + priority_fee,
+            "maxPriorityFeePerGas": priority_fee,
+            "chainId": self._chain_id
+        }
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Fetch a new fee suggestion and cache it.
+
+        Returns:
+            Dict: Transaction fee fields (maxFeePerGas, maxPriorityFeePerGas and
+                  chainId, or gasPrice on chains without EIP-1559)
+        """
+        with metrics.timer("gas_oracle.refresh", chain=self.chain):
+            fees = self._eip1559_fees()
+            if fees is None:
+                fees = {"gasPrice": int(self.w3.eth.gas_price * self.multiplier)}
+
+        with self._lock:
+            self._fees = fees
+            self._updated = time.monotonic()
+
+        return dict(fees)
+
+    def fees(self) -> Dict[str, int]:
+        """
+        Get the cached fee suggestion, refreshing it first if it is missing or stale.
+
+        Returns:
+            Dict: Transaction fee fields to merge into a transaction
+        """
+        with self._lock:
+            fees = self._fees
+            fresh = fees is not None and time.monotonic() - self._updated <= self.settings["max_age_seconds"]
+
+        if fresh:
+            metrics.increment("agent_cache_hits_total", cache="gas_oracle")
+            return dict(fees)
+
+        metrics.increment("agent_cache_misses_total", cache="gas_oracle")
+        return self.refresh()
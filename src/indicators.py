@@ -0,0 +1,319 @@
+"""
+Indicator module for the cryptocurrency trading agent.
+This module provides a registry of technical indicators that are built as a
+dependency graph. Each indicator declares the intermediate series it needs
+(returns, moving averages, rolling deviations, ...); identical intermediates
+are shared between indicators, every node is computed at most once per
+evaluation, and only the requested indicators are added as columns.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Registered indicators by name
+INDICATORS: Dict[str, "Indicator"] = {}
+
+
+class Node:
+    """
+    A series computed from other series of the graph.
+    """
+
+    __slots__ = ("key", "inputs", "compute")
+
+    def __init__(self, key: str, inputs: Tuple[str, ...], compute: Callable[..., pd.Series]):
+        self.key = key
+        self.inputs = inputs
+        self.compute = compute
+
+
+class IndicatorGraph:
+    """
+    A DAG of series derived from the price columns.
+
+    Nodes are identified by a key describing what they compute (e.g.
+    sma(close,20)), so adding the same computation twice returns the
+    existing node.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[str, Node] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def add(self, key: str, inputs: Iterable[str], compute: Callable[..., pd.Series]) -> str:
+        """
+        Add a node unless an identical one exists.
+
+        Args:
+            key: Unique description of the computation
+            inputs: Keys of the input nodes, or price column names
+            compute: Function taking the input series and returning the node's series
+
+        Returns:
+            str: The node key
+        """
+        if key not in self._nodes:
+            self._nodes[key] = Node(key, tuple(inputs), compute)
+        return key
+
+    def evaluate(self, df: pd.DataFrame, outputs: Dict[str, str]) -> pd.DataFrame:
+        """
+        Compute the requested nodes and add them to a copy of the price data.
+
+        Args:
+            df: Price data (open, high, low, close, volume columns)
+            outputs: Node key for each column to add
+
+        Returns:
+            pd.DataFrame: The price data plus one column per output
+        """
+        values: Dict[str, pd.Series] = {}
+
+        def value(key: str) -> pd.Series:
+            if key in values:
+                return values[key]
+            node = self._nodes.get(key)
+            if node is None:
+                result = df[key]
+            else:
+                result = node.compute(*(value(name) for name in node.inputs))
+            values[key] = result
+            return result
+
+        result = df.copy()
+        for column, key in outputs.items():
+            result[column] = value(key)
+        return result
+
+
+# Building blocks; each adds its node (and its inputs) and returns the node key
+
+def diff(graph: IndicatorGraph, source: str, periods: int = 1) -> str:
+    """Difference between each value and the one periods earlier."""
+    return graph.add(f"diff({source},{periods})", [source], lambda s: s.diff(periods))
+
+
+def pct_change(graph: IndicatorGraph, source: str, periods: int = 1) -> str:
+    """Relative change over a number of periods."""
+    return graph.add(f"pct_change({source},{periods})", [source], lambda s: s.pct_change(periods=periods))
+
+
+def sma(graph: IndicatorGraph, source: str, window: int) -> str:
+    """Simple moving average."""
+    return graph.add(f"sma({source},{window})", [source],
+                     lambda s: s.rolling(window=window, min_periods=window).mean())
+
+
+def rolling_std(graph: IndicatorGraph, source: str, window: int, ddof: int = 1) -> str:
+    """Rolling standard deviation."""
+    return graph.add(f"std({source},{window},{ddof})", [source],
+                     lambda s: s.rolling(window=window, min_periods=window).std(ddof=ddof))
+
+
+def ema(graph: IndicatorGraph, source: str, window: int) -> str:
+    """Exponential moving average (span = window)."""
+    return graph.add(f"ema({source},{window})", [source],
+                     lambda s: s.ewm(span=window, min_periods=window, adjust=False).mean())
+
+
+def wilder(graph: IndicatorGraph, source: str, window: int) -> str:
+    """Wilder's smoothing (exponential average with alpha = 1 / window)."""
+    return graph.add(f"wilder({source},{window})", [source],
+                     lambda s: s.ewm(alpha=1 / window, min_periods=window, adjust=False).mean())
+
+
+def linear(graph: IndicatorGraph, a: str, b: str, scale: float = 1.0) -> str:
+    """a + scale * b."""
+    return graph.add(f"linear({a},{b},{scale})", [a, b], lambda x, y: x + scale * y)
+
+
+def rsi(graph: IndicatorGraph, source: str, window: int) -> str:
+    """Relative Strength Index."""
+    change = diff(graph, source)
+    gains = graph.add(f"gains({change})", [change], lambda d: d.where(d > 0, 0.0))
+    losses = graph.add(f"losses({change})", [change], lambda d: -d.where(d < 0, 0.0))
+    avg_gain = wilder(graph, gains, window)
+    avg_loss = wilder(graph, losses, window)
+
+    def compute(up: pd.Series, down: pd.Series) -> pd.Series:
+        return pd.Series(np.where(down == 0, 100, 100 - (100 / (1 + up / down))), index=up.index)
+
+    return graph.add(f"rsi({source},{window})", [avg_gain, avg_loss], compute)
+
+
+def macd(graph: IndicatorGraph, source: str, fast: int, slow: int, signal: int) -> Tuple[str, str, str]:
+    """MACD line, signal line and histogram."""
+    line = linear(graph, ema(graph, source, fast), ema(graph, source, slow), -1.0)
+    signal_line = ema(graph, line, signal)
+    return line, signal_line, linear(graph, line, signal_line, -1.0)
+
+
+def bollinger(graph: IndicatorGraph, source: str, window: int, deviations: float) -> Tuple[str, str, str]:
+    """Bollinger middle, upper and lower bands."""
+    middle = sma(graph, source, window)
+    deviation = rolling_std(graph, source, window, ddof=0)
+    return middle, linear(graph, middle, deviation, deviations), linear(graph, middle, deviation, -deviations)
+
+
+def obv(graph: IndicatorGraph) -> str:
+    """On-Balance Volume."""
+    def compute(close: pd.Series, volume: pd.Series) -> pd.Series:
+        direction = np.where(close < close.shift(1), -1, 1)
+        return pd.Series(direction * volume, index=close.index).cumsum()
+
+    return graph.add("obv(close,volume)", ["close", "volume"], compute)
+
+
+class Indicator:
+    """
+    A named indicator the technical analyzer can request.
+    """
+
+    __slots__ = ("name", "column", "build")
+
+    def __init__(self, name: str, column: str, build: Callable[[IndicatorGraph, Dict[str, Any]], str]):
+        """
+        Initialize the indicator.
+
+        Args:
+            name: Indicator name (e.g. sma_short)
+            column: Column name, formatted with the analyzer settings (e.g. sma_{short_ma_period})
+            build: Function (graph, settings) adding the indicator's nodes and returning its key
+        """
+        self.name = name
+        self.column = column
+        self.build = build
+
+
+def indicator(name: str, column: Optional[str] = None):
+    """
+    Register an indicator.
+
+    Args:
+        name: Indicator name
+        column: Column name template (defaults to the name)
+
+    Returns:
+        Callable: Decorator for a function (graph, settings) -> node key
+    """
+    def register(build: Callable[[IndicatorGraph, Dict[str, Any]], str]):
+        INDICATORS[name] = Indicator(name, column or name, build)
+        return build
+
+    return register
+
+
+def build_plan(settings: Dict[str, Any], names: Optional[Iterable[str]] = None) -> Tuple[IndicatorGraph, Dict[str, str]]:
+    """
+    Build the graph for a set of indicators.
+
+    Args:
+        settings: Indicator parameters (see TechnicalAnalyzer.settings)
+        names: Indicators to include (None for all registered)
+
+    Returns:
+        Tuple: (graph, node key by column name)
+    """
+    graph = IndicatorGraph()
+    outputs = {}
+
+    for name in (INDICATORS if names is None else names):
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        definition = INDICATORS[name]
+        outputs[definition.column.format(**settings)] = definition.build(graph, settings)
+
+    return graph, outputs
+
+
+@indicator("sma_short", "sma_{short_ma_period}")
+def _sma_short(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return sma(graph, "close", settings["short_ma_period"])
+
+
+@indicator("sma_long", "sma_{long_ma_period}")
+def _sma_long(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return sma(graph, "close", settings["long_ma_period"])
+
+
+@indicator("ema_short", "ema_{short_ma_period}")
+def _ema_short(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return ema(graph, "close", settings["short_ma_period"])
+
+
+@indicator("ema_long", "ema_{long_ma_period}")
+def _ema_long(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return ema(graph, "close", settings["long_ma_period"])
+
+
+@indicator("rsi")
+def _rsi(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return rsi(graph, "close", settings["rsi_period"])
+
+
+def _macd(graph: IndicatorGraph, settings: Dict[str, Any]) -> Tuple[str, str, str]:
+    return macd(graph, "close", settings["macd_fast_period"], settings["macd_slow_period"],
+                settings["macd_signal_period"])
+
+
+@indicator("macd")
+def _macd_line(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return _macd(graph, settings)[0]
+
+
+@indicator("macd_signal")
+def _macd_signal(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return _macd(graph, settings)[1]
+
+
+@indicator("macd_diff")
+def _macd_diff(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return _macd(graph, settings)[2]
+
+
+def _bollinger(graph: IndicatorGraph, settings: Dict[str, Any]) -> Tuple[str, str, str]:
+    return bollinger(graph, "close", settings["bollinger_period"], settings["bollinger_deviations"])
+
+
+@indicator("bollinger_mavg")
+def _bollinger_mavg(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return _bollinger(graph, settings)[0]
+
+
+@indicator("bollinger_high")
+def _bollinger_high(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return _bollinger(graph, settings)[1]
+
+
+@indicator("bollinger_low")
+def _bollinger_low(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return _bollinger(graph, settings)[2]
+
+
+@indicator("obv")
+def _obv(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return obv(graph)
+
+
+@indicator("price_change")
+def _price_change(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return pct_change(graph, "close")
+
+
+@indicator("price_change_1d")
+def _price_change_1d(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return pct_change(graph, "close", settings["day_periods"])
+
+
+@indicator("price_change_7d")
+def _price_change_7d(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return pct_change(graph, "close", settings["week_periods"])
+
+
+@indicator("volatility")
+def _volatility(graph: IndicatorGraph, settings: Dict[str, Any]) -> str:
+    return rolling_std(graph, pct_change(graph, "close"), settings["volatility_window"])
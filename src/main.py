@@ -9,7 +9,8 @@ import sys
 import json
 import time
 import argparse
-import schedule
+import subprocess
+import threading
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Dict, List, Any, Optional
@@ -18,10 +19,18 @@ from pathlib import Path
 from loguru import logger
 from dotenv import load_dotenv
 
-from wallet import BlockchainWallet
 from technical_analysis import TechnicalAnalyzer
 from sentiment_analysis import SentimentAnalyzer
 from trading_strategy import TradingStrategy
+from metrics import metrics
+from scheduler import EventScheduler
+from risk_monitor import RiskMonitor
+from event_index import EventIndex
+from replay import Recorder, Replayer
+from state_store import (
+    StateStore, analysis_key, signals_key, DEFAULT_PATH, PORTFOLIO_KEY, STATUS_KEY, HEARTBEAT_KEY, METRICS_KEY,
+    CONTROL_KEY, ANALYZE_REQUEST_PREFIX
+)
 
 
 # Configure logger
@@ -59,12 +68,13 @@ class CryptoTradingAgent:
     Main class for the cryptocurrency trading agent.
     """
     
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, state_store: Optional[StateStore] = None):
         """
         Initialize the trading agent with configuration.
         
         Args:
             config_path: Path to the configuration file
+            state_store: Store to publish portfolio, analysis and status to (optional)
         """
         # Load environment variables
         load_dotenv()
@@ -72,13 +82,39 @@ class CryptoTradingAgent:
         # Load configuration
         with open(config_path, 'r') as f:
             self.config = json.load(f)
+        self.config_path = config_path
         
         # Initialize components
-        self.wallet = BlockchainWallet(config_path)
         self.technical_analyzer = TechnicalAnalyzer(config_path)
         self.sentiment_analyzer = SentimentAnalyzer(config_path)
         self.trading_strategy = TradingStrategy(config_path)
         
+        # One wallet, so the balance ledgers and fee caches the jobs keep fresh are the ones trades use
+        self.wallet = self.trading_strategy.wallet
+        
+        # Local history of the wallet's transfers and the strategy's trades
+        self.event_index = EventIndex(self.config.get("event_index"), self.wallet.native_symbols,
+                                      self.wallet.price_oracle)
+        for tracker in self.wallet.balance_trackers.values():
+            tracker.listeners.append(self.event_index)
+        
+        # Paper fills didn't happen on chain, so they stay out of the wallet's history
+        if self.trading_strategy.paper_exchange is None:
+            self.trading_strategy.trade_listeners.append(self.event_index.record_trade)
+        self.risk_monitor = RiskMonitor(self.trading_strategy)
+        
+        # Shared state for the web tier when running as a separate process
+        self.state_store = state_store
+        self._status_lock = threading.Lock()
+        
+        # Scheduler state for continuous runs
+        self.scheduler = None
+        self._token_locks: Dict[str, threading.Lock] = {}
+        self._token_locks_guard = threading.Lock()
+        
+        # Pause between tokens in run_once to avoid rate limiting (turned off by replays)
+        self.token_delay_seconds = 1
+        
         # Set up logger
         log_level = self.config["logging"]["level"]
         setup_logger(log_level)
@@ -99,14 +135,48 @@ class CryptoTradingAgent:
             for token_symbol, token_data in chain_data["tokens"].items():
                 logger.info(f"{chain} {token_symbol} balance: {token_data['balance']}")
         
+        self._publish({PORTFOLIO_KEY: portfolio})
         return portfolio
     
+    def _publish(self, items: Dict[str, Any]):
+        """
+        Write values to the state store, if there is one.
+        
+        Args:
+            items: Values by store key
+        """
+        if self.state_store is None:
+            return
+        
+        try:
+            self.state_store.set_many(items)
+        except Exception as e:
+            logger.error(f"Error publishing state: {str(e)}")
+    
+    def _publish_status(self, **status):
+        """
+        Update fields of the agent status in the state store.
+        
+        Args:
+            **status: Status values to update
+        """
+        if self.state_store is None:
+            return
+        
+        with self._status_lock:
+            current = self.state_store.get(STATUS_KEY, {})
+            current.update(status)
+            self._publish({STATUS_KEY: current})
+    
     def analyze_all_tokens(self):
         """Analyze all tokens of interest from the configuration."""
         logger.info("Analyzing all tokens of interest...")
         
         results = {}
         
+        # The tokens' sentiment searches run concurrently, then each strategy reuses its token's result
+        self.trading_strategy.refresh_sentiments([token["symbol"] for token in self.config["tokens_of_interest"]])
+        
         for token in self.config["tokens_of_interest"]:
             symbol = token["symbol"]
             chain = token["chain"]
@@ -114,25 +184,27 @@ class CryptoTradingAgent:
             logger.info(f"Analyzing {symbol} on {chain}...")
             
             # Run strategy for the token
-            result = self.trading_strategy.run_strategy(token)
+            result = self.trading_strategy.run_strategy(token, use_cached_sentiment=True)
             
             # Store result
-            results[symbol] = result
+            results[symbol] = result.to_dict()
             
             # Log result
-            action = result["action_taken"]
+            action = result.action_taken
             if action != "none":
                 logger.info(f"Action taken for {symbol}: {action}")
-                if result["trade_details"]:
-                    logger.info(f"Trade details: {result['trade_details']}")
+                if result.trade is not None:
+                    logger.info(f"Trade details: {result.trade.to_dict()}")
             else:
                 logger.info(f"No action taken for {symbol}")
             
             # Add a delay to avoid rate limiting
-            time.sleep(1)
+            if self.token_delay_seconds:
+                time.sleep(self.token_delay_seconds)
         
         return results
     
+    @metrics.timed("agent_cycle")
     def run_once(self):
         """Run the trading agent once for all tokens of interest."""
         logger.info("Running trading agent...")
@@ -145,6 +217,7 @@ class CryptoTradingAgent:
         
         # Check portfolio after trading
         updated_portfolio = self.trading_strategy.check_portfolio()
+        self.trading_strategy.flush_trade_history()
         
         # Return results
         return {
@@ -154,27 +227,321 @@ class CryptoTradingAgent:
             "analysis_results": results
         }
     
-    def schedule_runs(self, interval_minutes: int = 60):
+    def _token_lock(self, symbol: str) -> threading.Lock:
+        """Get the lock that serializes scheduled jobs for a token."""
+        with self._token_locks_guard:
+            return self._token_locks.setdefault(symbol, threading.Lock())
+    
+    def run_token_analysis(self, token: Dict[str, Any]):
         """
-        Schedule the trading agent to run at regular intervals.
+        Run the full strategy for a token, reusing its cached sentiment.
+        
+        Args:
+            token: Token data from config
+        """
+        symbol = token["symbol"]
+        
+        with self._token_lock(symbol):
+            result = self.trading_strategy.run_strategy(token, use_cached_sentiment=True)
+        
+        self._publish({
+            analysis_key(symbol): result.to_dict(),
+            signals_key(symbol): self.trading_strategy.signal_history.to_dict(symbol)
+        })
+        self._publish_status(last_update=datetime.utcnow().isoformat())
+        
+        action = result.action_taken
+        if action != "none":
+            logger.info(f"Action taken for {symbol}: {action}")
+            if result.trade is not None:
+                logger.info(f"Trade details: {result.trade.to_dict()}")
+        else:
+            logger.info(f"No action taken for {symbol}")
+    
+    def check_token_risk(self, token: Dict[str, Any], current_price: Optional[float] = None):
+        """
+        Check stop loss and take profit for a token's active trade.
+        
+        Args:
+            token: Token data from config
+            current_price: Latest price if already known
+        """
+        symbol = token["symbol"]
+        if symbol not in self.trading_strategy.active_trades:
+            return
+        
+        with self._token_lock(symbol):
+            result = self.trading_strategy.check_risk(token, current_price=current_price)
+        
+        if result.action_taken != "none":
+            logger.info(f"Risk check for {symbol}: {result.action_taken}")
+            self._publish({signals_key(symbol): self.trading_strategy.signal_history.to_dict(symbol)})
+            self.check_wallet_balances()
+    
+    def monitor_risk(self):
+        """Check every active trade against the latest prices and exit the ones that hit a level."""
+        triggered = self.risk_monitor.check()
+        if not triggered:
+            return
+        
+        tokens = {token["symbol"]: token for token in self.config["tokens_of_interest"]}
+        for symbol, action, price in triggered:
+            logger.warning(f"{action} triggered for {symbol} at {price}")
+            if symbol in tokens:
+                self.check_token_risk(tokens[symbol], current_price=price)
+    
+    def refresh_token_sentiment(self, token: Dict[str, Any]):
+        """
+        Refresh the cached sentiment for a token.
         
         Args:
-            interval_minutes: Interval in minutes between runs
+            token: Token data from config
         """
+        self.trading_strategy.refresh_sentiment(token["symbol"])
+    
+    def _token_schedule(self, token: Dict[str, Any], interval_minutes: int) -> Dict[str, float]:
+        """
+        Get the stage intervals (in seconds) for a token.
+        Per-token "schedule" settings override the global "scheduler" section.
+        
+        Args:
+            token: Token data from config
+            interval_minutes: Default analysis interval in minutes
+            
+        Returns:
+            Dict: Interval in seconds for each stage
+        """
+        settings = dict(self.config.get("scheduler", {}))
+        settings["analysis_interval_minutes"] = interval_minutes
+        settings.update(token.get("schedule", {}))
+        
+        return {
+            "analysis": settings["analysis_interval_minutes"] * 60,
+            "sentiment": settings.get("sentiment_interval_minutes", interval_minutes) * 60
+        }
+    
+    def _build_scheduler(self, interval_minutes: Optional[int] = None) -> EventScheduler:
+        """
+        Create a scheduler with the portfolio, risk monitor, gas oracle, balance
+        tracker, event index and trade history jobs and each token's analysis
+        and sentiment refresh jobs.
+        
+        Args:
+            interval_minutes: Interval in minutes between full analysis runs
+                              (None to use the scheduler config)
+            
+        Returns:
+            EventScheduler: Scheduler with all jobs added (not yet running)
+        """
+        scheduler_config = self.config.get("scheduler", {})
+        if interval_minutes is None:
+            interval_minutes = scheduler_config.get("analysis_interval_minutes", 60)
+        
         logger.info(f"Scheduling trading agent to run every {interval_minutes} minutes")
         
-        # Schedule the first run
-        schedule.every(interval_minutes).minutes.do(self.run_once)
+        jitter = scheduler_config.get("jitter_seconds", 0)
+        max_lateness = scheduler_config.get("max_lateness_seconds")
+        
+        scheduler = EventScheduler(max_workers=scheduler_config.get("max_workers", 4))
         
-        # Run immediately once
-        self.run_once()
+        # Log (and publish) the balances once per analysis interval
+        scheduler.add_job("portfolio", self.check_wallet_balances, interval_minutes * 60, jitter, max_lateness)
+        
+        # Stop losses and take profits of all active trades are checked together, without analysis,
+        # on a worker of their own so slow analysis and network jobs can't delay them
+        risk_interval = scheduler_config.get("risk_interval_seconds", 1)
+        scheduler.add_job("risk", self.monitor_risk, risk_interval, 0, risk_interval, dedicated=True)
+        
+        # Keep the wallet's fee suggestions fresh so sends never wait for a gas price request
+        for chain, oracle in self.wallet.gas_oracles.items():
+            refresh_seconds = oracle.settings["refresh_seconds"]
+            scheduler.add_job(f"gas:{chain}", oracle.refresh, refresh_seconds, 0, refresh_seconds)
+        
+        # Follow new blocks for the wallet's transfers, and read every balance again now and then
+        for chain, tracker in self.wallet.balance_trackers.items():
+            poll_seconds = tracker.settings["poll_seconds"]
+            scheduler.add_job(f"balances:{chain}", tracker.poll, poll_seconds, 0, poll_seconds)
+            scheduler.add_job(f"reconcile:{chain}", tracker.reconcile, tracker.settings["reconcile_minutes"] * 60,
+                              jitter, max_lateness)
+            # Backfill the event index, and fill the blocks skipped when the ledger reconciled instead of replaying
+            scheduler.add_job(f"events:{chain}", lambda t=tracker: self.event_index.sync(t),
+                              self.event_index.settings["sync_minutes"] * 60, jitter, max_lateness)
+        
+        # Dry runs write the trade history file periodically rather than after every trade
+        flush_seconds = self.trading_strategy.history_flush_seconds
+        if flush_seconds:
+            scheduler.add_job("trade_history", self.trading_strategy.flush_trade_history, flush_seconds, 0,
+                              flush_seconds)
+        
+        for token in self.config["tokens_of_interest"]:
+            symbol = token["symbol"]
+            intervals = self._token_schedule(token, interval_minutes)
+            
+            # Analysis reuses the sentiment cached by the sentiment job, so it starts once the first
+            # refresh has begun (and joins it if it is still running, see TradingStrategy.refresh_sentiment)
+            scheduler.add_job(f"{symbol}:sentiment", lambda t=token: self.refresh_token_sentiment(t),
+                              intervals["sentiment"], jitter, max_lateness)
+            scheduler.add_job(f"{symbol}:analysis", lambda t=token: self.run_token_analysis(t),
+                              intervals["analysis"], jitter, max_lateness, delay=jitter)
         
-        # Keep running
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        return scheduler
     
-    def run_web_interface(self, host: str = "127.0.0.1", port: int = 5000, debug: bool = False):
+    def schedule_runs(self, interval_minutes: Optional[int] = None):
+        """
+        Schedule the trading agent to run at regular intervals.
+        Each token gets its own analysis and sentiment refresh jobs; one risk monitor job
+        checks all active trades.
+        
+        Args:
+            interval_minutes: Interval in minutes between full analysis runs
+                              (None to use the scheduler config)
+        """
+        scheduler = self.scheduler = self._build_scheduler(interval_minutes)
+        self._start_stream()
+        
+        # Keep running until interrupted
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            logger.info("Stopping scheduler")
+            scheduler.stop()
+            self.trading_strategy.sentiment_analyzer.stop_stream()
+            self.trading_strategy.flush_trade_history()
+    
+    def _start_stream(self):
+        """Follow the X filtered stream for the tokens of interest, if it is enabled."""
+        symbols = [token["symbol"] for token in self.config["tokens_of_interest"]]
+        if self.trading_strategy.sentiment_analyzer.start_stream(symbols):
+            logger.info(f"Streaming X sentiment for {', '.join(symbols)}")
+    
+    def _set_running(self, running: bool, interval_minutes: Optional[int] = None):
+        """
+        Start or stop the scheduled jobs of the agent process.
+        
+        Args:
+            running: Whether the jobs should run
+            interval_minutes: Interval in minutes between full analysis runs
+        """
+        if running and self.scheduler is None:
+            self.scheduler = self._build_scheduler(interval_minutes)
+            self.scheduler.start()
+            self._start_stream()
+            logger.info("Agent started")
+        elif not running and self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+            self.trading_strategy.sentiment_analyzer.stop_stream()
+            self.trading_strategy.flush_trade_history()
+            logger.info("Agent stopped")
+        
+        self._publish_status(agent_running=running)
+    
+    def _handle_state_change(self, key: str, value: Any):
+        """
+        React to commands written to the state store by the web tier.
+        
+        Args:
+            key: Store key that changed
+            value: New value
+        """
+        if key == CONTROL_KEY:
+            self._set_running(value.get("running", False), value.get("interval"))
+        elif key.startswith(ANALYZE_REQUEST_PREFIX):
+            symbol = key[len(ANALYZE_REQUEST_PREFIX):]
+            for token in self.config["tokens_of_interest"]:
+                if token["symbol"] == symbol:
+                    threading.Thread(target=self.run_token_analysis, args=(token,), daemon=True).start()
+                    break
+            else:
+                logger.warning(f"Analysis requested for unknown token {symbol}")
+    
+    def record_runs(self, path: str, cycles: Optional[int] = None, interval_minutes: Optional[int] = None):
+        """
+        Run the agent in run_once cycles and record every external input it sees.
+        
+        Args:
+            path: Log file to write (gzip-compressed JSON lines, see Replayer)
+            cycles: Number of cycles to run (None to run until interrupted)
+            interval_minutes: Interval in minutes between cycles (None to use the scheduler config)
+        """
+        if interval_minutes is None:
+            interval_minutes = self.config.get("scheduler", {}).get("analysis_interval_minutes", 60)
+        
+        recorder = Recorder(path)
+        recorder.attach(self)
+        logger.info(f"Recording agent inputs to {path}")
+        
+        try:
+            while cycles is None or recorder.cycles < cycles:
+                recorder.run_once(self)
+                if cycles is None or recorder.cycles < cycles:
+                    time.sleep(interval_minutes * 60)
+        except KeyboardInterrupt:
+            logger.info("Stopping recording")
+        finally:
+            recorder.close()
+            logger.info(f"Recorded {recorder.cycles} cycles to {path}")
+    
+    def replay_runs(self, path: str) -> Dict[str, Any]:
+        """
+        Run the cycles of a recording through run_once, as fast as possible.
+        
+        Args:
+            path: Log file written by record_runs
+            
+        Returns:
+            Dict: Replay summary (see Replayer.run)
+        """
+        replayer = Replayer(path)
+        replayer.attach(self)
+        logger.info(f"Replaying {len(replayer.digests)} recorded cycles from {path}")
+        return replayer.run(self)
+    
+    def run_agent_process(self, heartbeat_seconds: float = 5.0):
+        """
+        Run the agent as its own process, separate from the web tier.
+        
+        The agent publishes its portfolio, analysis results, status and metrics
+        to the state store, and follows the start/stop and analysis commands
+        that the web workers write there.
+        
+        Args:
+            heartbeat_seconds: Seconds between status heartbeats and metrics exports
+        """
+        if self.state_store is None:
+            raise ValueError("The agent process needs a state store")
+        
+        logger.info(f"Running agent process (pid {os.getpid()}) with state store {self.state_store.path}")
+        
+        self._publish_status(agent_running=False, pid=os.getpid(), started_at=datetime.utcnow().isoformat())
+        
+        # Resume the last requested state, then follow new commands
+        control = self.state_store.get(CONTROL_KEY, {})
+        if control.get("running"):
+            self._set_running(True, control.get("interval"))
+        
+        stop_event = threading.Event()
+        self.state_store.watch(self._handle_state_change, stop_event=stop_event)
+        
+        try:
+            while True:
+                self._publish({
+                    HEARTBEAT_KEY: {"pid": os.getpid(), "time": time.time()},
+                    METRICS_KEY: metrics.export()
+                })
+                time.sleep(heartbeat_seconds)
+        except KeyboardInterrupt:
+            logger.info("Stopping agent process")
+        finally:
+            stop_event.set()
+            if self.scheduler is not None:
+                self.scheduler.stop()
+            self.trading_strategy.sentiment_analyzer.stop_stream()
+            self.trading_strategy.flush_trade_history()
+            self._publish_status(agent_running=False, pid=None)
+    
+    def run_web_interface(self, host: str = "127.0.0.1", port: int = 5000, debug: bool = False,
+                          start_agent_process: bool = True):
         """
         Run the web interface for the trading agent.
         
@@ -182,16 +549,24 @@ class CryptoTradingAgent:
             host: Host to run the web server on
             port: Port to run the web server on
             debug: Whether to run in debug mode
+            start_agent_process: Whether to launch the agent process alongside the web server
         """
         logger.info(f"Starting web interface on {host}:{port}")
         
+        agent_process = None
+        if start_agent_process:
+            agent_process = subprocess.Popen([
+                sys.executable, os.path.abspath(__file__), "--agent-process", "--config", self.config_path
+            ])
+            logger.info(f"Started agent process (pid {agent_process.pid})")
+        
         try:
             # Import web module
             from web.app import run_web_server
             
             # Run web server
             run_web_server(
-                config_path=self.config.get("config_path", "../config/config.json"),
+                config_path=self.config_path,
                 host=host,
                 port=port,
                 debug=debug
@@ -203,6 +578,9 @@ class CryptoTradingAgent:
         except Exception as e:
             logger.error(f"Error running web interface: {str(e)}")
             sys.exit(1)
+        finally:
+            if agent_process is not None:
+                agent_process.terminate()
 
 
 def main():
@@ -226,8 +604,8 @@ def main():
     parser.add_argument(
         "--interval",
         type=int,
-        default=60,
-        help="Interval in minutes between runs when running continuously"
+        default=None,
+        help="Interval in minutes between runs when running continuously (default: scheduler config or 60)"
     )
     
     parser.add_argument(
@@ -248,6 +626,18 @@ def main():
         help="Run the web interface"
     )
     
+    parser.add_argument(
+        "--agent-process",
+        action="store_true",
+        help="Run the agent as a background process controlled through the state store"
+    )
+    
+    parser.add_argument(
+        "--no-agent",
+        action="store_true",
+        help="With --web, do not launch the agent process (e.g. for additional web workers)"
+    )
+    
     parser.add_argument(
         "--host",
         type=str,
@@ -268,15 +658,46 @@ def main():
         help="Run in debug mode"
     )
     
+    parser.add_argument(
+        "--record",
+        type=str,
+        metavar="PATH",
+        help="Run the agent in run-once cycles and record every external input to PATH (with --run-once: one cycle)"
+    )
+    
+    parser.add_argument(
+        "--replay",
+        type=str,
+        metavar="PATH",
+        help="Replay the cycles recorded in PATH offline and report whether the results are identical"
+    )
+    
     args = parser.parse_args()
     
     # Initialize the trading agent
-    agent = CryptoTradingAgent(args.config)
+    state_store = None
+    if args.agent_process:
+        with open(args.config, 'r') as f:
+            store_config = json.load(f).get("state_store", {})
+        state_store = StateStore(store_config.get("path", DEFAULT_PATH))
+    
+    agent = CryptoTradingAgent(args.config, state_store)
     
     # Execute the requested action
-    if args.web:
+    if args.agent_process:
+        # Run as the agent process behind the web interface
+        agent.run_agent_process()
+    elif args.replay:
+        # Replay a recording and fail if any cycle diverged
+        summary = agent.replay_runs(args.replay)
+        print(json.dumps(summary, indent=2))
+        sys.exit(1 if summary["diverged"] else 0)
+    elif args.record:
+        # Record run-once cycles
+        agent.record_runs(args.record, 1 if args.run_once else None, args.interval)
+    elif args.web:
         # Run the web interface
-        agent.run_web_interface(args.host, args.port, args.debug)
+        agent.run_web_interface(args.host, args.port, args.debug, not args.no_agent)
     elif args.check_wallet:
         # Check wallet balances
         agent.check_wallet_balances()
@@ -291,7 +712,7 @@ def main():
         if token_config:
             # Analyze the token
             result = agent.trading_strategy.run_strategy(token_config)
-            print(json.dumps(result, indent=2, default=str))
+            print(json.dumps(result.to_dict(), indent=2, default=str))
         else:
             logger.error(f"Token {args.analyze_token} not found in configuration")
     elif args.run_once:
@@ -0,0 +1,131 @@
+"""
+Market data module for the cryptocurrency trading agent.
+This module gets the candles of tokens. Every timeframe that is a multiple
+of the base timeframe is built from one base candle stream per token, which
+is only topped up with the candles that arrived since the last call. It needs
+only the "market_data" config section, so readers that just show candles
+(the web tier's charts) don't have to build a trading strategy.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from metrics import metrics
+from resampler import CandleResampler, TIMEFRAME_SECONDS, timeframe_seconds
+
+
+def fetch_price_data(token_symbol: str, timeframe: str = "1h", limit: int = 200) -> List[Dict[str, Any]]:
+    """
+    Get historical price data for a token.
+    This is a placeholder that would be replaced with actual API calls.
+
+    Args:
+        token_symbol: The token symbol
+        timeframe: The timeframe for candles (e.g., 1h, 4h, 1d)
+        limit: Number of candles to retrieve
+
+    Returns:
+        List[Dict]: List of price data points
+    """
+    # In a real implementation, this would call an exchange API
+    # For now, we'll generate random data for demonstration
+
+    logger.info(f"Getting price data for {token_symbol} ({timeframe}, {limit} candles)")
+
+    price_data = []
+    base_price = 1000 if token_symbol == "BTC" else 100  # Simplified
+    interval = TIMEFRAME_SECONDS.get(timeframe, 3600) * 1000
+
+    # The last candle is the one currently forming
+    timestamp = int(time.time() * 1000) // interval * interval - (limit - 1) * interval
+
+    for i in range(limit):
+        # Generate random price movement
+        price_change = random.uniform(-0.02, 0.02)
+        base_price *= (1 + price_change)
+
+        # Create candle data
+        candle = {
+            "timestamp": timestamp,
+            "open": base_price * (1 - random.uniform(0, 0.005)),
+            "high": base_price * (1 + random.uniform(0, 0.01)),
+            "low": base_price * (1 - random.uniform(0, 0.01)),
+            "close": base_price,
+            "volume": random.uniform(10, 100) * base_price
+        }
+
+        price_data.append(candle)
+        timestamp += interval
+
+    return price_data
+
+
+class MarketData:
+    """
+    Candles of any timeframe per token, resampled from a base candle stream.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None,
+                 fetch: Callable[..., List[Dict[str, Any]]] = fetch_price_data):
+        """
+        Initialize the market data.
+
+        Args:
+            settings: The "market_data" config section (base_timeframe, history_candles)
+            fetch: Function (token_symbol, timeframe, limit) getting candles from the source
+        """
+        settings = settings or {}
+        self.base_timeframe = settings.get("base_timeframe", "1h")
+        self.history_candles = settings.get("history_candles", 5000)
+        self.fetch = fetch
+        self.resamplers: Dict[str, CandleResampler] = {}
+        self._resampler_locks: Dict[str, threading.Lock] = {}
+        self._resampler_guard = threading.Lock()
+
+    def get_candles(self, token_symbol: str, timeframe: str = "1h", limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Get recent candles of a token for any timeframe.
+
+        Timeframes that are multiples of the base timeframe are built from the
+        token's base candle stream, which is only topped up with the candles
+        that arrived since the last call. Shorter timeframes are fetched directly.
+
+        Args:
+            token_symbol: The token symbol
+            timeframe: The timeframe for candles (e.g., 1h, 4h, 1d)
+            limit: Number of candles to return
+
+        Returns:
+            List[Dict]: Candles, oldest first (the last one may still be forming)
+        """
+        base_seconds = timeframe_seconds(self.base_timeframe)
+        if timeframe_seconds(timeframe) % base_seconds:
+            return self.fetch(token_symbol, timeframe, limit)
+
+        with self._resampler_guard:
+            lock = self._resampler_locks.setdefault(token_symbol, threading.Lock())
+
+        with lock:
+            resampler = self.resamplers.get(token_symbol)
+            if resampler is None:
+                timeframes = [t for t, seconds in TIMEFRAME_SECONDS.items() if seconds % base_seconds == 0]
+                resampler = CandleResampler(self.base_timeframe, timeframes, capacity=self.history_candles)
+                self.resamplers[token_symbol] = resampler
+
+            # Fetch the full history once, then only the candles since the last one (including it,
+            # since it may have been forming)
+            last = resampler.last_timestamp
+            if last is None:
+                count = self.history_candles
+            else:
+                elapsed = time.time() * 1000 - last
+                count = min(self.history_candles, max(1, int(elapsed // (base_seconds * 1000)) + 1))
+
+            with metrics.timer("market_data.fetch"):
+                resampler.extend(self.fetch(token_symbol, self.base_timeframe, count))
+
+            return resampler.candles(timeframe, limit)
@@ -0,0 +1,329 @@
+"""
+Metrics module for the cryptocurrency trading agent.
+This module records per-stage timings and counters (RPC calls, API calls,
+cache hits) and renders them as a JSON snapshot or in the Prometheus text format.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Histogram buckets in seconds, from fast indicator math up to slow trade confirmations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Name of the histogram used for stage timings
+STAGE_METRIC = "agent_stage_duration_seconds"
+
+# Help text for the metrics the agent records
+METRIC_HELP = {
+    STAGE_METRIC: "Time spent in each stage of the agent",
+    "agent_rpc_calls_total": "JSON-RPC requests sent to blockchain nodes",
+    "agent_rpc_errors_total": "JSON-RPC requests that raised an error",
+    "agent_rpc_hedged_total": "JSON-RPC reads duplicated to a second endpoint after running past the p95 latency",
+    "agent_rpc_circuit_open_total": "Times an RPC endpoint was taken out of rotation after repeated failures",
+    "agent_api_calls_total": "Requests sent to external HTTP APIs",
+    "agent_api_errors_total": "Requests to external HTTP APIs that failed",
+    "agent_fetch_deferred_total": "API fetches deferred to stay within the rate-limit quota",
+    "agent_sentiment_refreshes_joined_total": "Sentiment refreshes that waited for one already running for the token instead of searching again",
+    "agent_cache_hits_total": "Cache lookups that returned a cached value",
+    "agent_cache_misses_total": "Cache lookups that missed",
+    "agent_errors_total": "Errors caught while running an agent stage",
+    "agent_trades_total": "Trades executed by the strategy",
+    "agent_balance_updates_total": "Balances changed by transfers found in new blocks",
+    "agent_risk_triggers_total": "Stop losses and take profits detected by the risk monitor",
+    "agent_exit_retries_deferred_total": "Failed stop-loss and take-profit exits backed off before their next attempt",
+    "agent_paper_orders_total": "Orders filled or rejected by the paper exchange",
+    "agent_scheduler_overruns_total": "Scheduled runs skipped because the previous run was still executing",
+    "agent_scheduler_long_runs_total": "Scheduled runs that took longer than their job's interval",
+    "agent_scheduler_dropped_total": "Scheduled runs dropped because they started too late (when due or after waiting for a worker)",
+    "agent_socketio_frames_total": "Socket.IO frames emitted to web clients",
+    "agent_socketio_bytes_total": "Bytes of Socket.IO payload emitted to web clients, after compression",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    """Convert a labels dict into a hashable, ordered key."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format a label key in the Prometheus exposition format."""
+    items = list(key)
+    if extra is not None:
+        items.append(extra)
+
+    if not items:
+        return ""
+
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in items) + "}"
+
+
+class _Histogram:
+    """Cumulative histogram of observed durations for one label set."""
+
+    __slots__ = ("buckets", "bucket_counts", "count", "total", "max", "last")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.last = value
+        if value > self.max:
+            self.max = value
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """
+    A thread-safe registry of counters and duration histograms.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty registry.
+
+        Args:
+            buckets: Upper bounds of the histogram buckets in seconds
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """
+        Increment a counter.
+
+        Args:
+            name: Counter name (e.g. agent_rpc_calls_total)
+            value: Amount to add
+            **labels: Label values for this series
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """
+        Record a duration in a histogram.
+
+        Args:
+            name: Histogram name
+            seconds: Observed duration in seconds
+            **labels: Label values for this series
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str, **labels) -> Iterator[None]:
+        """
+        Time a block of code as an agent stage.
+
+        Args:
+            stage: Stage name (e.g. analyze_token.sentiment)
+            **labels: Additional label values
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment("agent_errors_total", stage=stage)
+            raise
+        finally:
+            self.observe(STAGE_METRIC, time.perf_counter() - start, stage=stage, **labels)
+
+    def timed(self, stage: str) -> Callable:
+        """
+        Decorator that times every call of a function as an agent stage.
+
+        Args:
+            stage: Stage name
+        """
+        def decorator(fn: Callable) -> Callable:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def counter_value(self, name: str, **labels) -> float:
+        """Get the current value of a counter series."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def reset(self):
+        """Clear all recorded metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a JSON-serializable summary of all metrics.
+
+        Returns:
+            Dict: Stage timing summaries and counter values
+        """
+        with self._lock:
+            stages = {}
+            for key, histogram in self._histograms.get(STAGE_METRIC, {}).items():
+                labels = dict(key)
+                stage = labels.pop("stage", "")
+                name = stage if not labels else stage + _format_labels(_label_key(labels))
+                stages[name] = {
+                    "count": histogram.count,
+                    "total_seconds": histogram.total,
+                    "mean_seconds": histogram.total / histogram.count if histogram.count else 0.0,
+                    "max_seconds": histogram.max,
+                    "last_seconds": histogram.last
+                }
+
+            counters = {
+                name: {_format_labels(key) or "total": value for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+
+        return {"stages": stages, "counters": counters}
+
+    def export(self) -> Dict[str, Any]:
+        """
+        Get the raw counters and histograms in a JSON-serializable form, so
+        another process can merge them into its own output (see merge).
+
+        Returns:
+            Dict: Counter and histogram series with their labels
+        """
+        with self._lock:
+            counters = {
+                name: [[dict(key), value] for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [[dict(key), list(h.bucket_counts), h.count, h.total, h.max, h.last] for key, h in series.items()]
+                for name, series in self._histograms.items()
+            }
+
+        return {"buckets": list(self.buckets), "counters": counters, "histograms": histograms}
+
+    def merge(self, exported: Dict[str, Any], **labels):
+        """
+        Add metrics exported by another registry.
+
+        Args:
+            exported: Result of export() on the other registry
+            **labels: Labels added to every merged series (e.g. process="agent")
+        """
+        if tuple(exported.get("buckets", ())) != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+
+        with self._lock:
+            for name, series in exported["counters"].items():
+                target = self._counters.setdefault(name, {})
+                for series_labels, value in series:
+                    key = _label_key({**series_labels, **labels})
+                    target[key] = target.get(key, 0) + value
+
+            for name, series in exported["histograms"].items():
+                target = self._histograms.setdefault(name, {})
+                for series_labels, bucket_counts, count, total, max_value, last in series:
+                    key = _label_key({**series_labels, **labels})
+                    histogram = target.get(key)
+                    if histogram is None:
+                        histogram = target[key] = _Histogram(self.buckets)
+                    histogram.bucket_counts = [a + b for a, b in zip(histogram.bucket_counts, bucket_counts)]
+                    histogram.count += count
+                    histogram.total += total
+                    histogram.max = max(histogram.max, max_value)
+                    histogram.last = last
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format (version 0.0.4).
+
+        Returns:
+            str: Metrics text
+        """
+        lines: List[str] = []
+
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+            for name in sorted(self._histograms):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def web3_metrics_middleware(chain: str) -> Callable:
+    """
+    Create a web3 middleware that counts and times JSON-RPC requests.
+
+    Args:
+        chain: Chain name used as a label
+
+    Returns:
+        Callable: Middleware to inject into a Web3 middleware onion
+    """
+    def middleware(make_request, w3):
+        def inner(method, params):
+            metrics.increment("agent_rpc_calls_total", chain=chain, method=method)
+            start = time.perf_counter()
+            try:
+                response = make_request(method, params)
+            except Exception:
+                metrics.increment("agent_rpc_errors_total", chain=chain, method=method)
+                raise
+            finally:
+                metrics.observe(STAGE_METRIC, time.perf_counter() - start, stage="rpc", method=method)
+
+            if isinstance(response, dict) and "error" in response:
+                metrics.increment("agent_rpc_errors_total", chain=chain, method=method)
+
+            return response
+        return inner
+    return middleware
+
+
+# Default registry shared by all agent components
+metrics = MetricsRegistry()
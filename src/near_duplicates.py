@@ -0,0 +1,178 @@
+"""
+Near-duplicate detection module for the cryptocurrency trading agent.
+This module groups the copies of a tweet (retweets, copy-pasted shilling and
+bot spam with small edits) before they are scored. Each tweet's normalized
+text is cut into character shingles and summarized by a MinHash signature, and
+locality-sensitive hashing over bands of the signatures finds the candidate
+pairs. Candidates whose signatures agree on at least the similarity threshold
+(an estimate of the shingles' Jaccard similarity) join the same cluster.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Default detector settings (overridden by the "near_duplicates" config section)
+DEFAULT_SETTINGS = {
+    "enabled": True,
+    "num_perm": 64,
+    "bands": 16,
+    "shingle_size": 5,
+    "threshold": 0.7,
+    "seed": 1
+}
+
+_URL = re.compile(r'http\S+')
+_MENTION = re.compile(r'@\w+')
+_NON_WORD = re.compile(r'[^\w\s]')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize a tweet's text for comparison.
+
+    Links, mentions, punctuation, case and a retweet's "RT" prefix are
+    dropped, so copies that differ only in those are identical.
+
+    Args:
+        text: Raw tweet text
+
+    Returns:
+        str: Normalized text
+    """
+    text = _MENTION.sub('', _URL.sub('', text.lower()))
+    text = _SPACE.sub(' ', _NON_WORD.sub('', text)).strip()
+    if text.startswith("rt "):
+        text = text[3:]
+    return text
+
+
+def _fmix32(h: np.ndarray) -> np.ndarray:
+    """Scramble 32-bit hashes (MurmurHash3's finalizer), elementwise."""
+    h = h ^ (h >> np.uint32(16))
+    h = h * np.uint32(0x85EBCA6B)
+    h = h ^ (h >> np.uint32(13))
+    h = h * np.uint32(0xC2B2AE35)
+    return h ^ (h >> np.uint32(16))
+
+
+class NearDuplicateDetector:
+    """
+    MinHash/LSH clustering of near-duplicate texts.
+
+    The signatures of a batch are computed together: the shingles of every
+    text are hashed in one pass, and each of the num_perm hash functions is
+    a seeded xor-multiply permutation of the (scrambled) shingle hashes, of
+    which each text keeps the minimum.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the detector.
+
+        Args:
+            settings: Detector settings (see DEFAULT_SETTINGS)
+
+        Raises:
+            ValueError: If num_perm is not a multiple of bands
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.enabled = self.settings["enabled"]
+        self.num_perm = int(self.settings["num_perm"])
+        self.bands = int(self.settings["bands"])
+        self.shingle_size = int(self.settings["shingle_size"])
+        self.threshold = float(self.settings["threshold"])
+        if self.bands <= 0 or self.num_perm % self.bands:
+            raise ValueError(f"MinHash permutations ({self.num_perm}) must split into {self.bands} equal bands")
+        self.rows = self.num_perm // self.bands
+
+        rng = np.random.default_rng(self.settings["seed"])
+        self._seeds = rng.integers(0, 2 ** 32, size=(self.num_perm, 1), dtype=np.uint64).astype(np.uint32)
+        self._multipliers = (rng.integers(0, 2 ** 32, size=(self.num_perm, 1), dtype=np.uint64) | 1).astype(np.uint32)
+        self._band_mix = rng.integers(0, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._powers = (31 ** np.arange(self.shingle_size - 1, -1, -1, dtype=np.uint64)).astype(np.uint32)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """
+        Get the MinHash signatures of some texts.
+
+        Args:
+            texts: Raw texts (normalized here)
+
+        Returns:
+            np.ndarray: Signatures, one row of num_perm uint32 per text
+        """
+        if not texts:
+            return np.zeros((0, self.num_perm), dtype=np.uint32)
+
+        # Texts shorter than a shingle are one shingle, padded with spaces
+        k = self.shingle_size
+        docs = [normalize(text).encode("utf-8").ljust(k) for text in texts]
+        lengths = np.array([len(doc) for doc in docs], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        # Hash of every k-byte window of the joined texts, keeping those inside one text
+        data = np.frombuffer(b"".join(docs), dtype=np.uint8).astype(np.uint32)
+        window_hashes = _fmix32((sliding_window_view(data, k) * self._powers).sum(axis=1, dtype=np.uint32))
+        counts = lengths - k + 1
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        positions = np.arange(counts.sum()) - np.repeat(starts - offsets, counts)
+        shingles = window_hashes[positions]
+
+        # Minimum of each hash function over each text's shingles (reduced along rows, which is faster)
+        hashed = shingles[None, :] ^ self._seeds
+        np.multiply(hashed, self._multipliers, out=hashed)
+        return np.ascontiguousarray(np.minimum.reduceat(hashed, starts, axis=1).T)
+
+    def cluster(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group near-duplicate texts.
+
+        Args:
+            texts: Raw texts
+
+        Returns:
+            List[List[int]]: Indexes of the texts in each cluster, in order of
+                             first appearance (every text in its own cluster if disabled)
+        """
+        n = len(texts)
+        if not self.enabled or n < 2:
+            return [[i] for i in range(n)]
+
+        signatures = self.signatures(texts)
+        parent = list(range(n))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Texts whose band of the signature is equal (hashed to 64 bits) are candidates
+        keys = (signatures.reshape(n, self.bands, self.rows).astype(np.uint64) * self._band_mix).sum(
+            axis=2, dtype=np.uint64)
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            edges = np.flatnonzero(np.diff(keys[order, band])) + 1
+            starts = np.concatenate(([0], edges))
+            ends = np.concatenate((edges, [n]))
+            for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+                first, *members = order[start:end].tolist()
+                root = find(first)
+                others = [other for other in members if find(other) != root]
+                if not others:
+                    continue
+                agreeing = np.count_nonzero(signatures[others] == signatures[first], axis=1)
+                for other, similar in zip(others, agreeing >= self.threshold * self.num_perm):
+                    if similar:
+                        root, other_root = find(first), find(other)
+                        if root != other_root:
+                            parent[max(root, other_root)] = min(root, other_root)
+
+        clusters: Dict[int, List[int]] = {}
+        for i in range(n):
+            clusters.setdefault(find(i), []).append(i)
+        return list(clusters.values())
@@ -0,0 +1,225 @@
+"""
+Paper exchange module for the cryptocurrency trading agent.
+This module executes the strategy's orders in memory for dry runs. Each token
+trades against its own constant-product pool (x * y = k) with USD, anchored to
+the market price, so a fill moves the price by its size. Orders wait a
+simulated network latency, pay a fee, are rejected when the fill price slips
+past the allowed slippage, and settle against paper balances.
+"""
+
+import random
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from metrics import metrics
+from records import TradeRecord
+
+# Asset the paper balances are quoted and settled in
+QUOTE_ASSET = "USD"
+
+# Default exchange settings (overridden by the "paper_exchange" config section)
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "initial_balances": {QUOTE_ASSET: 10000},
+    "fee_rate": 0.003,
+    "liquidity_usd": 1000000,
+    "latency_ms": 50,
+    "latency_jitter_ms": 20,
+    "history_flush_seconds": 5
+}
+
+
+class Pool:
+    """
+    A token/USD constant-product pool.
+    """
+
+    __slots__ = ("price", "token_reserve", "usd_reserve")
+
+    def __init__(self, price: float, liquidity_usd: float):
+        """
+        Initialize the pool at a market price.
+
+        Args:
+            price: Market price in USD
+            liquidity_usd: Total value of both reserves in USD
+        """
+        self.anchor(price, liquidity_usd)
+
+    def anchor(self, price: float, liquidity_usd: float):
+        """Reset the reserves to a market price (what arbitrage does to a real pool)."""
+        self.price = price
+        self.usd_reserve = liquidity_usd / 2
+        self.token_reserve = self.usd_reserve / price
+
+
+class PaperExchange:
+    """
+    Simulated order execution with price impact, latency, fees and balances.
+
+    A pool keeps the price impact of the agent's own fills until the market
+    price it is anchored to changes. The latency is waited outside the
+    exchange's lock, so concurrent orders overlap their latencies like real
+    requests do and only the fill itself is serialized.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None,
+                 get_price: Optional[Callable[[str], Optional[float]]] = None, max_slippage: float = 0.01):
+        """
+        Initialize the exchange.
+
+        Args:
+            settings: Exchange settings (see DEFAULT_SETTINGS)
+            get_price: Function returning a token's market price in USD (None if unknown)
+            max_slippage: Largest allowed relative difference between the quoted and fill price, before fees
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.get_price = get_price
+        self.max_slippage = max_slippage
+        self.fee_rate = self.settings["fee_rate"]
+        self.liquidity_usd = float(self.settings["liquidity_usd"])
+
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Pool] = {}
+        self._balances = {asset: float(amount) for asset, amount in self.settings["initial_balances"].items()}
+        self._balances.setdefault(QUOTE_ASSET, 0.0)
+        self.orders = 0
+        self.rejected = 0
+        self.volume_usd = 0.0
+        self.fees_usd = 0.0
+
+    def _latency(self) -> float:
+        """Get the simulated latency of one order in seconds."""
+        latency = self.settings["latency_ms"]
+        jitter = self.settings["latency_jitter_ms"]
+        if jitter:
+            latency += random.uniform(-jitter, jitter)
+        return max(latency, 0) / 1000
+
+    def _pool(self, symbol: str, price: float) -> Pool:
+        """Get a token's pool anchored to the latest market price (called with the lock held)."""
+        pool = self._pools.get(symbol)
+        if pool is None:
+            pool = self._pools[symbol] = Pool(price, self.liquidity_usd)
+        elif pool.price != price:
+            pool.anchor(price, self.liquidity_usd)
+        return pool
+
+    def _fill(self, symbol: str, action: str, amount: float, quote: float,
+              market: float) -> Union[Tuple[float, float, float], str]:
+        """
+        Fill an order against the pool and the balances (called with the lock held).
+
+        Returns:
+            Tuple: (fill price, value in USD, fee in USD), or an error message if the order is rejected
+        """
+        pool = self._pool(symbol, market)
+        fee_rate = self.fee_rate
+
+        if action == "buy":
+            if amount >= pool.token_reserve:
+                return "Insufficient liquidity"
+            # Exact output: the USD paid in, fee included, for the requested tokens
+            usd_in = pool.usd_reserve * amount / (pool.token_reserve - amount) / (1 - fee_rate)
+            fee = usd_in * fee_rate
+            slippage = (usd_in - fee) / amount / quote - 1
+            if slippage > self.max_slippage:
+                return f"Slippage {slippage:.2%} above the {self.max_slippage:.2%} limit"
+            if usd_in > self._balances[QUOTE_ASSET]:
+                return f"Insufficient {QUOTE_ASSET} balance"
+
+            pool.usd_reserve += usd_in - fee
+            pool.token_reserve -= amount
+            self._balances[QUOTE_ASSET] -= usd_in
+            self._balances[symbol] = self._balances.get(symbol, 0.0) + amount
+            return usd_in / amount, usd_in, fee
+
+        if amount > self._balances.get(symbol, 0.0):
+            return f"Insufficient {symbol} balance"
+        # Exact input: the fee is taken from the tokens sold
+        amount_in = amount * (1 - fee_rate)
+        usd_out = pool.usd_reserve * amount_in / (pool.token_reserve + amount_in)
+        fee = usd_out * fee_rate / (1 - fee_rate)
+        slippage = 1 - (usd_out + fee) / amount / quote
+        if slippage > self.max_slippage:
+            return f"Slippage {slippage:.2%} above the {self.max_slippage:.2%} limit"
+
+        pool.token_reserve += amount_in
+        pool.usd_reserve -= usd_out
+        self._balances[symbol] -= amount
+        self._balances[QUOTE_ASSET] += usd_out
+        return usd_out / amount, usd_out, fee
+
+    def execute(self, symbol: str, chain: str, action: str, amount: Decimal,
+                price: Optional[float] = None) -> TradeRecord:
+        """
+        Execute a market order.
+
+        Args:
+            symbol: Token symbol
+            chain: Chain the order is for (recorded on the trade)
+            action: buy or sell
+            amount: Token amount to buy or sell
+            price: Quoted price the slippage is measured against (the market price by default)
+
+        Returns:
+            TradeRecord: The fill, or an unsuccessful record with the reason the order was rejected
+        """
+        quote = price if price is not None or self.get_price is None else self.get_price(symbol)
+        if quote is None:
+            result = "No price available"
+        elif action not in ("buy", "sell") or amount <= 0:
+            result = f"Invalid order: {action} {amount}"
+        else:
+            latency = self._latency()
+            if latency:
+                time.sleep(latency)
+
+            # The market may have moved while the order was in flight
+            market = self.get_price(symbol) if self.get_price is not None else None
+            with self._lock:
+                result = self._fill(symbol, action, float(amount), quote, market or quote)
+                if not isinstance(result, str):
+                    self.orders += 1
+                    self.volume_usd += result[1]
+                    self.fees_usd += result[2]
+
+        if isinstance(result, str):
+            with self._lock:
+                self.orders += 1
+                self.rejected += 1
+            metrics.increment("agent_paper_orders_total", action=action, status="rejected")
+            return TradeRecord(token=symbol, chain=chain, action=action, amount=amount, price=quote or 0.0,
+                               value_usd=0.0, success=False, error=result)
+
+        metrics.increment("agent_paper_orders_total", action=action, status="filled")
+        fill_price, value_usd, fee = result
+        return TradeRecord(token=symbol, chain=chain, action=action, amount=amount, price=fill_price,
+                           value_usd=value_usd, fee_usd=fee)
+
+    def balances(self) -> Dict[str, float]:
+        """Get the paper balances by asset."""
+        with self._lock:
+            return dict(self._balances)
+
+    def portfolio(self, prices: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Get the paper balances, their value and the exchange's statistics.
+
+        Args:
+            prices: USD price by symbol to value the token balances with
+
+        Returns:
+            Dict: balances, value_usd (of the balances that have a price), orders,
+                  rejected, volume_usd and fees_usd
+        """
+        with self._lock:
+            balances = dict(self._balances)
+            stats = {"orders": self.orders, "rejected": self.rejected,
+                     "volume_usd": self.volume_usd, "fees_usd": self.fees_usd}
+
+        value = balances[QUOTE_ASSET] + sum(amount * prices[asset] for asset, amount in balances.items()
+                                            if asset != QUOTE_ASSET and asset in prices)
+        return {"balances": balances, "value_usd": value, **stats}
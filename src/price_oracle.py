@@ -0,0 +1,187 @@
+"""
+Price oracle module for the cryptocurrency trading agent.
+This module keeps one snapshot of USD prices for every held and watched asset.
+A refresh asks each configured source for all the symbols it knows in a single
+request, and the snapshot is cached for a short TTL, so portfolio valuation,
+position sizing and stop checks within a cycle all read the same prices.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import requests
+from loguru import logger
+
+from metrics import metrics
+
+# Default oracle settings (overridden by the "price_oracle" config section)
+DEFAULT_SETTINGS = {
+    "ttl_seconds": 10,
+    "max_age_seconds": 300,
+    "timeout_seconds": 5,
+    "sources": []
+}
+
+
+class PriceOracle:
+    """
+    Cached USD prices from one or more batched price sources.
+
+    Each source is a CoinGecko-style simple price endpoint: a GET of
+    url?ids=<id>,<id>&vs_currencies=<currency> answered with
+    {"<id>": {"<currency>": <price>}}. A source's "ids" map the agent's
+    symbols to the source's asset ids; symbols a source doesn't list or
+    doesn't quote are asked of the next source.
+
+    When a refresh fails, the previous quotes keep being served until they are
+    older than max_age_seconds, after which the symbol has no price.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, watched: Iterable[str] = ()):
+        """
+        Initialize the oracle.
+
+        Args:
+            settings: Oracle settings (see DEFAULT_SETTINGS)
+            watched: Symbols to quote on every refresh (others are added when first requested)
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.sources = self.settings["sources"]
+        self.session = requests.Session()
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.RLock()
+        self._watched = set(watched)
+        self._quotes: Dict[str, Tuple[float, float]] = {}
+        self._updated: Optional[float] = None
+
+    @property
+    def watched(self) -> Set[str]:
+        """Get the symbols quoted on every refresh."""
+        with self._lock:
+            return set(self._watched)
+
+    def watch(self, symbols: Iterable[str]):
+        """Add symbols to quote on every refresh."""
+        with self._lock:
+            self._watched.update(symbols)
+
+    def _fetch(self, source: Dict[str, Any], symbols: Iterable[str]) -> Dict[str, float]:
+        """
+        Get the prices of the symbols a source lists, in one request.
+
+        Args:
+            source: Source settings (name, url, ids and optionally currency)
+            symbols: Symbols still without a price
+
+        Returns:
+            Dict: Price by symbol, for the symbols the source quoted
+        """
+        ids = source.get("ids", {})
+        requested = {ids[symbol]: symbol for symbol in symbols if symbol in ids}
+        if not requested:
+            return {}
+
+        name = source.get("name", source["url"])
+        currency = source.get("currency", "usd")
+        metrics.increment("agent_api_calls_total", api=name, endpoint="price")
+        try:
+            response = self.session.get(source["url"], params={"ids": ",".join(sorted(requested)),
+                                                                "vs_currencies": currency},
+                                        timeout=self.settings["timeout_seconds"])
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            metrics.increment("agent_api_errors_total", api=name, endpoint="price")
+            logger.error(f"Error fetching prices from {name}: {str(e)}")
+            return {}
+
+        prices = {}
+        for asset_id, symbol in requested.items():
+            price = (data.get(asset_id) or {}).get(currency)
+            if price is not None:
+                prices[symbol] = float(price)
+        return prices
+
+    def refresh(self, symbols: Iterable[str] = ()) -> Dict[str, float]:
+        """
+        Fetch new prices for the watched symbols (and any others given).
+
+        Args:
+            symbols: Symbols to quote besides the watched ones (they become watched)
+
+        Returns:
+            Dict: The new snapshot (see snapshot)
+        """
+        self.watch(symbols)
+        with self._refresh_lock:
+            missing = self.watched
+            prices: Dict[str, float] = {}
+            with metrics.timer("price_oracle.refresh"):
+                for source in self.sources:
+                    if not missing:
+                        break
+                    quoted = self._fetch(source, missing)
+                    prices.update(quoted)
+                    missing -= quoted.keys()
+
+            now = time.monotonic()
+            with self._lock:
+                self._quotes.update((symbol, (price, now)) for symbol, price in prices.items())
+                # A failed refresh also counts, so a source that is down isn't asked on every read
+                self._updated = now
+
+        return self._current(now)
+
+    def _current(self, now: float) -> Dict[str, float]:
+        """Get the quotes that are not too old to use."""
+        max_age = self.settings["max_age_seconds"]
+        with self._lock:
+            return {symbol: price for symbol, (price, fetched) in self._quotes.items() if now - fetched <= max_age}
+
+    def _is_fresh(self, symbols: Set[str], now: float) -> bool:
+        """Check whether the snapshot is younger than the TTL and covers the symbols."""
+        with self._lock:
+            if self._updated is None or now - self._updated > self.settings["ttl_seconds"]:
+                return False
+            return symbols <= self._watched
+
+    def snapshot(self, symbols: Iterable[str] = ()) -> Dict[str, float]:
+        """
+        Get the cached prices, refreshing them first if they are older than the TTL
+        or if a symbol that was never requested is asked for.
+
+        Args:
+            symbols: Symbols the caller needs besides the watched ones
+
+        Returns:
+            Dict: USD price by symbol (symbols without a usable quote are absent)
+        """
+        symbols = set(symbols)
+        if self._is_fresh(symbols, time.monotonic()):
+            metrics.increment("agent_cache_hits_total", cache="price_oracle")
+            return self._current(time.monotonic())
+
+        # Callers that missed together wait for one refresh instead of each sending their own
+        with self._refresh_lock:
+            if self._is_fresh(symbols, time.monotonic()):
+                metrics.increment("agent_cache_hits_total", cache="price_oracle")
+                return self._current(time.monotonic())
+
+            metrics.increment("agent_cache_misses_total", cache="price_oracle")
+            return self.refresh(symbols)
+
+    def prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """
+        Get the prices of some symbols from the current snapshot.
+
+        Args:
+            symbols: Token symbols
+
+        Returns:
+            Dict: USD price by symbol, for the symbols that have one
+        """
+        symbols = list(symbols)
+        snapshot = self.snapshot(symbols)
+        return {symbol: snapshot[symbol] for symbol in symbols if symbol in snapshot}
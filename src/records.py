@@ -0,0 +1,670 @@
+"""
+Record types for the cryptocurrency trading agent.
+This module defines compact, slotted classes for the candles, signals, trades
+and analysis snapshots the agent keeps in memory. They have no per-instance
+__dict__, store timestamps as Unix seconds and amounts as Decimals, and are
+converted to JSON-compatible dicts only where they leave the process (the
+state store, the web API and the trade history file).
+"""
+
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Candle fields, in column order
+CANDLE_FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+# Latest candle values kept in a technical summary, in order
+LATEST_FIELDS = CANDLE_FIELDS[1:]
+
+# Indicator values kept in a technical summary, in order
+INDICATOR_FIELDS = ("rsi", "macd", "macd_signal", "macd_histogram", "sma_short", "sma_long", "ema_short", "ema_long",
+                    "bollinger_upper", "bollinger_middle", "bollinger_lower", "volatility")
+
+# Tweet counts kept in a sentiment summary, in order
+SENTIMENT_COUNT_FIELDS = ("tweet_count", "unique_tweet_count", "duplicate_count", "largest_cluster",
+                          "positive_count", "negative_count", "neutral_count")
+
+# Fields of a rolling sentiment window (see SentimentAggregator.window)
+WINDOW_FIELDS = ("tweet_count", "sentiment_score", "positive_count", "negative_count", "neutral_count",
+                 "influencer_count", "influencer_score", "previous_score", "change")
+
+
+def _isoformat(timestamp: float) -> str:
+    """Format Unix seconds as a UTC ISO 8601 string (like datetime.utcnow().isoformat())."""
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+
+def _parse_timestamp(value: Any) -> float:
+    """Parse an ISO 8601 UTC string (or Unix seconds) into Unix seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return (parsed - datetime(1970, 1, 1)).total_seconds()
+    return parsed.timestamp()
+
+
+class Candle:
+    """
+    A single OHLCV candle. The timestamp is in milliseconds, like the price data.
+    """
+
+    __slots__ = CANDLE_FIELDS
+
+    def __init__(self, timestamp: int, open: float, high: float, low: float, close: float, volume: float):
+        self.timestamp = int(timestamp)
+        self.open = float(open)
+        self.high = float(high)
+        self.low = float(low)
+        self.close = float(close)
+        self.volume = float(volume)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Candle":
+        """Create a candle from a price data dict."""
+        return cls(*(data[field] for field in CANDLE_FIELDS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the candle as a price data dict."""
+        return {field: getattr(self, field) for field in CANDLE_FIELDS}
+
+
+class CandleSeries:
+    """
+    A series of candles stored as one numpy array per field.
+
+    A list of candle dicts costs a dict and six boxed numbers per candle;
+    a series costs six arrays, whatever its length.
+    """
+
+    __slots__ = ("columns",)
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        Initialize the series.
+
+        Args:
+            columns: Array per candle field (see CANDLE_FIELDS), all the same length
+        """
+        self.columns = columns
+
+    @classmethod
+    def from_candles(cls, candles: List[Dict[str, Any]]) -> "CandleSeries":
+        """
+        Create a series from price data dicts.
+
+        Args:
+            candles: Candle dicts (timestamp, open, high, low, close, volume)
+
+        Returns:
+            CandleSeries: The candles as columns
+        """
+        columns = {}
+        for field in CANDLE_FIELDS:
+            dtype = np.int64 if field == "timestamp" else np.float64
+            columns[field] = np.fromiter((candle[field] for candle in candles), dtype=dtype, count=len(candles))
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    def __getitem__(self, index: int) -> Candle:
+        return Candle(*(self.columns[field][index] for field in CANDLE_FIELDS))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Get the series as a DataFrame with the candle fields as columns."""
+        return pd.DataFrame(self.columns, columns=list(CANDLE_FIELDS))
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Get the series as price data dicts."""
+        return [self[i].to_dict() for i in range(len(self))]
+
+
+class SignalFactor:
+    """
+    One input to a combined signal and its contribution to the signal strength.
+    """
+
+    __slots__ = ("factor", "signal", "contribution", "score")
+
+    def __init__(self, factor: str, signal: str, contribution: float, score: Optional[float] = None):
+        self.factor = factor
+        self.signal = signal
+        self.contribution = contribution
+        self.score = score
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the factor as a dictionary (score only if it has one)."""
+        data = {"factor": self.factor, "signal": self.signal}
+        if self.score is not None:
+            data["score"] = self.score
+        data["contribution"] = self.contribution
+        return data
+
+
+class Signal:
+    """
+    A combined trading signal.
+    """
+
+    __slots__ = ("signal", "strength", "confidence", "factors")
+
+    def __init__(self, signal: str = "neutral", strength: float = 0, confidence: float = 0.5,
+                 factors: Tuple[SignalFactor, ...] = ()):
+        """
+        Initialize the signal.
+
+        Args:
+            signal: strong_buy, buy, neutral, sell or strong_sell
+            strength: Weighted strength, from -100 to 100
+            confidence: Confidence in the signal, from 0 to 1
+            factors: Factors that contributed to the strength
+        """
+        self.signal = signal
+        self.strength = strength
+        self.confidence = confidence
+        self.factors = tuple(factors)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the signal as a dictionary."""
+        return {
+            "signal": self.signal,
+            "strength": self.strength,
+            "confidence": self.confidence,
+            "factors": [factor.to_dict() for factor in self.factors]
+        }
+
+
+class TradeRecord:
+    """
+    An executed (or attempted) trade.
+    """
+
+    __slots__ = ("token", "chain", "action", "amount", "price", "value_usd", "success", "error", "timestamp",
+                 "fee_usd")
+
+    def __init__(self, token: str, chain: str, action: str, amount: Decimal, price: float,
+                 value_usd: float, success: bool = True, error: Optional[str] = None,
+                 timestamp: Optional[float] = None, fee_usd: float = 0.0):
+        """
+        Initialize the trade record.
+
+        Args:
+            token: Token symbol
+            chain: Blockchain the trade ran on
+            action: buy or sell
+            amount: Amount traded
+            price: Price in USD at execution
+            value_usd: Trade value in USD
+            success: Whether the trade succeeded
+            error: Error message if it failed
+            timestamp: Unix time in seconds (None for now)
+            fee_usd: Trading fee paid in USD
+        """
+        self.token = token
+        self.chain = chain
+        self.action = action
+        self.amount = Decimal(str(amount))
+        self.price = price
+        self.value_usd = float(value_usd)
+        self.success = success
+        self.error = error
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.fee_usd = float(fee_usd)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TradeRecord":
+        """Create a trade record from its dictionary form (e.g. the trade history file)."""
+        return cls(
+            token=data["token"],
+            chain=data.get("chain", ""),
+            action=data["action"],
+            amount=Decimal(str(data["amount"])),
+            price=data["price"],
+            value_usd=data["value_usd"],
+            success=data.get("success", True),
+            error=data.get("error"),
+            timestamp=_parse_timestamp(data["timestamp"]),
+            fee_usd=data.get("fee_usd", 0.0)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the trade as a dictionary."""
+        return {
+            "token": self.token,
+            "chain": self.chain,
+            "action": self.action,
+            "amount": str(self.amount),
+            "price": self.price,
+            "value_usd": self.value_usd,
+            "success": self.success,
+            "error": self.error,
+            "timestamp": _isoformat(self.timestamp),
+            "fee_usd": self.fee_usd
+        }
+
+
+class ActiveTrade:
+    """
+    An open position with its stop loss and take profit prices.
+    """
+
+    __slots__ = ("entry_price", "amount", "entry_time", "stop_loss", "take_profit", "exit_failures", "retry_at")
+
+    def __init__(self, entry_price: float, amount: Decimal, stop_loss: float, take_profit: float,
+                 entry_time: Optional[float] = None):
+        """
+        Initialize the position.
+
+        Args:
+            entry_price: Price in USD at entry
+            amount: Amount held
+            stop_loss: Price at or below which the position is sold
+            take_profit: Price at or above which the position is sold
+            entry_time: Unix time in seconds (None for now)
+        """
+        self.entry_price = entry_price
+        self.amount = amount
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.entry_time = time.time() if entry_time is None else entry_time
+        # Failed stop-loss/take-profit exits in a row, and the Unix time before which they aren't retried
+        self.exit_failures = 0
+        self.retry_at = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the position as a dictionary."""
+        return {
+            "entry_price": self.entry_price,
+            "amount": str(self.amount),
+            "entry_time": _isoformat(self.entry_time),
+            "stop_loss": self.stop_loss,
+            "take_profit": self.take_profit
+        }
+
+
+class IndicatorSignal:
+    """
+    A buy or sell signal raised by one indicator.
+    """
+
+    __slots__ = ("indicator", "description", "strength")
+
+    def __init__(self, indicator: str, description: str, strength: float):
+        self.indicator = indicator
+        self.description = description
+        self.strength = strength
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the signal as a dictionary."""
+        return {"indicator": self.indicator, "description": self.description, "strength": self.strength}
+
+
+class TechnicalSignals:
+    """
+    The indicator signals of one timeframe and the overall signal they add up to.
+    """
+
+    __slots__ = ("signal", "strength", "buy_signals", "sell_signals", "timestamp")
+
+    def __init__(self, signal: str, strength: float, buy_signals: Tuple[IndicatorSignal, ...] = (),
+                 sell_signals: Tuple[IndicatorSignal, ...] = (), timestamp: Optional[str] = None):
+        """
+        Initialize the signals.
+
+        Args:
+            signal: strong_buy, buy, neutral, sell, strong_sell or error
+            strength: Signal strength, from -100 to 100
+            buy_signals: Indicators signalling a buy
+            sell_signals: Indicators signalling a sell
+            timestamp: ISO 8601 time of the candle the signals are for
+        """
+        self.signal = signal
+        self.strength = strength
+        self.buy_signals = tuple(buy_signals)
+        self.sell_signals = tuple(sell_signals)
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TechnicalSignals":
+        """Create the signals from TechnicalAnalyzer.generate_signals's dict."""
+        return cls(
+            signal=data.get("overall_signal", "neutral"),
+            strength=data.get("signal_strength", 0),
+            buy_signals=tuple(IndicatorSignal(**signal) for signal in data.get("buy_signals", ())),
+            sell_signals=tuple(IndicatorSignal(**signal) for signal in data.get("sell_signals", ())),
+            timestamp=data.get("timestamp")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the signals in the dict form of TechnicalAnalyzer.generate_signals."""
+        data = {
+            "buy_signals": [signal.to_dict() for signal in self.buy_signals],
+            "sell_signals": [signal.to_dict() for signal in self.sell_signals],
+            "overall_signal": self.signal,
+            "signal_strength": self.strength
+        }
+        if self.timestamp is not None:
+            data["timestamp"] = self.timestamp
+        return data
+
+
+def _scalar(value: Any) -> Optional[float]:
+    """Convert an indicator value (numpy or Python number, or None) to a float."""
+    return None if value is None else float(value)
+
+
+class TechnicalSummary:
+    """
+    The values of a technical analysis that the strategy and the API read.
+
+    The latest candle and the indicators are stored as tuples of floats in
+    the order of LATEST_FIELDS and INDICATOR_FIELDS, and signals as slotted
+    records; the analyzer's dict is rebuilt only by to_dict.
+    """
+
+    __slots__ = ("timeframe", "latest", "change_24h", "change_7d", "indicators", "signals", "confirmations",
+                 "error")
+
+    def __init__(self, signals: TechnicalSignals, timeframe: Optional[str] = None,
+                 latest: Optional[Tuple[float, ...]] = None, change_24h: Optional[float] = None,
+                 change_7d: Optional[float] = None, indicators: Optional[Tuple[Optional[float], ...]] = None,
+                 confirmations: Optional[Dict[str, TechnicalSignals]] = None, error: Optional[str] = None):
+        """
+        Initialize the summary.
+
+        Args:
+            signals: Signals of the analysis timeframe
+            timeframe: Analysis timeframe (None if the analysis failed)
+            latest: Latest candle's values, in LATEST_FIELDS order
+            change_24h: Price change over the last day
+            change_7d: Price change over the last week
+            indicators: Latest indicator values, in INDICATOR_FIELDS order
+            confirmations: Signals of the confirmation timeframes
+            error: Error message if the analysis failed
+        """
+        self.signals = signals
+        self.timeframe = timeframe
+        self.latest = latest
+        self.change_24h = change_24h
+        self.change_7d = change_7d
+        self.indicators = indicators
+        self.confirmations = confirmations
+        self.error = error
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TechnicalSummary":
+        """Create the summary from TechnicalAnalyzer.analyze's dict."""
+        signals = TechnicalSignals.from_dict(data.get("signals", {}))
+        confirmations = data.get("confirmations")
+        if confirmations is not None:
+            confirmations = {timeframe: TechnicalSignals.from_dict(value) for timeframe, value in confirmations.items()}
+        if "error" in data:
+            return cls(signals, confirmations=confirmations, error=data["error"])
+
+        price_data = data.get("price_data", {})
+        latest = price_data.get("latest", {})
+        indicators = data.get("indicators", {})
+        return cls(
+            signals,
+            timeframe=data.get("timeframe"),
+            latest=tuple(_scalar(latest.get(field)) for field in LATEST_FIELDS),
+            change_24h=_scalar(price_data.get("change_24h")),
+            change_7d=_scalar(price_data.get("change_7d")),
+            indicators=tuple(_scalar(indicators.get(field)) for field in INDICATOR_FIELDS),
+            confirmations=confirmations
+        )
+
+    def indicator(self, name: str) -> Optional[float]:
+        """Get the latest value of an indicator (see INDICATOR_FIELDS)."""
+        return self.indicators[INDICATOR_FIELDS.index(name)] if self.indicators is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the summary in the dict form of TechnicalAnalyzer.analyze."""
+        if self.error is not None:
+            data = {"error": self.error, "signals": self.signals.to_dict()}
+        else:
+            data = {
+                "timeframe": self.timeframe,
+                "price_data": {
+                    "latest": dict(zip(LATEST_FIELDS, self.latest)),
+                    "change_24h": self.change_24h,
+                    "change_7d": self.change_7d
+                },
+                "indicators": dict(zip(INDICATOR_FIELDS, self.indicators)),
+                "signals": self.signals.to_dict()
+            }
+        if self.confirmations is not None:
+            data["confirmations"] = {timeframe: signals.to_dict() for timeframe, signals in self.confirmations.items()}
+        return data
+
+
+class SentimentWindow:
+    """
+    A token's sentiment over one rolling window (see SentimentAggregator.window).
+    """
+
+    __slots__ = WINDOW_FIELDS
+
+    def __init__(self, *values: Any):
+        for field, value in zip(WINDOW_FIELDS, values):
+            setattr(self, field, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SentimentWindow":
+        """Create the window from its dict form."""
+        return cls(*(data.get(field) for field in WINDOW_FIELDS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the window as a dictionary."""
+        return {field: getattr(self, field) for field in WINDOW_FIELDS}
+
+
+class SentimentSummary:
+    """
+    The values of a sentiment analysis that the strategy and the API read.
+
+    Of the recent tweets only the ids are kept. The percentages are derived
+    from the counts, and the analyzer's dict is rebuilt only by to_dict.
+    """
+
+    __slots__ = ("token", "sentiment", "score", "counts", "influencer_sentiment", "recent_tweet_ids", "windows",
+                 "source", "stale", "stale_reason", "timestamp")
+
+    def __init__(self, token: str, sentiment: str, score: float, counts: Tuple[int, ...] = (0,) * 7,
+                 influencer_sentiment: str = "neutral", recent_tweet_ids: Tuple[Any, ...] = (),
+                 windows: Optional[Dict[str, SentimentWindow]] = None, source: Optional[str] = None,
+                 stale: bool = False, stale_reason: Optional[str] = None, timestamp: Optional[float] = None):
+        """
+        Initialize the summary.
+
+        Args:
+            token: Token symbol
+            sentiment: positive, neutral, negative or unknown
+            score: Sentiment score (-1 to 1)
+            counts: Tweet counts, in SENTIMENT_COUNT_FIELDS order
+            influencer_sentiment: Sentiment of the influencers' tweets
+            recent_tweet_ids: Ids of the most engaging recent tweets
+            windows: Sentiment per rolling window label
+            source: Where the tweets came from (None for a search)
+            stale: Whether the result is an older one reused (see SentimentAnalyzer._stale_sentiment)
+            stale_reason: Why it was reused (deferred or error)
+            timestamp: Unix time of the search the result came from (None for now)
+        """
+        self.token = token
+        self.sentiment = sentiment
+        self.score = float(score)
+        self.counts = tuple(int(count) for count in counts)
+        self.influencer_sentiment = influencer_sentiment
+        self.recent_tweet_ids = tuple(recent_tweet_ids)
+        self.windows = windows or {}
+        self.source = source
+        self.stale = stale
+        self.stale_reason = stale_reason
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SentimentSummary":
+        """Create the summary from SentimentAnalyzer.analyze_sentiment's dict."""
+        return cls(
+            token=data.get("token", ""),
+            sentiment=data.get("sentiment", "neutral"),
+            score=data.get("sentiment_score", 0),
+            counts=tuple(data.get(field, 0) for field in SENTIMENT_COUNT_FIELDS),
+            influencer_sentiment=data.get("influencer_sentiment", "neutral"),
+            recent_tweet_ids=tuple(tweet["id"] for tweet in data.get("recent_tweets", ()) if "id" in tweet),
+            windows={label: SentimentWindow.from_dict(window) for label, window in data.get("windows", {}).items()},
+            source=data.get("source"),
+            stale=data.get("stale", False),
+            stale_reason=data.get("stale_reason"),
+            timestamp=_parse_timestamp(data["timestamp"]) if "timestamp" in data else None
+        )
+
+    def count(self, name: str) -> int:
+        """Get one of the tweet counts (see SENTIMENT_COUNT_FIELDS)."""
+        return self.counts[SENTIMENT_COUNT_FIELDS.index(name)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the summary in the dict form of SentimentAnalyzer.analyze_sentiment."""
+        data = {"token": self.token, "sentiment_score": self.score, "sentiment": self.sentiment}
+        data.update(zip(SENTIMENT_COUNT_FIELDS, self.counts))
+        unique = self.count("unique_tweet_count")
+        for label in ("positive", "negative", "neutral"):
+            data[f"{label}_percentage"] = self.count(f"{label}_count") / unique * 100 if unique else 0
+        data["influencer_sentiment"] = self.influencer_sentiment
+        data["recent_tweet_ids"] = list(self.recent_tweet_ids)
+        data["windows"] = {label: window.to_dict() for label, window in self.windows.items()}
+        if self.source is not None:
+            data["source"] = self.source
+        data["stale"] = self.stale
+        if self.stale:
+            data["stale_reason"] = self.stale_reason
+        data["timestamp"] = _isoformat(self.timestamp)
+        return data
+
+
+class AnalysisSnapshot:
+    """
+    The technical and sentiment analysis of a token at a point in time.
+
+    The analyses are kept as slotted summaries of the values that are read;
+    their nested dicts are built only by to_dict, where they leave the process.
+    """
+
+    __slots__ = ("token", "chain", "timestamp", "technical", "sentiment", "signal")
+
+    def __init__(self, token: str, chain: str, technical: TechnicalSummary, sentiment: SentimentSummary,
+                 signal: Signal, timestamp: Optional[float] = None):
+        self.token = token
+        self.chain = chain
+        self.technical = technical
+        self.sentiment = sentiment
+        self.signal = signal
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the snapshot as a dictionary."""
+        return {
+            "token": self.token,
+            "chain": self.chain,
+            "timestamp": _isoformat(self.timestamp),
+            "technical_analysis": self.technical.to_dict(),
+            "sentiment_analysis": self.sentiment.to_dict(),
+            "combined_signal": self.signal.to_dict()
+        }
+
+
+class StrategyResult:
+    """
+    The outcome of one strategy run for a token.
+    """
+
+    __slots__ = ("token", "chain", "timestamp", "analysis", "action_taken", "trade")
+
+    def __init__(self, token: str, chain: str, analysis: Optional[AnalysisSnapshot] = None,
+                 action_taken: str = "none", trade: Optional[TradeRecord] = None,
+                 timestamp: Optional[float] = None):
+        """
+        Initialize the result.
+
+        Args:
+            token: Token symbol
+            chain: Blockchain of the token
+            analysis: Analysis the decision was based on (None for risk checks)
+            action_taken: none, buy, sell, stop_loss or take_profit
+            trade: The trade that was executed, if any
+            timestamp: Unix time in seconds (None for now)
+        """
+        self.token = token
+        self.chain = chain
+        self.analysis = analysis
+        self.action_taken = action_taken
+        self.trade = trade
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the result as a dictionary (the shape served by the web API)."""
+        data = {
+            "token": self.token,
+            "chain": self.chain,
+            "timestamp": _isoformat(self.timestamp)
+        }
+        if self.analysis is not None:
+            data["analysis"] = self.analysis.to_dict()
+        data["action_taken"] = self.action_taken
+        data["trade_details"] = self.trade.to_dict() if self.trade is not None else None
+        return data
+
+
+class WalletEvent:
+    """
+    A change of a wallet balance found on chain (a token or native transfer,
+    or a gas fee), or a trade made by the strategy.
+
+    Trade events carry the trade's price and value; they are kept next to the
+    transfers for valuation and PnL, and are not balance changes themselves.
+    """
+
+    __slots__ = ("chain", "block", "timestamp", "tx_hash", "log_index", "kind", "asset", "raw", "amount",
+                 "price", "value_usd")
+
+    def __init__(self, chain: str, block: Optional[int], timestamp: float, tx_hash: str, log_index: int,
+                 kind: str, asset: str, amount: Decimal, raw: Optional[int] = None,
+                 price: Optional[float] = None, value_usd: Optional[float] = None):
+        """
+        Initialize the event.
+
+        Args:
+            chain: Chain of the wallet
+            block: Block number (None for trades)
+            timestamp: Unix time in seconds (of the block, or of the trade)
+            tx_hash: Transaction hash (or another id unique within the chain)
+            log_index: Position of the change within the transaction
+            kind: transfer, native, fee or trade
+            asset: Token symbol, or "native"
+            amount: Signed change in token units (negative when leaving the wallet)
+            raw: Signed change in the token's smallest unit
+            price: Price in USD (trades only)
+            value_usd: Signed value in USD (trades only)
+        """
+        self.chain = chain
+        self.block = block
+        self.timestamp = timestamp
+        self.tx_hash = tx_hash
+        self.log_index = log_index
+        self.kind = kind
+        self.asset = asset
+        self.amount = amount
+        self.raw = raw
+        self.price = price
+        self.value_usd = value_usd
+
+
+def trades_to_list(trades: Iterable[TradeRecord]) -> List[Dict[str, Any]]:
+    """Convert trade records to dictionaries, e.g. to save them."""
+    return [trade.to_dict() for trade in trades]
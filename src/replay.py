@@ -0,0 +1,348 @@
+"""
+Record and replay module for the cryptocurrency trading agent.
+This module captures every external input the agent sees (candles, tweet
+searches, price quotes, JSON-RPC responses and the sentiment windows read)
+into a gzip-compressed JSON lines log, and feeds such a log back through CryptoTradingAgent.run_once
+without network access or sleeps. Each recorded cycle stores a digest of its
+result, so a replay tells whether the agent still reaches the same results.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Mapping
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from hexbytes import HexBytes
+from loguru import logger
+
+from records import TradeRecord, trades_to_list
+
+# Fields that hold the wall-clock time of a run and are left out of cycle digests
+VOLATILE_FIELDS = frozenset({"timestamp"})
+
+
+class ReplayError(Exception):
+    """Raised when the agent asks for an input the replayed log doesn't have."""
+
+
+class RecordedError(Exception):
+    """Raised in a replay where the recorded call raised an error."""
+
+
+def _encode(value: Any) -> Any:
+    """Convert the non-JSON values found in inputs to tagged JSON objects."""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": HexBytes(value).hex()}
+    if isinstance(value, Mapping):
+        # e.g. Web3's AttributeDict
+        return dict(value)
+    raise TypeError(f"Cannot record {type(value).__name__}")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    """Restore the values tagged by _encode."""
+    if len(obj) == 1:
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        if "__decimal__" in obj:
+            return Decimal(obj["__decimal__"])
+        if "__bytes__" in obj:
+            return HexBytes(obj["__bytes__"])
+    return obj
+
+
+def _strip(value: Any) -> Any:
+    """Drop the volatile fields from a result, recursively."""
+    if isinstance(value, dict):
+        return {key: _strip(item) for key, item in value.items() if key not in VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [_strip(item) for item in value]
+    return value
+
+
+def result_digest(result: Dict[str, Any]) -> str:
+    """
+    Get the digest of a run_once result, without its wall-clock timestamps.
+
+    Args:
+        result: Result of CryptoTradingAgent.run_once
+
+    Returns:
+        str: SHA-256 hex digest of the result's canonical JSON form
+    """
+    canonical = json.dumps(_strip(result), sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _rpc_middleware(chain: str, handle: Callable[[str, str, Callable, Any], Dict[str, Any]]) -> Callable:
+    """
+    Create a Web3 middleware that passes every request of a chain to a handler.
+
+    The middleware is injected at the innermost layer, so it sees the
+    responses after the provider's own formatting (e.g. eth-tester's) and
+    before every other middleware (e.g. the PoA middleware), which run the
+    same way when recording and replaying.
+
+    Args:
+        chain: Chain name
+        handle: Called with (chain, method, make_request, params) and returning the response
+    """
+    def middleware(make_request, w3):
+        def inner(method, params):
+            return handle(chain, method, make_request, params)
+        return inner
+    return middleware
+
+
+def _hooks(agent) -> List[Tuple[str, Any, str, Callable[..., str]]]:
+    """
+    Get the agent's input points: (source, object, method name, function giving the log key of a call).
+
+    Calls with the same source and key are recorded and replayed in order, so
+    keys leave out arguments that depend on the wall clock (e.g. candle counts).
+    """
+    strategy = agent.trading_strategy
+    return [
+        ("candles", strategy, "_get_price_data",
+         lambda token_symbol, timeframe="1h", limit=200: f"{token_symbol}:{timeframe}"),
+        ("tweets", strategy.sentiment_analyzer, "search_tweets",
+         lambda query, max_results=100, days_back=1: query),
+        # Snapshots rather than source requests, since whether a snapshot is cached depends on the clock
+        ("prices", strategy.price_oracle, "snapshot", lambda symbols=(): "snapshot"),
+        # The windows end at the time they are read; keyed by token, since tokens are refreshed concurrently
+        ("windows", strategy.sentiment_analyzer.aggregator, "window", lambda token_symbol, now=None: token_symbol),
+        # Whether a search was deferred depends on the clock too
+        ("quota", strategy.sentiment_analyzer.fetch_scheduler, "acquire",
+         lambda token_symbol, requests=1: token_symbol),
+        # And so does the weight of a stale sentiment result
+        ("sentiment age", strategy, "_sentiment_age",
+         lambda sentiment_analysis: sentiment_analysis.get("token", ""))
+    ]
+
+
+class _DiscardListener:
+    """
+    A balance tracker listener that ignores everything.
+
+    It keeps the tracker's reads unchanged, and still makes the price reads
+    of the listeners it replaces (the event index quotes the reconciled assets).
+    """
+
+    def __init__(self, replaced: List[Any]):
+        self.quoting = [listener for listener in replaced if hasattr(listener, "quote_assets")]
+
+    def on_events(self, tracker, from_block, to_block, events):
+        pass
+
+    def on_reconcile(self, tracker, block, timestamp, balances):
+        for listener in self.quoting:
+            listener.quote_assets(tracker.chain, balances)
+
+
+class Recorder:
+    """
+    Writes the inputs of an agent to a compressed log.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a new log.
+
+        Args:
+            path: Log file path (gzip-compressed JSON lines)
+        """
+        self.path = path
+        self.cycles = 0
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, source: str, key: str, value: Any = None, error: Optional[Exception] = None):
+        """Append one input (or the error raised instead) to the log."""
+        entry = {"source": source, "key": key}
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {str(error)}"
+        else:
+            entry["value"] = value
+        line = json.dumps(entry, default=_encode, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def call(self, source: str, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call an input function and record what it returns or raises."""
+        try:
+            value = fn(*args, **kwargs)
+        except Exception as e:
+            self.write(source, key, error=e)
+            raise
+        self.write(source, key, value)
+        return value
+
+    def attach(self, agent):
+        """
+        Record the agent's inputs from now on, starting with its trade history.
+
+        Args:
+            agent: CryptoTradingAgent to record
+        """
+        strategy = agent.trading_strategy
+        self.write("state", "trade_history", trades_to_list(strategy.trade_history))
+
+        for source, obj, name, key_fn in _hooks(agent):
+            original = getattr(obj, name)
+
+            def recorded(*args, _source=source, _original=original, _key_fn=key_fn, **kwargs):
+                return self.call(_source, _key_fn(*args, **kwargs), _original, *args, **kwargs)
+
+            setattr(obj, name, recorded)
+
+        def record_rpc(chain, method, make_request, params):
+            return self.call("rpc", f"{chain}:{method}", make_request, method, params)
+
+        for chain, w3 in agent.wallet.web3_connections.items():
+            w3.middleware_onion.inject(_rpc_middleware(chain, record_rpc), name="replay", layer=0)
+
+    def run_once(self, agent) -> Dict[str, Any]:
+        """
+        Run one agent cycle and record the digest of its result.
+
+        Args:
+            agent: CryptoTradingAgent the recorder is attached to
+
+        Returns:
+            Dict: The run_once result
+        """
+        result = agent.run_once()
+        self.write("cycle", str(self.cycles), result_digest(result))
+        self.cycles += 1
+        return result
+
+    def close(self):
+        """Flush and close the log."""
+        with self._lock:
+            self._file.close()
+
+
+class Replayer:
+    """
+    Serves the inputs of a recorded log to an agent.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load a log.
+
+        Args:
+            path: Log file written by Recorder
+        """
+        self.path = path
+        self.state: Dict[str, Any] = {}
+        self.digests: List[str] = []
+        self._queues: Dict[Tuple[str, str], Deque[Any]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line, object_hook=_decode)
+                source, key = entry["source"], entry["key"]
+                if source == "state":
+                    self.state[key] = entry["value"]
+                elif source == "cycle":
+                    self.digests.append(entry["value"])
+                else:
+                    self._queues[(source, key)].append(entry)
+
+    @property
+    def remaining(self) -> int:
+        """Get the number of recorded inputs not served yet."""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def next(self, source: str, key: str) -> Any:
+        """
+        Get the next recorded input of a source and key.
+
+        Raises:
+            ReplayError: If the log has no (more) such input
+            RecordedError: If the recorded call raised an error
+        """
+        with self._lock:
+            queue = self._queues.get((source, key))
+            if not queue:
+                raise ReplayError(f"No recorded {source} input left for {key}")
+            entry = queue.popleft()
+
+        if "error" in entry:
+            raise RecordedError(entry["error"])
+        return entry["value"]
+
+    def attach(self, agent):
+        """
+        Serve the agent's inputs from the log, and make it run without side effects or sleeps.
+
+        The trade history is restored from the log and no longer written to
+        disk, trade and balance listeners (such as the event index) no longer
+        receive anything, and the paper exchange's simulated latency and the
+        delay between tokens are turned off.
+
+        Args:
+            agent: CryptoTradingAgent to replay into
+        """
+        strategy = agent.trading_strategy
+        strategy.trade_history = [TradeRecord.from_dict(trade) for trade in self.state.get("trade_history", [])]
+        strategy._save_trade_history = lambda: None
+        strategy.trade_listeners.clear()
+        for tracker in agent.wallet.balance_trackers.values():
+            tracker.listeners[:] = [_DiscardListener(tracker.listeners)] if tracker.listeners else []
+        if strategy.paper_exchange is not None:
+            strategy.paper_exchange.settings.update(latency_ms=0, latency_jitter_ms=0)
+        agent.token_delay_seconds = 0
+
+        for source, obj, name, key_fn in _hooks(agent):
+            def replayed(*args, _source=source, _key_fn=key_fn, **kwargs):
+                return self.next(_source, _key_fn(*args, **kwargs))
+
+            setattr(obj, name, replayed)
+
+        def replay_rpc(chain, method, make_request, params):
+            return self.next("rpc", f"{chain}:{method}")
+
+        for chain, w3 in agent.wallet.web3_connections.items():
+            w3.middleware_onion.inject(_rpc_middleware(chain, replay_rpc), name="replay", layer=0)
+
+    def run(self, agent) -> Dict[str, Any]:
+        """
+        Run every recorded cycle through the agent and compare the results.
+
+        Args:
+            agent: CryptoTradingAgent the replayer is attached to
+
+        Returns:
+            Dict: cycles, identical (cycles whose result digest matches the
+                  recording), diverged (indexes of the others), seconds and
+                  unused (recorded inputs the agent didn't ask for)
+        """
+        diverged = []
+        start = time.perf_counter()
+        for cycle, digest in enumerate(self.digests):
+            result = agent.run_once()
+            if result_digest(result) != digest:
+                diverged.append(cycle)
+                logger.warning(f"Replayed cycle {cycle} diverged from the recording")
+
+        return {
+            "cycles": len(self.digests),
+            "identical": len(self.digests) - len(diverged),
+            "diverged": diverged,
+            "seconds": time.perf_counter() - start,
+            "unused": self.remaining
+        }
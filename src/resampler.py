@@ -0,0 +1,192 @@
+"""
+Candle resampling module for the cryptocurrency trading agent.
+This module builds candles for several timeframes (e.g. 1h, 4h, 1d) from a
+single stream of base candles (e.g. 1m or 1h). Candles are folded into every
+timeframe as they arrive, so each new base candle costs O(1) per timeframe
+and higher timeframes never need their own data fetches.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from records import Candle
+
+# Candle length in seconds for each supported timeframe
+TIMEFRAME_SECONDS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400
+}
+
+# Default number of closed candles kept per timeframe
+DEFAULT_CAPACITY = 5000
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """
+    Get the candle length of a timeframe.
+
+    Args:
+        timeframe: Timeframe name (see TIMEFRAME_SECONDS)
+
+    Returns:
+        int: Candle length in seconds
+    """
+    if timeframe not in TIMEFRAME_SECONDS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return TIMEFRAME_SECONDS[timeframe]
+
+
+def periods_in(timeframe: str, seconds: float) -> int:
+    """
+    Get the number of candles of a timeframe that cover a duration.
+
+    Args:
+        timeframe: Timeframe name
+        seconds: Duration in seconds (e.g. 86400 for a day)
+
+    Returns:
+        int: Number of candles (at least 1)
+    """
+    return max(1, int(seconds // timeframe_seconds(timeframe)))
+
+
+def _merge(acc: Optional[Candle], candle: Candle, bucket: int) -> Candle:
+    """Get the candle for a bucket after adding a base candle to it."""
+    if acc is None:
+        return Candle(bucket, candle.open, candle.high, candle.low, candle.close, candle.volume)
+    return Candle(bucket, acc.open, max(acc.high, candle.high), min(acc.low, candle.low),
+                  candle.close, acc.volume + candle.volume)
+
+
+class _Timeframe:
+    """Closed candles of one timeframe and the aggregate of its open bucket."""
+
+    __slots__ = ("name", "interval_ms", "closed", "acc")
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.interval_ms = timeframe_seconds(name) * 1000
+        self.closed: Deque[Candle] = deque(maxlen=capacity)
+        # Base candles of the open bucket before the latest one
+        self.acc: Optional[Candle] = None
+
+    def bucket(self, timestamp: int) -> int:
+        return timestamp - timestamp % self.interval_ms
+
+
+class CandleResampler:
+    """
+    Builds candles for several timeframes from one base candle stream.
+
+    The latest base candle may still be forming: adding a candle with the
+    same timestamp replaces it instead of counting it twice.
+    """
+
+    def __init__(self, base_timeframe: str = "1h", timeframes: Optional[Iterable[str]] = None,
+                 capacity: int = DEFAULT_CAPACITY):
+        """
+        Initialize the resampler.
+
+        Args:
+            base_timeframe: Timeframe of the candles that are added
+            timeframes: Timeframes to build (the base timeframe is always included);
+                        each must be a multiple of the base timeframe
+            capacity: Number of closed candles kept per timeframe
+        """
+        base_seconds = timeframe_seconds(base_timeframe)
+        names = [base_timeframe] + [t for t in (timeframes or []) if t != base_timeframe]
+
+        for name in names:
+            if timeframe_seconds(name) % base_seconds:
+                raise ValueError(f"Timeframe {name} is not a multiple of the base timeframe {base_timeframe}")
+
+        self.base_timeframe = base_timeframe
+        self._timeframes: Dict[str, _Timeframe] = {name: _Timeframe(name, capacity) for name in names}
+        self._last: Optional[Candle] = None
+
+    @property
+    def timeframes(self) -> List[str]:
+        """Get the timeframes built by this resampler."""
+        return list(self._timeframes)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Get the timestamp (in milliseconds) of the latest base candle."""
+        return self._last.timestamp if self._last is not None else None
+
+    def add(self, candle: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Add a base candle.
+
+        Args:
+            candle: Candle dict (timestamp in milliseconds, open, high, low, close, volume)
+
+        Returns:
+            List: (timeframe, candle) for every candle closed by this one
+        """
+        new = Candle.from_dict(candle)
+        last = self._last
+
+        if last is not None and new.timestamp <= last.timestamp:
+            if new.timestamp == last.timestamp:
+                # Update of the forming candle
+                self._last = new
+            return []
+
+        closed = []
+        if last is not None:
+            for frame in self._timeframes.values():
+                bucket = frame.bucket(last.timestamp)
+                full = _merge(frame.acc, last, bucket)
+
+                if frame.bucket(new.timestamp) == bucket:
+                    frame.acc = full
+                else:
+                    frame.closed.append(full)
+                    frame.acc = None
+                    closed.append((frame.name, full.to_dict()))
+
+        self._last = new
+        return closed
+
+    def extend(self, candles: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add base candles in time order.
+
+        Args:
+            candles: Candle dicts
+
+        Returns:
+            int: Number of candles closed across all timeframes
+        """
+        return sum(len(self.add(candle)) for candle in candles)
+
+    def candles(self, timeframe: str, limit: Optional[int] = None,
+                include_partial: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get the candles of a timeframe, oldest first.
+
+        Args:
+            timeframe: Timeframe built by this resampler
+            limit: Maximum number of (most recent) candles (None for all)
+            include_partial: Include the candle of the bucket that is still open
+
+        Returns:
+            List[Dict]: Candle dicts in the format of the price data
+        """
+        frame = self._timeframes.get(timeframe)
+        if frame is None:
+            raise ValueError(f"Timeframe {timeframe} is not built by this resampler")
+
+        result = list(frame.closed)
+        if include_partial and self._last is not None:
+            result.append(_merge(frame.acc, self._last, frame.bucket(self._last.timestamp)))
+
+        if limit is not None:
+            result = result[-limit:] if limit > 0 else []
+
+        return [candle.to_dict() for candle in result]
@@ -0,0 +1,96 @@
+"""
+Risk monitor module for the cryptocurrency trading agent.
+This module watches the stop-loss and take-profit levels of all active trades
+between analysis runs. The levels are kept in numpy arrays that are rebuilt
+only when positions change, so each check is one batched price lookup and
+one vectorized comparison, whatever the number of open positions.
+"""
+
+import math
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import metrics
+
+
+class RiskMonitor:
+    """
+    Finds active trades whose stop loss or take profit has been hit.
+
+    The monitor only detects triggers; the caller executes the exits (see
+    TradingStrategy.check_risk), so that exits go through the same locking
+    and recording as every other trade.
+    """
+
+    def __init__(self, strategy, get_prices: Optional[Callable[[List[str]], Dict[str, float]]] = None):
+        """
+        Initialize the monitor.
+
+        Args:
+            strategy: TradingStrategy whose active trades are watched
+            get_prices: Function returning the latest price for each of a list of
+                        symbols (defaults to the strategy's batched price lookup)
+        """
+        self.strategy = strategy
+        self.get_prices = get_prices or strategy._get_current_prices
+
+        self._version = None
+        self._symbols: List[str] = []
+        self._stops = np.empty(0)
+        self._take_profits = np.empty(0)
+
+    @property
+    def symbols(self) -> List[str]:
+        """Get the symbols of the watched positions."""
+        return list(self._symbols)
+
+    def _sync(self):
+        """Rebuild the level arrays if the strategy's positions changed."""
+        version = self.strategy.positions_version
+        if version == self._version:
+            return
+
+        positions = list(self.strategy.active_trades.items())
+        self._symbols = [symbol for symbol, _ in positions]
+        self._stops = np.fromiter((trade.stop_loss for _, trade in positions), dtype=np.float64, count=len(positions))
+        self._take_profits = np.fromiter((trade.take_profit for _, trade in positions), dtype=np.float64,
+                                         count=len(positions))
+        self._version = version
+
+    def check(self) -> List[Tuple[str, str, float]]:
+        """
+        Compare the latest prices with the levels of every active trade.
+
+        Returns:
+            List: (symbol, "stop_loss" or "take_profit", price) for each triggered trade
+        """
+        self._sync()
+        symbols = self._symbols
+        if not symbols:
+            return []
+
+        with metrics.timer("risk_monitor.prices"):
+            prices = self.get_prices(symbols)
+
+        with metrics.timer("risk_monitor.check"):
+            latest = np.fromiter((prices.get(symbol, math.nan) for symbol in symbols), dtype=np.float64,
+                                 count=len(symbols))
+
+            # Missing prices are NaN, which compares false on both sides
+            stopped = latest <= self._stops
+            triggered = np.flatnonzero(stopped | (latest >= self._take_profits))
+
+        results = []
+        now = time.time()
+        for i in triggered.tolist():
+            # Exits that failed recently wait for their backoff (see TradingStrategy.check_risk)
+            trade = self.strategy.active_trades.get(symbols[i])
+            if trade is not None and trade.retry_at > now:
+                continue
+            action = "stop_loss" if stopped[i] else "take_profit"
+            metrics.increment("agent_risk_triggers_total", action=action, token=symbols[i])
+            results.append((symbols[i], action, float(latest[i])))
+
+        return results
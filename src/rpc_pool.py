@@ -0,0 +1,273 @@
+"""
+RPC pool module for the cryptocurrency trading agent.
+This module provides a Web3 provider that spreads the requests of one chain
+over several JSON-RPC endpoints. It tracks each endpoint's rolling latency and
+failures, routes requests to the fastest healthy endpoint, sends a hedged
+duplicate of a read that runs past the endpoint's p95 latency, and stops using
+an endpoint that keeps failing until a cooldown has passed (circuit breaker).
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+from web3 import HTTPProvider
+from web3.providers.base import JSONBaseProvider
+
+from metrics import metrics
+
+# Default pool settings (overridden by the "rpc_pool" config section)
+DEFAULT_SETTINGS = {
+    "timeout_seconds": 10,
+    "latency_window": 100,
+    "latency_smoothing": 0.2,
+    "hedge_reads": True,
+    "max_hedges": 1,
+    "hedge_min_samples": 20,
+    "hedge_delay_seconds": 0.5,
+    "hedge_min_delay_seconds": 0.05,
+    "failure_threshold": 3,
+    "cooldown_seconds": 30
+}
+
+# Methods with side effects are never duplicated by hedging
+WRITE_METHODS = frozenset({"eth_sendRawTransaction", "eth_sendTransaction", "eth_sign", "eth_signTransaction"})
+
+
+class Endpoint:
+    """
+    One JSON-RPC endpoint and its health statistics.
+
+    The statistics are guarded by the owning pool's lock.
+    """
+
+    def __init__(self, url: str, provider, window: int):
+        """
+        Initialize the endpoint.
+
+        Args:
+            url: Endpoint URL
+            provider: Provider sending the requests (e.g. an HTTPProvider)
+            window: Number of recent latencies kept for the p95
+        """
+        self.url = url
+        self.provider = provider
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def is_open(self, now: float) -> bool:
+        """Check whether the circuit breaker keeps requests away from this endpoint."""
+        if self.open_until == 0.0:
+            return False
+        # After the cooldown, one probe request is let through (half-open)
+        return now < self.open_until or self.probing
+
+    def p95(self) -> Optional[float]:
+        """Get the 95th percentile of the recent latencies (None if there are none)."""
+        if not self.latencies:
+            return None
+        return float(np.percentile(self.latencies, 95))
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        """Get the endpoint's statistics as a dictionary."""
+        return {
+            "url": self.url,
+            "latency": self.latency,
+            "p95": self.p95(),
+            "requests": self.requests,
+            "errors": self.errors,
+            "open": self.is_open(now)
+        }
+
+
+class ProviderPool(JSONBaseProvider):
+    """
+    A Web3 provider backed by several endpoints of the same chain.
+    """
+
+    def __init__(self, urls: List[str], chain: str, settings: Optional[Dict[str, Any]] = None,
+                 providers: Optional[List[Any]] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            urls: Endpoint URLs, in order of preference while no latency is known
+            chain: Chain name (for logs and metrics)
+            settings: Pool settings (see DEFAULT_SETTINGS)
+            providers: Providers to use instead of one HTTPProvider per URL
+        """
+        super().__init__()
+        if not urls:
+            raise ValueError(f"No RPC endpoints configured for {chain}")
+
+        self.chain = chain
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+
+        if providers is None:
+            request_kwargs = {"timeout": self.settings["timeout_seconds"]}
+            providers = [HTTPProvider(url, request_kwargs=request_kwargs) for url in urls]
+
+        self.endpoints = [Endpoint(url, provider, self.settings["latency_window"])
+                          for url, provider in zip(urls, providers)]
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(self.endpoints),
+                                            thread_name_prefix=f"rpc-{chain}")
+
+    def __str__(self) -> str:
+        return f"ProviderPool({self.chain}, {len(self.endpoints)} endpoints)"
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Get the statistics of every endpoint."""
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.to_dict(now) for endpoint in self.endpoints]
+
+    def _ranked(self) -> List[Endpoint]:
+        """
+        Get the endpoints to try, fastest first.
+
+        Endpoints without a latency yet rank first so that they get measured.
+        If every circuit is open, the endpoints are returned in the order their
+        cooldowns end rather than failing without trying.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if not endpoint.is_open(now)]
+            if not healthy:
+                return sorted(self.endpoints, key=lambda endpoint: endpoint.open_until)
+
+            return sorted(healthy, key=lambda endpoint: endpoint.latency or 0.0)
+
+    def _hedge_delay(self, endpoint: Endpoint) -> float:
+        """Get how long to wait for an endpoint before sending a hedged request."""
+        with self._lock:
+            if len(endpoint.latencies) < self.settings["hedge_min_samples"]:
+                delay = self.settings["hedge_delay_seconds"]
+            else:
+                delay = endpoint.p95()
+        return max(delay, self.settings["hedge_min_delay_seconds"])
+
+    def _record(self, endpoint: Endpoint, latency: Optional[float]):
+        """Update an endpoint's statistics after a request (latency None on failure)."""
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.probing = False
+
+            if latency is not None:
+                endpoint.latencies.append(latency)
+                smoothing = self.settings["latency_smoothing"]
+                endpoint.latency = latency if endpoint.latency is None else \
+                    (1 - smoothing) * endpoint.latency + smoothing * latency
+                endpoint.consecutive_failures = 0
+                endpoint.open_until = 0.0
+                return
+
+            endpoint.errors += 1
+            endpoint.consecutive_failures += 1
+            # A failed probe reopens the circuit straight away
+            if endpoint.open_until or endpoint.consecutive_failures >= self.settings["failure_threshold"]:
+                endpoint.open_until = time.monotonic() + self.settings["cooldown_seconds"]
+                opened = True
+            else:
+                opened = False
+
+        if opened:
+            metrics.increment("agent_rpc_circuit_open_total", chain=self.chain)
+            logger.warning(f"RPC endpoint {endpoint.url} on {self.chain} failing, "
+                           f"pausing it for {self.settings['cooldown_seconds']}s")
+
+    def _call(self, endpoint: Endpoint, method: str, params: Any) -> Dict[str, Any]:
+        """Send a request to one endpoint and record the outcome."""
+        with self._lock:
+            if endpoint.open_until:
+                endpoint.probing = True
+
+        start = time.monotonic()
+        try:
+            response = endpoint.provider.make_request(method, params)
+        except Exception:
+            self._record(endpoint, None)
+            raise
+
+        self._record(endpoint, time.monotonic() - start)
+        return response
+
+    def _failover(self, endpoints: List[Endpoint], method: str, params: Any) -> Dict[str, Any]:
+        """Try the endpoints one at a time until one answers."""
+        last_error: Optional[Exception] = None
+        for endpoint in endpoints:
+            try:
+                return self._call(endpoint, method, params)
+            except Exception as e:
+                last_error = e
+                logger.debug(f"RPC {method} failed on {endpoint.url}: {str(e)}")
+        raise last_error
+
+    def _hedged(self, endpoints: List[Endpoint], method: str, params: Any) -> Dict[str, Any]:
+        """
+        Send a read to the fastest endpoint, and to the next one if it runs past its p95.
+
+        Failed requests fail over to the next endpoint immediately. The first
+        answer wins; slower duplicates still finish in the background and
+        update their endpoint's statistics.
+        """
+        waiting = iter(endpoints)
+        max_parallel = 1 + self.settings["max_hedges"]
+        pending = {}
+        last_error: Optional[Exception] = None
+
+        def launch() -> bool:
+            endpoint = next(waiting, None)
+            if endpoint is None:
+                return False
+            pending[self._executor.submit(self._call, endpoint, method, params)] = endpoint
+            return True
+
+        exhausted = not launch()
+        while pending:
+            primary = next(iter(pending.values()))
+            hedge = not exhausted and len(pending) < max_parallel
+            done, _ = wait(list(pending), timeout=self._hedge_delay(primary) if hedge else None,
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+
+            if not done:
+                # Too slow: duplicate the request on the next endpoint
+                exhausted = not launch()
+                if not exhausted:
+                    metrics.increment("agent_rpc_hedged_total", chain=self.chain, method=method)
+            elif not pending:
+                exhausted = not launch()
+
+        raise last_error
+
+    def make_request(self, method: str, params: Any) -> Dict[str, Any]:
+        """
+        Send a JSON-RPC request through the pool.
+
+        Args:
+            method: JSON-RPC method
+            params: Method parameters
+
+        Returns:
+            Dict: The JSON-RPC response
+        """
+        endpoints = self._ranked()
+        if method in WRITE_METHODS or not self.settings["hedge_reads"] or len(endpoints) == 1:
+            return self._failover(endpoints, method, params)
+        return self._hedged(endpoints, method, params)
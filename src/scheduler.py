@@ -0,0 +1,289 @@
+"""
+Scheduler module for the cryptocurrency trading agent.
+This module provides a deadline-aware, event-driven job scheduler backed by
+a heap-ordered timer queue. The scheduler thread sleeps until the next job is
+due, supports per-job intervals and jitter, detects overruns and drops work
+that has become too stale to be useful.
+"""
+
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from metrics import metrics, STAGE_METRIC
+
+
+class ScheduledJob:
+    """
+    A recurring job managed by the EventScheduler.
+    """
+
+    __slots__ = (
+        "name", "callback", "interval", "jitter", "max_lateness", "base_time",
+        "next_run", "running", "cancelled", "runs", "overruns", "dropped",
+        "last_duration", "last_started", "last_error"
+    )
+
+    def __init__(self, name: str, callback: Callable[[], Any], interval: float,
+                 jitter: float = 0.0, max_lateness: Optional[float] = None):
+        """
+        Initialize a job.
+
+        Args:
+            name: Unique job name (e.g. ETH:analysis)
+            callback: Zero-argument callable to run
+            interval: Seconds between runs
+            jitter: Maximum random delay in seconds added to each run
+            max_lateness: Runs that start later than this many seconds after
+                          their due time are dropped (None to never drop)
+        """
+        if interval <= 0:
+            raise ValueError(f"Job {name} must have a positive interval")
+
+        self.name = name
+        self.callback = callback
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.max_lateness = max_lateness
+        self.base_time = 0.0
+        self.next_run = 0.0
+        self.running = False
+        self.cancelled = False
+        self.runs = 0
+        self.overruns = 0
+        self.dropped = 0
+        self.last_duration: Optional[float] = None
+        self.last_started: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the job status as a dictionary."""
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "dropped": self.dropped,
+            "last_duration_seconds": self.last_duration,
+            "last_error": self.last_error
+        }
+
+
+class EventScheduler:
+    """
+    A heap-ordered timer queue that runs recurring jobs on a worker pool.
+
+    The scheduler thread blocks on a condition variable until the earliest
+    job is due, so no CPU is used between jobs. Jobs keep a fixed time grid:
+    if a run overruns its interval, the missed slots are skipped instead of
+    being queued up behind it. Latency-critical jobs can get a dedicated
+    worker, so they never wait behind the shared pool's slow jobs.
+    """
+
+    def __init__(self, max_workers: int = 4, clock: Callable[[], float] = time.monotonic,
+                 seed: Optional[int] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_workers: Number of worker threads that execute jobs
+            clock: Monotonic clock function returning seconds
+            seed: Random seed for jitter (None for a random seed)
+        """
+        self._clock = clock
+        self._random = random.Random(seed)
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler")
+        self._dedicated: Dict[str, ThreadPoolExecutor] = {}
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name: str, callback: Callable[[], Any], interval: float,
+                jitter: float = 0.0, max_lateness: Optional[float] = None,
+                delay: float = 0.0, dedicated: bool = False) -> ScheduledJob:
+        """
+        Add a recurring job.
+
+        Args:
+            name: Unique job name
+            callback: Zero-argument callable to run
+            interval: Seconds between runs
+            jitter: Maximum random delay in seconds added to each run
+            max_lateness: Seconds after which a late run is dropped
+            delay: Seconds before the first run
+            dedicated: Run the job on its own worker thread instead of the shared pool
+
+        Returns:
+            ScheduledJob: The scheduled job
+        """
+        job = ScheduledJob(name, callback, interval, jitter, max_lateness)
+
+        with self._cond:
+            if name in self._jobs:
+                raise ValueError(f"Job {name} is already scheduled")
+
+            job.base_time = self._clock() + delay
+            self._jobs[name] = job
+            if dedicated:
+                self._dedicated[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"scheduler-{name}")
+            self._push(job)
+            self._cond.notify()
+
+        logger.info(f"Scheduled job {name} every {interval:g}s")
+        return job
+
+    def remove_job(self, name: str):
+        """
+        Remove a job. A run that is already executing is allowed to finish.
+
+        Args:
+            name: Job name
+        """
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            executor = self._dedicated.pop(name, None)
+            if job is not None:
+                job.cancelled = True
+                self._cond.notify()
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Get the status of all jobs."""
+        with self._cond:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def _push(self, job: ScheduledJob):
+        """Push a job onto the heap at its base time plus jitter."""
+        job.next_run = job.base_time + (self._random.uniform(0, job.jitter) if job.jitter else 0.0)
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+
+    def _advance(self, job: ScheduledJob, now: float):
+        """Move a job to its next slot on the time grid, skipping missed slots."""
+        job.base_time += job.interval
+        if job.base_time <= now:
+            missed = math.floor((now - job.base_time) / job.interval) + 1
+            job.base_time += missed * job.interval
+        self._push(job)
+
+    def _dispatch(self, job: ScheduledJob, now: float):
+        """Run a due job, or record why it was skipped. Called with the lock held."""
+        lateness = now - job.next_run
+
+        if job.running:
+            # Previous run is still executing: skip this slot instead of stacking runs
+            job.overruns += 1
+            metrics.increment("agent_scheduler_overruns_total", job=job.name)
+            logger.warning(f"Job {job.name} is still running, skipping this run")
+        elif job.max_lateness is not None and lateness > job.max_lateness:
+            self._drop(job, lateness)
+        else:
+            job.running = True
+            job.last_started = now
+            self._dedicated.get(job.name, self._executor).submit(self._run_job, job, job.next_run)
+
+        self._advance(job, now)
+
+    def _drop(self, job: ScheduledJob, lateness: float):
+        """Record a run dropped for starting too late. Called with the lock held."""
+        job.dropped += 1
+        metrics.increment("agent_scheduler_dropped_total", job=job.name)
+        logger.warning(f"Dropping stale run of {job.name} ({lateness:.1f}s late)")
+
+    def _run_job(self, job: ScheduledJob, due: float):
+        """
+        Execute a job callback on a worker thread.
+
+        Args:
+            job: The job
+            due: Time the run was due (a run that waited for a worker too long is dropped)
+        """
+        if job.max_lateness is not None:
+            lateness = self._clock() - due
+            if lateness > job.max_lateness:
+                with self._cond:
+                    job.running = False
+                    self._drop(job, lateness)
+                return
+
+        start = time.perf_counter()
+        error = None
+
+        try:
+            job.callback()
+        except Exception as e:
+            error = str(e)
+            metrics.increment("agent_errors_total", stage=f"scheduler.{job.name}")
+            logger.error(f"Error in scheduled job {job.name}: {error}")
+
+        duration = time.perf_counter() - start
+        metrics.observe(STAGE_METRIC, duration, stage="scheduler.job", job=job.name)
+
+        with self._cond:
+            job.running = False
+            job.runs += 1
+            job.last_duration = duration
+            job.last_error = error
+
+        # The slots this run covers are counted as overruns when they are skipped
+        if duration > job.interval:
+            metrics.increment("agent_scheduler_long_runs_total", job=job.name)
+            logger.warning(f"Job {job.name} overran its interval ({duration:.1f}s > {job.interval:g}s)")
+
+    def run(self):
+        """Run the scheduler loop in the current thread until stop() is called."""
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                next_run, _, job = self._heap[0]
+                if job.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+
+                now = self._clock()
+                if next_run > now:
+                    # Sleep until the earliest job is due or the queue changes
+                    self._cond.wait(next_run - now)
+                    continue
+
+                heapq.heappop(self._heap)
+                self._dispatch(job, now)
+
+    def start(self):
+        """Run the scheduler loop in a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.run, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = False):
+        """
+        Stop the scheduler.
+
+        Args:
+            wait: Whether to wait for running jobs to finish
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+        self._executor.shutdown(wait=wait)
+        for executor in list(self._dedicated.values()):
+            executor.shutdown(wait=wait)
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
@@ -0,0 +1,200 @@
+"""
+Score cache module for the cryptocurrency trading agent.
+This module remembers the sentiment score of every tweet already scored, so a
+tweet found again (in another token's search, the next cycle's search or the
+filtered stream) is never cleaned and scored twice. Scores are looked up by
+tweet id first and then by a hash of the cleaned text, which also catches
+retweets and copy-pasted tweets. The cache is a bounded LRU in memory and can
+be persisted to a local SQLite database to survive restarts.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from metrics import metrics
+
+# Default cache settings (overridden by the "score_cache" config section)
+DEFAULT_SETTINGS = {
+    "capacity": 50000,
+    "path": None,
+    "flush_every": 500
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    key TEXT PRIMARY KEY,
+    score REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_used ON scores (used);
+"""
+
+
+def content_key(text: str) -> str:
+    """
+    Get the cache key of a cleaned tweet text.
+
+    A retweet's "RT" prefix is dropped (its mention is already cleaned
+    away), so it shares the key of the original tweet.
+
+    Args:
+        text: Cleaned tweet text (see SentimentAnalyzer._clean_tweet)
+
+    Returns:
+        str: Key of the text's score
+    """
+    if text.startswith("RT "):
+        text = text[3:]
+    return "text:" + hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def id_key(tweet_id: Any) -> str:
+    """Get the cache key of a tweet id."""
+    return f"id:{tweet_id}"
+
+
+class ScoreCache:
+    """
+    Bounded LRU of tweet sentiment scores, keyed by tweet id and content hash.
+
+    Only the scores (polarities) are kept, so the sentiment thresholds can
+    change without invalidating the cache. With a path, new and used entries
+    are written to the database in batches of flush_every (and on flush()),
+    and the most recently used entries are loaded back on start.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the cache, loading the persisted scores if a path is set.
+
+        Args:
+            settings: Cache settings (see DEFAULT_SETTINGS)
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.capacity = int(self.settings["capacity"])
+        self.path = self.settings["path"]
+
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[str, float]" = OrderedDict()
+        self._pending: Dict[str, Tuple[float, float]] = {}
+        self._local = threading.local()
+
+        if self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection to the database."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self):
+        """Load the most recently used scores and drop the older ones from the database."""
+        conn = self._conn()
+        rows = conn.execute("SELECT key, score FROM scores ORDER BY used DESC LIMIT ?",
+                            (self.capacity,)).fetchall()
+        with self._lock:
+            for key, score in reversed(rows):
+                self._scores[key] = score
+        conn.execute("DELETE FROM scores WHERE key NOT IN "
+                     "(SELECT key FROM scores ORDER BY used DESC LIMIT ?)", (self.capacity,))
+        logger.info(f"Loaded {len(rows)} cached tweet scores from {self.path}")
+
+    def _touch(self, key: str, score: float):
+        """Mark an entry as just used, evicting the least recently used (called with the lock held)."""
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.capacity:
+            self._scores.popitem(last=False)
+        if self.path:
+            self._pending[key] = (score, time.time())
+
+    def get(self, tweet_id: Any = None, text: Optional[str] = None) -> Optional[float]:
+        """
+        Get the score of a tweet seen before, by id and then by content.
+
+        Args:
+            tweet_id: Tweet id (None if unknown)
+            text: Cleaned tweet text (None to look up by id only)
+
+        Returns:
+            float: The cached score (None if the tweet has not been scored)
+        """
+        flush = False
+        with self._lock:
+            keys = ([id_key(tweet_id)] if tweet_id is not None else []) + \
+                   ([content_key(text)] if text is not None else [])
+            score = None
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    metrics.increment("agent_cache_hits_total", cache="tweet_score", key=key.split(":", 1)[0])
+                    break
+            if score is None:
+                metrics.increment("agent_cache_misses_total", cache="tweet_score")
+                return None
+
+            # Copies found by content are remembered by their own id too
+            for key in keys:
+                self._touch(key, score)
+            flush = len(self._pending) >= self.settings["flush_every"]
+        if flush:
+            self.flush()
+        return score
+
+    def put(self, tweet_id: Any, text: str, score: float):
+        """
+        Remember a tweet's score.
+
+        Args:
+            tweet_id: Tweet id (None if unknown)
+            text: Cleaned tweet text
+            score: Sentiment score (-1 to 1)
+        """
+        with self._lock:
+            if tweet_id is not None:
+                self._touch(id_key(tweet_id), score)
+            self._touch(content_key(text), score)
+            flush = len(self._pending) >= self.settings["flush_every"]
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Write the entries added or used since the last flush to the database (if persisted)."""
+        if not self.path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        rows: List[Tuple[str, float, float]] = [(key, score, used) for key, (score, used) in pending.items()]
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO scores (key, score, used) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET score = excluded.score, used = excluded.used", rows)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(f"Error persisting tweet scores: {str(e)}")
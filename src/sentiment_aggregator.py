@@ -0,0 +1,271 @@
+"""
+Sentiment aggregator module for the cryptocurrency trading agent.
+This module keeps rolling per-token sentiment totals over several time windows
+(1h, 6h, 24h and 48h by default). Scored tweets are added to fixed-width time
+buckets, and each window keeps running totals of the buckets it covers and of
+the equally long window before it. Adding a tweet or advancing the clock
+touches only the buckets that enter or leave a window, so reading a window's
+sentiment and its change costs the same however many tweets it holds.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Default aggregator settings (overridden by the "sentiment_aggregator" config section)
+DEFAULT_SETTINGS = {
+    "bucket_seconds": 300,
+    "windows_hours": [1, 6, 24, 48]
+}
+
+# Totals kept per bucket and window, in column order
+FIELDS = ("count", "weighted_sum", "positive", "negative", "neutral", "influencer_count", "influencer_sum")
+_COLUMNS = {name: i for i, name in enumerate(FIELDS)}
+
+# Windows read as current (the latest buckets) and previous (the buckets before them)
+CURRENT, PREVIOUS = 0, 1
+
+
+def _epoch(created_at: Any) -> Optional[float]:
+    """Get the Unix time of a tweet's created_at (naive datetimes are UTC)."""
+    if created_at is None:
+        return None
+    if isinstance(created_at, (int, float)):
+        return float(created_at)
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+class TokenWindows:
+    """
+    Bucketed sentiment totals of one token.
+
+    The ring holds twice the longest window, so every window's previous
+    window is still in it. Tweets older than that are dropped.
+    """
+
+    __slots__ = ("bucket_seconds", "lengths", "ring", "totals", "head", "_ids", "_slot_ids")
+
+    def __init__(self, bucket_seconds: float, lengths: List[int]):
+        """
+        Initialize empty windows.
+
+        Args:
+            bucket_seconds: Width of a bucket in seconds
+            lengths: Length of each window in buckets
+        """
+        self.bucket_seconds = bucket_seconds
+        self.lengths = np.array(lengths, dtype=np.int64)
+        size = 2 * int(self.lengths.max())
+        self.ring = np.zeros((size, len(FIELDS)), dtype=np.float64)
+        self.totals = np.zeros((len(lengths), 2, len(FIELDS)), dtype=np.float64)
+        self.head: Optional[int] = None
+
+        # Tweet ids already added, and the ids added to each ring slot (forgotten with the slot)
+        self._ids: Dict[Any, int] = {}
+        self._slot_ids: List[List[Any]] = [[] for _ in range(size)]
+
+    def _clear(self):
+        """Forget every bucket."""
+        self.ring[:] = 0
+        self.totals[:] = 0
+        self._ids.clear()
+        for ids in self._slot_ids:
+            ids.clear()
+
+    def advance(self, bucket: int):
+        """
+        Move the latest bucket forward, sliding each window over the buckets in between.
+
+        Args:
+            bucket: New latest bucket (earlier buckets are ignored)
+        """
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+
+        size = len(self.ring)
+        if bucket - self.head >= size:
+            self._clear()
+            self.head = bucket
+            return
+
+        lengths = self.lengths
+        for b in range(self.head + 1, bucket + 1):
+            # The bucket leaving each window enters its previous window, whose own oldest bucket leaves
+            leaving = self.ring[(b - lengths) % size]
+            expired = self.ring[(b - 2 * lengths) % size]
+            self.totals[:, CURRENT] -= leaving
+            self.totals[:, PREVIOUS] += leaving - expired
+
+            # The slot of bucket b held bucket b - size, which just left the longest previous window
+            slot = b % size
+            self.ring[slot] = 0
+            for tweet_id in self._slot_ids[slot]:
+                self._ids.pop(tweet_id, None)
+            self._slot_ids[slot].clear()
+
+        # Empty windows are reset, so rounding errors of the running sums don't build up
+        empty = self.totals[:, :, _COLUMNS["count"]] <= 0
+        self.totals[empty] = 0
+        self.head = bucket
+
+    def add(self, tweet_id: Any, timestamp: float, row: np.ndarray) -> bool:
+        """
+        Add one tweet's totals.
+
+        Args:
+            tweet_id: Tweet id (None to skip the duplicate check)
+            timestamp: Unix time the tweet was created
+            row: The tweet's totals (see FIELDS)
+
+        Returns:
+            bool: True if added, False for a tweet already added or older than the ring
+        """
+        if tweet_id is not None and tweet_id in self._ids:
+            return False
+
+        bucket = int(timestamp // self.bucket_seconds)
+        self.advance(bucket)
+        age = self.head - bucket
+        size = len(self.ring)
+        if age >= size:
+            return False
+
+        slot = bucket % size
+        self.ring[slot] += row
+        self.totals[age < self.lengths, CURRENT] += row
+        self.totals[(age >= self.lengths) & (age < 2 * self.lengths), PREVIOUS] += row
+        if tweet_id is not None:
+            self._ids[tweet_id] = bucket
+            self._slot_ids[slot].append(tweet_id)
+        return True
+
+
+class SentimentAggregator:
+    """
+    Rolling sentiment windows for every token.
+
+    Scores and weights are the ones SentimentAnalyzer gives each tweet, and a
+    window's sentiment_score is the mean weighted score of its tweets, like
+    the overall score of analyze_sentiment. Each tweet id is counted once per
+    token, so the overlapping results of successive searches can all be added.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the aggregator.
+
+        Args:
+            settings: Aggregator settings (see DEFAULT_SETTINGS)
+
+        Raises:
+            ValueError: If a window is not a whole number of buckets
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.bucket_seconds = float(self.settings["bucket_seconds"])
+        if self.bucket_seconds <= 0:
+            raise ValueError("Sentiment bucket width must be positive")
+
+        self.windows: Dict[str, int] = {}
+        for hours in self.settings["windows_hours"]:
+            buckets = hours * 3600 / self.bucket_seconds
+            if buckets < 1 or buckets != int(buckets):
+                raise ValueError(f"Sentiment window of {hours}h is not a whole number of "
+                                 f"{self.bucket_seconds:g}s buckets")
+            self.windows[f"{hours:g}h"] = int(buckets)
+
+        # Clock the windows end at
+        self.clock = time.time
+
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, TokenWindows] = {}
+
+    def _token(self, token_symbol: str) -> TokenWindows:
+        """Get a token's windows, creating them on first use (called with the lock held)."""
+        windows = self._tokens.get(token_symbol)
+        if windows is None:
+            windows = self._tokens[token_symbol] = TokenWindows(self.bucket_seconds, list(self.windows.values()))
+        return windows
+
+    def add(self, token_symbol: str, tweet_id: Any, created_at: Any, score: float, sentiment: str,
+            weight: float = 1.0, is_influencer: bool = False) -> bool:
+        """
+        Add a scored tweet to a token's windows.
+
+        Args:
+            token_symbol: Token symbol
+            tweet_id: Tweet id (None if unknown, then the tweet is always added)
+            created_at: Time the tweet was created (datetime, ISO string or Unix time; None for now)
+            score: Sentiment score (-1 to 1)
+            sentiment: Sentiment label (positive, negative or neutral)
+            weight: Engagement, follower and influencer weight of the tweet
+            is_influencer: Whether the author is a tracked influencer
+
+        Returns:
+            bool: True if added, False for a tweet already added or too old to be in any window
+        """
+        timestamp = _epoch(created_at)
+        row = np.zeros(len(FIELDS), dtype=np.float64)
+        row[_COLUMNS["count"]] = 1
+        row[_COLUMNS["weighted_sum"]] = score * weight
+        row[_COLUMNS.get(sentiment, _COLUMNS["neutral"])] = 1
+        if is_influencer:
+            row[_COLUMNS["influencer_count"]] = 1
+            row[_COLUMNS["influencer_sum"]] = score * weight
+
+        with self._lock:
+            return self._token(token_symbol).add(tweet_id, self.clock() if timestamp is None else timestamp, row)
+
+    def window(self, token_symbol: str, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get a token's sentiment over every window ending now.
+
+        Args:
+            token_symbol: Token symbol
+            now: Unix time the windows end at (the aggregator's clock by default)
+
+        Returns:
+            Dict: Per window label (e.g. "1h"): tweet_count, sentiment_score, positive_count,
+                  negative_count, neutral_count, influencer_count, influencer_score (None
+                  without influencer tweets), previous_score (of the window before it, None
+                  without tweets) and change (sentiment_score - previous_score, None if unknown)
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            windows = self._token(token_symbol)
+            windows.advance(int(now // self.bucket_seconds))
+            totals = windows.totals.copy()
+
+        count = _COLUMNS["count"]
+        result = {}
+        for i, label in enumerate(self.windows):
+            current, previous = totals[i, CURRENT], totals[i, PREVIOUS]
+            score = current[_COLUMNS["weighted_sum"]] / current[count] if current[count] else 0.0
+            previous_score = previous[_COLUMNS["weighted_sum"]] / previous[count] if previous[count] else None
+            influencers = current[_COLUMNS["influencer_count"]]
+            result[label] = {
+                "tweet_count": int(current[count]),
+                "sentiment_score": float(score),
+                "positive_count": int(current[_COLUMNS["positive"]]),
+                "negative_count": int(current[_COLUMNS["negative"]]),
+                "neutral_count": int(current[_COLUMNS["neutral"]]),
+                "influencer_count": int(influencers),
+                "influencer_score": float(current[_COLUMNS["influencer_sum"]] / influencers) if influencers else None,
+                "previous_score": None if previous_score is None else float(previous_score),
+                "change": None if previous_score is None or not current[count] else float(score - previous_score)
+            }
+        return result
+
+    def tokens(self) -> List[str]:
+        """Get the symbols of the tokens with windows."""
+        with self._lock:
+            return list(self._tokens)
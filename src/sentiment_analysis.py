@@ -5,9 +5,13 @@ to help inform trading decisions.
 """
 
 import json
+import math
 import re
 import os
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import tweepy
 from textblob import TextBlob
@@ -15,6 +19,14 @@ import nltk
 from loguru import logger
 from dotenv import load_dotenv
 
+from fetch_scheduler import FetchScheduler
+from metrics import metrics, STAGE_METRIC
+from near_duplicates import NearDuplicateDetector
+from score_cache import ScoreCache
+from sentiment_aggregator import SentimentAggregator
+from x_search import AsyncSearchClient
+from x_stream import FilteredStream, INFLUENCER_TAG, build_rules
+
 # Load environment variables
 load_dotenv()
 
@@ -56,8 +68,31 @@ class SentimentAnalyzer:
         self.keywords = self.sentiment_config["keywords"]
         self.influencers = self.sentiment_config["influencers"]
         
+        # Rolling per-token windows of every scored tweet
+        self.aggregator = SentimentAggregator(self.config.get("sentiment_aggregator"))
+        
+        # Scores of the tweets already scored, by tweet id and content
+        self.score_cache = ScoreCache(self.config.get("score_cache"))
+        
+        # Clustering of copy-pasted and bot tweets, each cluster scored once
+        self.deduplicator = NearDuplicateDetector(self.config.get("near_duplicates"))
+        
+        # Paces searches by the X API quota, and the last fresh result per token reported while deferred
+        self.fetch_scheduler = FetchScheduler(self.config.get("fetch_scheduler"))
+        self.last_results: Dict[str, Dict[str, Any]] = {}
+        
+        # Filtered stream replacing the searches while it is connected (see start_stream)
+        self.stream_config = self.config.get("x_stream", {})
+        self.stream: Optional[FilteredStream] = None
+        self.streamed_tweets: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._stream_terms: Dict[str, List[str]] = {}
+        self._stream_lock = threading.Lock()
+        
         # Initialize Twitter API client
         self._initialize_twitter_client()
+        
+        # Every search response reports the remaining quota in its headers
+        self.client.session.hooks["response"].append(self._on_response)
     
     def _initialize_twitter_client(self):
         """Initialize the Twitter API client using credentials from config or env vars."""
@@ -67,6 +102,10 @@ class SentimentAnalyzer:
         access_token = os.getenv("TWITTER_ACCESS_TOKEN", self.config["twitter"]["access_token"])
         access_token_secret = os.getenv("TWITTER_ACCESS_TOKEN_SECRET", self.config["twitter"]["access_token_secret"])
         bearer_token = os.getenv("TWITTER_BEARER_TOKEN", self.config["twitter"]["bearer_token"])
+        self.bearer_token = bearer_token
+        
+        # Pooled async client for paginated v2 searches (None to search through tweepy)
+        self.search_client: Optional[AsyncSearchClient] = None
         
         # Initialize Twitter client
         try:
@@ -80,6 +119,12 @@ class SentimentAnalyzer:
             )
             logger.info("Initialized Twitter API v2 client")
             self.api_version = "v2"
+            
+            try:
+                self.search_client = AsyncSearchClient(bearer_token, self.config.get("x_search"),
+                                                       self.fetch_scheduler, self.influencers)
+            except RuntimeError as e:
+                logger.warning(f"{str(e)}; searching tweets through tweepy, one page per search")
         except Exception as e:
             logger.warning(f"Failed to initialize Twitter API v2 client: {str(e)}")
             logger.warning("Falling back to v1.1 API")
@@ -92,6 +137,18 @@ class SentimentAnalyzer:
             self.api_version = "v1.1"
             logger.info("Initialized Twitter API v1.1 client")
     
+    def search_pages(self, max_results: int) -> int:
+        """Get the number of requests a search for max_results tweets may send."""
+        if self.search_client is None:
+            return 1
+        settings = self.search_client.settings
+        return max(1, min(math.ceil(max_results / settings["page_size"]), settings["max_pages"]))
+    
+    def _on_response(self, response, *args, **kwargs):
+        """Pass the rate-limit headers of a search response to the fetch scheduler."""
+        if "search" in response.url:
+            self.fetch_scheduler.update(response.headers)
+    
     def _clean_tweet(self, tweet: str) -> str:
         """
         Clean the tweet text by removing links, special characters, etc.
@@ -119,12 +176,14 @@ class SentimentAnalyzer:
         
         return tweet
     
-    def _get_tweet_sentiment(self, tweet: str) -> Tuple[float, str]:
+    def _get_tweet_sentiment(self, tweet: str, tweet_id: Any = None) -> Tuple[float, str]:
         """
         Get the sentiment score and label for a tweet.
+        Tweets seen before (by id or cleaned text) get their cached score.
         
         Args:
             tweet: The tweet text
+            tweet_id: The tweet's id (None if unknown)
             
         Returns:
             Tuple[float, str]: Sentiment score (-1 to 1) and label (positive, negative, neutral)
@@ -136,11 +195,14 @@ class SentimentAnalyzer:
         if not cleaned_tweet:
             return 0.0, "neutral"
         
-        # Analyze sentiment using TextBlob
-        analysis = TextBlob(cleaned_tweet)
-        
-        # Get polarity score (-1 to 1)
-        polarity = analysis.sentiment.polarity
+        polarity = self.score_cache.get(tweet_id, cleaned_tweet)
+        if polarity is None:
+            # Analyze sentiment using TextBlob
+            analysis = TextBlob(cleaned_tweet)
+            
+            # Get polarity score (-1 to 1)
+            polarity = analysis.sentiment.polarity
+            self.score_cache.put(tweet_id, cleaned_tweet, polarity)
         
         # Determine sentiment label
         if polarity > self.sentiment_threshold_positive:
@@ -163,16 +225,21 @@ class SentimentAnalyzer:
             days_back: Number of days to look back
             
         Returns:
-            List[Dict]: List of tweet data
+            List[Dict]: List of tweet data (None if the search failed)
         """
         # Calculate start time
         start_time = datetime.utcnow() - timedelta(days=days_back)
         
+        # The async client follows the pagination past the 100 tweets of a page
+        if self.search_client is not None:
+            return self.search_client.search(query, max_results, start_time)
+        
         try:
             # Search tweets
+            metrics.increment("agent_api_calls_total", api="x", endpoint="search_recent_tweets")
             response = self.client.search_recent_tweets(
                 query=query,
-                max_results=max_results,
+                max_results=max(10, min(max_results, 100)),
                 tweet_fields=['created_at', 'public_metrics', 'author_id'],
                 user_fields=['username', 'name', 'public_metrics'],
                 expansions=['author_id'],
@@ -212,9 +279,15 @@ class SentimentAnalyzer:
             
             return tweets
             
+        except tweepy.TooManyRequests as e:
+            metrics.increment("agent_api_errors_total", api="x", endpoint="search_recent_tweets")
+            self.fetch_scheduler.rate_limited(e.response.headers)
+            logger.warning("X API rate limit reached searching tweets with v2 API")
+            return None
         except Exception as e:
+            metrics.increment("agent_api_errors_total", api="x", endpoint="search_recent_tweets")
             logger.error(f"Error searching tweets with v2 API: {str(e)}")
-            return []
+            return None
     
     def _search_tweets_v1(self, query: str, max_results: int = 100, 
                          days_back: int = 1) -> List[Dict[str, Any]]:
@@ -227,10 +300,11 @@ class SentimentAnalyzer:
             days_back: Number of days to look back
             
         Returns:
-            List[Dict]: List of tweet data
+            List[Dict]: List of tweet data (None if the search failed)
         """
         try:
             # Search tweets
+            metrics.increment("agent_api_calls_total", api="x", endpoint="search_tweets")
             search_results = tweepy.Cursor(
                 self.client.search_tweets,
                 q=query,
@@ -270,9 +344,15 @@ class SentimentAnalyzer:
             
             return tweets
             
+        except tweepy.TooManyRequests as e:
+            metrics.increment("agent_api_errors_total", api="x", endpoint="search_tweets")
+            self.fetch_scheduler.rate_limited(e.response.headers)
+            logger.warning("X API rate limit reached searching tweets with v1.1 API")
+            return None
         except Exception as e:
+            metrics.increment("agent_api_errors_total", api="x", endpoint="search_tweets")
             logger.error(f"Error searching tweets with v1.1 API: {str(e)}")
-            return []
+            return None
     
     def search_tweets(self, query: str, max_results: int = 100, 
                      days_back: int = 1) -> List[Dict[str, Any]]:
@@ -285,25 +365,53 @@ class SentimentAnalyzer:
             days_back: Number of days to look back
             
         Returns:
-            List[Dict]: List of tweet data
+            List[Dict]: List of tweet data (None if the search failed)
         """
         if self.api_version == "v2":
             return self._search_tweets_v2(query, max_results, days_back)
         else:
             return self._search_tweets_v1(query, max_results, days_back)
     
-    def analyze_sentiment(self, token_symbol: str, additional_keywords: List[str] = None) -> Dict[str, Any]:
+    def _stale_sentiment(self, token_symbol: str, reason: str) -> Dict[str, Any]:
         """
-        Analyze sentiment for a specific cryptocurrency token.
+        Get the last sentiment result of a token, marked as stale, when no new one could be fetched.
+        
+        The result keeps the timestamp of the search it came from, while its
+        windows are read again (they don't need a search). A token never
+        searched successfully gets an unknown sentiment rather than a neutral one.
         
         Args:
-            token_symbol: The token symbol (e.g., BTC, ETH)
-            additional_keywords: Additional keywords to include in the search
+            token_symbol: The token symbol
+            reason: Why no search was made (deferred) or why it failed (error)
             
         Returns:
-            Dict: Sentiment analysis results
+            Dict: Sentiment analysis results with stale set
         """
-        # Prepare search query
+        last = self.last_results.get(token_symbol)
+        if last is None:
+            result = {
+                "token": token_symbol,
+                "sentiment_score": 0,
+                "sentiment": "unknown",
+                "tweet_count": 0,
+                "unique_tweet_count": 0,
+                "duplicate_count": 0,
+                "largest_cluster": 0,
+                "positive_count": 0,
+                "negative_count": 0,
+                "neutral_count": 0,
+                "influencer_sentiment": "unknown",
+                "recent_tweets": [],
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        else:
+            result = dict(last)
+        
+        result.update(stale=True, stale_reason=reason, windows=self.aggregator.window(token_symbol))
+        return result
+    
+    def _token_terms(self, token_symbol: str, additional_keywords: List[str] = None) -> List[str]:
+        """Get the search terms naming a token (without the general crypto keywords)."""
         search_terms = [token_symbol]
         
         # Add token name variations
@@ -316,29 +424,265 @@ class SentimentAnalyzer:
         if additional_keywords:
             search_terms.extend(additional_keywords)
         
+        return search_terms
+    
+    def build_query(self, token_symbol: str, additional_keywords: List[str] = None) -> str:
+        """
+        Build the search query (and stream rule) of a token.
+        
+        Args:
+            token_symbol: The token symbol (e.g., BTC, ETH)
+            additional_keywords: Additional keywords to include in the search
+            
+        Returns:
+            str: The token's terms and the general crypto keywords, quoted and OR-ed
+        """
         # Add general crypto keywords
-        search_terms.extend(self.keywords)
+        search_terms = self._token_terms(token_symbol, additional_keywords) + list(self.keywords)
         
         # Build query string
-        query = " OR ".join([f'"{term}"' for term in search_terms])
+        return " OR ".join([f'"{term}"' for term in search_terms])
+    
+    def _tweet_weight(self, tweet: Dict[str, Any]) -> float:
+        """
+        Get the weight of a tweet's score from its engagement, followers and author.
+        
+        Args:
+            tweet: Tweet data
+            
+        Returns:
+            float: Weight multiplier
+        """
+        weight = 1.0
+        
+        # Engagement weight (likes, retweets, replies)
+        engagement = tweet.get("like_count", 0) + tweet.get("retweet_count", 0) + tweet.get("reply_count", 0)
+        if engagement > 100:
+            weight *= 1.5
+        elif engagement > 50:
+            weight *= 1.3
+        elif engagement > 10:
+            weight *= 1.1
+        
+        # Follower weight
+        followers = tweet.get("followers_count", 0)
+        if followers > 100000:
+            weight *= 1.5
+        elif followers > 10000:
+            weight *= 1.3
+        elif followers > 1000:
+            weight *= 1.1
+        
+        # Influencer weight
+        if tweet.get("is_influencer", False):
+            weight *= self.influencer_weight
+        
+        return weight
+    
+    def _label(self, score: float) -> str:
+        """Get the sentiment label of a score."""
+        if score > self.sentiment_threshold_positive:
+            return "positive"
+        if score < self.sentiment_threshold_negative:
+            return "negative"
+        return "neutral"
+    
+    def ingest(self, tags: List[str], tweet: Dict[str, Any]) -> List[str]:
+        """
+        Score a streamed tweet and add it to the windows of the tokens it is about.
+        
+        Tweets that matched only the influencer rule count for the tokens
+        whose own terms (not the general keywords) appear anywhere in the text,
+        e.g. as a cashtag, which the token rules' keyword matching misses.
+        
+        Args:
+            tags: Tags of the stream rules the tweet matched
+            tweet: Tweet data (see search_tweets)
+            
+        Returns:
+            List[str]: Symbols of the tokens the tweet was added to
+        """
+        with self._stream_lock:
+            terms = dict(self._stream_terms)
+        
+        tokens = [tag for tag in tags if tag in terms]
+        if not tokens and INFLUENCER_TAG in tags:
+            text = tweet["text"].lower()
+            tokens = [symbol for symbol, words in terms.items() if any(word.lower() in text for word in words)]
+        if not tokens:
+            return []
+        
+        score, sentiment = self._get_tweet_sentiment(tweet["text"], tweet.get("id"))
+        tweet["sentiment_score"] = score
+        tweet["sentiment"] = sentiment
+        weight = self._tweet_weight(tweet)
+        
+        added = []
+        for symbol in tokens:
+            if self.aggregator.add(symbol, tweet.get("id"), tweet.get("created_at"), score, sentiment,
+                                   weight, tweet.get("is_influencer", False)):
+                self.streamed_tweets[symbol].append(tweet)
+                added.append(symbol)
+        return added
+    
+    def backfill(self, since: datetime):
+        """
+        Search for the tokens' tweets of a stream outage the API couldn't backfill.
+        
+        Args:
+            since: Start of the outage (UTC)
+        """
+        with self._stream_lock:
+            symbols = list(self._stream_terms)
+        
+        days_back = max(1, math.ceil((datetime.utcnow() - since).total_seconds() / 86400))
+        for symbol in symbols:
+            if not self.fetch_scheduler.acquire(symbol, self.search_pages(100)):
+                continue
+            if self.search_client is not None:
+                tweets = self.search_client.search(self.build_query(symbol), 100, since)
+            else:
+                tweets = self.search_tweets(self.build_query(symbol), max_results=100, days_back=days_back)
+            for tweet in tweets or []:
+                self.ingest([symbol], tweet)
+        logger.info(f"Backfilled stream outage since {since.isoformat()} for {len(symbols)} tokens")
+    
+    def start_stream(self, token_symbols: List[str]) -> bool:
+        """
+        Follow the filtered stream for some tokens, if x_stream.enabled is set.
+        
+        Args:
+            token_symbols: Symbols of the tokens to stream
+            
+        Returns:
+            bool: Whether the stream was started
+        """
+        if not self.stream_config.get("enabled") or self.stream is not None:
+            return False
+        
+        with self._stream_lock:
+            self._stream_terms = {symbol: self._token_terms(symbol) for symbol in token_symbols}
+            # The last streamed tweets of each token, for the recent tweets of its results
+            for symbol in token_symbols:
+                self.streamed_tweets.setdefault(symbol, deque(maxlen=100))
+        
+        rules = build_rules({symbol: self.build_query(symbol) for symbol in token_symbols}, self.influencers)
+        stream = FilteredStream(self.bearer_token, rules, self.ingest, self.stream_config, self.influencers,
+                                on_gap=self.backfill)
+        try:
+            stream.start()
+        except Exception as e:
+            logger.error(f"Error starting the X filtered stream, searching instead: {str(e)}")
+            return False
+        
+        self.stream = stream
+        return True
+    
+    def stop_stream(self):
+        """Stop following the filtered stream (analysis goes back to searching)."""
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.stop()
+            self.score_cache.flush()
+    
+    def _streamed_sentiment(self, token_symbol: str) -> Dict[str, Any]:
+        """
+        Get a token's sentiment from the tweets streamed into its windows.
+        
+        The overall score and counts are those of the longest window (the
+        span a search covers), and the recent tweets are the most engaging of
+        the last streamed ones.
+        
+        Args:
+            token_symbol: The token symbol
+            
+        Returns:
+            Dict: Sentiment analysis results, in the format of analyze_sentiment
+        """
+        windows = self.aggregator.window(token_symbol)
+        span = windows[list(windows)[-1]]
+        count = span["tweet_count"]
+        influencer_score = span["influencer_score"]
+        
+        recent = list(self.streamed_tweets.get(token_symbol, ()))
+        recent.sort(key=lambda x: x.get("like_count", 0) + x.get("retweet_count", 0), reverse=True)
+        
+        result = {
+            "token": token_symbol,
+            "sentiment_score": span["sentiment_score"],
+            "sentiment": self._label(span["sentiment_score"]),
+            "tweet_count": count,
+            "unique_tweet_count": count,
+            "duplicate_count": 0,
+            "largest_cluster": 1 if count else 0,
+            "positive_count": span["positive_count"],
+            "negative_count": span["negative_count"],
+            "neutral_count": span["neutral_count"],
+            "positive_percentage": (span["positive_count"] / count) * 100 if count else 0,
+            "negative_percentage": (span["negative_count"] / count) * 100 if count else 0,
+            "neutral_percentage": (span["neutral_count"] / count) * 100 if count else 0,
+            "influencer_sentiment": self._label(influencer_score) if influencer_score is not None else "neutral",
+            "recent_tweets": recent[:10],
+            "windows": windows,
+            "source": "stream",
+            "stale": False,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        self.last_results[token_symbol] = result
+        return result
+    
+    def analyze_sentiment(self, token_symbol: str, additional_keywords: List[str] = None) -> Dict[str, Any]:
+        """
+        Analyze sentiment for a specific cryptocurrency token.
+        
+        When the X API quota can't afford a search now, or the search fails,
+        the token's last result is returned with stale set (see _stale_sentiment).
+        
+        Args:
+            token_symbol: The token symbol (e.g., BTC, ETH)
+            additional_keywords: Additional keywords to include in the search
+            
+        Returns:
+            Dict: Sentiment analysis results
+        """
+        # While the filtered stream is live, its tweets replace the search
+        if self.stream is not None and self.stream.healthy:
+            return self._streamed_sentiment(token_symbol)
+        
+        query = self.build_query(token_symbol, additional_keywords)
+        
+        # Searches the quota can't afford now are deferred
+        if not self.fetch_scheduler.acquire(token_symbol, self.search_pages(200)):
+            return self._stale_sentiment(token_symbol, "deferred")
         
         # Search tweets
-        tweets = self.search_tweets(query, max_results=200, days_back=2)
+        with metrics.timer("sentiment.search"):
+            tweets = self.search_tweets(query, max_results=200, days_back=2)
+        
+        if tweets is None:
+            return self._stale_sentiment(token_symbol, "error")
         
         if not tweets:
             logger.warning(f"No tweets found for {token_symbol}")
-            return {
+            result = {
                 "token": token_symbol,
                 "sentiment_score": 0,
                 "sentiment": "neutral",
                 "tweet_count": 0,
+                "unique_tweet_count": 0,
+                "duplicate_count": 0,
+                "largest_cluster": 0,
                 "positive_count": 0,
                 "negative_count": 0,
                 "neutral_count": 0,
                 "influencer_sentiment": "neutral",
                 "recent_tweets": [],
+                "windows": self.aggregator.window(token_symbol),
+                "stale": False,
                 "timestamp": datetime.utcnow().isoformat()
             }
+            self.last_results[token_symbol] = result
+            return result
         
         # Analyze sentiment for each tweet
         sentiment_scores = []
@@ -348,13 +692,27 @@ class SentimentAnalyzer:
         
         influencer_scores = []
         
-        for tweet in tweets:
+        # Copies of a tweet (retweets, shilling, bot spam) are scored and counted once
+        with metrics.timer("sentiment.dedup"):
+            clusters = self.deduplicator.cluster([tweet["text"] for tweet in tweets])
+        representatives = []
+        
+        scoring_start = time.perf_counter()
+        
+        for members in clusters:
+            # The most engaging copy stands for its cluster
+            tweet = max((tweets[i] for i in members),
+                        key=lambda x: x.get("like_count", 0) + x.get("retweet_count", 0))
+            tweet["cluster_size"] = len(members)
+            representatives.append(tweet)
+            
             # Get sentiment
-            score, sentiment = self._get_tweet_sentiment(tweet["text"])
+            score, sentiment = self._get_tweet_sentiment(tweet["text"], tweet.get("id"))
             
-            # Add sentiment data to tweet
-            tweet["sentiment_score"] = score
-            tweet["sentiment"] = sentiment
+            # Add sentiment data to the tweet and its copies
+            for i in members:
+                tweets[i]["sentiment_score"] = score
+                tweets[i]["sentiment"] = sentiment
             
             # Update counts
             if sentiment == "positive":
@@ -364,34 +722,20 @@ class SentimentAnalyzer:
             else:
                 neutral_count += 1
             
-            # Apply weighting based on engagement and followers
-            weight = 1.0
-            
-            # Engagement weight (likes, retweets, replies)
-            engagement = tweet.get("like_count", 0) + tweet.get("retweet_count", 0) + tweet.get("reply_count", 0)
-            if engagement > 100:
-                weight *= 1.5
-            elif engagement > 50:
-                weight *= 1.3
-            elif engagement > 10:
-                weight *= 1.1
-            
-            # Follower weight
-            followers = tweet.get("followers_count", 0)
-            if followers > 100000:
-                weight *= 1.5
-            elif followers > 10000:
-                weight *= 1.3
-            elif followers > 1000:
-                weight *= 1.1
-            
-            # Influencer weight
+            # Apply weighting based on engagement, followers and influencers
+            weight = self._tweet_weight(tweet)
             if tweet.get("is_influencer", False):
-                weight *= self.influencer_weight
                 influencer_scores.append(score * weight)
             
             # Add weighted score
             sentiment_scores.append(score * weight)
+            
+            # Each cluster is added once; tweets already in the token's windows (earlier searches) are skipped
+            self.aggregator.add(token_symbol, tweet.get("id"), tweet.get("created_at"), score, sentiment,
+                                weight, tweet.get("is_influencer", False))
+        
+        metrics.observe(STAGE_METRIC, time.perf_counter() - scoring_start, stage="sentiment.scoring")
+        self.score_cache.flush()
         
         # Calculate overall sentiment
         if sentiment_scores:
@@ -422,7 +766,7 @@ class SentimentAnalyzer:
         
         # Sort tweets by engagement for recent tweets sample
         sorted_tweets = sorted(
-            tweets, 
+            representatives, 
             key=lambda x: x.get("like_count", 0) + x.get("retweet_count", 0), 
             reverse=True
         )
@@ -431,21 +775,28 @@ class SentimentAnalyzer:
         recent_tweets = sorted_tweets[:10]
         
         # Return results
-        return {
+        result = {
             "token": token_symbol,
             "sentiment_score": overall_score,
             "sentiment": overall_sentiment,
             "tweet_count": len(tweets),
+            "unique_tweet_count": len(clusters),
+            "duplicate_count": len(tweets) - len(clusters),
+            "largest_cluster": max(len(members) for members in clusters),
             "positive_count": positive_count,
             "negative_count": negative_count,
             "neutral_count": neutral_count,
-            "positive_percentage": (positive_count / len(tweets)) * 100 if tweets else 0,
-            "negative_percentage": (negative_count / len(tweets)) * 100 if tweets else 0,
-            "neutral_percentage": (neutral_count / len(tweets)) * 100 if tweets else 0,
+            "positive_percentage": (positive_count / len(clusters)) * 100,
+            "negative_percentage": (negative_count / len(clusters)) * 100,
+            "neutral_percentage": (neutral_count / len(clusters)) * 100,
             "influencer_sentiment": influencer_sentiment,
             "recent_tweets": recent_tweets,
+            "windows": self.aggregator.window(token_symbol),
+            "stale": False,
             "timestamp": datetime.utcnow().isoformat()
         }
+        self.last_results[token_symbol] = result
+        return result
 
 
 if __name__ == "__main__":
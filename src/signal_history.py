@@ -0,0 +1,225 @@
+"""
+Signal history module for the cryptocurrency trading agent.
+This module keeps a bounded, rolling history of the signals computed for each
+token in preallocated numpy ring buffers. Appending a point is O(1), memory is
+fixed by the capacity however long the agent runs, and time-windowed queries
+use a binary search over the (time-ordered) buffer.
+"""
+
+import math
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from records import StrategyResult
+
+# Default number of points kept per token
+DEFAULT_CAPACITY = 2048
+
+# Actions recorded with each point, stored as their index in this tuple
+ACTIONS = ("none", "buy", "sell", "stop_loss", "take_profit")
+_ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+# Column name and dtype of each buffer, in serialized order
+COLUMNS = (
+    ("t", np.float64),
+    ("tech_strength", np.float32),
+    ("sentiment_score", np.float32),
+    ("combined_strength", np.float32),
+    ("action", np.int8)
+)
+
+
+class SignalSeries:
+    """
+    A fixed-capacity ring buffer of signal points for one token.
+
+    Points must be appended in time order; once the buffer is full, each new
+    point overwrites the oldest one.
+    """
+
+    __slots__ = ("capacity", "buffers", "_next", "_size")
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """
+        Initialize an empty series.
+
+        Args:
+            capacity: Maximum number of points kept
+        """
+        if capacity <= 0:
+            raise ValueError("Signal history capacity must be positive")
+
+        self.capacity = capacity
+        self.buffers = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS}
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, tech_strength: float, sentiment_score: float,
+               combined_strength: float, action: str = "none"):
+        """
+        Add a point, overwriting the oldest one if the series is full.
+
+        Args:
+            timestamp: Unix time in seconds (not earlier than the last point)
+            tech_strength: Technical signal strength (NaN if unknown)
+            sentiment_score: Sentiment score (NaN if unknown)
+            combined_strength: Combined signal strength (NaN if unknown)
+            action: Action taken (see ACTIONS)
+        """
+        i = self._next
+        self.buffers["t"][i] = timestamp
+        self.buffers["tech_strength"][i] = tech_strength
+        self.buffers["sentiment_score"][i] = sentiment_score
+        self.buffers["combined_strength"][i] = combined_strength
+        self.buffers["action"][i] = _ACTION_CODES.get(action, 0)
+
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def _order(self) -> np.ndarray:
+        """Get the buffer indices of the stored points, oldest first."""
+        if self._size < self.capacity:
+            return np.arange(self._size)
+        return np.concatenate((np.arange(self._next, self.capacity), np.arange(self._next)))
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None,
+               limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Get the points in a time window, oldest first.
+
+        Args:
+            start: Earliest timestamp to include (None for no lower bound)
+            end: Latest timestamp to include (None for no upper bound)
+            limit: Maximum number of points, keeping the most recent (None for all)
+
+        Returns:
+            Dict: Array per column (see COLUMNS)
+        """
+        order = self._order()
+        times = self.buffers["t"][order]
+
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = len(order) if end is None else int(np.searchsorted(times, end, side="right"))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+
+        selected = order[lo:hi]
+        return {name: self.buffers[name][selected] for name, _ in COLUMNS}
+
+    def to_dict(self, start: Optional[float] = None, end: Optional[float] = None,
+                limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get points in a time window as JSON-compatible columns (see window).
+
+        Returns:
+            Dict: Column lists, with NaN as None and actions as names
+        """
+        columns = self.window(start, end, limit)
+        data: Dict[str, Any] = {"points": len(columns["t"]), "capacity": self.capacity}
+
+        for name, _ in COLUMNS:
+            values = columns[name]
+            if name == "action":
+                data[name] = [ACTIONS[code] for code in values.tolist()]
+            elif name == "t":
+                data[name] = values.tolist()
+            else:
+                data[name] = [None if math.isnan(value) else round(value, 4) for value in values.tolist()]
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], capacity: Optional[int] = None) -> "SignalSeries":
+        """
+        Rebuild a series from its to_dict form.
+
+        Args:
+            data: Output of to_dict
+            capacity: Capacity of the new series (None to keep the serialized one)
+
+        Returns:
+            SignalSeries: The rebuilt series
+        """
+        series = cls(capacity or data.get("capacity") or DEFAULT_CAPACITY)
+        nan = float("nan")
+
+        for i in range(len(data.get("t", []))):
+            series.append(
+                data["t"][i],
+                nan if data["tech_strength"][i] is None else data["tech_strength"][i],
+                nan if data["sentiment_score"][i] is None else data["sentiment_score"][i],
+                nan if data["combined_strength"][i] is None else data["combined_strength"][i],
+                data["action"][i]
+            )
+
+        return series
+
+
+class SignalHistory:
+    """
+    Rolling signal histories for all tokens.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """
+        Initialize the history.
+
+        Args:
+            capacity: Number of points kept per token
+        """
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._series: Dict[str, SignalSeries] = {}
+
+    def tokens(self) -> List[str]:
+        """Get the tokens that have a history."""
+        with self._lock:
+            return list(self._series)
+
+    def record(self, result: StrategyResult):
+        """
+        Add a point for a strategy result.
+
+        Results without an analysis (risk checks) are recorded with NaN
+        strengths, so that the actions they took still show up.
+
+        Args:
+            result: Result of run_strategy or check_risk
+        """
+        nan = float("nan")
+        tech_strength = sentiment_score = combined_strength = nan
+
+        analysis = result.analysis
+        if analysis is not None:
+            tech_strength = analysis.technical.signals.strength
+            sentiment_score = analysis.sentiment.score
+            combined_strength = analysis.signal.strength
+
+        with self._lock:
+            series = self._series.get(result.token)
+            if series is None:
+                series = self._series[result.token] = SignalSeries(self.capacity)
+            series.append(result.timestamp, tech_strength, sentiment_score, combined_strength, result.action_taken)
+
+    def to_dict(self, token: str, start: Optional[float] = None, end: Optional[float] = None,
+                limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a token's history in a time window as JSON-compatible columns.
+
+        Args:
+            token: Token symbol
+            start: Earliest timestamp to include (None for no lower bound)
+            end: Latest timestamp to include (None for no upper bound)
+            limit: Maximum number of points, keeping the most recent (None for all)
+
+        Returns:
+            Optional[Dict]: Column lists (see SignalSeries.to_dict), or None if there is no history
+        """
+        with self._lock:
+            series = self._series.get(token)
+            return series.to_dict(start, end, limit) if series is not None else None
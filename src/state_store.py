@@ -0,0 +1,305 @@
+"""
+State store module for the cryptocurrency trading agent.
+This module provides a key/value store in a local SQLite database that the
+agent process writes its state to (portfolio, per-token analysis, status)
+and any number of web worker processes read from. Every write gets a new,
+store-wide version number, so readers can ask for everything that changed
+since the version they last saw and be notified when new writes land.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from metrics import metrics
+
+# Default database path, relative to src/ like the log directory
+DEFAULT_PATH = "../data/agent_state.db"
+
+# Keys written by the agent process
+PORTFOLIO_KEY = "portfolio"
+STATUS_KEY = "status"
+HEARTBEAT_KEY = "heartbeat"
+METRICS_KEY = "metrics"
+ANALYSIS_PREFIX = "analysis:"
+SIGNALS_PREFIX = "signals:"
+
+# Keys written by the web tier and read by the agent process
+CONTROL_KEY = "control"
+ANALYZE_REQUEST_PREFIX = "request:analyze:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS state_version ON state (version);
+"""
+
+
+def analysis_key(symbol: str) -> str:
+    """Get the store key for a token's analysis result."""
+    return f"{ANALYSIS_PREFIX}{symbol}"
+
+
+def signals_key(symbol: str) -> str:
+    """Get the store key for a token's signal history."""
+    return f"{SIGNALS_PREFIX}{symbol}"
+
+
+class StateStore:
+    """
+    A versioned key/value store shared between processes through SQLite.
+
+    The database runs in WAL mode, so readers never block the writer. Each
+    thread gets its own connection.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.2):
+        """
+        Open (and create if needed) the store.
+
+        Args:
+            path: Path to the SQLite database file
+            poll_interval: Seconds between checks for new writes in watch()
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection to the database."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def set(self, key: str, value: Any) -> int:
+        """
+        Store a value.
+
+        Args:
+            key: Key to store the value under
+            value: JSON-serializable value
+
+        Returns:
+            int: Version of the write
+        """
+        return self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]) -> int:
+        """
+        Store several values in one transaction.
+
+        Args:
+            items: Values by key
+
+        Returns:
+            int: Version of the write (shared by all the values)
+        """
+        rows = [(key, json.dumps(value, default=str)) for key, value in items.items()]
+        now = time.time()
+        conn = self._conn()
+
+        with metrics.timer("state_store.write"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM state").fetchone()[0]
+                conn.executemany(
+                    "INSERT INTO state (key, value, version, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                    "version = excluded.version, updated_at = excluded.updated_at",
+                    [(key, value, version, now) for key, value in rows]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return version
+
+    def delete(self, key: str):
+        """
+        Remove a key.
+
+        Args:
+            key: Key to remove
+        """
+        self._conn().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a value.
+
+        Args:
+            key: Key to look up
+            default: Value returned when the key does not exist
+
+        Returns:
+            Any: The stored value or default
+        """
+        row = self._conn().execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def get_with_version(self, key: str) -> Tuple[Any, int]:
+        """
+        Get a value and the version it was written at.
+
+        Args:
+            key: Key to look up
+
+        Returns:
+            Tuple: (value, version), or (None, 0) if the key does not exist
+        """
+        row = self._conn().execute("SELECT value, version FROM state WHERE key = ?", (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, 0)
+
+    def get_prefix(self, prefix: str) -> Dict[str, Any]:
+        """
+        Get all values whose key starts with a prefix.
+
+        Args:
+            prefix: Key prefix (e.g. analysis:)
+
+        Returns:
+            Dict: Values keyed by the rest of the key after the prefix
+        """
+        rows = self._conn().execute(
+            "SELECT key, value FROM state WHERE key >= ? AND key < ?",
+            (prefix, prefix + "\uffff")
+        ).fetchall()
+        return {key[len(prefix):]: json.loads(value) for key, value in rows}
+
+    def versions(self, keys: List[str]) -> Dict[str, int]:
+        """
+        Get the versions of several keys without reading their values.
+
+        Args:
+            keys: Keys to look up
+
+        Returns:
+            Dict: Version by key (0 for keys that do not exist)
+        """
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn().execute(
+            f"SELECT key, version FROM state WHERE key IN ({placeholders})", keys
+        ).fetchall() if keys else []
+        found = dict(rows)
+        return {key: found.get(key, 0) for key in keys}
+
+    def prefix_version(self, prefix: str) -> Tuple[int, int]:
+        """
+        Get the latest version and the number of keys under a prefix.
+
+        Args:
+            prefix: Key prefix
+
+        Returns:
+            Tuple: (latest version, key count)
+        """
+        return tuple(self._conn().execute(
+            "SELECT COALESCE(MAX(version), 0), COUNT(*) FROM state WHERE key >= ? AND key < ?",
+            (prefix, prefix + "\uffff")
+        ).fetchone())
+
+    def version(self) -> int:
+        """Get the version of the latest write."""
+        return self._conn().execute("SELECT COALESCE(MAX(version), 0) FROM state").fetchone()[0]
+
+    def changes_since(self, version: int) -> List[Tuple[str, Any, int]]:
+        """
+        Get the values written after a version.
+
+        Args:
+            version: Last version the caller has seen
+
+        Returns:
+            List: (key, value, version) tuples in write order
+        """
+        rows = self._conn().execute(
+            "SELECT key, value, version FROM state WHERE version > ? ORDER BY version",
+            (version,)
+        ).fetchall()
+        return [(key, json.loads(value), row_version) for key, value, row_version in rows]
+
+    def wait_for_change(self, key: str, after_version: int, timeout: float) -> Tuple[Any, int]:
+        """
+        Wait until a key is written after a version.
+
+        Args:
+            key: Key to wait for
+            after_version: Version the key must be newer than
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Tuple: (value, version); the version is unchanged if the wait timed out
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            value, version = self.get_with_version(key)
+            if version > after_version or time.monotonic() >= deadline:
+                return value, version
+            time.sleep(self.poll_interval)
+
+    def watch(self, callback: Callable[[str, Any], None], since: Optional[int] = None,
+              stop_event: Optional[threading.Event] = None) -> threading.Thread:
+        """
+        Call a function for every write, from a background thread.
+
+        Other processes' commits are detected through SQLite's data_version,
+        which is read from memory, so idle polling does not query the table.
+
+        Args:
+            callback: Function called with (key, value) for each change
+            since: Version to start after (None for the current version)
+            stop_event: Event that stops the watcher when set
+
+        Returns:
+            threading.Thread: The watcher thread
+        """
+        stop_event = stop_event or threading.Event()
+
+        def run():
+            conn = self._conn()
+            last_version = self.version() if since is None else since
+            data_version = None
+
+            while not stop_event.is_set():
+                current = conn.execute("PRAGMA data_version").fetchone()[0]
+                if current != data_version:
+                    data_version = current
+                    for key, value, version in self.changes_since(last_version):
+                        last_version = version
+                        try:
+                            callback(key, value)
+                        except Exception as e:
+                            logger.error(f"Error handling state change for {key}: {str(e)}")
+
+                stop_event.wait(self.poll_interval)
+
+        thread = threading.Thread(target=run, name="state-watcher", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
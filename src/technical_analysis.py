@@ -5,15 +5,27 @@ based on technical indicators such as moving averages, RSI, MACD, etc.
 """
 
 import json
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Union
 import pandas as pd
 import numpy as np
-from ta.trend import SMAIndicator, EMAIndicator, MACD
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
-from ta.volume import OnBalanceVolumeIndicator
 from loguru import logger
 
+from metrics import metrics
+from records import CandleSeries
+from resampler import periods_in
+from indicators import IndicatorGraph, build_plan
+
+# Seconds in the periods used for price changes and volatility
+DAY_SECONDS = 86400
+WEEK_SECONDS = 7 * DAY_SECONDS
+
+# Indicators used by generate_signals and reported by analyze; the rest
+# of the registry is only computed when add_indicators is asked for it
+ANALYSIS_INDICATORS = (
+    "sma_short", "sma_long", "ema_short", "ema_long", "rsi", "macd", "macd_signal", "macd_diff",
+    "bollinger_mavg", "bollinger_high", "bollinger_low", "volatility", "price_change_1d", "price_change_7d"
+)
+
 
 class TechnicalAnalyzer:
     """
@@ -42,20 +54,58 @@ class TechnicalAnalyzer:
         self.macd_fast_period = self.ta_config["macd_fast_period"]
         self.macd_slow_period = self.ta_config["macd_slow_period"]
         self.macd_signal_period = self.ta_config["macd_signal_period"]
+        
+        # Per-timeframe overrides of the parameters above, e.g. {"1d": {"long_ma_period": 50}}
+        self.timeframe_overrides = self.ta_config.get("timeframes", {})
+        
+        # Indicator graphs by timeframe and indicator set, built on first use
+        self._plans: Dict[Tuple[str, Optional[Tuple[str, ...]]], Tuple[IndicatorGraph, Dict[str, str]]] = {}
+    
+    def settings(self, timeframe: str = "1h") -> Dict[str, Any]:
+        """
+        Get the indicator parameters for a timeframe.
+        
+        Args:
+            timeframe: Candle timeframe (e.g. 1h, 4h, 1d)
+            
+        Returns:
+            Dict: Indicator parameters, with the timeframe's overrides applied
+        """
+        settings = {
+            "short_ma_period": self.short_ma_period,
+            "long_ma_period": self.long_ma_period,
+            "rsi_period": self.rsi_period,
+            "rsi_overbought": self.rsi_overbought,
+            "rsi_oversold": self.rsi_oversold,
+            "macd_fast_period": self.macd_fast_period,
+            "macd_slow_period": self.macd_slow_period,
+            "macd_signal_period": self.macd_signal_period,
+            "bollinger_period": self.ta_config.get("bollinger_period", 20),
+            "bollinger_deviations": self.ta_config.get("bollinger_deviations", 2),
+            "day_periods": periods_in(timeframe, DAY_SECONDS),
+            "week_periods": periods_in(timeframe, WEEK_SECONDS),
+            # Volatility is measured over a day of candles (at least two)
+            "volatility_window": max(2, periods_in(timeframe, DAY_SECONDS))
+        }
+        settings.update(self.timeframe_overrides.get(timeframe, {}))
+        return settings
     
-    def preprocess_data(self, price_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    def preprocess_data(self, price_data: Union[List[Dict[str, Any]], CandleSeries]) -> pd.DataFrame:
         """
         Preprocess raw price data into a pandas DataFrame.
         
         Args:
             price_data: List of dictionaries containing price data
-                        (timestamp, open, high, low, close, volume)
+                        (timestamp, open, high, low, close, volume), or a CandleSeries
             
         Returns:
             pd.DataFrame: Processed DataFrame with price data
         """
         # Convert to DataFrame
-        df = pd.DataFrame(price_data)
+        if isinstance(price_data, CandleSeries):
+            df = price_data.to_frame()
+        else:
+            df = pd.DataFrame(price_data)
         
         # Ensure timestamp is in datetime format
         if 'timestamp' in df.columns:
@@ -78,75 +128,47 @@ class TechnicalAnalyzer:
         
         return df
     
-    def add_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def add_indicators(self, df: pd.DataFrame, timeframe: str = "1h",
+                       indicators: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
         """
         Add technical indicators to the price DataFrame.
         
+        The indicators are evaluated as a dependency graph (see indicators.py), so
+        intermediate series shared by several indicators are computed once.
+        
         Args:
             df: DataFrame with price data
+            timeframe: Candle timeframe of the data
+            indicators: Names of the indicators to add (None for all registered)
             
         Returns:
             pd.DataFrame: DataFrame with added technical indicators
         """
-        # Make a copy to avoid modifying the original
-        df_with_indicators = df.copy()
-        
-        # Add Simple Moving Averages
-        sma_short = SMAIndicator(close=df['close'], window=self.short_ma_period)
-        sma_long = SMAIndicator(close=df['close'], window=self.long_ma_period)
-        df_with_indicators[f'sma_{self.short_ma_period}'] = sma_short.sma_indicator()
-        df_with_indicators[f'sma_{self.long_ma_period}'] = sma_long.sma_indicator()
-        
-        # Add Exponential Moving Averages
-        ema_short = EMAIndicator(close=df['close'], window=self.short_ma_period)
-        ema_long = EMAIndicator(close=df['close'], window=self.long_ma_period)
-        df_with_indicators[f'ema_{self.short_ma_period}'] = ema_short.ema_indicator()
-        df_with_indicators[f'ema_{self.long_ma_period}'] = ema_long.ema_indicator()
-        
-        # Add RSI
-        rsi = RSIIndicator(close=df['close'], window=self.rsi_period)
-        df_with_indicators['rsi'] = rsi.rsi()
-        
-        # Add MACD
-        macd = MACD(
-            close=df['close'], 
-            window_slow=self.macd_slow_period,
-            window_fast=self.macd_fast_period,
-            window_sign=self.macd_signal_period
-        )
-        df_with_indicators['macd'] = macd.macd()
-        df_with_indicators['macd_signal'] = macd.macd_signal()
-        df_with_indicators['macd_diff'] = macd.macd_diff()
+        key = (timeframe, indicators)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = build_plan(self.settings(timeframe), indicators)
         
-        # Add Bollinger Bands
-        bollinger = BollingerBands(close=df['close'], window=20, window_dev=2)
-        df_with_indicators['bollinger_mavg'] = bollinger.bollinger_mavg()
-        df_with_indicators['bollinger_high'] = bollinger.bollinger_hband()
-        df_with_indicators['bollinger_low'] = bollinger.bollinger_lband()
-        
-        # Add On-Balance Volume
-        obv = OnBalanceVolumeIndicator(close=df['close'], volume=df['volume'])
-        df_with_indicators['obv'] = obv.on_balance_volume()
-        
-        # Calculate price changes
-        df_with_indicators['price_change'] = df['close'].pct_change()
-        df_with_indicators['price_change_1d'] = df['close'].pct_change(periods=24)  # Assuming hourly data
-        
-        # Calculate volatility (standard deviation of returns)
-        df_with_indicators['volatility'] = df['close'].pct_change().rolling(window=24).std()
-        
-        return df_with_indicators
+        graph, outputs = plan
+        return graph.evaluate(df, outputs)
     
-    def generate_signals(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def generate_signals(self, df: pd.DataFrame, timeframe: str = "1h") -> Dict[str, Any]:
         """
         Generate trading signals based on technical indicators.
         
         Args:
             df: DataFrame with price data and indicators
+            timeframe: Candle timeframe of the data
             
         Returns:
             Dict: Dictionary containing trading signals and their strengths
         """
+        settings = self.settings(timeframe)
+        short_period = settings["short_ma_period"]
+        long_period = settings["long_ma_period"]
+        rsi_overbought = settings["rsi_overbought"]
+        rsi_oversold = settings["rsi_oversold"]
+        
         # Get the most recent data point
         latest = df.iloc[-1]
         previous = df.iloc[-2] if len(df) > 1 else None
@@ -162,14 +184,14 @@ class TechnicalAnalyzer:
         # Check Moving Average Crossover
         if previous is not None:
             # SMA Crossover
-            sma_short_col = f'sma_{self.short_ma_period}'
-            sma_long_col = f'sma_{self.long_ma_period}'
+            sma_short_col = f'sma_{short_period}'
+            sma_long_col = f'sma_{long_period}'
             
             if (previous[sma_short_col] <= previous[sma_long_col] and 
                 latest[sma_short_col] > latest[sma_long_col]):
                 signals["buy_signals"].append({
                     "indicator": "SMA Crossover",
-                    "description": f"Short-term SMA ({self.short_ma_period}) crossed above long-term SMA ({self.long_ma_period})",
+                    "description": f"Short-term SMA ({short_period}) crossed above long-term SMA ({long_period})",
                     "strength": 60
                 })
                 signals["signal_strength"] += 60
@@ -178,20 +200,20 @@ class TechnicalAnalyzer:
                   latest[sma_short_col] < latest[sma_long_col]):
                 signals["sell_signals"].append({
                     "indicator": "SMA Crossover",
-                    "description": f"Short-term SMA ({self.short_ma_period}) crossed below long-term SMA ({self.long_ma_period})",
+                    "description": f"Short-term SMA ({short_period}) crossed below long-term SMA ({long_period})",
                     "strength": 60
                 })
                 signals["signal_strength"] -= 60
             
             # EMA Crossover
-            ema_short_col = f'ema_{self.short_ma_period}'
-            ema_long_col = f'ema_{self.long_ma_period}'
+            ema_short_col = f'ema_{short_period}'
+            ema_long_col = f'ema_{long_period}'
             
             if (previous[ema_short_col] <= previous[ema_long_col] and 
                 latest[ema_short_col] > latest[ema_long_col]):
                 signals["buy_signals"].append({
                     "indicator": "EMA Crossover",
-                    "description": f"Short-term EMA ({self.short_ma_period}) crossed above long-term EMA ({self.long_ma_period})",
+                    "description": f"Short-term EMA ({short_period}) crossed above long-term EMA ({long_period})",
                     "strength": 70
                 })
                 signals["signal_strength"] += 70
@@ -200,7 +222,7 @@ class TechnicalAnalyzer:
                   latest[ema_short_col] < latest[ema_long_col]):
                 signals["sell_signals"].append({
                     "indicator": "EMA Crossover",
-                    "description": f"Short-term EMA ({self.short_ma_period}) crossed below long-term EMA ({self.long_ma_period})",
+                    "description": f"Short-term EMA ({short_period}) crossed below long-term EMA ({long_period})",
                     "strength": 70
                 })
                 signals["signal_strength"] -= 70
@@ -226,21 +248,21 @@ class TechnicalAnalyzer:
         
         # Check RSI
         if not pd.isna(latest['rsi']):
-            if latest['rsi'] < self.rsi_oversold:
+            if latest['rsi'] < rsi_oversold:
                 signals["buy_signals"].append({
                     "indicator": "RSI Oversold",
-                    "description": f"RSI ({latest['rsi']:.2f}) is below oversold threshold ({self.rsi_oversold})",
-                    "strength": 50 + (self.rsi_oversold - latest['rsi']) * 2  # Stronger signal the more oversold
+                    "description": f"RSI ({latest['rsi']:.2f}) is below oversold threshold ({rsi_oversold})",
+                    "strength": 50 + (rsi_oversold - latest['rsi']) * 2  # Stronger signal the more oversold
                 })
-                signals["signal_strength"] += 50 + (self.rsi_oversold - latest['rsi']) * 2
+                signals["signal_strength"] += 50 + (rsi_oversold - latest['rsi']) * 2
             
-            elif latest['rsi'] > self.rsi_overbought:
+            elif latest['rsi'] > rsi_overbought:
                 signals["sell_signals"].append({
                     "indicator": "RSI Overbought",
-                    "description": f"RSI ({latest['rsi']:.2f}) is above overbought threshold ({self.rsi_overbought})",
-                    "strength": 50 + (latest['rsi'] - self.rsi_overbought) * 2  # Stronger signal the more overbought
+                    "description": f"RSI ({latest['rsi']:.2f}) is above overbought threshold ({rsi_overbought})",
+                    "strength": 50 + (latest['rsi'] - rsi_overbought) * 2  # Stronger signal the more overbought
                 })
-                signals["signal_strength"] -= 50 + (latest['rsi'] - self.rsi_overbought) * 2
+                signals["signal_strength"] -= 50 + (latest['rsi'] - rsi_overbought) * 2
         
         # Check Bollinger Bands
         if not pd.isna(latest['bollinger_high']) and not pd.isna(latest['bollinger_low']):
@@ -277,45 +299,54 @@ class TechnicalAnalyzer:
         
         return signals
     
-    def analyze(self, price_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze(self, price_data: Union[List[Dict[str, Any]], CandleSeries],
+                timeframe: str = "1h") -> Dict[str, Any]:
         """
         Analyze price data and generate trading signals.
         
         Args:
-            price_data: List of dictionaries containing price data
+            price_data: List of dictionaries containing price data, or a CandleSeries
+            timeframe: Candle timeframe of the data (sets the periods of 24h and 7d changes)
             
         Returns:
             Dict: Analysis results including indicators and signals
         """
         try:
             # Preprocess data
-            df = self.preprocess_data(price_data)
+            with metrics.timer("technical.preprocess"):
+                df = self.preprocess_data(price_data)
             
             # Add technical indicators
-            df_with_indicators = self.add_indicators(df)
+            with metrics.timer("technical.indicators"):
+                df_with_indicators = self.add_indicators(df, timeframe, ANALYSIS_INDICATORS)
             
             # Generate signals
-            signals = self.generate_signals(df_with_indicators)
+            with metrics.timer("technical.signals"):
+                signals = self.generate_signals(df_with_indicators, timeframe)
             
             # Add latest price data
             latest = df.iloc[-1].to_dict()
+            settings = self.settings(timeframe)
+            day = settings["day_periods"]
+            week = settings["week_periods"]
             
             # Return analysis results
             return {
+                "timeframe": timeframe,
                 "price_data": {
                     "latest": latest,
-                    "change_24h": df['close'].pct_change(periods=24).iloc[-1] if len(df) > 24 else None,
-                    "change_7d": df['close'].pct_change(periods=168).iloc[-1] if len(df) > 168 else None,
+                    "change_24h": df_with_indicators['price_change_1d'].iloc[-1] if len(df) > day else None,
+                    "change_7d": df_with_indicators['price_change_7d'].iloc[-1] if len(df) > week else None,
                 },
                 "indicators": {
                     "rsi": df_with_indicators['rsi'].iloc[-1],
                     "macd": df_with_indicators['macd'].iloc[-1],
                     "macd_signal": df_with_indicators['macd_signal'].iloc[-1],
                     "macd_histogram": df_with_indicators['macd_diff'].iloc[-1],
-                    "sma_short": df_with_indicators[f'sma_{self.short_ma_period}'].iloc[-1],
-                    "sma_long": df_with_indicators[f'sma_{self.long_ma_period}'].iloc[-1],
-                    "ema_short": df_with_indicators[f'ema_{self.short_ma_period}'].iloc[-1],
-                    "ema_long": df_with_indicators[f'ema_{self.long_ma_period}'].iloc[-1],
+                    "sma_short": df_with_indicators[f'sma_{settings["short_ma_period"]}'].iloc[-1],
+                    "sma_long": df_with_indicators[f'sma_{settings["long_ma_period"]}'].iloc[-1],
+                    "ema_short": df_with_indicators[f'ema_{settings["short_ma_period"]}'].iloc[-1],
+                    "ema_long": df_with_indicators[f'ema_{settings["long_ma_period"]}'].iloc[-1],
                     "bollinger_upper": df_with_indicators['bollinger_high'].iloc[-1],
                     "bollinger_middle": df_with_indicators['bollinger_mavg'].iloc[-1],
                     "bollinger_lower": df_with_indicators['bollinger_low'].iloc[-1],
@@ -5,8 +5,10 @@ to make trading decisions for cryptocurrency tokens.
 """
 
 import json
+import threading
 import time
-from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime, timedelta
 import pandas as pd
@@ -15,6 +17,14 @@ from loguru import logger
 from technical_analysis import TechnicalAnalyzer
 from sentiment_analysis import SentimentAnalyzer
 from wallet import BlockchainWallet
+from metrics import metrics
+from paper_exchange import PaperExchange, QUOTE_ASSET
+from records import (
+    ActiveTrade, AnalysisSnapshot, SentimentSummary, Signal, SignalFactor, StrategyResult, TechnicalSummary,
+    TradeRecord, trades_to_list
+)
+from signal_history import SignalHistory, DEFAULT_CAPACITY
+from market_data import MarketData, fetch_price_data
 
 
 class TradingStrategy:
@@ -41,16 +51,63 @@ class TradingStrategy:
         self.take_profit = self.trading_config["take_profit_percentage"]
         self.max_slippage = self.trading_config["max_slippage"]
         
+        # Weight of a stale sentiment result halves every half-life since its search
+        self.stale_sentiment_half_life = self.trading_config.get("stale_sentiment_half_life_minutes", 60)
+        
+        # A failed stop-loss/take-profit exit is retried after a delay that doubles with each failure
+        self.exit_retry_seconds = self.trading_config.get("exit_retry_seconds", 5)
+        self.max_exit_retry_seconds = self.trading_config.get("max_exit_retry_seconds", 300)
+        
         # Initialize analyzers
         self.technical_analyzer = TechnicalAnalyzer(config_path)
         self.sentiment_analyzer = SentimentAnalyzer(config_path)
         self.wallet = BlockchainWallet(config_path)
         
+        # Batched, cached USD prices (shared with the wallet's portfolio valuation)
+        self.price_oracle = self.wallet.price_oracle
+        
         # Initialize trade history
-        self.trade_history = []
+        self.trade_history: List[TradeRecord] = []
+        
+        # Called with every recorded trade (e.g. EventIndex.record_trade)
+        self.trade_listeners: List[Callable[[TradeRecord], None]] = []
         
         # Initialize active trades
-        self.active_trades = {}
+        self.active_trades: Dict[str, ActiveTrade] = {}
+        
+        # Incremented whenever active_trades changes, so watchers can tell when to reload it
+        self.positions_version = 0
+        
+        # Candles of every timeframe are built from one base candle stream per token
+        market_config = self.config.get("market_data", {})
+        self.analysis_timeframe = market_config.get("analysis_timeframe", "1h")
+        self.confirmation_timeframes = market_config.get("confirmation_timeframes", [])
+        # Fetched through _get_price_data, so replacing it (e.g. in a replay) replaces the source
+        self.market_data = MarketData(market_config, lambda *args: self._get_price_data(*args))
+        
+        # Rolling history of the signals and actions of each token
+        history_config = self.config.get("signal_history", {})
+        self.signal_history = SignalHistory(history_config.get("capacity", DEFAULT_CAPACITY))
+        
+        # Latest sentiment result per token, refreshed on its own schedule
+        self.sentiment_cache: Dict[str, Dict[str, Any]] = {}
+        
+        # Sentiment refreshes in flight per token, which later callers wait for instead of searching again
+        self._sentiment_refreshes: Dict[str, Future] = {}
+        self._sentiment_guard = threading.Lock()
+        
+        # Serializes writes to the trade history when tokens run concurrently
+        self._trade_lock = threading.Lock()
+        
+        # Dry runs fill orders on an in-memory exchange, and write the trade history file
+        # every history_flush_seconds (see flush_trade_history) instead of after each trade
+        paper_config = self.config.get("paper_exchange", {})
+        self.paper_exchange: Optional[PaperExchange] = None
+        self.history_flush_seconds = 0
+        if paper_config.get("enabled"):
+            self.paper_exchange = PaperExchange(paper_config, self._get_current_price, self.max_slippage)
+            self.history_flush_seconds = self.paper_exchange.settings["history_flush_seconds"]
+        self._history_dirty = False
         
         # Load trade history if exists
         self._load_trade_history()
@@ -59,7 +116,7 @@ class TradingStrategy:
         """Load trade history from file if it exists."""
         try:
             with open("../logs/trade_history.json", 'r') as f:
-                self.trade_history = json.load(f)
+                self.trade_history = [TradeRecord.from_dict(trade) for trade in json.load(f)]
             logger.info(f"Loaded {len(self.trade_history)} historical trades")
         except FileNotFoundError:
             logger.info("No trade history file found, starting fresh")
@@ -70,29 +127,43 @@ class TradingStrategy:
         """Save trade history to file."""
         try:
             with open("../logs/trade_history.json", 'w') as f:
-                json.dump(self.trade_history, f, indent=2, default=str)
+                json.dump(trades_to_list(self.trade_history), f, indent=2, default=str)
             logger.info(f"Saved {len(self.trade_history)} trades to history")
         except Exception as e:
             logger.error(f"Error saving trade history: {str(e)}")
     
-    def _record_trade(self, trade_data: Dict[str, Any]):
+    def _record_trade(self, trade: TradeRecord):
         """
         Record a trade in the trade history.
         
         Args:
-            trade_data: Dictionary containing trade details
+            trade: The executed trade
         """
-        # Add timestamp
-        trade_data["timestamp"] = datetime.utcnow().isoformat()
-        
-        # Add to trade history
-        self.trade_history.append(trade_data)
-        
-        # Save trade history
-        self._save_trade_history()
+        with self._trade_lock:
+            # Add to trade history
+            self.trade_history.append(trade)
+            
+            # Save trade history (or leave it to the next flush)
+            if self.history_flush_seconds:
+                self._history_dirty = True
+            else:
+                self._save_trade_history()
         
         # Log trade
-        logger.info(f"Recorded trade: {trade_data['action']} {trade_data['amount']} {trade_data['token']} at {trade_data['price']}")
+        logger.info(f"Recorded trade: {trade.action} {trade.amount} {trade.token} at {trade.price}")
+        
+        for listener in self.trade_listeners:
+            try:
+                listener(trade)
+            except Exception as e:
+                logger.error(f"Error passing trade to {listener}: {str(e)}")
+    
+    def flush_trade_history(self):
+        """Save the trade history if trades were recorded since it was last saved."""
+        with self._trade_lock:
+            if self._history_dirty:
+                self._save_trade_history()
+                self._history_dirty = False
     
     def _calculate_position_size(self, token_data: Dict[str, Any], 
                                portfolio_value: Decimal) -> Decimal:
@@ -124,8 +195,7 @@ class TradingStrategy:
     def _get_price_data(self, token_symbol: str, timeframe: str = "1h", 
                       limit: int = 200) -> List[Dict[str, Any]]:
         """
-        Get historical price data for a token.
-        This is a placeholder that would be replaced with actual API calls.
+        Get historical price data for a token (see market_data.fetch_price_data).
         
         Args:
             token_symbol: The token symbol
@@ -135,74 +205,197 @@ class TradingStrategy:
         Returns:
             List[Dict]: List of price data points
         """
-        # In a real implementation, this would call an exchange API
-        # For now, we'll generate random data for demonstration
+        return fetch_price_data(token_symbol, timeframe, limit)
+    
+    def get_candles(self, token_symbol: str, timeframe: str = "1h", 
+                    limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Get recent candles of a token for any timeframe (see MarketData.get_candles).
         
-        logger.info(f"Getting price data for {token_symbol} ({timeframe}, {limit} candles)")
+        Args:
+            token_symbol: The token symbol
+            timeframe: The timeframe for candles (e.g., 1h, 4h, 1d)
+            limit: Number of candles to return
+            
+        Returns:
+            List[Dict]: Candles, oldest first (the last one may still be forming)
+        """
+        return self.market_data.get_candles(token_symbol, timeframe, limit)
+    
+    def _get_current_price(self, token_symbol: str) -> Optional[float]:
+        """
+        Get the current price of a token from the price oracle's snapshot.
+        
+        Args:
+            token_symbol: The token symbol
+            
+        Returns:
+            float: Current price in USD, or None if no source quotes the token
+        """
+        return self._get_current_prices([token_symbol]).get(token_symbol)
+    
+    def _get_current_prices(self, token_symbols: List[str]) -> Dict[str, float]:
+        """
+        Get the current prices of several tokens from the price oracle's snapshot.
         
-        # This is just placeholder code
-        import random
+        Args:
+            token_symbols: The token symbols
+            
+        Returns:
+            Dict: Current price in USD by symbol (tokens without a price are left out)
+        """
+        return self.price_oracle.prices(token_symbols)
+    
+    def refresh_sentiment(self, token_symbol: str) -> Dict[str, Any]:
+        """
+        Run sentiment analysis for a token and cache the result.
         
-        price_data = []
-        base_price = 1000 if token_symbol == "BTC" else 100  # Simplified
-        timestamp = int(time.time() * 1000) - (limit * 3600 * 1000)  # Start from 'limit' hours ago
+        A call made while another refresh of the token is running waits for
+        that refresh and returns its result, so the token isn't searched twice.
         
-        for i in range(limit):
-            # Generate random price movement
-            price_change = random.uniform(-0.02, 0.02)
-            base_price *= (1 + price_change)
+        Args:
+            token_symbol: The token symbol
             
-            # Create candle data
-            candle = {
-                "timestamp": timestamp,
-                "open": base_price * (1 - random.uniform(0, 0.005)),
-                "high": base_price * (1 + random.uniform(0, 0.01)),
-                "low": base_price * (1 - random.uniform(0, 0.01)),
-                "close": base_price,
-                "volume": random.uniform(10, 100) * base_price
-            }
+        Returns:
+            Dict: Sentiment analysis results
+        """
+        with self._sentiment_guard:
+            pending = self._sentiment_refreshes.get(token_symbol)
+            if pending is None:
+                refresh = self._sentiment_refreshes[token_symbol] = Future()
+        if pending is not None:
+            metrics.increment("agent_sentiment_refreshes_joined_total", token=token_symbol)
+            return pending.result()
+        
+        try:
+            # Tokens with an active trade get priority for the X API quota
+            self.sentiment_analyzer.fetch_scheduler.set_active(self.active_trades)
+            
+            with metrics.timer("refresh_sentiment"):
+                sentiment_analysis = self.sentiment_analyzer.analyze_sentiment(token_symbol)
             
-            price_data.append(candle)
-            timestamp += 3600 * 1000  # Add 1 hour in milliseconds
+            self.sentiment_cache[token_symbol] = sentiment_analysis
+            refresh.set_result(sentiment_analysis)
+            return sentiment_analysis
+        except Exception as e:
+            refresh.set_exception(e)
+            raise
+        finally:
+            with self._sentiment_guard:
+                del self._sentiment_refreshes[token_symbol]
+    
+    def refresh_sentiments(self, token_symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Refresh the cached sentiment of several tokens, searching for them concurrently.
+        
+        Args:
+            token_symbols: The token symbols
+            
+        Returns:
+            Dict: Sentiment analysis results by symbol
+        """
+        if not token_symbols:
+            return {}
         
-        return price_data
+        workers = min(len(token_symbols), self.config.get("x_search", {}).get("concurrency", 4))
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="sentiment") as pool:
+            return dict(zip(token_symbols, pool.map(self.refresh_sentiment, token_symbols)))
     
-    def analyze_token(self, token_symbol: str, chain: str) -> Dict[str, Any]:
+    def analyze_token(self, token_symbol: str, chain: str, 
+                      use_cached_sentiment: bool = False) -> AnalysisSnapshot:
         """
         Perform comprehensive analysis on a token.
         
         Args:
             token_symbol: The token symbol
             chain: The blockchain where the token exists
+            use_cached_sentiment: Reuse the last refresh_sentiment result if available
             
         Returns:
-            Dict: Analysis results
+            AnalysisSnapshot: Analysis results (see AnalysisSnapshot.to_dict for the dict form)
         """
         logger.info(f"Analyzing {token_symbol} on {chain}")
         
         # Get price data
-        price_data = self._get_price_data(token_symbol)
+        with metrics.timer("analyze_token.price_data"):
+            price_data = self.get_candles(token_symbol, self.analysis_timeframe)
         
         # Perform technical analysis
-        technical_analysis = self.technical_analyzer.analyze(price_data)
+        with metrics.timer("analyze_token.technical"):
+            technical_analysis = self.technical_analyzer.analyze(price_data, self.analysis_timeframe)
+            
+            # Signals on higher timeframes come from the same candle stream, without extra fetches
+            if self.confirmation_timeframes:
+                technical_analysis["confirmations"] = {
+                    timeframe: self.technical_analyzer.analyze(
+                        self.get_candles(token_symbol, timeframe), timeframe
+                    )["signals"]
+                    for timeframe in self.confirmation_timeframes
+                }
+        
+        # Volatile tokens also get priority for the X API quota
+        self.sentiment_analyzer.fetch_scheduler.set_volatility(
+            token_symbol, technical_analysis.get("indicators", {}).get("volatility"))
         
         # Perform sentiment analysis
-        sentiment_analysis = self.sentiment_analyzer.analyze_sentiment(token_symbol)
+        sentiment_analysis = self.sentiment_cache.get(token_symbol) if use_cached_sentiment else None
+        if sentiment_analysis is None:
+            with metrics.timer("analyze_token.sentiment"):
+                sentiment_analysis = self.refresh_sentiment(token_symbol)
         
         # Combine analyses
-        combined_analysis = {
-            "token": token_symbol,
-            "chain": chain,
-            "timestamp": datetime.utcnow().isoformat(),
-            "technical_analysis": technical_analysis,
-            "sentiment_analysis": sentiment_analysis,
-            "combined_signal": self._generate_combined_signal(technical_analysis, sentiment_analysis)
-        }
+        with metrics.timer("analyze_token.combine"):
+            combined_analysis = AnalysisSnapshot(
+                token=token_symbol,
+                chain=chain,
+                technical=TechnicalSummary.from_dict(technical_analysis),
+                sentiment=SentimentSummary.from_dict(sentiment_analysis),
+                signal=self._generate_combined_signal(technical_analysis, sentiment_analysis)
+            )
         
         return combined_analysis
     
+    def _sentiment_freshness(self, sentiment_analysis: Dict[str, Any]) -> float:
+        """
+        Get how much a sentiment result can be trusted, from 1 (fresh) to 0 (unknown).
+        
+        A stale result (its search was deferred or failed) loses half its
+        weight every stale_sentiment_half_life_minutes since the search it came from.
+        
+        Args:
+            sentiment_analysis: Sentiment analysis results
+            
+        Returns:
+            float: Multiplier of the sentiment weight
+        """
+        if sentiment_analysis.get("sentiment") == "unknown":
+            return 0.0
+        if not sentiment_analysis.get("stale"):
+            return 1.0
+        
+        minutes = self._sentiment_age(sentiment_analysis)
+        if minutes is None or self.stale_sentiment_half_life <= 0:
+            return 0.0
+        return 0.5 ** (minutes / self.stale_sentiment_half_life)
+    
+    def _sentiment_age(self, sentiment_analysis: Dict[str, Any]) -> Optional[float]:
+        """
+        Get the minutes since the search a sentiment result came from.
+        
+        Args:
+            sentiment_analysis: Sentiment analysis results
+            
+        Returns:
+            float: Age in minutes (None if the result has no valid timestamp)
+        """
+        try:
+            age = datetime.utcnow() - datetime.fromisoformat(sentiment_analysis["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return max(age.total_seconds() / 60, 0.0)
+    
     def _generate_combined_signal(self, technical_analysis: Dict[str, Any], 
-                                sentiment_analysis: Dict[str, Any]) -> Dict[str, Any]:
+                                sentiment_analysis: Dict[str, Any]) -> Signal:
         """
         Generate a combined trading signal based on technical and sentiment analysis.
         
@@ -211,7 +404,7 @@ class TradingStrategy:
             sentiment_analysis: Sentiment analysis results
             
         Returns:
-            Dict: Combined signal information
+            Signal: Combined signal information
         """
         # Extract signals
         tech_signal = technical_analysis["signals"]["overall_signal"]
@@ -221,95 +414,80 @@ class TradingStrategy:
         sentiment_signal = sentiment_analysis["sentiment"]
         
         # Initialize combined signal
-        combined_signal = {
-            "signal": "neutral",
-            "strength": 0,
-            "confidence": 0.5,
-            "factors": []
-        }
+        combined_signal = Signal()
+        factors = []
         
         # Technical analysis weight (60%)
         tech_weight = 0.6
         
-        # Sentiment analysis weight (40%)
-        sentiment_weight = 0.4
+        # Sentiment analysis weight (40%), less for stale results and none for unknown ones
+        freshness = self._sentiment_freshness(sentiment_analysis)
+        sentiment_weight = 0.4 * freshness
         
         # Calculate weighted strength
         if tech_signal == "strong_buy":
-            combined_signal["strength"] += tech_weight * 100
-            combined_signal["factors"].append({
-                "factor": "Technical Analysis",
-                "signal": "Strong Buy",
-                "contribution": tech_weight * 100
-            })
+            combined_signal.strength += tech_weight * 100
+            factors.append(SignalFactor("Technical Analysis", "Strong Buy", tech_weight * 100))
         elif tech_signal == "buy":
-            combined_signal["strength"] += tech_weight * 50
-            combined_signal["factors"].append({
-                "factor": "Technical Analysis",
-                "signal": "Buy",
-                "contribution": tech_weight * 50
-            })
+            combined_signal.strength += tech_weight * 50
+            factors.append(SignalFactor("Technical Analysis", "Buy", tech_weight * 50))
         elif tech_signal == "strong_sell":
-            combined_signal["strength"] -= tech_weight * 100
-            combined_signal["factors"].append({
-                "factor": "Technical Analysis",
-                "signal": "Strong Sell",
-                "contribution": -tech_weight * 100
-            })
+            combined_signal.strength -= tech_weight * 100
+            factors.append(SignalFactor("Technical Analysis", "Strong Sell", -tech_weight * 100))
         elif tech_signal == "sell":
-            combined_signal["strength"] -= tech_weight * 50
-            combined_signal["factors"].append({
-                "factor": "Technical Analysis",
-                "signal": "Sell",
-                "contribution": -tech_weight * 50
-            })
+            combined_signal.strength -= tech_weight * 50
+            factors.append(SignalFactor("Technical Analysis", "Sell", -tech_weight * 50))
         
         # Add sentiment contribution
-        sentiment_contribution = sentiment_score * 100 * sentiment_weight
-        combined_signal["strength"] += sentiment_contribution
-        combined_signal["factors"].append({
-            "factor": "Sentiment Analysis",
-            "signal": sentiment_signal.capitalize(),
-            "score": sentiment_score,
-            "contribution": sentiment_contribution
-        })
+        if freshness > 0:
+            sentiment_contribution = sentiment_score * 100 * sentiment_weight
+            combined_signal.strength += sentiment_contribution
+            label = sentiment_signal.capitalize() + (" (stale)" if freshness < 1 else "")
+            factors.append(SignalFactor("Sentiment Analysis", label, sentiment_contribution, score=sentiment_score))
+        combined_signal.factors = tuple(factors)
         
         # Determine overall signal
-        if combined_signal["strength"] > 50:
-            combined_signal["signal"] = "strong_buy"
-        elif combined_signal["strength"] > 20:
-            combined_signal["signal"] = "buy"
-        elif combined_signal["strength"] < -50:
-            combined_signal["signal"] = "strong_sell"
-        elif combined_signal["strength"] < -20:
-            combined_signal["signal"] = "sell"
+        if combined_signal.strength > 50:
+            combined_signal.signal = "strong_buy"
+        elif combined_signal.strength > 20:
+            combined_signal.signal = "buy"
+        elif combined_signal.strength < -50:
+            combined_signal.signal = "strong_sell"
+        elif combined_signal.strength < -20:
+            combined_signal.signal = "sell"
         else:
-            combined_signal["signal"] = "neutral"
+            combined_signal.signal = "neutral"
         
         # Calculate confidence based on agreement between technical and sentiment
         if (tech_signal in ["buy", "strong_buy"] and sentiment_signal == "positive") or \
            (tech_signal in ["sell", "strong_sell"] and sentiment_signal == "negative"):
-            combined_signal["confidence"] = 0.8
+            combined_signal.confidence = 0.8
         elif tech_signal == "neutral" or sentiment_signal == "neutral":
-            combined_signal["confidence"] = 0.5
+            combined_signal.confidence = 0.5
         else:
-            combined_signal["confidence"] = 0.3
+            combined_signal.confidence = 0.3
+        
+        # Without current sentiment to confirm the technicals, confidence falls towards the disagreement level
+        if freshness < 1:
+            combined_signal.confidence = 0.3 + (combined_signal.confidence - 0.3) * freshness
         
         return combined_signal
     
     def execute_trade(self, token_data: Dict[str, Any], 
-                     action: str, amount: Decimal) -> Dict[str, Any]:
+                     action: str, amount: Decimal, price: Optional[float] = None) -> TradeRecord:
         """
         Execute a trade based on the trading signal.
-        This is a placeholder that would be replaced with actual trading logic.
+        Orders are filled by the paper exchange when it is enabled, and simulated
+        at the current price otherwise (real execution would go here).
         
         Args:
             token_data: Token data from config
             action: The trade action (buy, sell)
             amount: The amount to trade
+            price: Price of the cycle's snapshot, if the caller already has it (fetched otherwise)
             
         Returns:
-            Dict: Trade result information
+            TradeRecord: Trade result information (not recorded, and unsuccessful, if there is no price)
         """
         # In a real implementation, this would call exchange APIs or smart contracts
         # For now, we'll simulate the trade
@@ -318,68 +496,85 @@ class TradingStrategy:
         chain = token_data["chain"]
         token_address = token_data["address"]
         
+        # Get current price
+        current_price = price if price is not None else self._get_current_price(token_symbol)
+        if current_price is None:
+            logger.warning(f"Not executing {action} trade for {token_symbol}: no price available")
+            return TradeRecord(token=token_symbol, chain=chain, action=action, amount=amount, price=0.0,
+                               value_usd=0.0, success=False, error="No price available")
+        
         logger.info(f"Executing {action} trade for {amount} {token_symbol} on {chain}")
+        metrics.increment("agent_trades_total", action=action, token=token_symbol)
         
-        # Simulate trade execution
-        success = True
-        error = None
-        
-        # Get current price (simulated)
-        current_price = 1000 if token_symbol == "BTC" else 100  # Simplified
-        
-        # Record trade details
-        trade_details = {
-            "token": token_symbol,
-            "chain": chain,
-            "action": action,
-            "amount": str(amount),
-            "price": current_price,
-            "value_usd": float(amount) * current_price,
-            "success": success,
-            "error": error,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        if self.paper_exchange is not None:
+            with metrics.timer("execute_trade.paper"):
+                trade_details = self.paper_exchange.execute(token_symbol, chain, action, amount, current_price)
+        else:
+            # Simulate trade execution
+            trade_details = TradeRecord(
+                token=token_symbol,
+                chain=chain,
+                action=action,
+                amount=amount,
+                price=current_price,
+                value_usd=float(amount) * current_price
+            )
         
         # Record the trade
-        self._record_trade(trade_details)
+        with metrics.timer("execute_trade.record"):
+            self._record_trade(trade_details)
+        
+        if not trade_details.success:
+            logger.warning(f"{action} trade for {token_symbol} failed: {trade_details.error}")
+            return trade_details
         
         # Update active trades
         if action == "buy":
-            self.active_trades[token_symbol] = {
-                "entry_price": current_price,
-                "amount": amount,
-                "entry_time": datetime.utcnow().isoformat(),
-                "stop_loss": current_price * (1 - self.stop_loss),
-                "take_profit": current_price * (1 + self.take_profit)
-            }
+            entry_price = trade_details.price
+            self.active_trades[token_symbol] = ActiveTrade(
+                entry_price=entry_price,
+                amount=amount,
+                stop_loss=entry_price * (1 - self.stop_loss),
+                take_profit=entry_price * (1 + self.take_profit)
+            )
+            self.positions_version += 1
         elif action == "sell" and token_symbol in self.active_trades:
             del self.active_trades[token_symbol]
+            self.positions_version += 1
         
         return trade_details
     
-    def check_portfolio(self) -> Dict[str, Any]:
+    def check_portfolio(self, prices: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
         Check the current portfolio status.
         
+        Args:
+            prices: Price snapshot to value the portfolio with (the price oracle's by default)
+            
         Returns:
             Dict: Portfolio information
         """
         # Get portfolio from wallet
-        portfolio = self.wallet.get_portfolio_value()
+        portfolio = self.wallet.get_portfolio_value(prices)
+        
+        # Paper balances of dry runs, valued at the same prices
+        if self.paper_exchange is not None:
+            held = [asset for asset in self.paper_exchange.balances() if asset != QUOTE_ASSET]
+            portfolio["paper"] = self.paper_exchange.portfolio(prices or self._get_current_prices(held))
         
         # Add active trades information
-        portfolio["active_trades"] = self.active_trades
+        portfolio["active_trades"] = {symbol: trade.to_dict() for symbol, trade in list(self.active_trades.items())}
         
         # Add trade history summary
         if self.trade_history:
             # Calculate profit/loss
-            total_bought = sum(float(trade["value_usd"]) for trade in self.trade_history if trade["action"] == "buy")
-            total_sold = sum(float(trade["value_usd"]) for trade in self.trade_history if trade["action"] == "sell")
+            total_bought = sum(trade.value_usd for trade in self.trade_history if trade.action == "buy")
+            total_sold = sum(trade.value_usd for trade in self.trade_history if trade.action == "sell")
             
             portfolio["trading_summary"] = {
                 "total_trades": len(self.trade_history),
-                "buys": sum(1 for trade in self.trade_history if trade["action"] == "buy"),
-                "sells": sum(1 for trade in self.trade_history if trade["action"] == "sell"),
+                "buys": sum(1 for trade in self.trade_history if trade.action == "buy"),
+                "sells": sum(1 for trade in self.trade_history if trade.action == "sell"),
                 "total_bought_usd": total_bought,
                 "total_sold_usd": total_sold,
                 "realized_pnl": total_sold - total_bought
@@ -387,84 +582,166 @@ class TradingStrategy:
         
         return portfolio
     
-    def run_strategy(self, token_data: Dict[str, Any]) -> Dict[str, Any]:
+    def check_risk(self, token_data: Dict[str, Any], record_history: bool = True,
+                   current_price: Optional[float] = None) -> StrategyResult:
+        """
+        Check stop loss and take profit for an active trade without running analysis.
+        A failed exit (e.g. a paper sell the pool can't fill) is not retried until
+        its backoff expires, so the risk job doesn't resubmit it on every tick.
+        
+        Args:
+            token_data: Token data from config
+            record_history: Add the action (if any) to the signal history
+            current_price: Latest price if the caller already has it (fetched otherwise)
+            
+        Returns:
+            StrategyResult: Action taken ("none", "stop_loss" or "take_profit") and the trade
+        """
+        token_symbol = token_data["symbol"]
+        result = StrategyResult(token_symbol, token_data["chain"])
+        
+        active_trade = self.active_trades.get(token_symbol)
+        if active_trade is None or active_trade.retry_at > time.time():
+            return result
+        
+        with metrics.timer("check_risk"):
+            if current_price is None:
+                current_price = self._get_current_price(token_symbol)
+            
+            if current_price is None:
+                logger.warning(f"No price for {token_symbol}, skipping its risk check")
+            
+            elif current_price <= active_trade.stop_loss:
+                # Execute stop loss
+                result.action_taken = "stop_loss"
+                result.trade = self.execute_trade(token_data, "sell", active_trade.amount, price=current_price)
+                
+            elif current_price >= active_trade.take_profit:
+                # Execute take profit
+                result.action_taken = "take_profit"
+                result.trade = self.execute_trade(token_data, "sell", active_trade.amount, price=current_price)
+            
+            if result.trade is not None and not result.trade.success:
+                self._defer_exit(token_symbol, active_trade)
+        
+        if record_history and result.action_taken != "none":
+            self.signal_history.record(result)
+        
+        return result
+    
+    def _defer_exit(self, token_symbol: str, active_trade: ActiveTrade):
+        """
+        Back off the next exit attempt of a trade whose exit failed.
+        
+        Args:
+            token_symbol: The token symbol
+            active_trade: The trade that is still open
+        """
+        active_trade.exit_failures += 1
+        delay = min(self.exit_retry_seconds * 2 ** (active_trade.exit_failures - 1), self.max_exit_retry_seconds)
+        active_trade.retry_at = time.time() + delay
+        
+        metrics.increment("agent_exit_retries_deferred_total", token=token_symbol)
+        logger.warning(f"Exit of {token_symbol} failed {active_trade.exit_failures} time(s), retrying in {delay:.0f}s")
+    
+    def run_strategy(self, token_data: Dict[str, Any], 
+                     use_cached_sentiment: bool = False) -> StrategyResult:
         """
         Run the trading strategy for a specific token.
         
         Args:
             token_data: Token data from config
+            use_cached_sentiment: Reuse the last refresh_sentiment result if available
             
         Returns:
-            Dict: Strategy execution results
+            StrategyResult: Strategy execution results (see StrategyResult.to_dict for the dict form)
         """
         token_symbol = token_data["symbol"]
         chain = token_data["chain"]
         
         logger.info(f"Running strategy for {token_symbol} on {chain}")
         
+        with metrics.timer("run_strategy"):
+            result = self._run_strategy(token_data, use_cached_sentiment)
+        
+        self.signal_history.record(result)
+        return result
+    
+    def _run_strategy(self, token_data: Dict[str, Any], 
+                      use_cached_sentiment: bool = False) -> StrategyResult:
+        """
+        Run the trading strategy stages for a token (see run_strategy).
+        
+        Args:
+            token_data: Token data from config
+            use_cached_sentiment: Reuse the last refresh_sentiment result if available
+            
+        Returns:
+            StrategyResult: Strategy execution results
+        """
+        token_symbol = token_data["symbol"]
+        chain = token_data["chain"]
+        
         # Analyze the token
-        analysis = self.analyze_token(token_symbol, chain)
+        with metrics.timer("run_strategy.analyze"):
+            analysis = self.analyze_token(token_symbol, chain, use_cached_sentiment)
         
         # Get the combined signal
-        signal = analysis["combined_signal"]["signal"]
-        strength = analysis["combined_signal"]["strength"]
-        confidence = analysis["combined_signal"]["confidence"]
+        signal = analysis.signal.signal
+        strength = analysis.signal.strength
+        confidence = analysis.signal.confidence
         
         # Check if we already have an active trade for this token
         has_active_trade = token_symbol in self.active_trades
         
+        # One price snapshot for the valuation, the sizing and the stop checks of this run
+        prices = self.price_oracle.snapshot([token_symbol])
+        current_price = prices.get(token_symbol)
+        
         # Get portfolio value
-        portfolio = self.check_portfolio()
+        with metrics.timer("run_strategy.portfolio"):
+            portfolio = self.check_portfolio(prices)
         
         # Initialize result
-        result = {
-            "token": token_symbol,
-            "chain": chain,
-            "timestamp": datetime.utcnow().isoformat(),
-            "analysis": analysis,
-            "action_taken": "none",
-            "trade_details": None
-        }
+        result = StrategyResult(token_symbol, chain, analysis)
         
         # Execute strategy based on signal
-        if signal in ["buy", "strong_buy"] and not has_active_trade and confidence > 0.6:
-            # Calculate position size
-            position_size = self._calculate_position_size(token_data, Decimal("10000"))  # Simplified
-            
-            # Execute buy trade
-            trade_details = self.execute_trade(token_data, "buy", position_size)
-            
-            result["action_taken"] = "buy"
-            result["trade_details"] = trade_details
-            
-        elif signal in ["sell", "strong_sell"] and has_active_trade:
-            # Get active trade details
-            active_trade = self.active_trades[token_symbol]
-            
-            # Execute sell trade
-            trade_details = self.execute_trade(token_data, "sell", active_trade["amount"])
-            
-            result["action_taken"] = "sell"
-            result["trade_details"] = trade_details
-            
-        # Check stop loss and take profit for active trades
-        elif has_active_trade:
-            active_trade = self.active_trades[token_symbol]
-            current_price = 1000 if token_symbol == "BTC" else 100  # Simplified
-            
-            if current_price <= active_trade["stop_loss"]:
-                # Execute stop loss
-                trade_details = self.execute_trade(token_data, "sell", active_trade["amount"])
+        with metrics.timer("run_strategy.execute"):
+            if signal in ["buy", "strong_buy"] and not has_active_trade and confidence > 0.6:
+                if current_price is None:
+                    logger.warning(f"No price for {token_symbol}, not buying")
+                    return result
                 
-                result["action_taken"] = "stop_loss"
-                result["trade_details"] = trade_details
+                # Calculate position size in USD, then in tokens (capped at the token's max holding)
+                if self.paper_exchange is not None:
+                    portfolio_value = Decimal(str(portfolio["paper"]["value_usd"]))
+                else:
+                    portfolio_value = portfolio["total_value_usd"]
+                position_size = self._calculate_position_size(token_data, portfolio_value)
+                max_holding = Decimal(str(token_data.get("max_holding", float('inf'))))
+                amount = min(position_size / Decimal(str(current_price)), max_holding)
+                if amount <= 0:
+                    logger.info(f"Portfolio has no priced value to size a {token_symbol} position from")
+                    return result
                 
-            elif current_price >= active_trade["take_profit"]:
-                # Execute take profit
-                trade_details = self.execute_trade(token_data, "sell", active_trade["amount"])
+                # Execute buy trade
+                result.action_taken = "buy"
+                result.trade = self.execute_trade(token_data, "buy", amount, current_price)
+            
+            elif signal in ["sell", "strong_sell"] and has_active_trade:
+                # Get active trade details
+                active_trade = self.active_trades[token_symbol]
+                
+                # Execute sell trade
+                result.action_taken = "sell"
+                result.trade = self.execute_trade(token_data, "sell", active_trade.amount, current_price)
+            
+            # Check stop loss and take profit for active trades
+            elif has_active_trade:
+                risk_result = self.check_risk(token_data, record_history=False, current_price=current_price)
                 
-                result["action_taken"] = "take_profit"
-                result["trade_details"] = trade_details
+                result.action_taken = risk_result.action_taken
+                result.trade = risk_result.trade
         
         return result
 
@@ -486,4 +763,4 @@ if __name__ == "__main__":
     result = strategy.run_strategy(token)
     
     # Print the results
-    print(json.dumps(result, indent=2, default=str))
+    print(json.dumps(result.to_dict(), indent=2, default=str))
@@ -14,6 +14,12 @@ from web3.middleware import geth_poa_middleware
 from loguru import logger
 from dotenv import load_dotenv
 
+from metrics import metrics, web3_metrics_middleware
+from gas_oracle import GasOracle
+from rpc_pool import ProviderPool
+from balance_tracker import BalanceTracker
+from price_oracle import PriceOracle
+
 # Load environment variables
 load_dotenv()
 
@@ -64,6 +70,9 @@ ERC20_ABI = json.loads('''
 ]
 ''')
 
+# Address used in tokens_of_interest for a chain's native token
+NATIVE_TOKEN_ADDRESS = "0x0000000000000000000000000000000000000000"
+
 class BlockchainWallet:
     """
     A class to manage blockchain wallet operations across different chains.
@@ -81,17 +90,43 @@ class BlockchainWallet:
         
         self.wallets = {}
         self.web3_connections = {}
+        self.gas_oracles: Dict[str, GasOracle] = {}
+        self.balance_trackers: Dict[str, BalanceTracker] = {}
+        
+        # Native token symbol by chain, from the zero-address entries of tokens_of_interest
+        self.native_symbols = {token["chain"]: token["symbol"] for token in self.config["tokens_of_interest"]
+                               if token["address"] == NATIVE_TOKEN_ADDRESS}
+        
+        # One USD price snapshot for every token of interest, shared by valuation and trading
+        self.price_oracle = PriceOracle(self.config.get("price_oracle"),
+                                        watched=[token["symbol"] for token in self.config["tokens_of_interest"]])
         
         # Initialize connections to different blockchains
         self._initialize_connections()
     
+    def _provider(self, chain: str, chain_config: Dict[str, Any]) -> ProviderPool:
+        """
+        Create the RPC provider of a chain.
+        
+        Args:
+            chain: Chain name
+            chain_config: Wallet config of the chain (provider_urls, or a single provider_url)
+            
+        Returns:
+            ProviderPool: Provider routing requests over the chain's endpoints
+        """
+        urls = chain_config.get("provider_urls") or [chain_config["provider_url"]]
+        return ProviderPool(urls, chain, self.config.get("rpc_pool"))
+    
     def _initialize_connections(self):
         """Initialize Web3 connections to configured blockchains."""
         # Ethereum connection
         if "ethereum" in self.config["wallet"]:
             eth_config = self.config["wallet"]["ethereum"]
-            eth_provider = Web3.HTTPProvider(eth_config["provider_url"])
-            eth_w3 = Web3(eth_provider)
+            eth_w3 = Web3(self._provider("ethereum", eth_config))
+            
+            # Count and time every JSON-RPC request
+            eth_w3.middleware_onion.add(web3_metrics_middleware("ethereum"), name="metrics")
             
             # Use private key from environment variable if available
             private_key = os.getenv("ETH_PRIVATE_KEY", eth_config["private_key"])
@@ -107,12 +142,14 @@ class BlockchainWallet:
         # Binance Smart Chain connection
         if "binance_smart_chain" in self.config["wallet"]:
             bsc_config = self.config["wallet"]["binance_smart_chain"]
-            bsc_provider = Web3.HTTPProvider(bsc_config["provider_url"])
-            bsc_w3 = Web3(bsc_provider)
+            bsc_w3 = Web3(self._provider("binance_smart_chain", bsc_config))
             
             # BSC uses PoA consensus, so we need this middleware
             bsc_w3.middleware_onion.inject(geth_poa_middleware, layer=0)
             
+            # Count and time every JSON-RPC request
+            bsc_w3.middleware_onion.add(web3_metrics_middleware("binance_smart_chain"), name="metrics")
+            
             # Use private key from environment variable if available
             private_key = os.getenv("BSC_PRIVATE_KEY", bsc_config["private_key"])
             
@@ -123,6 +160,34 @@ class BlockchainWallet:
             }
             
             logger.info(f"Initialized Binance Smart Chain wallet: {bsc_config['address']}")
+        
+        self.initialize_chain_services()
+    
+    def initialize_chain_services(self):
+        """
+        Build the gas oracles and balance trackers of the current connections.
+        
+        Called again after web3_connections, wallets or the tokens of interest
+        are replaced, so the services don't keep using the old ones. The balance
+        listeners of a chain carry over to its new tracker.
+        """
+        # Cached fee suggestions, so sends don't wait for a gas price request
+        gas_price_multiplier = self.config["trading"]["gas_price_multiplier"]
+        self.gas_oracles = {
+            chain: GasOracle(w3, chain, gas_price_multiplier, self.config.get("gas_oracle"))
+            for chain, w3 in self.web3_connections.items()
+        }
+        
+        # In-memory balance ledgers, updated from the wallet's transfers in new blocks
+        previous, self.balance_trackers = self.balance_trackers, {}
+        for chain, w3 in self.web3_connections.items():
+            tokens = {token["symbol"]: token["address"] for token in self.config["tokens_of_interest"]
+                      if token["chain"] == chain and token["address"] != NATIVE_TOKEN_ADDRESS}
+            tracker = BalanceTracker(w3, chain, self.wallets[chain]["address"], tokens,
+                                     ERC20_ABI, self.config.get("balance_tracker"))
+            if chain in previous:
+                tracker.listeners.extend(previous[chain].listeners)
+            self.balance_trackers[chain] = tracker
     
     def get_native_balance(self, chain: str) -> Decimal:
         """
@@ -186,6 +251,7 @@ class BlockchainWallet:
         
         return token_balance, decimals
     
+    @metrics.timed("wallet.approve_token_spending")
     def approve_token_spending(self, chain: str, token_address: str, spender_address: str, 
                               amount: Decimal = None) -> Optional[str]:
         """
@@ -222,8 +288,7 @@ class BlockchainWallet:
         
         # Build transaction
         try:
-            gas_price_multiplier = self.config["trading"]["gas_price_multiplier"]
-            gas_price = int(w3.eth.gas_price * gas_price_multiplier)
+            fees = self.gas_oracles[chain].fees()
             
             # Estimate gas
             gas_estimate = token_contract.functions.approve(
@@ -238,7 +303,7 @@ class BlockchainWallet:
             ).build_transaction({
                 'from': wallet_address,
                 'gas': int(gas_estimate * 1.2),  # Add 20% buffer
-                'gasPrice': gas_price,
+                **fees,
                 'nonce': w3.eth.get_transaction_count(wallet_address),
             })
             
@@ -247,7 +312,8 @@ class BlockchainWallet:
             tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
             # Wait for transaction receipt
-            tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+            with metrics.timer("wallet.wait_for_receipt", chain=chain):
+                tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
             
             if tx_receipt.status == 1:
                 logger.info(f"Successfully approved {spender_address} to spend tokens")
@@ -260,6 +326,7 @@ class BlockchainWallet:
             logger.error(f"Error approving token: {str(e)}")
             return None
     
+    @metrics.timed("wallet.send_token")
     def send_token(self, chain: str, token_address: str, to_address: str, 
                   amount: Decimal) -> Optional[str]:
         """
@@ -293,8 +360,7 @@ class BlockchainWallet:
         
         # Build transaction
         try:
-            gas_price_multiplier = self.config["trading"]["gas_price_multiplier"]
-            gas_price = int(w3.eth.gas_price * gas_price_multiplier)
+            fees = self.gas_oracles[chain].fees()
             
             # Estimate gas
             gas_estimate = token_contract.functions.transfer(
@@ -309,7 +375,7 @@ class BlockchainWallet:
             ).build_transaction({
                 'from': wallet_address,
                 'gas': int(gas_estimate * 1.2),  # Add 20% buffer
-                'gasPrice': gas_price,
+                **fees,
                 'nonce': w3.eth.get_transaction_count(wallet_address),
             })
             
@@ -318,7 +384,8 @@ class BlockchainWallet:
             tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
             # Wait for transaction receipt
-            tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+            with metrics.timer("wallet.wait_for_receipt", chain=chain):
+                tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
             
             if tx_receipt.status == 1:
                 logger.info(f"Successfully sent {amount} tokens to {to_address}")
@@ -331,6 +398,7 @@ class BlockchainWallet:
             logger.error(f"Error sending token: {str(e)}")
             return None
     
+    @metrics.timed("wallet.send_native_token")
     def send_native_token(self, chain: str, to_address: str, amount: Decimal) -> Optional[str]:
         """
         Send native tokens (ETH, BNB, etc.) to another address.
@@ -356,8 +424,7 @@ class BlockchainWallet:
         
         # Build transaction
         try:
-            gas_price_multiplier = self.config["trading"]["gas_price_multiplier"]
-            gas_price = int(w3.eth.gas_price * gas_price_multiplier)
+            fees = self.gas_oracles[chain].fees()
             
             # Build transaction
             tx = {
@@ -365,7 +432,7 @@ class BlockchainWallet:
                 'to': to_address,
                 'value': wei_amount,
                 'gas': 21000,  # Standard gas limit for ETH transfers
-                'gasPrice': gas_price,
+                **fees,
                 'nonce': w3.eth.get_transaction_count(wallet_address),
             }
             
@@ -374,7 +441,8 @@ class BlockchainWallet:
             tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
             # Wait for transaction receipt
-            tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+            with metrics.timer("wallet.wait_for_receipt", chain=chain):
+                tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
             
             if tx_receipt.status == 1:
                 logger.info(f"Successfully sent {amount} native tokens to {to_address}")
@@ -387,38 +455,53 @@ class BlockchainWallet:
             logger.error(f"Error sending native token: {str(e)}")
             return None
     
-    def get_portfolio_value(self) -> Dict[str, Any]:
+    @metrics.timed("get_portfolio_value")
+    def get_portfolio_value(self, prices: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
         Calculate the total portfolio value across all chains and tokens.
+        Balances come from the balance trackers' ledgers, which are read from
+        the chain only the first time.
         
+        Args:
+            prices: USD price by symbol to value the balances with (the price oracle's snapshot by default)
+            
         Returns:
-            Dict: Portfolio information including total value and breakdown
+            Dict: Portfolio information including total value and breakdown; assets without a
+                  price have a value_usd of None, are left out of the totals and listed in "unpriced"
         """
         portfolio = {
             "total_value_usd": Decimal('0'),
-            "chains": {}
+            "chains": {},
+            "unpriced": []
         }
         
-        # Iterate through each chain
+        def value(symbol: Optional[str], balance: Decimal) -> Optional[Decimal]:
+            if symbol in prices:
+                return balance * Decimal(str(prices[symbol]))
+            if balance and symbol is not None and symbol not in portfolio["unpriced"]:
+                portfolio["unpriced"].append(symbol)
+            return None
+        
+        # Native and token balances of the tokens of interest on each chain
         for chain in self.wallets:
-            chain_portfolio = {
-                "native_balance": self.get_native_balance(chain),
-                "tokens": {}
-            }
-            
-            # Add native token value (would need price feed integration)
-            # For now, we'll just record the balance
-            
-            # Add token balances for tokens of interest
-            for token in self.config["tokens_of_interest"]:
-                if token["chain"] == chain:
-                    balance, _ = self.get_token_balance(chain, token["address"])
-                    chain_portfolio["tokens"][token["symbol"]] = {
-                        "balance": balance,
-                        "address": token["address"]
-                    }
+            with metrics.timer("get_portfolio_value.balances", chain=chain):
+                portfolio["chains"][chain] = self.balance_trackers[chain].balances()
+        
+        if prices is None:
+            held = [self.native_symbols.get(chain) for chain in portfolio["chains"]]
+            held += [symbol for chain_data in portfolio["chains"].values() for symbol in chain_data["tokens"]]
+            prices = self.price_oracle.snapshot(symbol for symbol in held if symbol is not None)
+        
+        for chain, chain_data in portfolio["chains"].items():
+            native_symbol = self.native_symbols.get(chain)
+            chain_data["native_symbol"] = native_symbol
+            chain_data["native_value_usd"] = value(native_symbol, chain_data["native_balance"])
+            for token_symbol, token_data in chain_data["tokens"].items():
+                token_data["value_usd"] = value(token_symbol, token_data["balance"])
             
-            portfolio["chains"][chain] = chain_portfolio
+            values = [chain_data["native_value_usd"]] + [token["value_usd"] for token in chain_data["tokens"].values()]
+            chain_data["total_value_usd"] = sum((v for v in values if v is not None), Decimal('0'))
+            portfolio["total_value_usd"] += chain_data["total_value_usd"]
         
         return portfolio
 
@@ -4,21 +4,24 @@ Flask application for the cryptocurrency trading agent web interface.
 
 import os
 import json
-import threading
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
 from flask_socketio import SocketIO
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.utils import PlotlyJSONEncoder
 
-from ..wallet import BlockchainWallet
-from ..technical_analysis import TechnicalAnalyzer
-from ..sentiment_analysis import SentimentAnalyzer
-from ..trading_strategy import TradingStrategy
+from market_data import MarketData
+from metrics import metrics, MetricsRegistry
+from state_store import (
+    StateStore, analysis_key, signals_key, DEFAULT_PATH, PORTFOLIO_KEY, STATUS_KEY, HEARTBEAT_KEY, METRICS_KEY,
+    ANALYSIS_PREFIX, CONTROL_KEY, ANALYZE_REQUEST_PREFIX
+)
+from signal_history import SignalSeries
+from event_index import EventIndex, DAY_SECONDS
+from web.publisher import UpdatePublisher
+from web.chart_data import ChartDataService
+from web.responses import VersionedResponder, select_fields, exclude_fields, parse_list
 
 
 # Initialize Flask app
@@ -27,117 +30,122 @@ app = Flask(__name__,
             static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = os.urandom(24)
 socketio = SocketIO(app)
+publisher = UpdatePublisher(socketio)
+chart_service = None
+responder = VersionedResponder()
+
+# The agent process counts as gone if its heartbeat is older than this many seconds
+AGENT_HEARTBEAT_TIMEOUT = 30
+
+# Seconds to wait for the agent process to answer an on-demand analysis
+ANALYZE_TIMEOUT = 120
+
+# Days of portfolio history returned when no start is given
+DEFAULT_HISTORY_DAYS = 30
 
 # Global variables
 config_path = None
 trading_agent = None
-agent_thread = None
-agent_running = False
-last_update = None
-portfolio_data = None
-analysis_results = {}
+state_store = None
+event_index = None
 
 
 def initialize_agent(config_path: str):
-    """Initialize the trading agent components."""
-    global trading_agent
+    """
+    Initialize the web tier: configuration, the state store shared with the
+    agent process and the chart data service. Everything else is read from
+    the state store, so no trading strategy is built here.
+    """
+    global trading_agent, state_store, chart_service, event_index
     
     if trading_agent is None:
+        # Load configuration
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        
         trading_agent = {
-            'wallet': BlockchainWallet(config_path),
-            'technical_analyzer': TechnicalAnalyzer(config_path),
-            'sentiment_analyzer': SentimentAnalyzer(config_path),
-            'trading_strategy': TradingStrategy(config_path),
-            'config_path': config_path
+            'config_path': config_path,
+            'config': config
         }
         
-        # Load configuration
-        with open(config_path, 'r') as f:
-            trading_agent['config'] = json.load(f)
-
-
-def agent_worker(interval: int = 60):
-    """Background worker to run the trading agent."""
-    global agent_running, last_update, portfolio_data, analysis_results
-    
-    while agent_running:
-        try:
-            # Update portfolio data
-            portfolio_data = trading_agent['wallet'].get_portfolio_value()
-            
-            # Analyze tokens
-            for token in trading_agent['config']['tokens_of_interest']:
-                symbol = token['symbol']
-                chain = token['chain']
-                
-                # Run strategy for the token
-                result = trading_agent['trading_strategy'].run_strategy(token)
-                
-                # Store result
-                analysis_results[symbol] = result
-                
-                # Emit update via Socket.IO
-                socketio.emit('agent_update', {
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'portfolio': portfolio_data,
-                    'analysis': analysis_results
-                })
-                
-                # Add a delay to avoid rate limiting
-                time.sleep(1)
-            
-            # Update last update time
-            last_update = datetime.utcnow()
-            
-            # Sleep for the specified interval
-            time.sleep(interval)
-            
-        except Exception as e:
-            print(f"Error in agent worker: {str(e)}")
-            time.sleep(10)  # Sleep for a bit before retrying
-
-
-def start_agent_thread(interval: int = 60):
-    """Start the agent in a background thread."""
-    global agent_thread, agent_running
-    
-    if agent_thread is None or not agent_thread.is_alive():
-        agent_running = True
-        agent_thread = threading.Thread(target=agent_worker, args=(interval,))
-        agent_thread.daemon = True
-        agent_thread.start()
-
-
-def stop_agent_thread():
-    """Stop the agent background thread."""
-    global agent_running
-    agent_running = False
+        state_store = StateStore(config.get('state_store', {}).get('path', DEFAULT_PATH))
+        event_index = EventIndex(config.get('event_index'))
+        
+        publisher.known_tokens = [t['symbol'] for t in config['tokens_of_interest']]
+        chart_service = ChartDataService(MarketData(config.get('market_data')).get_candles)
+        
+        # Forward everything already in the store, then every new write, to Socket.IO clients
+        state_store.watch(forward_state_change, since=0)
+
+
+def forward_state_change(key: str, value: Any):
+    """Send a change written by the agent process to the Socket.IO clients of this worker."""
+    if key == PORTFOLIO_KEY:
+        publisher.publish_portfolio(value)
+    elif key.startswith(ANALYSIS_PREFIX):
+        publisher.publish_token(key[len(ANALYSIS_PREFIX):], value)
+    elif key == STATUS_KEY:
+        publisher.publish_status(agent_running=value.get('agent_running', False),
+                                 last_update=value.get('last_update'))
+
+
+def get_agent_status() -> Dict[str, Any]:
+    """Get the agent status published by the agent process."""
+    status = state_store.get(STATUS_KEY, {})
+    heartbeat = state_store.get(HEARTBEAT_KEY)
+    
+    process_alive = heartbeat is not None and time.time() - heartbeat['time'] < AGENT_HEARTBEAT_TIMEOUT
+    
+    return {
+        'agent_running': bool(status.get('agent_running')) and process_alive,
+        'agent_process_alive': process_alive,
+        'last_update': status.get('last_update')
+    }
+
+
+def get_analysis_results() -> Dict[str, Any]:
+    """Get the latest analysis result for every token."""
+    return state_store.get_prefix(ANALYSIS_PREFIX)
+
+
+def combined_metrics(include_web: bool = True) -> MetricsRegistry:
+    """Get the metrics of this web worker (optional) and of the agent process in one registry."""
+    combined = MetricsRegistry()
+    if include_web:
+        combined.merge(metrics.export(), process='web')
+    
+    agent_metrics = state_store.get(METRICS_KEY)
+    if agent_metrics:
+        combined.merge(agent_metrics, process='agent')
+    
+    return combined
 
 
 @app.route('/')
 def index():
     """Render the main dashboard page."""
+    status = get_agent_status()
     return render_template('index.html', 
-                          portfolio=portfolio_data,
-                          analysis=analysis_results,
-                          last_update=last_update,
-                          agent_running=agent_running)
+                          portfolio=state_store.get(PORTFOLIO_KEY),
+                          analysis=get_analysis_results(),
+                          last_update=status['last_update'],
+                          agent_running=status['agent_running'])
 
 
 @app.route('/portfolio')
 def portfolio():
     """Render the portfolio page."""
     return render_template('portfolio.html', 
-                          portfolio=portfolio_data,
-                          last_update=last_update)
+                          portfolio=state_store.get(PORTFOLIO_KEY),
+                          last_update=get_agent_status()['last_update'])
 
 
 @app.route('/analysis')
 def analysis():
     """Render the analysis page."""
     return render_template('analysis.html', 
-                          analysis=analysis_results,
-                          last_update=last_update)
+                          analysis=get_analysis_results(),
+                          last_update=get_agent_status()['last_update'])
 
 
 @app.route('/settings')
@@ -150,24 +158,26 @@ def settings():
 @app.route('/api/start', methods=['POST'])
 def api_start():
     """API endpoint to start the trading agent."""
-    global agent_running
-    
     interval = request.json.get('interval', 60)
+    status = get_agent_status()
     
-    if not agent_running:
-        start_agent_thread(interval)
+    if status['agent_running']:
+        return jsonify({'status': 'error', 'message': 'Agent already running'})
+    
+    # The agent process picks the command up from the state store
+    state_store.set(CONTROL_KEY, {'running': True, 'interval': interval})
+    
+    if status['agent_process_alive']:
         return jsonify({'status': 'success', 'message': 'Agent started'})
     else:
-        return jsonify({'status': 'error', 'message': 'Agent already running'})
+        return jsonify({'status': 'success', 'message': 'Agent will start when the agent process is up'})
 
 
 @app.route('/api/stop', methods=['POST'])
 def api_stop():
     """API endpoint to stop the trading agent."""
-    global agent_running
-    
-    if agent_running:
-        stop_agent_thread()
+    if get_agent_status()['agent_running']:
+        state_store.set(CONTROL_KEY, {'running': False})
         return jsonify({'status': 'success', 'message': 'Agent stopped'})
     else:
         return jsonify({'status': 'error', 'message': 'Agent not running'})
@@ -176,21 +186,143 @@ def api_stop():
 @app.route('/api/portfolio', methods=['GET'])
 def api_portfolio():
     """API endpoint to get portfolio data."""
-    if portfolio_data:
-        return jsonify(portfolio_data)
+    version = state_store.versions([PORTFOLIO_KEY])[PORTFOLIO_KEY]
+    if version:
+        etag = responder.make_etag(PORTFOLIO_KEY, version)
+        return responder.respond(etag, lambda: state_store.get(PORTFOLIO_KEY))
     else:
         return jsonify({'status': 'error', 'message': 'Portfolio data not available'})
 
 
+def history_window() -> Tuple[float, float]:
+    """Get the start and end (Unix seconds) of a portfolio history request."""
+    end = request.args.get('end', type=float) or time.time()
+    start = request.args.get('start', type=float)
+    if start is None:
+        start = end - request.args.get('days', DEFAULT_HISTORY_DAYS, type=int) * DAY_SECONDS
+    return start, end
+
+
+@app.route('/api/portfolio/history', methods=['GET'])
+def api_portfolio_history():
+    """
+    API endpoint to get the balance of an asset after each block that changed it.
+    
+    Query parameters: chain and asset (a token symbol, or native) are required;
+    start and end as Unix seconds, or days back from now (default 30).
+    """
+    chain = request.args.get('chain')
+    asset = request.args.get('asset')
+    if not chain or not asset:
+        return jsonify({'status': 'error', 'message': 'chain and asset are required'}), 400
+    
+    start, end = history_window()
+    
+    def build():
+        return {'chain': chain, 'asset': asset, 'points': event_index.balance_history(chain, asset, start, end)}
+    
+    # Open-ended windows move with the clock, so they are cached per index version and minute
+    etag = responder.make_etag('portfolio_history', event_index.version(), chain, asset, int(start) // 60,
+                               int(end) // 60)
+    return responder.respond(etag, build)
+
+
+@app.route('/api/portfolio/daily', methods=['GET'])
+def api_portfolio_daily():
+    """
+    API endpoint to get the end-of-day balance, value and PnL of every asset of a chain.
+    
+    Query parameters: chain is required; start and end as Unix seconds, or
+    days back from now (default 30).
+    """
+    chain = request.args.get('chain')
+    if not chain:
+        return jsonify({'status': 'error', 'message': 'chain is required'}), 400
+    
+    start, end = history_window()
+    
+    def build():
+        return {'chain': chain, 'days': event_index.daily_values(chain, start, end)}
+    
+    etag = responder.make_etag('portfolio_daily', event_index.version(), chain, int(start) // 60, int(end) // 60)
+    return responder.respond(etag, build)
+
+
 @app.route('/api/analysis/<token>', methods=['GET'])
 def api_analysis(token):
     """API endpoint to get analysis data for a specific token."""
-    if token in analysis_results:
-        return jsonify(analysis_results[token])
+    key = analysis_key(token)
+    version = state_store.versions([key])[key]
+    if version:
+        return responder.respond(responder.make_etag(key, version), lambda: state_store.get(key))
     else:
         return jsonify({'status': 'error', 'message': f'Analysis for {token} not available'})
 
 
+@app.route('/api/analysis', methods=['GET'])
+def api_analysis_bulk():
+    """
+    API endpoint to get analysis data for several tokens in one response.
+    
+    Query parameters (all optional):
+        tokens: Comma-separated token symbols (default: all analyzed tokens)
+        fields: Comma-separated dotted paths to include (e.g. action_taken,analysis.combined_signal)
+        exclude: Comma-separated dotted paths to leave out (e.g. analysis.sentiment_analysis.windows)
+        format: json (default) or msgpack; msgpack is also chosen by Accept: application/msgpack
+    """
+    tokens = parse_list('tokens')
+    fields = parse_list('fields')
+    exclude = parse_list('exclude')
+    
+    if tokens is None:
+        versions = state_store.prefix_version(ANALYSIS_PREFIX)
+    else:
+        versions = tuple(sorted(state_store.versions([analysis_key(t) for t in tokens]).items()))
+    
+    def build():
+        results = get_analysis_results()
+        selected = results if tokens is None else {t: results[t] for t in tokens if t in results}
+        
+        for symbol, result in selected.items():
+            if fields:
+                result = select_fields(result, fields)
+            if exclude:
+                result = exclude_fields(result, exclude)
+            selected[symbol] = result
+        
+        return selected
+    
+    etag = responder.make_etag(ANALYSIS_PREFIX, versions, tokens, fields, exclude)
+    return responder.respond(etag, build)
+
+
+@app.route('/api/signals/<token>', methods=['GET'])
+def api_signals(token):
+    """
+    API endpoint to get the rolling signal history of a token as columns
+    (t, tech_strength, sentiment_score, combined_strength, action).
+    
+    Query parameters (all optional): start and end as Unix seconds, and limit
+    to keep only the most recent points.
+    """
+    key = signals_key(token)
+    version = state_store.versions([key])[key]
+    if not version:
+        return jsonify({'status': 'error', 'message': f'Signal history for {token} not available'})
+    
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    limit = request.args.get('limit', type=int)
+    
+    def build():
+        history = state_store.get(key)
+        if start is None and end is None and limit is None:
+            return history
+        return SignalSeries.from_dict(history).to_dict(start, end, limit)
+    
+    return responder.respond(responder.make_etag(key, version, start, end, limit), build)
+
+
 @app.route('/api/analyze/<token>', methods=['POST'])
 def api_analyze_token(token):
     """API endpoint to analyze a specific token on demand."""
@@ -202,61 +334,44 @@ def api_analyze_token(token):
             break
     
     if token_config:
-        # Analyze the token
-        result = trading_agent['trading_strategy'].run_strategy(token_config)
+        symbol = token_config['symbol']
+        _, version = state_store.get_with_version(analysis_key(symbol))
+        
+        # Ask the agent process to analyze the token and wait for the new result
+        state_store.set(ANALYZE_REQUEST_PREFIX + symbol, {'requested_at': time.time()})
+        result, new_version = state_store.wait_for_change(analysis_key(symbol), version, ANALYZE_TIMEOUT)
         
-        # Store result
-        analysis_results[token_config['symbol']] = result
+        if new_version == version:
+            return jsonify({'status': 'error', 'message': f'Timed out waiting for the analysis of {symbol}'})
         
         return jsonify(result)
     else:
         return jsonify({'status': 'error', 'message': f'Token {token} not found in configuration'})
 
 
-def create_price_chart(token_symbol: str, price_data: list) -> str:
-    """Create a price chart for a token."""
-    # Convert price data to a format suitable for plotting
-    dates = [datetime.fromtimestamp(d['timestamp'] / 1000) for d in price_data]
-    closes = [d['close'] for d in price_data]
-    
-    # Create figure
-    fig = go.Figure()
-    
-    # Add price line
-    fig.add_trace(go.Scatter(
-        x=dates,
-        y=closes,
-        mode='lines',
-        name=f'{token_symbol} Price',
-        line=dict(color='blue', width=2)
-    ))
-    
-    # Update layout
-    fig.update_layout(
-        title=f'{token_symbol} Price Chart',
-        xaxis_title='Date',
-        yaxis_title='Price',
-        template='plotly_white',
-        height=500
-    )
-    
-    # Convert to JSON
-    return json.dumps(fig, cls=PlotlyJSONEncoder)
-
-
 @app.route('/api/chart/<token>', methods=['GET'])
 def api_chart(token):
-    """API endpoint to get a price chart for a token."""
-    if token in analysis_results:
-        # Get price data from the trading strategy
-        price_data = trading_agent['trading_strategy']._get_price_data(token)
-        
-        # Create chart
-        chart_json = create_price_chart(token, price_data)
-        
-        return jsonify({'chart': chart_json})
-    else:
+    """
+    API endpoint to get chart data for a token.
+    
+    Query parameters: timeframe (default 1h), width in pixels (default 800)
+    and type (line or candles).
+    """
+    symbols = [t['symbol'] for t in trading_agent['config']['tokens_of_interest']] if trading_agent else []
+    if token not in symbols:
         return jsonify({'status': 'error', 'message': f'Data for {token} not available'})
+    
+    try:
+        chart = chart_service.get_chart(
+            token,
+            timeframe=request.args.get('timeframe', '1h'),
+            width=request.args.get('width', 800, type=int),
+            chart_type=request.args.get('type', 'line')
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    return jsonify(chart)
 
 
 @app.route('/api/config', methods=['GET'])
@@ -287,14 +402,31 @@ def api_config():
 
 @app.route('/api/status', methods=['GET'])
 def api_status():
-    """API endpoint to get the current status of the agent."""
-    return jsonify({
-        'agent_running': agent_running,
-        'last_update': last_update.isoformat() if last_update else None,
-        'portfolio_available': portfolio_data is not None,
-        'analysis_available': len(analysis_results) > 0,
-        'tokens_analyzed': list(analysis_results.keys())
-    })
+    """API endpoint to get the current status of the agent (metrics are the agent process's)."""
+    status = get_agent_status()
+    versions = state_store.versions([PORTFOLIO_KEY, METRICS_KEY])
+    analysis_version = state_store.prefix_version(ANALYSIS_PREFIX)
+    
+    def build():
+        tokens_analyzed = list(get_analysis_results().keys())
+        return {
+            'agent_running': status['agent_running'],
+            'agent_process_alive': status['agent_process_alive'],
+            'last_update': status['last_update'],
+            'portfolio_available': versions[PORTFOLIO_KEY] > 0,
+            'analysis_available': len(tokens_analyzed) > 0,
+            'tokens_analyzed': tokens_analyzed,
+            'metrics': combined_metrics(include_web=False).snapshot()
+        }
+    
+    etag = responder.make_etag(STATUS_KEY, sorted(status.items()), sorted(versions.items()), analysis_version)
+    return responder.respond(etag, build)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose stage timings and counters of this worker and the agent process in the Prometheus text format."""
+    return Response(combined_metrics().render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 def run_web_server(config_path: str, host: str = '127.0.0.1', port: int = 5000, debug: bool = False):
@@ -0,0 +1,250 @@
+"""
+Chart data service for the cryptocurrency trading agent web interface.
+This module caches candle series per token and timeframe as numpy arrays,
+invalidates them when the current candle closes, and downsamples long
+histories to the width of the chart so the browser only receives the points
+it can draw.
+"""
+
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from metrics import metrics
+from records import CandleSeries
+from resampler import TIMEFRAME_SECONDS
+
+# Downsampled charts cached per series (one per chart type and width)
+MAX_CHARTS_PER_SERIES = 8
+
+# Column names in the chart response, in candle field order
+COLUMNS = (("t", "timestamp"), ("o", "open"), ("h", "high"), ("l", "low"), ("c", "close"), ("v", "volume"))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Select the points to keep with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept. The points in between are split
+    into threshold - 2 buckets, and from each bucket the point that forms the
+    largest triangle with the previously kept point and the average of the next
+    bucket is kept, which preserves peaks and troughs.
+
+    Args:
+        x: X values (e.g. timestamps), sorted ascending
+        y: Y values
+        threshold: Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+
+    # Bucket boundaries for the points between the first and the last
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # Twice the triangle area for every candidate in the bucket
+        areas = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+
+    return indices
+
+
+def bucket_ohlc(columns: Dict[str, np.ndarray], threshold: int) -> Dict[str, np.ndarray]:
+    """
+    Merge consecutive candles so at most threshold candles remain.
+
+    Args:
+        columns: Candle columns (t, o, h, l, c, v)
+        threshold: Maximum number of candles
+
+    Returns:
+        Dict: Merged candle columns
+    """
+    n = len(columns["t"])
+    if threshold >= n or threshold < 1:
+        return columns
+
+    size = math.ceil(n / threshold)
+    starts = np.arange(0, n, size)
+    ends = np.append(starts[1:], n) - 1
+
+    return {
+        "t": columns["t"][starts],
+        "o": columns["o"][starts],
+        "h": np.maximum.reduceat(columns["h"], starts),
+        "l": np.minimum.reduceat(columns["l"], starts),
+        "c": columns["c"][ends],
+        "v": np.add.reduceat(columns["v"], starts)
+    }
+
+
+class _CachedSeries:
+    """Candle columns for one token and timeframe, and the charts built from them."""
+
+    __slots__ = ("columns", "expires_at", "charts")
+
+    def __init__(self, columns: Dict[str, np.ndarray], expires_at: float):
+        self.columns = columns
+        self.expires_at = expires_at
+        self.charts: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+
+class ChartDataService:
+    """
+    Serves compact, downsampled chart data for tokens.
+    """
+
+    def __init__(self, fetch_candles: Callable[[str, str, int], List[Dict[str, Any]]],
+                 history_days: int = 90, max_candles: int = 5000,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the service.
+
+        Args:
+            fetch_candles: Function (token, timeframe, limit) returning candle dicts or a
+                           CandleSeries (e.g. MarketData.get_candles)
+            history_days: Days of history to load for each series
+            max_candles: Maximum candles to load for each series
+            clock: Function returning the current Unix time in seconds
+        """
+        self.fetch_candles = fetch_candles
+        self.history_days = history_days
+        self.max_candles = max_candles
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, str], _CachedSeries] = {}
+
+    def _load(self, token: str, timeframe: str) -> _CachedSeries:
+        """Fetch candles and convert them to columns."""
+        interval = TIMEFRAME_SECONDS[timeframe]
+        limit = min(self.max_candles, self.history_days * 86400 // interval)
+
+        with metrics.timer("chart.fetch"):
+            candles = self.fetch_candles(token, timeframe, limit)
+
+        if not isinstance(candles, CandleSeries):
+            candles = CandleSeries.from_candles(candles)
+        columns = {name: candles.columns[field] for name, field in COLUMNS}
+
+        # The series is valid until the current candle closes
+        now = self._clock()
+        expires_at = (math.floor(now / interval) + 1) * interval
+
+        return _CachedSeries(columns, expires_at)
+
+    def _series(self, token: str, timeframe: str) -> _CachedSeries:
+        """Get the cached series for a token and timeframe, loading it if needed."""
+        key = (token, timeframe)
+
+        with self._lock:
+            series = self._cache.get(key)
+            if series is not None and self._clock() < series.expires_at:
+                metrics.increment("agent_cache_hits_total", cache="chart_series")
+                return series
+
+        metrics.increment("agent_cache_misses_total", cache="chart_series")
+        series = self._load(token, timeframe)
+
+        with self._lock:
+            self._cache[key] = series
+
+        return series
+
+    def invalidate(self, token: Optional[str] = None, timeframe: Optional[str] = None):
+        """
+        Drop cached series, e.g. when a new candle is known to have closed.
+
+        Args:
+            token: Token symbol (None for all tokens)
+            timeframe: Timeframe (None for all timeframes)
+        """
+        with self._lock:
+            for key in list(self._cache):
+                if (token is None or key[0] == token) and (timeframe is None or key[1] == timeframe):
+                    del self._cache[key]
+
+    def get_chart(self, token: str, timeframe: str = "1h", width: int = 800,
+                  chart_type: str = "line") -> Dict[str, Any]:
+        """
+        Get chart data for a token as columnar arrays.
+
+        Args:
+            token: Token symbol
+            timeframe: Candle timeframe (see TIMEFRAME_SECONDS)
+            width: Chart width in pixels; the series is reduced to at most this many points
+            chart_type: "line" keeps the points that best preserve the close price shape (LTTB),
+                        "candles" merges neighbouring candles into wider ones
+
+        Returns:
+            Dict: Token, timeframe, point counts and the t/o/h/l/c/v columns
+        """
+        if timeframe not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+        if chart_type not in ("line", "candles"):
+            raise ValueError(f"Unsupported chart type: {chart_type}")
+
+        width = max(3, int(width))
+        series = self._series(token, timeframe)
+
+        chart_key = (chart_type, width)
+        with self._lock:
+            chart = series.charts.get(chart_key)
+        if chart is not None:
+            return chart
+
+        with metrics.timer("chart.downsample"):
+            columns = series.columns
+            if chart_type == "line":
+                keep = lttb_indices(columns["t"], columns["c"], width)
+                reduced = {name: values[keep] for name, values in columns.items()}
+            else:
+                reduced = bucket_ohlc(columns, width)
+
+            chart = {
+                "token": token,
+                "timeframe": timeframe,
+                "type": chart_type,
+                "total_points": len(columns["t"]),
+                "points": len(reduced["t"]),
+                **{name: values.tolist() for name, values in reduced.items()}
+            }
+
+        with self._lock:
+            # Keep only a few widths per series; clients rarely use more than one or two
+            if len(series.charts) >= MAX_CHARTS_PER_SERIES:
+                series.charts.pop(next(iter(series.charts)))
+            series.charts[chart_key] = chart
+
+        logger.debug(f"Built {chart_type} chart for {token} ({timeframe}): "
+                     f"{chart['points']} of {chart['total_points']} points")
+        return chart
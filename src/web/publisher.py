@@ -0,0 +1,275 @@
+"""
+Update publisher for the cryptocurrency trading agent web interface.
+This module pushes agent state to browsers over Socket.IO. Instead of sending
+the full state after every change, it keeps the last state sent for each token,
+coalesces changes made within a short window and emits only the fields that
+changed, as JSON merge patches (RFC 7386), to the clients subscribed to that token.
+"""
+
+import json
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import request
+from flask_socketio import SocketIO, join_room, leave_room
+from loguru import logger
+
+from metrics import metrics
+
+# Marker returned by diff() when nothing changed
+_UNCHANGED = object()
+
+# Room that every connected client joins for portfolio and agent status updates
+AGENT_ROOM = "agent"
+
+
+def token_room(symbol: str) -> str:
+    """Get the Socket.IO room name for a token's updates."""
+    return f"token:{symbol}"
+
+
+def diff(old: Any, new: Any) -> Any:
+    """
+    Compute a JSON merge patch that turns old into new.
+
+    Args:
+        old: Previous JSON-compatible value
+        new: Current JSON-compatible value
+
+    Returns:
+        Any: The merge patch, or _UNCHANGED if the values are equal.
+             Removed keys are set to None; lists are replaced as a whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = {}
+        for key, value in new.items():
+            if key not in old:
+                patch[key] = value
+            else:
+                change = diff(old[key], value)
+                if change is not _UNCHANGED:
+                    patch[key] = change
+
+        for key in old:
+            if key not in new:
+                patch[key] = None
+
+        return patch if patch else _UNCHANGED
+
+    return _UNCHANGED if old == new else new
+
+
+def _to_json_value(value: Any) -> Any:
+    """Convert a value to plain JSON types (and take a deep copy of it)."""
+    return json.loads(json.dumps(value, default=str))
+
+
+class UpdatePublisher:
+    """
+    Publishes coalesced, delta-encoded agent updates to Socket.IO rooms.
+
+    Clients join the agent room on connect and receive:
+    - agent_snapshot: the full current state for the tokens they subscribe to
+    - agent_update: merge patches for the portfolio, status and subscribed tokens
+
+    Frames larger than compress_threshold bytes are sent as zlib-compressed
+    binary ({"encoding": "deflate", "data": <bytes>}).
+    """
+
+    def __init__(self, socketio: SocketIO, window: float = 0.25, compress_threshold: int = 4096):
+        """
+        Initialize the publisher and register its Socket.IO handlers.
+
+        Args:
+            socketio: Socket.IO server to emit on
+            window: Seconds to wait after the first change before flushing, so
+                    that changes made in quick succession are sent together
+            compress_threshold: Frames larger than this many bytes are compressed
+                                (0 to disable compression)
+        """
+        self.socketio = socketio
+        self.window = window
+        self.compress_threshold = compress_threshold
+
+        # Tokens clients may subscribe to with "*" before their first analysis
+        self.known_tokens: List[str] = []
+
+        self._lock = threading.Lock()
+        self._current: Dict[str, Any] = {"tokens": {}, "portfolio": None, "status": {}}
+        self._sent: Dict[str, Any] = {"tokens": {}, "portfolio": None, "status": {}}
+        self._dirty_tokens = set()
+        self._dirty_agent = False
+        self._flush_scheduled = False
+
+        socketio.on_event("connect", self._on_connect)
+        socketio.on_event("subscribe", self._on_subscribe)
+        socketio.on_event("unsubscribe", self._on_unsubscribe)
+
+    def publish_token(self, symbol: str, result: Dict[str, Any]):
+        """
+        Record the latest analysis result for a token.
+
+        Args:
+            symbol: Token symbol
+            result: Strategy result for the token
+        """
+        value = _to_json_value(result)
+        with self._lock:
+            self._current["tokens"][symbol] = value
+            self._dirty_tokens.add(symbol)
+        self._schedule_flush()
+
+    def publish_portfolio(self, portfolio: Dict[str, Any]):
+        """
+        Record the latest portfolio value.
+
+        Args:
+            portfolio: Portfolio data from the wallet
+        """
+        value = _to_json_value(portfolio)
+        with self._lock:
+            self._current["portfolio"] = value
+            self._dirty_agent = True
+        self._schedule_flush()
+
+    def publish_status(self, **status):
+        """
+        Record agent status fields (e.g. agent_running, last_update).
+
+        Args:
+            **status: Status values to update
+        """
+        value = _to_json_value(status)
+        with self._lock:
+            self._current["status"].update(value)
+            self._dirty_agent = True
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Start a flush after the coalescing window unless one is already pending."""
+        with self._lock:
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        self.socketio.start_background_task(self._delayed_flush)
+
+    def _delayed_flush(self):
+        """Wait for the coalescing window, then flush."""
+        self.socketio.sleep(self.window)
+        self.flush()
+
+    def flush(self):
+        """Emit patches for everything that changed since the last flush."""
+        frames: List[tuple] = []
+        timestamp = datetime.utcnow().isoformat()
+
+        with self._lock:
+            self._flush_scheduled = False
+
+            for symbol in sorted(self._dirty_tokens):
+                current = self._current["tokens"][symbol]
+                patch = diff(self._sent["tokens"].get(symbol), current)
+                self._sent["tokens"][symbol] = current
+                if patch is not _UNCHANGED:
+                    frames.append((token_room(symbol), {"timestamp": timestamp, "analysis": {symbol: patch}}))
+
+            if self._dirty_agent:
+                frame: Dict[str, Any] = {"timestamp": timestamp}
+
+                patch = diff(self._sent["portfolio"], self._current["portfolio"])
+                if patch is not _UNCHANGED:
+                    frame["portfolio"] = patch
+
+                for key, value in self._current["status"].items():
+                    if self._sent["status"].get(key) != value:
+                        frame[key] = value
+
+                self._sent["portfolio"] = self._current["portfolio"]
+                self._sent["status"] = dict(self._current["status"])
+
+                if len(frame) > 1:
+                    frames.append((AGENT_ROOM, frame))
+
+            self._dirty_tokens.clear()
+            self._dirty_agent = False
+
+        for room, frame in frames:
+            self._emit("agent_update", frame, to=room)
+
+    def snapshot(self, tokens: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Get the last published state.
+
+        Args:
+            tokens: Token symbols to include (None for all)
+
+        Returns:
+            Dict: Full portfolio, status and analysis for the requested tokens
+        """
+        with self._lock:
+            sent_tokens = self._sent["tokens"]
+            symbols = sent_tokens.keys() if tokens is None else [t for t in tokens if t in sent_tokens]
+
+            state = {
+                "timestamp": datetime.utcnow().isoformat(),
+                "portfolio": self._sent["portfolio"],
+                "analysis": {symbol: sent_tokens[symbol] for symbol in symbols}
+            }
+            state.update(self._sent["status"])
+
+        return state
+
+    def _emit(self, event: str, payload: Dict[str, Any], **kwargs):
+        """Emit a payload, compressing it if it is large."""
+        data = json.dumps(payload, separators=(",", ":"))
+        size = len(data)
+
+        if self.compress_threshold and size > self.compress_threshold:
+            compressed = zlib.compress(data.encode("utf-8"), 6)
+            metrics.increment("agent_socketio_bytes_total", len(compressed), event=event, encoding="deflate")
+            self.socketio.emit(event, {"encoding": "deflate", "data": compressed}, **kwargs)
+        else:
+            metrics.increment("agent_socketio_bytes_total", size, event=event, encoding="json")
+            self.socketio.emit(event, payload, **kwargs)
+
+        metrics.increment("agent_socketio_frames_total", event=event)
+
+    def _on_connect(self, auth=None):
+        """Join new clients to the agent room and send them the current portfolio and status."""
+        join_room(AGENT_ROOM)
+        self._emit("agent_snapshot", self.snapshot(tokens=[]), to=request.sid)
+
+    def _on_subscribe(self, data: Optional[Dict[str, Any]] = None):
+        """
+        Subscribe the client to token updates and send it the full state of those tokens.
+
+        Args:
+            data: {"tokens": [symbols]} or {"tokens": "*"} for every token
+        """
+        tokens = self._requested_tokens(data)
+        for symbol in tokens:
+            join_room(token_room(symbol))
+
+        logger.debug(f"Client {request.sid} subscribed to {', '.join(tokens)}")
+        self._emit("agent_snapshot", self.snapshot(tokens), to=request.sid)
+
+    def _on_unsubscribe(self, data: Optional[Dict[str, Any]] = None):
+        """
+        Stop sending token updates to the client.
+
+        Args:
+            data: {"tokens": [symbols]} or {"tokens": "*"} for every token
+        """
+        for symbol in self._requested_tokens(data):
+            leave_room(token_room(symbol))
+
+    def _requested_tokens(self, data: Optional[Dict[str, Any]]) -> List[str]:
+        """Get the token symbols named in a subscribe/unsubscribe message."""
+        tokens = (data or {}).get("tokens", "*")
+        if tokens == "*":
+            with self._lock:
+                return sorted(set(self._current["tokens"]) | set(self.known_tokens))
+        return [str(t) for t in tokens]
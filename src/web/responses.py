@@ -0,0 +1,221 @@
+"""
+HTTP response helpers for the cryptocurrency trading agent web interface.
+This module serves versioned state with ETags, so clients that already have
+the current version get an empty 304 response, and encodes response bodies
+as JSON or msgpack, gzip-compressed when the client accepts it. Encoded
+bodies are cached by version, so a burst of requests for unchanged state is
+serialized only once.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, request
+
+from metrics import metrics
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are optional
+    msgpack = None
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+# Number of encoded bodies kept in the response cache
+RESPONSE_CACHE_SIZE = 256
+
+
+def select_fields(value: Any, fields: Iterable[str]) -> Any:
+    """
+    Keep only the given dotted paths of a nested dict.
+
+    Args:
+        value: Dict to filter
+        fields: Dotted paths to keep (e.g. analysis.combined_signal)
+
+    Returns:
+        Any: A new dict holding only the selected paths that exist
+    """
+    if not isinstance(value, dict):
+        return value
+
+    result: Dict[str, Any] = {}
+    selected: List[List[str]] = []
+
+    for field in sorted(fields, key=lambda f: f.count(".")):
+        parts = field.split(".")
+
+        # A parent path that is already selected includes this one
+        if any(parts[:len(prefix)] == prefix for prefix in selected):
+            continue
+
+        source = value
+        for part in parts:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+        else:
+            target = result
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = source
+            selected.append(parts)
+
+    return result
+
+
+def exclude_fields(value: Any, fields: Iterable[str]) -> Any:
+    """
+    Remove the given dotted paths from a nested dict.
+
+    Args:
+        value: Dict to filter
+        fields: Dotted paths to remove (e.g. analysis.sentiment_analysis.windows)
+
+    Returns:
+        Any: A copy of the dict without the excluded paths
+    """
+    if not isinstance(value, dict):
+        return value
+
+    tree: Dict[str, Any] = {}
+    for field in fields:
+        node = tree
+        parts = field.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+            if node is True:
+                break
+        else:
+            node[parts[-1]] = True
+
+    def prune(source: Dict[str, Any], node: Dict[str, Any]) -> Dict[str, Any]:
+        result = {}
+        for key, item in source.items():
+            rule = node.get(key)
+            if rule is True:
+                continue
+            result[key] = prune(item, rule) if isinstance(rule, dict) and isinstance(item, dict) else item
+        return result
+
+    return prune(value, tree)
+
+
+def parse_list(name: str) -> Optional[List[str]]:
+    """Get a comma-separated query parameter as a list (None if absent)."""
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+class VersionedResponder:
+    """
+    Builds ETag-aware responses for state identified by a version tag.
+    """
+
+    def __init__(self, cache_size: int = RESPONSE_CACHE_SIZE, gzip_min_size: int = GZIP_MIN_SIZE):
+        """
+        Initialize the responder.
+
+        Args:
+            cache_size: Number of encoded bodies to keep
+            gzip_min_size: Minimum body size in bytes to gzip
+        """
+        self.cache_size = cache_size
+        self.gzip_min_size = gzip_min_size
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[bytes, bool]]" = OrderedDict()
+
+    @staticmethod
+    def make_etag(*parts: Any) -> str:
+        """
+        Build an ETag from the state versions and request options a response depends on.
+
+        Args:
+            *parts: Values identifying the response (versions, query parameters)
+
+        Returns:
+            str: Strong ETag value (unquoted)
+        """
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+
+    def _negotiate(self) -> Tuple[str, bool]:
+        """Get the body format (json or msgpack) and whether to gzip it."""
+        fmt = "json"
+        if msgpack is not None and (request.args.get("format") == "msgpack" or
+                                    request.accept_mimetypes.best == MSGPACK_MIMETYPE):
+            fmt = "msgpack"
+
+        use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+        return fmt, use_gzip
+
+    def _encode(self, payload: Any, fmt: str, use_gzip: bool) -> Tuple[bytes, bool]:
+        """Serialize (and maybe compress) a payload."""
+        with metrics.timer("web.encode"):
+            if fmt == "msgpack":
+                body = msgpack.packb(payload, default=str)
+            else:
+                body = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+
+            compressed = use_gzip and len(body) >= self.gzip_min_size
+            if compressed:
+                body = gzip.compress(body, compresslevel=5)
+
+        return body, compressed
+
+    def respond(self, etag: str, build: Callable[[], Any]) -> Response:
+        """
+        Respond with the payload for a version, or 304 if the client has it.
+
+        The ETag sent is specific to the representation: the format and
+        compression are folded into the state's tag, so a client never
+        revalidates a gzip or msgpack body with the tag of another encoding.
+
+        Args:
+            etag: ETag of the current state (see make_etag)
+            build: Function that builds the payload; only called on a cache miss
+
+        Returns:
+            Response: 304, or 200 with the encoded payload
+        """
+        fmt, use_gzip = self._negotiate()
+        etag = self.make_etag(etag, fmt, use_gzip)
+        if request.if_none_match.contains(etag):
+            metrics.increment("agent_http_not_modified_total", endpoint=request.endpoint)
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+
+        with self._lock:
+            cached = self._cache.get(etag)
+            if cached is not None:
+                self._cache.move_to_end(etag)
+
+        if cached is not None:
+            metrics.increment("agent_cache_hits_total", cache="http_response")
+            body, compressed = cached
+        else:
+            metrics.increment("agent_cache_misses_total", cache="http_response")
+            body, compressed = self._encode(build(), fmt, use_gzip)
+            with self._lock:
+                self._cache[etag] = (body, compressed)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        response = Response(body, mimetype=MSGPACK_MIMETYPE if fmt == "msgpack" else "application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["Vary"] = "Accept, Accept-Encoding"
+        if compressed:
+            response.headers["Content-Encoding"] = "gzip"
+
+        return response
@@ -2,23 +2,56 @@
  * Main JavaScript file for the Crypto Trading Agent web interface
  */
 
+// Shared Socket.IO connection
+const socket = io();
+
+// Agent state kept up to date from agent_snapshot and agent_update frames
+const agentState = { portfolio: null, analysis: {} };
+const agentStateListeners = [];
+let subscribedTokens = [];
+let frameQueue = Promise.resolve();
+
+// Re-subscribe after a reconnect, since the server forgets our rooms
+socket.on('connect', function() {
+    if (subscribedTokens.length > 0) {
+        socket.emit('subscribe', { tokens: subscribedTokens });
+    }
+});
+
+// A snapshot replaces the state of the tokens it contains
+socket.on('agent_snapshot', function(data) {
+    queueFrame(data, function(frame) {
+        for (const key in frame) {
+            if (key === 'analysis') {
+                for (const token in frame.analysis) {
+                    agentState.analysis[token] = frame.analysis[token];
+                }
+            } else {
+                agentState[key] = frame[key];
+            }
+        }
+    });
+});
+
+// An update is a JSON merge patch against the current state
+socket.on('agent_update', function(data) {
+    queueFrame(data, function(frame) {
+        applyMergePatch(agentState, frame);
+    });
+});
+
 // Initialize when the document is ready
 $(document).ready(function() {
-    // Initialize Socket.IO
-    const socket = io();
-    
-    // Listen for agent updates
-    socket.on('agent_update', function(data) {
-        console.log('Received agent update:', data);
-        
+    // Keep the navbar in sync with agent updates
+    onAgentUpdate(function(state, frame) {
         // Update last update time
-        if (data.timestamp) {
-            updateLastUpdateTime(data.timestamp);
+        if (frame.timestamp) {
+            updateLastUpdateTime(frame.timestamp);
         }
         
         // Update agent status in the navbar
-        if (data.agent_running !== undefined) {
-            updateAgentStatus(data.agent_running);
+        if (frame.agent_running !== undefined) {
+            updateAgentStatus(frame.agent_running);
         }
     });
     
@@ -39,6 +72,81 @@ $(document).ready(function() {
     $('[data-bs-toggle="tooltip"]').tooltip();
 });
 
+/**
+ * Subscribe to updates for the given tokens
+ * @param {string[]|string} tokens - Token symbols, or '*' for every token
+ */
+function subscribeTokens(tokens) {
+    subscribedTokens = tokens;
+    socket.emit('subscribe', { tokens: tokens });
+}
+
+/**
+ * Register a listener for agent state changes
+ * @param {function} listener - Called with (agentState, frame) after each frame is applied
+ */
+function onAgentUpdate(listener) {
+    agentStateListeners.push(listener);
+}
+
+/**
+ * Decode a frame and apply it in arrival order, then notify listeners
+ * @param {object} data - Frame as received from the server
+ * @param {function} apply - Applies the decoded frame to agentState
+ */
+function queueFrame(data, apply) {
+    frameQueue = frameQueue
+        .then(function() { return decodeFrame(data); })
+        .then(function(frame) {
+            apply(frame);
+            agentStateListeners.forEach(function(listener) {
+                listener(agentState, frame);
+            });
+        })
+        .catch(function(error) {
+            console.error('Error applying agent update:', error);
+        });
+}
+
+/**
+ * Decode a frame, decompressing it if the server sent it deflated
+ * @param {object} data - Frame as received from the server
+ * @returns {Promise<object>} Decoded frame
+ */
+function decodeFrame(data) {
+    if (!data || data.encoding !== 'deflate') {
+        return Promise.resolve(data);
+    }
+    
+    const stream = new Blob([data.data]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return new Response(stream).text().then(JSON.parse);
+}
+
+/**
+ * Apply a JSON merge patch (RFC 7386) to an object in place
+ * @param {object} target - Object to update
+ * @param {object} patch - Patch where null removes a key
+ * @returns {object} The updated target
+ */
+function applyMergePatch(target, patch) {
+    for (const key in patch) {
+        const value = patch[key];
+        
+        if (value === null) {
+            delete target[key];
+        } else if (typeof value === 'object' && !Array.isArray(value)) {
+            if (typeof target[key] !== 'object' || target[key] === null || Array.isArray(target[key])) {
+                target[key] = {};
+            }
+            applyMergePatch(target[key], value);
+        } else {
+            target[key] = value;
+        }
+    }
+    
+    return target;
+}
+
 /**
  * Check the current status of the trading agent
  */
@@ -158,6 +266,181 @@ function stopAgent() {
     });
 }
 
+/**
+ * Load chart data for a token and draw it as a price line
+ * @param {string} elementId - ID of the chart container
+ * @param {string} token - Token symbol
+ * @param {string} timeframe - Candle timeframe (default: 1h)
+ */
+function loadPriceChart(elementId, token, timeframe = '1h') {
+    const container = $('#' + elementId);
+    const width = Math.max(Math.round(container.width()), 100);
+    
+    $.ajax({
+        url: `/api/chart/${token}`,
+        type: 'GET',
+        data: { timeframe: timeframe, width: width },
+        success: function(response) {
+            if (response.t && response.t.length > 0) {
+                const data = [{
+                    x: response.t,
+                    y: response.c,
+                    mode: 'lines',
+                    name: `${token} Price`,
+                    line: { color: 'blue', width: 2 }
+                }];
+                
+                const layout = {
+                    title: `${token} Price Chart`,
+                    xaxis: { title: 'Date', type: 'date' },
+                    yaxis: { title: 'Price' },
+                    height: container.height()
+                };
+                
+                Plotly.newPlot(elementId, data, layout);
+            } else {
+                container.html('<div class="d-flex justify-content-center align-items-center h-100"><p class="text-muted">No chart data available</p></div>');
+            }
+        },
+        error: function() {
+            container.html('<div class="d-flex justify-content-center align-items-center h-100"><p class="text-muted">Error loading chart</p></div>');
+        }
+    });
+}
+
+/**
+ * Load the rolling signal history of a token and draw the signal strengths,
+ * with the trades taken marked on the combined strength line
+ * @param {string} elementId - ID of the chart container
+ * @param {string} token - Token symbol
+ * @param {number} limit - Maximum number of recent points (optional)
+ */
+function loadSignalChart(elementId, token, limit) {
+    const container = $('#' + elementId);
+    
+    $.ajax({
+        url: `/api/signals/${token}`,
+        type: 'GET',
+        data: limit ? { limit: limit } : {},
+        success: function(response) {
+            if (response.t && response.t.length > 0) {
+                const times = response.t.map(t => new Date(t * 1000));
+                const trades = response.action
+                    .map((action, i) => ({ action: action, i: i }))
+                    .filter(point => point.action !== 'none');
+                
+                const data = [
+                    {
+                        x: times,
+                        y: response.combined_strength,
+                        mode: 'lines',
+                        name: 'Combined',
+                        line: { color: 'blue', width: 2 }
+                    },
+                    {
+                        x: times,
+                        y: response.tech_strength,
+                        mode: 'lines',
+                        name: 'Technical',
+                        line: { color: 'gray', width: 1 }
+                    },
+                    {
+                        x: times,
+                        y: response.sentiment_score.map(score => score === null ? null : score * 100),
+                        mode: 'lines',
+                        name: 'Sentiment (x100)',
+                        line: { color: 'orange', width: 1 }
+                    },
+                    {
+                        x: trades.map(point => times[point.i]),
+                        y: trades.map(point => response.combined_strength[point.i] ?? 0),
+                        text: trades.map(point => formatSignal(point.action)),
+                        mode: 'markers',
+                        name: 'Trades',
+                        marker: {
+                            size: 10,
+                            color: trades.map(point => point.action === 'buy' ? 'green' : 'red')
+                        }
+                    }
+                ];
+                
+                const layout = {
+                    title: `${token} Signal History`,
+                    xaxis: { title: 'Date', type: 'date' },
+                    yaxis: { title: 'Strength', range: [-100, 100] },
+                    height: container.height()
+                };
+                
+                Plotly.newPlot(elementId, data, layout);
+            } else {
+                container.html('<div class="d-flex justify-content-center align-items-center h-100"><p class="text-muted">No signal history available</p></div>');
+            }
+        },
+        error: function() {
+            container.html('<div class="d-flex justify-content-center align-items-center h-100"><p class="text-muted">Error loading signal history</p></div>');
+        }
+    });
+}
+
+/**
+ * Load the daily portfolio value and PnL of several chains into a chart
+ * @param {string} elementId - Chart container element ID
+ * @param {Array<string>} chains - Chain names
+ * @param {number} days - Number of days to show
+ */
+function loadPortfolioHistoryChart(elementId, chains, days) {
+    const container = $('#' + elementId);
+    const requests = chains.map(chain => $.ajax({
+        url: '/api/portfolio/daily',
+        type: 'GET',
+        data: { chain: chain, days: days || 30 }
+    }));
+    
+    $.when(...requests).done(function(...responses) {
+        // $.when passes the response itself for one request and [data, status, xhr] for several
+        const results = requests.length === 1 ? [responses[0]] : responses.map(response => response[0]);
+        const data = [];
+        
+        results.forEach(result => {
+            if (!result.days || result.days.length === 0) {
+                return;
+            }
+            const dates = result.days.map(day => day.date);
+            data.push({
+                x: dates,
+                y: result.days.map(day => day.value_usd),
+                mode: 'lines',
+                name: `${result.chain} value`
+            });
+            data.push({
+                x: dates,
+                y: result.days.map(day => day.pnl_usd),
+                type: 'bar',
+                name: `${result.chain} PnL`,
+                yaxis: 'y2',
+                opacity: 0.5
+            });
+        });
+        
+        if (data.length === 0) {
+            container.html('<div class="d-flex justify-content-center align-items-center h-100"><p class="text-muted">No portfolio history available</p></div>');
+            return;
+        }
+        
+        const layout = {
+            title: 'Portfolio Value per Day',
+            xaxis: { title: 'Date', type: 'date' },
+            yaxis: { title: 'Value (USD)' },
+            yaxis2: { title: 'PnL (USD)', overlaying: 'y', side: 'right' },
+            height: container.height()
+        };
+        
+        Plotly.newPlot(elementId, data, layout);
+    }).fail(function() {
+        container.html('<div class="d-flex justify-content-center align-items-center h-100"><p class="text-muted">Error loading portfolio history</p></div>');
+    });
+}
+
 /**
  * Format a datetime string
  * @param {string} isoString - ISO timestamp string
@@ -0,0 +1,246 @@
+"""
+X.com search client module for the cryptocurrency trading agent.
+This module sends recent-search requests from one asyncio event loop with a
+pooled aiohttp session, so the searches of several tokens share connections
+and run concurrently. A search follows the next_token pagination until it has
+the requested number of tweets (the API returns at most 100 per page), and the
+authors of the users expansion are kept in a bounded cache shared by every
+page and search.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from metrics import metrics
+
+try:
+    import aiohttp
+except ImportError:  # the async client is optional; searches then go through tweepy
+    aiohttp = None
+
+# Recent search endpoint of the X API v2
+SEARCH_URL = "https://api.twitter.com/2/tweets/search/recent"
+
+# Default client settings (overridden by the "x_search" config section)
+DEFAULT_SETTINGS = {
+    "page_size": 100,
+    "max_pages": 5,
+    "concurrency": 4,
+    "timeout_seconds": 10,
+    "user_cache_size": 10000
+}
+
+
+def tweet_data(tweet: Dict[str, Any], user: Optional[Dict[str, Any]], influencers: Iterable[str]) -> Dict[str, Any]:
+    """
+    Convert an API v2 tweet to the format of SentimentAnalyzer.search_tweets.
+
+    Args:
+        tweet: Tweet object of the API response
+        user: Its author from the users expansion (None if unknown)
+        influencers: Usernames marked as influencers
+
+    Returns:
+        Dict: Tweet data
+    """
+    public_metrics = tweet.get("public_metrics", {})
+    created_at = tweet.get("created_at")
+    data = {
+        'id': int(tweet["id"]),
+        'text': tweet["text"],
+        'created_at': datetime.fromisoformat(created_at.replace("Z", "+00:00")) if created_at else None,
+        'retweet_count': public_metrics.get('retweet_count', 0),
+        'like_count': public_metrics.get('like_count', 0),
+        'reply_count': public_metrics.get('reply_count', 0),
+        'author_id': int(tweet["author_id"]) if tweet.get("author_id") else None,
+    }
+
+    if user:
+        data.update({
+            'username': user["username"],
+            'followers_count': user.get("public_metrics", {}).get("followers_count", 0),
+            'is_influencer': user["username"] in influencers
+        })
+    return data
+
+
+class UserCache:
+    """
+    A bounded, least recently used map of author id to user data.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SETTINGS["user_cache_size"]):
+        """
+        Initialize an empty cache.
+
+        Args:
+            capacity: Maximum number of users kept
+        """
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def update(self, users: Iterable[Dict[str, Any]]):
+        """Add or refresh users (as found in includes.users)."""
+        with self._lock:
+            for user in users:
+                self._users[str(user["id"])] = user
+                self._users.move_to_end(str(user["id"]))
+            while len(self._users) > self.capacity:
+                self._users.popitem(last=False)
+
+    def get(self, author_id: Any) -> Optional[Dict[str, Any]]:
+        """Get a user by id (None if not cached)."""
+        with self._lock:
+            user = self._users.get(str(author_id))
+            if user is not None:
+                self._users.move_to_end(str(author_id))
+            return user
+
+
+class AsyncSearchClient:
+    """
+    Paginated recent search over a pooled aiohttp session.
+
+    The session lives on an event loop in a background thread, so callers on
+    any thread can use search() and searches from different threads overlap.
+    Each page is one request: its rate-limit headers are passed to the fetch
+    scheduler, and a rate-limited page ends the search with the tweets found
+    so far.
+    """
+
+    def __init__(self, bearer_token: str, settings: Optional[Dict[str, Any]] = None, fetch_scheduler=None,
+                 influencers: Iterable[str] = (), url: str = SEARCH_URL):
+        """
+        Initialize the client.
+
+        Args:
+            bearer_token: App bearer token of the X API
+            settings: Client settings (see DEFAULT_SETTINGS)
+            fetch_scheduler: FetchScheduler following the quota (optional)
+            influencers: Usernames marked as influencers in the tweets
+            url: Recent search endpoint (e.g. a local stand-in server)
+
+        Raises:
+            RuntimeError: If aiohttp is not installed
+        """
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for the async X.com search client")
+
+        self.bearer_token = bearer_token
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.fetch_scheduler = fetch_scheduler
+        self.influencers = set(influencers)
+        self.url = url
+        self.users = UserCache(self.settings["user_cache_size"])
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session = None
+        self._start_lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        """Get the client's event loop, starting its thread on first use."""
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="x-search", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _get_session(self):
+        """Get the pooled session, creating it on first use (called on the client's loop)."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.settings["concurrency"], ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.settings["timeout_seconds"]),
+                headers={"Authorization": f"Bearer {self.bearer_token}"}
+            )
+        return self._session
+
+    async def _search(self, query: str, max_results: int, start_time: Optional[datetime]) -> Optional[List[Dict[str, Any]]]:
+        """Collect the pages of a search (see search)."""
+        session = self._get_session()
+        page_size = max(10, min(self.settings["page_size"], 100))
+        params = {
+            "query": query,
+            "tweet.fields": "created_at,public_metrics,author_id",
+            "user.fields": "username,name,public_metrics",
+            "expansions": "author_id"
+        }
+        if start_time is not None:
+            params["start_time"] = start_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        tweets: List[Dict[str, Any]] = []
+        next_token = None
+        for page in range(self.settings["max_pages"]):
+            params["max_results"] = max(10, min(page_size, max_results - len(tweets)))
+            if next_token:
+                params["next_token"] = next_token
+
+            metrics.increment("agent_api_calls_total", api="x", endpoint="search_recent_tweets")
+            try:
+                async with session.get(self.url, params=params) as response:
+                    if self.fetch_scheduler is not None:
+                        if response.status == 429:
+                            self.fetch_scheduler.rate_limited(response.headers)
+                        else:
+                            self.fetch_scheduler.update(response.headers)
+                    response.raise_for_status()
+                    body = await response.json()
+            except Exception as e:
+                metrics.increment("agent_api_errors_total", api="x", endpoint="search_recent_tweets")
+                logger.error(f"Error searching tweets (page {page + 1}): {str(e)}")
+                # Earlier pages are still a sample, only a failed first page is a failed search
+                return tweets or None
+
+            self.users.update(body.get("includes", {}).get("users", []))
+            tweets.extend(tweet_data(tweet, self.users.get(tweet.get("author_id")), self.influencers)
+                          for tweet in body.get("data", []))
+
+            next_token = body.get("meta", {}).get("next_token")
+            if not next_token or len(tweets) >= max_results:
+                break
+
+        return tweets[:max_results]
+
+    def search(self, query: str, max_results: int = 100,
+               start_time: Optional[datetime] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Search recent tweets, following the pagination up to max_results tweets.
+
+        Args:
+            query: The search query
+            max_results: Maximum number of tweets to retrieve (at most max_pages pages)
+            start_time: Earliest creation time (UTC) of the tweets
+
+        Returns:
+            List[Dict]: Tweets in the format of SentimentAnalyzer.search_tweets (None if the search failed)
+        """
+        future = asyncio.run_coroutine_threadsafe(self._search(query, max_results, start_time), self._start())
+        return future.result()
+
+    def close(self):
+        """Close the session and stop the client's event loop."""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def shutdown():
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
@@ -0,0 +1,238 @@
+"""
+X.com filtered stream module for the cryptocurrency trading agent.
+This module keeps one filtered-stream connection open for all tokens. Its
+rules are built from each token's search terms and the tracked influencers,
+and every tweet is handed to a callback as it arrives, tagged with the rules
+it matched. A dropped or stalled connection is reopened with exponential
+backoff, asking the API to resend the tweets of the last backfill_minutes,
+and a longer outage is reported so the gap can be filled by a search.
+"""
+
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+from loguru import logger
+
+from metrics import metrics
+from x_search import UserCache, tweet_data
+
+# Filtered stream endpoint of the X API v2 (its rules are at STREAM_URL + "/rules")
+STREAM_URL = "https://api.twitter.com/2/tweets/search/stream"
+
+# Tag of the rule that matches the tracked influencers' tweets
+INFLUENCER_TAG = "influencers"
+
+# Longest outage the API can backfill on reconnect
+MAX_BACKFILL_MINUTES = 5
+
+# Default stream settings (overridden by the "x_stream" config section)
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "url": STREAM_URL,
+    "stall_seconds": 30,
+    "reconnect_min_seconds": 1,
+    "reconnect_max_seconds": 60,
+    "backfill_minutes": 5,
+    "user_cache_size": 10000
+}
+
+
+def build_rules(queries: Dict[str, str], influencers: Iterable[str] = ()) -> List[Dict[str, str]]:
+    """
+    Get the stream rules of the tokens' queries and the tracked influencers.
+
+    Args:
+        queries: Search query by token symbol (the symbol is the rule's tag)
+        influencers: Usernames whose tweets are streamed
+
+    Returns:
+        List[Dict]: Rules as {"value", "tag"}
+    """
+    rules = [{"value": query, "tag": symbol} for symbol, query in queries.items()]
+    influencers = list(influencers)
+    if influencers:
+        rules.append({"value": " OR ".join(f"from:{username}" for username in influencers), "tag": INFLUENCER_TAG})
+    return rules
+
+
+class FilteredStream:
+    """
+    A filtered-stream connection in a background thread.
+
+    on_tweet(tags, tweet) is called from the stream's thread for every tweet,
+    with the tags of the rules it matched and the tweet in the format of
+    SentimentAnalyzer.search_tweets. on_gap(since) is called after a
+    reconnect when the outage was longer than the API can backfill.
+    """
+
+    def __init__(self, bearer_token: str, rules: List[Dict[str, str]],
+                 on_tweet: Callable[[List[str], Dict[str, Any]], None],
+                 settings: Optional[Dict[str, Any]] = None, influencers: Iterable[str] = (),
+                 on_gap: Optional[Callable[[datetime], None]] = None):
+        """
+        Initialize the stream.
+
+        Args:
+            bearer_token: App bearer token of the X API
+            rules: Stream rules (see build_rules)
+            on_tweet: Called with the matched tags and the tweet data of each tweet
+            settings: Stream settings (see DEFAULT_SETTINGS)
+            influencers: Usernames marked as influencers in the tweets
+            on_gap: Called with the start of an outage too long to backfill
+        """
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.url = self.settings["url"]
+        self.rules = rules
+        self.on_tweet = on_tweet
+        self.on_gap = on_gap
+        self.influencers = set(influencers)
+        self.users = UserCache(self.settings["user_cache_size"])
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {bearer_token}"
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._response: Optional[requests.Response] = None
+        self._lock = threading.Lock()
+        self.connected = False
+        self.connections = 0
+        self.tweets = 0
+        self._last_message = 0.0
+        self._disconnected_at: Optional[datetime] = None
+
+    @property
+    def healthy(self) -> bool:
+        """Check whether the stream is connected and has sent data or a keep-alive recently."""
+        with self._lock:
+            return self.connected and time.monotonic() - self._last_message <= self.settings["stall_seconds"]
+
+    def sync_rules(self):
+        """Replace the stream's rules with this stream's rules, leaving matching ones in place."""
+        rules_url = self.url + "/rules"
+        response = self.session.get(rules_url, timeout=10)
+        response.raise_for_status()
+        existing = response.json().get("data") or []
+
+        wanted = {(rule["value"], rule["tag"]) for rule in self.rules}
+        stale = [rule["id"] for rule in existing if (rule["value"], rule.get("tag")) not in wanted]
+        present = {(rule["value"], rule.get("tag")) for rule in existing}
+        missing = [rule for rule in self.rules if (rule["value"], rule["tag"]) not in present]
+
+        if stale:
+            self.session.post(rules_url, json={"delete": {"ids": stale}}, timeout=10).raise_for_status()
+        if missing:
+            self.session.post(rules_url, json={"add": missing}, timeout=10).raise_for_status()
+        logger.info(f"Stream rules synced ({len(missing)} added, {len(stale)} removed)")
+
+    def start(self):
+        """Sync the rules and start following the stream."""
+        if self._thread is not None:
+            return
+        self.sync_rules()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="x-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Close the connection and stop the stream's thread."""
+        self._stop.set()
+        with self._lock:
+            response = self._response
+        if response is not None:
+            response.close()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        """Follow the stream, reconnecting with exponential backoff until stopped."""
+        backoff = self.settings["reconnect_min_seconds"]
+        while not self._stop.is_set():
+            try:
+                received = self._consume()
+            except Exception as e:
+                received = False
+                if not self._stop.is_set():
+                    metrics.increment("agent_api_errors_total", api="x", endpoint="filtered_stream")
+                    logger.warning(f"X filtered stream disconnected: {str(e)}")
+
+            with self._lock:
+                self.connected = False
+                self._response = None
+            if self._disconnected_at is None:
+                self._disconnected_at = datetime.utcnow()
+
+            # A connection that delivered something starts the backoff over
+            backoff = self.settings["reconnect_min_seconds"] if received else \
+                min(backoff * 2, self.settings["reconnect_max_seconds"])
+            self._stop.wait(backoff * random.uniform(0.5, 1.0))
+
+    def _consume(self) -> bool:
+        """
+        Read the stream until it ends, stalls or the stream is stopped.
+
+        Returns:
+            bool: Whether any line (tweet or keep-alive) was received
+        """
+        params = {
+            "tweet.fields": "created_at,public_metrics,author_id",
+            "user.fields": "username,name,public_metrics",
+            "expansions": "author_id"
+        }
+
+        # After an outage, the API resends what it can and the rest is searched for
+        gap_since = self._disconnected_at
+        backfill = min(self.settings["backfill_minutes"], MAX_BACKFILL_MINUTES)
+        if gap_since is not None and backfill:
+            params["backfill_minutes"] = backfill
+
+        metrics.increment("agent_api_calls_total", api="x", endpoint="filtered_stream")
+        response = self.session.get(self.url, params=params, stream=True,
+                                    timeout=(10, self.settings["stall_seconds"]))
+        response.raise_for_status()
+        with self._lock:
+            self._response = response
+            self.connected = True
+            self.connections += 1
+            self._last_message = time.monotonic()
+        logger.info("Connected to the X filtered stream")
+
+        if gap_since is not None:
+            self._disconnected_at = None
+            if self.on_gap is not None and datetime.utcnow() - gap_since > timedelta(minutes=backfill):
+                self.on_gap(gap_since)
+
+        received = False
+        with response:
+            for line in response.iter_lines():
+                if self._stop.is_set():
+                    break
+                received = True
+                with self._lock:
+                    self._last_message = time.monotonic()
+                # Empty lines are keep-alives
+                if line:
+                    self._handle(json.loads(line))
+        return received
+
+    def _handle(self, message: Dict[str, Any]):
+        """Pass one stream message's tweet to on_tweet."""
+        tweet = message.get("data")
+        if not tweet:
+            if "errors" in message:
+                logger.warning(f"X filtered stream error: {message['errors']}")
+            return
+
+        self.users.update(message.get("includes", {}).get("users", []))
+        tags = [rule.get("tag") for rule in message.get("matching_rules", [])]
+        self.tweets += 1
+        try:
+            self.on_tweet(tags, tweet_data(tweet, self.users.get(tweet.get("author_id")), self.influencers))
+        except Exception as e:
+            logger.error(f"Error handling streamed tweet {tweet.get('id')}: {str(e)}")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Stand-in X.com filtered stream server for offline runs and tests.
+This module serves the filtered stream and its rules endpoint locally. Rules
+are matched the way the agent writes them (quoted terms and from:username
+joined by OR), published tweets are sent to every open connection with their
+matching rules and author, and keep-alive lines are sent while idle. Run it
+with --rate to stream synthetic tweets, and point x_stream.url at it.
+"""
+
+import argparse
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Path of the stream on the stand-in server (the same as on the API)
+STREAM_PATH = "/2/tweets/search/stream"
+
+
+def rule_matches(value: str, text: str, username: str) -> bool:
+    """Check whether a rule of OR-ed quoted terms and from:username operators matches a tweet."""
+    for term in value.split(" OR "):
+        term = term.strip()
+        if term.startswith("from:"):
+            if term[5:].lower() == username.lower():
+                return True
+        elif term.strip('"').lower() in text.lower():
+            return True
+    return False
+
+
+class StandInStreamServer:
+    """
+    A local filtered stream: rules, connections and published tweets.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, keepalive_seconds: float = 20):
+        """
+        Initialize the server (not yet serving).
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 for any free port)
+            keepalive_seconds: Seconds between keep-alive lines on an idle connection
+        """
+        self.keepalive_seconds = keepalive_seconds
+        self.rules: List[Dict[str, str]] = []
+        self.connects: List[Dict[str, str]] = []
+        self._ids = itertools.count(1)
+        self._tweet_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._clients: List["queue.Queue[Optional[bytes]]"] = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Get the URL of the stream (the x_stream.url setting)."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{STREAM_PATH}"
+
+    @property
+    def connections(self) -> int:
+        """Get the number of open stream connections."""
+        with self._lock:
+            return len(self._clients)
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="x-stream-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Close the connections and stop serving."""
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self):
+        """Close every open stream connection (the clients should reconnect)."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.put(None)
+
+    def publish(self, text: str, username: str = "user", followers: int = 100, like_count: int = 0,
+                retweet_count: int = 0, created_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Send a tweet to every connection, if it matches any rule.
+
+        Returns:
+            Dict: The stream message (its matching_rules is empty if nothing matched, and then nothing is sent)
+        """
+        author_id = str(abs(hash(username)) % 10 ** 12)
+        created_at = created_at or datetime.utcnow()
+        with self._lock:
+            matching = [{"id": rule["id"], "tag": rule["tag"]} for rule in self.rules
+                        if rule_matches(rule["value"], text, username)]
+        message = {
+            "data": {
+                "id": str(next(self._tweet_ids)),
+                "text": text,
+                "author_id": author_id,
+                "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "public_metrics": {"retweet_count": retweet_count, "like_count": like_count, "reply_count": 0}
+            },
+            "includes": {"users": [{"id": author_id, "username": username, "name": username,
+                                    "public_metrics": {"followers_count": followers}}]},
+            "matching_rules": matching
+        }
+
+        if matching:
+            line = json.dumps(message).encode() + b"\r\n"
+            with self._lock:
+                for client in self._clients:
+                    client.put(line)
+        return message
+
+    def _handler(self):
+        """Get the request handler class bound to this server."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == STREAM_PATH + "/rules":
+                    with server._lock:
+                        rules = list(server.rules)
+                    self._json(200, {"data": rules, "meta": {"result_count": len(rules)}})
+                elif parsed.path == STREAM_PATH:
+                    self._stream({key: values[0] for key, values in parse_qs(parsed.query).items()})
+                else:
+                    self._json(404, {"title": "Not Found"})
+
+            def do_POST(self):
+                if urlparse(self.path).path != STREAM_PATH + "/rules":
+                    self._json(404, {"title": "Not Found"})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    deleted = set(body.get("delete", {}).get("ids", []))
+                    server.rules = [rule for rule in server.rules if rule["id"] not in deleted]
+                    added = [{"id": str(next(server._ids)), "value": rule["value"], "tag": rule.get("tag")}
+                             for rule in body.get("add", [])]
+                    server.rules.extend(added)
+                self._json(200, {"data": added, "meta": {"summary": {"created": len(added),
+                                                                      "deleted": len(deleted)}}})
+
+            def _stream(self, params: Dict[str, str]):
+                # Like the API, every line is sent as its own chunk, so clients get it without waiting for more
+                client: "queue.Queue[Optional[bytes]]" = queue.Queue()
+                with server._lock:
+                    server._clients.append(client)
+                    server.connects.append(params)
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    while True:
+                        try:
+                            line = client.get(timeout=server.keepalive_seconds)
+                        except queue.Empty:
+                            line = b"\r\n"
+                        if line is None:
+                            self.wfile.write(b"0\r\n\r\n")
+                            break
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    with server._lock:
+                        if client in server._clients:
+                            server._clients.remove(client)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    """Serve a stand-in stream, optionally publishing synthetic tweets."""
+    parser = argparse.ArgumentParser(description="Stand-in X.com filtered stream server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8099, help="Port to listen on")
+    parser.add_argument("--rate", type=float, default=0, help="Synthetic tweets per second (0 for none)")
+    parser.add_argument("--tokens", type=str, default="ETH,BNB", help="Comma-separated symbols to tweet about")
+    args = parser.parse_args()
+
+    server = StandInStreamServer(args.host, args.port)
+    server.start()
+    print(f"Stand-in filtered stream at {server.url}")
+
+    texts = ["{} is going to the moon, great news", "Terrible day for {}, selling everything",
+             "Holding {} for now", "Bought more {}, amazing project"]
+    tokens = args.tokens.split(",")
+    try:
+        while True:
+            if args.rate > 0:
+                server.publish(random.choice(texts).format(random.choice(tokens)),
+                               username=f"user{random.randint(1, 500)}", followers=random.randint(10, 200000),
+                               like_count=random.randint(0, 200), retweet_count=random.randint(0, 50))
+                time.sleep(1 / args.rate)
+            else:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,11 @@ from wallet import BlockchainWallet
 from technical_analysis import TechnicalAnalyzer
 from sentiment_analysis import SentimentAnalyzer
 from trading_strategy import TradingStrategy
+from metrics import MetricsRegistry
+from state_store import StateStore
+from scheduler import EventScheduler
+from web.publisher import UpdatePublisher
+from web.chart_data import ChartDataService
 from loguru import logger
 
 
@@ -137,12 +142,1578 @@ def test_trading_strategy(config_path):
         position_size = strategy._calculate_position_size(token, Decimal("10000"))
         print(f"✅ Position size calculation: {position_size}")
         
+        # A refresh requested while another is running for the token joins it instead of searching again
+        import threading
+        import time
+        searches = []
+        
+        def slow_analysis(token_symbol):
+            searches.append(token_symbol)
+            time.sleep(0.2)
+            return {"token": token_symbol, "sentiment": "neutral"}
+        
+        strategy.sentiment_analyzer.analyze_sentiment = slow_analysis
+        results = []
+        workers = [threading.Thread(target=lambda: results.append(strategy.refresh_sentiment("TEST")))
+                   for _ in range(3)]
+        for worker in workers:
+            worker.start()
+            time.sleep(0.02)
+        for worker in workers:
+            worker.join()
+        assert searches == ["TEST"], searches
+        assert len(results) == 3 and all(result is results[0] for result in results)
+        strategy.refresh_sentiment("TEST")
+        assert searches == ["TEST", "TEST"], "a refresh after the first one finished should search again"
+        print("✅ Concurrent sentiment refreshes share one search")
+        
         return True
     except Exception as e:
         print(f"❌ Trading strategy test failed: {str(e)}")
         return False
 
 
+def test_metrics(config_path):
+    """Test the metrics module."""
+    print("\n=== Testing Metrics Module ===")
+    
+    try:
+        registry = MetricsRegistry()
+        
+        # Record a stage timing and some counters
+        with registry.timer("analyze_token.technical"):
+            sum(range(1000))
+        registry.increment("agent_rpc_calls_total", chain="ethereum", method="eth_getBalance")
+        registry.increment("agent_rpc_calls_total", chain="ethereum", method="eth_getBalance")
+        
+        assert registry.counter_value("agent_rpc_calls_total", chain="ethereum", method="eth_getBalance") == 2
+        
+        snapshot = registry.snapshot()
+        assert snapshot["stages"]["analyze_token.technical"]["count"] == 1
+        print("✅ Stage timing and counters recorded")
+        
+        # Check the Prometheus exposition format
+        text = registry.render_prometheus()
+        assert 'agent_rpc_calls_total{chain="ethereum",method="eth_getBalance"} 2' in text
+        assert 'agent_stage_duration_seconds_count{stage="analyze_token.technical"} 1' in text
+        assert 'le="+Inf"' in text
+        print("✅ Prometheus rendering successful")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Metrics test failed: {str(e)}")
+        return False
+
+
+def test_scheduler(config_path):
+    """Test the event scheduler."""
+    print("\n=== Testing Scheduler Module ===")
+    
+    try:
+        import threading
+        import time
+        
+        scheduler = EventScheduler(max_workers=2, seed=0)
+        fast_runs = []
+        slow_started = threading.Event()
+        
+        def slow_job():
+            slow_started.set()
+            time.sleep(0.35)
+        
+        scheduler.add_job("fast", lambda: fast_runs.append(time.monotonic()), interval=0.05)
+        slow = scheduler.add_job("slow", slow_job, interval=0.1)
+        scheduler.start()
+        
+        time.sleep(0.5)
+        scheduler.stop(wait=True)
+        
+        assert len(fast_runs) >= 5, f"expected at least 5 fast runs, got {len(fast_runs)}"
+        assert slow_started.is_set()
+        assert slow.overruns > 0, "slow job should have overrun its interval"
+        print(f"✅ Ran {len(fast_runs)} fast jobs alongside an overrunning slow job")
+        
+        # A dedicated job keeps running while slow jobs hold every shared worker
+        scheduler = EventScheduler(max_workers=1)
+        release = threading.Event()
+        checks = []
+        scheduler.add_job("blocking", lambda: release.wait(2), interval=0.05)
+        scheduler.add_job("risk", lambda: checks.append(time.monotonic()), interval=0.05, dedicated=True)
+        scheduler.start()
+        time.sleep(0.5)
+        release.set()
+        scheduler.stop(wait=True)
+        assert len(checks) >= 5, f"expected at least 5 dedicated runs, got {len(checks)}"
+        print(f"✅ Dedicated job ran {len(checks)} times while the shared pool was busy")
+        
+        # Runs that are too late are dropped instead of executed
+        now = [0.0]
+        scheduler = EventScheduler(max_workers=1, clock=lambda: now[0])
+        stale = scheduler.add_job("stale", lambda: None, interval=10, max_lateness=1)
+        now[0] = 5.0
+        with scheduler._cond:
+            scheduler._dispatch(scheduler._heap[0][2], now[0])
+        scheduler.stop()
+        
+        assert stale.dropped == 1 and stale.runs == 0
+        assert stale.base_time == 10.0, "the next run should stay on the original time grid"
+        
+        # A run that was on time when submitted, but waited for a worker too long, is dropped too
+        queued = scheduler.add_job("queued", lambda: None, interval=10, max_lateness=1)
+        queued.running = True
+        now[0] = queued.next_run + 3
+        scheduler._run_job(queued, queued.next_run)
+        assert queued.dropped == 1 and queued.runs == 0 and not queued.running
+        print("✅ Stale runs dropped, when due and when picked up by a worker")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Scheduler test failed: {str(e)}")
+        return False
+
+
+def test_publisher(config_path):
+    """Test the web update publisher."""
+    print("\n=== Testing Update Publisher ===")
+    
+    try:
+        import time
+        import zlib
+        from flask import Flask
+        from flask_socketio import SocketIO
+        
+        app = Flask(__name__)
+        socketio = SocketIO(app)
+        publisher = UpdatePublisher(socketio, window=0.05, compress_threshold=2048)
+        
+        client = socketio.test_client(app)
+        client.emit("subscribe", {"tokens": ["ETH"]})
+        client.get_received()
+        
+        def received_updates():
+            time.sleep(0.2)
+            return [msg["args"][0] for msg in client.get_received() if msg["name"] == "agent_update"]
+        
+        result = {"action_taken": "none", "analysis": {"price": 100, "signal": "buy", "tweets": ["a", "b"]}}
+        publisher.publish_token("ETH", result)
+        publisher.publish_token("BTC", result)
+        updates = received_updates()
+        assert len(updates) == 1 and updates[0]["analysis"]["ETH"] == result, "expected one full ETH frame"
+        
+        # Coalesced changes arrive as a single frame holding only the changed fields
+        publisher.publish_token("ETH", {**result, "analysis": {**result["analysis"], "price": 101}})
+        publisher.publish_token("ETH", {**result, "analysis": {"price": 102, "signal": "buy"}})
+        updates = received_updates()
+        assert updates == [{"timestamp": updates[0]["timestamp"],
+                            "analysis": {"ETH": {"analysis": {"price": 102, "tweets": None}}}}]
+        print("✅ Coalesced delta sent to subscribed client only")
+        
+        # Large frames are compressed
+        publisher.publish_token("ETH", {"recent_tweets": ["to the moon"] * 1000})
+        updates = received_updates()
+        assert updates[0]["encoding"] == "deflate"
+        assert json.loads(zlib.decompress(updates[0]["data"]))["analysis"]["ETH"]["recent_tweets"][0] == "to the moon"
+        print("✅ Large frame compressed")
+        
+        client.disconnect()
+        return True
+    except Exception as e:
+        print(f"❌ Publisher test failed: {str(e)}")
+        return False
+
+
+def test_chart_data(config_path):
+    """Test the chart data service."""
+    print("\n=== Testing Chart Data Service ===")
+    
+    try:
+        strategy = TradingStrategy(config_path)
+        fetches = []
+        now = [1_700_000_000.0]
+        
+        def fetch_candles(token, timeframe, limit):
+            fetches.append((token, timeframe, limit))
+            candles = strategy._get_price_data(token, timeframe, limit)
+            candles[1234]["close"] = candles[1234]["high"] = 10 ** 6  # Spike that must stay visible
+            return candles
+        
+        service = ChartDataService(fetch_candles, history_days=90, clock=lambda: now[0])
+        
+        chart = service.get_chart("ETH", timeframe="1h", width=500)
+        assert chart["total_points"] == 2160 and chart["points"] == 500
+        assert len(chart["t"]) == len(chart["c"]) == 500
+        assert chart["t"] == sorted(chart["t"])
+        print(f"✅ Downsampled {chart['total_points']} candles to {chart['points']} points")
+        
+        # The spike survives downsampling
+        assert max(chart["c"]) == 10 ** 6
+        
+        candles = service.get_chart("ETH", timeframe="1h", width=100, chart_type="candles")
+        assert candles["points"] <= 100 and max(candles["h"]) == 10 ** 6
+        print("✅ Price extremes preserved")
+        
+        # Cached until the current candle closes
+        service.get_chart("ETH", timeframe="1h", width=800)
+        assert len(fetches) == 1
+        now[0] += 3600
+        service.get_chart("ETH", timeframe="1h", width=800)
+        assert len(fetches) == 2
+        print("✅ Series cached until the candle closes")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Chart data test failed: {str(e)}")
+        return False
+
+
+def test_state_store(config_path):
+    """Test the state store shared by the agent process and the web tier."""
+    print("\n=== Testing State Store ===")
+    
+    try:
+        import tempfile
+        import threading
+        import time
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.db")
+            writer = StateStore(path)
+            reader = StateStore(path, poll_interval=0.05)
+            
+            version = writer.set("analysis:ETH", {"action_taken": "none", "price": 100})
+            writer.set_many({"analysis:BTC": {"action_taken": "buy"}, "portfolio": {"chains": {}}})
+            
+            assert reader.get("analysis:ETH")["price"] == 100
+            assert set(reader.get_prefix("analysis:")) == {"ETH", "BTC"}
+            assert [key for key, _, _ in reader.changes_since(version)] == ["analysis:BTC", "portfolio"]
+            print("✅ Values shared between connections")
+            
+            # The watcher sees writes made through another connection
+            seen = []
+            changed = threading.Event()
+            stop = threading.Event()
+            
+            def on_change(key, value):
+                seen.append((key, value))
+                changed.set()
+            
+            reader.watch(on_change, stop_event=stop)
+            time.sleep(0.1)
+            writer.set("status", {"agent_running": True})
+            assert changed.wait(2), "watcher was not notified"
+            stop.set()
+            assert seen == [("status", {"agent_running": True})]
+            print("✅ Change notifications delivered")
+            
+            # Metrics exported by one process can be merged into another's output
+            agent_metrics = MetricsRegistry()
+            agent_metrics.increment("agent_trades_total", token="ETH")
+            writer.set("metrics", agent_metrics.export())
+            
+            combined = MetricsRegistry()
+            combined.merge(reader.get("metrics"), process="agent")
+            assert combined.counter_value("agent_trades_total", token="ETH", process="agent") == 1
+            print("✅ Agent metrics merged")
+            
+            writer.close()
+            reader.close()
+        
+        return True
+    except Exception as e:
+        print(f"❌ State store test failed: {str(e)}")
+        return False
+
+
+def test_http_caching(config_path):
+    """Test ETags and the bulk analysis endpoint of the web interface."""
+    print("\n=== Testing HTTP Caching ===")
+    
+    try:
+        import gzip
+        import tempfile
+        from web import app as web_app
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = StateStore(os.path.join(tmp, "state.db"))
+            web_app.state_store = store
+            client = web_app.app.test_client()
+            
+            tweets = [{"text": "to the moon"}] * 50
+            for symbol in ["ETH", "BNB"]:
+                store.set(f"analysis:{symbol}", {
+                    "action_taken": "none",
+                    "analysis": {
+                        "combined_signal": {"signal": "buy"},
+                        "sentiment_analysis": {"sentiment": "positive", "recent_tweets": tweets}
+                    }
+                })
+            
+            response = client.get("/api/analysis/ETH")
+            etag = response.headers["ETag"]
+            assert response.status_code == 200 and response.json["action_taken"] == "none"
+            assert client.get("/api/analysis/ETH", headers={"If-None-Match": etag}).status_code == 304
+            
+            store.set("analysis:ETH", {"action_taken": "buy"})
+            response = client.get("/api/analysis/ETH", headers={"If-None-Match": etag})
+            assert response.status_code == 200 and response.headers["ETag"] != etag
+            print("✅ ETag revalidation returns 304 until the state changes")
+            
+            response = client.get("/api/analysis?tokens=BNB&fields=action_taken,analysis.combined_signal.signal")
+            assert response.json == {"BNB": {"action_taken": "none", "analysis": {"combined_signal": {"signal": "buy"}}}}
+            
+            response = client.get("/api/analysis?exclude=analysis.sentiment_analysis.recent_tweets")
+            assert set(response.json) == {"ETH", "BNB"}
+            assert "recent_tweets" not in response.json["BNB"]["analysis"]["sentiment_analysis"]
+            print("✅ Bulk analysis with field selection")
+            
+            response = client.get("/api/analysis", headers={"Accept-Encoding": "gzip"})
+            assert response.headers.get("Content-Encoding") == "gzip"
+            assert json.loads(gzip.decompress(response.data))["BNB"]["action_taken"] == "none"
+            
+            # Each encoding of the same state has its own ETag
+            gzip_etag = response.headers["ETag"]
+            response = client.get("/api/analysis", headers={"If-None-Match": gzip_etag})
+            assert response.status_code == 200 and response.headers["ETag"] != gzip_etag
+            assert response.json["BNB"]["action_taken"] == "none"
+            response = client.get("/api/analysis", headers={"If-None-Match": gzip_etag, "Accept-Encoding": "gzip"})
+            assert response.status_code == 304
+            
+            from web.responses import msgpack
+            if msgpack is not None:
+                response = client.get("/api/analysis?format=msgpack")
+                assert response.mimetype == "application/msgpack"
+                assert msgpack.unpackb(response.data)["BNB"]["action_taken"] == "none"
+                print("✅ Gzip and msgpack encodings")
+            else:
+                print("✅ Gzip encoding (msgpack not installed)")
+            
+            store.close()
+            web_app.state_store = None
+        
+        return True
+    except Exception as e:
+        print(f"❌ HTTP caching test failed: {str(e)}")
+        return False
+
+
+def test_records(config_path):
+    """Test the slotted analysis and trade records."""
+    print("\n=== Testing Records ===")
+    
+    try:
+        from datetime import datetime, timedelta
+        from decimal import Decimal
+        from records import CandleSeries, SentimentSummary, TradeRecord, StrategyResult, TechnicalSummary
+        
+        strategy = TradingStrategy(config_path)
+        strategy.trade_history = []
+        strategy._save_trade_history = lambda: None
+        
+        token = {"symbol": "TEST", "address": "0x0000000000000000000000000000000000000000", "chain": "ethereum"}
+        trade = strategy.execute_trade(token, "buy", Decimal("2.5"), 100.0)
+        assert not hasattr(trade, "__dict__")
+        
+        data = trade.to_dict()
+        assert data["amount"] == "2.5" and data["action"] == "buy" and data["value_usd"] == 250.0
+        assert TradeRecord.from_dict(json.loads(json.dumps(data))).to_dict() == data
+        print("✅ Trade records round-trip through their JSON form")
+        
+        portfolio_trades = {symbol: trade.to_dict() for symbol, trade in strategy.active_trades.items()}
+        assert portfolio_trades["TEST"]["stop_loss"] < portfolio_trades["TEST"]["entry_price"]
+        
+        signal = strategy._generate_combined_signal(
+            {"signals": {"overall_signal": "strong_buy", "signal_strength": 80}},
+            {"sentiment": "positive", "sentiment_score": 0.5}
+        )
+        assert signal.signal == "strong_buy" and signal.confidence == 0.8
+        factors = signal.to_dict()["factors"]
+        assert factors[0] == {"factor": "Technical Analysis", "signal": "Strong Buy", "contribution": 60.0}
+        assert factors[1]["score"] == 0.5
+        
+        # Stale sentiment weighs less as it ages, unknown sentiment not at all
+        technical = {"signals": {"overall_signal": "buy", "signal_strength": 50}}
+        searched = (datetime.utcnow() - timedelta(minutes=60)).isoformat()
+        stale = strategy._generate_combined_signal(
+            technical, {"sentiment": "positive", "sentiment_score": 0.5, "stale": True, "timestamp": searched})
+        assert abs(stale.strength - (30 + 10)) < 0.1 and abs(stale.confidence - 0.55) < 0.01
+        assert stale.to_dict()["factors"][1]["signal"] == "Positive (stale)"
+        unknown = strategy._generate_combined_signal(
+            technical, {"sentiment": "unknown", "sentiment_score": 0, "stale": True, "timestamp": searched})
+        assert unknown.strength == 30 and unknown.confidence == 0.3 and len(unknown.factors) == 1
+        print("✅ Stale sentiment down-weighted, unknown sentiment left out of the signal")
+        
+        result = StrategyResult("TEST", "ethereum", action_taken="buy", trade=trade).to_dict()
+        assert result["trade_details"] == data and "analysis" not in result
+        print("✅ Signals and strategy results serialize to the API shape")
+        
+        # Analyses are summarized into slotted fields and rebuilt as dicts only at the API edge
+        candles = strategy.get_candles("TEST", "1h", 200)
+        technical = strategy.technical_analyzer.analyze(candles, "1h")
+        technical["confirmations"] = {"4h": technical["signals"]}
+        summary = TechnicalSummary.from_dict(technical)
+        assert not hasattr(summary, "__dict__") and summary.indicator("rsi") == float(technical["indicators"]["rsi"])
+        assert json.dumps(summary.to_dict(), sort_keys=True, default=float) == \
+            json.dumps(technical, sort_keys=True, default=float)
+        tweets = [{"id": i, "text": "x" * 280, "username": "user", "like_count": i} for i in range(10)]
+        sentiment = strategy.sentiment_analyzer._stale_sentiment("TEST", "error")
+        sentiment.update(sentiment="positive", sentiment_score=0.4, tweet_count=12, unique_tweet_count=10,
+                         positive_count=6, negative_count=1, neutral_count=3, recent_tweets=tweets)
+        data = SentimentSummary.from_dict(sentiment).to_dict()
+        assert data["recent_tweet_ids"] == list(range(10)) and "recent_tweets" not in data
+        assert data["positive_percentage"] == 60.0 and data["stale_reason"] == "error"
+        assert data["windows"] == sentiment["windows"] and data["sentiment_score"] == 0.4
+        print("✅ Analyses kept as slotted summaries with tweet ids only")
+        
+        candles = [{"timestamp": i * 3600000, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10.0}
+                   for i in range(50)]
+        series = CandleSeries.from_candles(candles)
+        assert len(series) == 50 and series[49].to_dict() == candles[49]
+        assert list(series.to_frame().columns) == ["timestamp", "open", "high", "low", "close", "volume"]
+        print("✅ Candle series stores candles as columns")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Records test failed: {str(e)}")
+        return False
+
+
+def test_signal_history(config_path):
+    """Test the rolling per-token signal history."""
+    print("\n=== Testing Signal History ===")
+    
+    try:
+        import math
+        from signal_history import SignalHistory, SignalSeries
+        from records import AnalysisSnapshot, SentimentSummary, Signal, StrategyResult, TechnicalSignals, TechnicalSummary
+        
+        series = SignalSeries(capacity=100)
+        for i in range(250):
+            series.append(1000.0 + i, i % 50, 0.1, i - 100, "buy" if i % 10 == 0 else "none")
+        
+        assert len(series) == 100
+        window = series.window()
+        assert window["t"][0] == 1150.0 and window["t"][-1] == 1249.0
+        assert list(series.window(start=1200, end=1204)["t"]) == [1200.0, 1201.0, 1202.0, 1203.0, 1204.0]
+        assert list(series.window(limit=3)["t"]) == [1247.0, 1248.0, 1249.0]
+        print("✅ Ring buffer keeps the most recent points at a fixed capacity")
+        
+        data = series.to_dict(start=1240)
+        assert data["points"] == 10 and data["action"][0] == "buy" and data["combined_strength"][-1] == 149.0
+        assert SignalSeries.from_dict(json.loads(json.dumps(series.to_dict()))).to_dict() == series.to_dict()
+        
+        history = SignalHistory(capacity=10)
+        analysis = AnalysisSnapshot("ETH", "ethereum", TechnicalSummary(TechnicalSignals("buy", 40)),
+                                    SentimentSummary("ETH", "positive", 0.5), Signal("buy", 44.0, 0.8))
+        history.record(StrategyResult("ETH", "ethereum", analysis, "buy", timestamp=1.0))
+        history.record(StrategyResult("ETH", "ethereum", action_taken="stop_loss", timestamp=2.0))
+        
+        eth = history.to_dict("ETH")
+        assert eth["tech_strength"] == [40.0, None] and eth["action"] == ["buy", "stop_loss"]
+        assert history.to_dict("BTC") is None and not math.isnan(eth["combined_strength"][0])
+        print("✅ Strategy results recorded per token")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Signal history test failed: {str(e)}")
+        return False
+
+
+def test_resampler(config_path):
+    """Test multi-timeframe candles built from one base stream."""
+    print("\n=== Testing Candle Resampler ===")
+    
+    try:
+        from resampler import CandleResampler
+        
+        hour = 3600 * 1000
+        base = [{"timestamp": i * hour, "open": i, "high": i + 1, "low": i - 1, "close": i + 0.5, "volume": 1.0}
+                for i in range(48)]
+        
+        resampler = CandleResampler("1h", ["4h", "1d"])
+        resampler.extend(base[:47])
+        assert len(resampler.candles("4h", include_partial=False)) == 11
+        
+        # The forming candle is replaced, not added twice
+        resampler.add(dict(base[46], high=100.0))
+        closed = resampler.add(base[47])
+        assert closed == [("1h", dict(base[46], high=100.0))]
+        
+        four_hour = resampler.candles("4h")
+        assert len(four_hour) == 12 and four_hour[0] == {
+            "timestamp": 0, "open": 0.0, "high": 4.0, "low": -1.0, "close": 3.5, "volume": 4.0
+        }
+        day = resampler.candles("1d")
+        assert [c["timestamp"] for c in day] == [0, 24 * hour] and day[1]["high"] == 100.0
+        assert day[1]["volume"] == 24.0
+        print("✅ Higher timeframes aggregated incrementally, forming candle updated in place")
+        
+        strategy = TradingStrategy(config_path)
+        fetches = []
+        original_fetch = strategy._get_price_data
+        
+        def fetch(token, timeframe="1h", limit=200):
+            fetches.append((timeframe, limit))
+            return original_fetch(token, timeframe, limit)
+        
+        strategy._get_price_data = fetch
+        strategy.get_candles("ETH", "1h", 200)
+        assert len(strategy.get_candles("ETH", "4h", 100)) == 100
+        assert len(strategy.get_candles("ETH", "1d", 30)) == 30
+        assert fetches[0] == ("1h", strategy.market_data.history_candles) and all(limit <= 2 for _, limit in fetches[1:])
+        print("✅ Strategy fetches the base history once, then only new candles")
+        
+        analyzer = TechnicalAnalyzer(config_path)
+        analysis = analyzer.analyze(strategy.get_candles("ETH", "1d", 60), "1d")
+        assert analysis["timeframe"] == "1d" and analysis["price_data"]["change_7d"] is not None
+        print("✅ Technical analysis adapts its periods to the timeframe")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Resampler test failed: {str(e)}")
+        return False
+
+
+def test_indicators(config_path):
+    """Test the indicator dependency graph."""
+    print("\n=== Testing Indicator Graph ===")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from indicators import IndicatorGraph, build_plan, sma, rolling_std
+        
+        analyzer = TechnicalAnalyzer(config_path)
+        settings = dict(analyzer.settings("1h"), long_ma_period=20)
+        
+        graph, outputs = build_plan(settings)
+        assert outputs["bollinger_mavg"] == outputs["sma_20"]
+        assert outputs["macd"] in graph._nodes[outputs["macd_signal"]].inputs
+        print(f"✅ {len(outputs)} indicators share {len(graph)} graph nodes")
+        
+        calls = []
+        counting = IndicatorGraph()
+        std = rolling_std(counting, "close", 5)
+        mean = sma(counting, "close", 5)
+        spread = counting.add("spread", [mean, std], lambda m, d: calls.append(1) or m - d)
+        total = counting.add("total", [spread, spread], lambda a, b: a + b)
+        
+        close = pd.Series(np.arange(1.0, 21.0))
+        result = counting.evaluate(pd.DataFrame({"close": close}), {"total": total})
+        assert len(calls) == 1 and list(result.columns) == ["close", "total"]
+        expected = 2 * (close.rolling(5).mean() - close.rolling(5).std())
+        assert np.allclose(result["total"], expected, equal_nan=True)
+        print("✅ Shared nodes evaluated once, only requested columns materialized")
+        
+        candles = [{"timestamp": i * 3600000, "open": p, "high": p + 1, "low": p - 1, "close": p, "volume": 10.0}
+                   for i, p in enumerate(close.tolist() * 3)]
+        df = analyzer.preprocess_data(candles)
+        columns = analyzer.add_indicators(df, "1h", ("rsi", "volatility")).columns
+        assert list(columns) == ["open", "high", "low", "close", "volume", "rsi", "volatility"]
+        
+        return True
+    except Exception as e:
+        print(f"❌ Indicator graph test failed: {str(e)}")
+        return False
+
+
+def test_risk_monitor(config_path):
+    """Test the vectorized risk monitor."""
+    print("\n=== Testing Risk Monitor ===")
+    
+    try:
+        from decimal import Decimal
+        from records import ActiveTrade
+        from risk_monitor import RiskMonitor
+        
+        strategy = TradingStrategy(config_path)
+        prices = {"ETH": 100.0, "BTC": 1000.0}
+        monitor = RiskMonitor(strategy, lambda symbols: {s: prices[s] for s in symbols if s in prices})
+        assert monitor.check() == []
+        
+        strategy.active_trades["ETH"] = ActiveTrade(100.0, Decimal("1"), 95.0, 110.0)
+        strategy.active_trades["BTC"] = ActiveTrade(1000.0, Decimal("1"), 950.0, 1100.0)
+        strategy.active_trades["SOL"] = ActiveTrade(20.0, Decimal("1"), 19.0, 22.0)
+        strategy.positions_version += 1
+        assert monitor.check() == [] and monitor.symbols == ["ETH", "BTC", "SOL"]
+        print("✅ No triggers inside the levels, missing prices ignored")
+        
+        prices.update(ETH=94.0, BTC=1100.0)
+        assert monitor.check() == [("ETH", "stop_loss", 94.0), ("BTC", "take_profit", 1100.0)]
+        print("✅ Stop loss and take profit detected in one pass")
+        
+        del strategy.active_trades["ETH"]
+        assert len(monitor.check()) == 2
+        strategy.positions_version += 1
+        assert monitor.check() == [("BTC", "take_profit", 1100.0)]
+        print("✅ Levels reloaded only when the positions version changes")
+        
+        # The exit fills at the price that triggered it, not at a new quote
+        strategy._get_current_price = lambda token_symbol: 1200.0
+        btc = {"symbol": "BTC", "chain": "ethereum", "address": "0x" + "22" * 20}
+        result = strategy.check_risk(btc, record_history=False, current_price=1100.0)
+        assert result.action_taken == "take_profit" and result.trade.price == 1100.0, result.trade
+        print("✅ Take profit filled at the triggering price")
+        
+        # A failed exit is backed off instead of being retried on every check
+        import time
+        from records import TradeRecord
+        attempts = []
+        
+        def failing_sell(token_data, action, amount, price=None):
+            attempts.append(price)
+            return TradeRecord(token=token_data["symbol"], chain=token_data["chain"], action=action, amount=amount,
+                               price=price, value_usd=0.0, success=False, error="Insufficient liquidity")
+        
+        strategy.execute_trade = failing_sell
+        sol = {"symbol": "SOL", "chain": "solana", "address": "So11111111111111111111111111111111111111112"}
+        prices.update(SOL=18.0)
+        strategy.positions_version += 1
+        assert ("SOL", "stop_loss", 18.0) in monitor.check()
+        assert strategy.check_risk(sol, record_history=False, current_price=18.0).action_taken == "stop_loss"
+        assert strategy.check_risk(sol, record_history=False, current_price=18.0).action_taken == "none"
+        assert len(attempts) == 1 and "SOL" in strategy.active_trades
+        assert all(symbol != "SOL" for symbol, _, _ in monitor.check()), "backed-off exits should not trigger"
+        
+        trade = strategy.active_trades["SOL"]
+        first_delay = trade.retry_at - time.time()
+        trade.retry_at = 0.0
+        strategy.check_risk(sol, record_history=False, current_price=18.0)
+        assert len(attempts) == 2 and trade.exit_failures == 2
+        assert trade.retry_at - time.time() > first_delay * 1.5, "the backoff should grow with each failure"
+        print("✅ Failed exits retried with a growing backoff")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Risk monitor test failed: {str(e)}")
+        return False
+
+
+def test_gas_oracle(config_path):
+    """Test the cached gas oracle."""
+    print("\n=== Testing Gas Oracle ===")
+    
+    try:
+        from types import SimpleNamespace
+        from gas_oracle import GasOracle
+        
+        calls = []
+        
+        def fee_history(block_count, newest_block, percentiles):
+            calls.append("fee_history")
+            return {"baseFeePerGas": [90, 95, 100], "reward": [[3], [1], [2]]}
+        
+        eth = SimpleNamespace(fee_history=fee_history, chain_id=1, gas_price=50, max_priority_fee=1)
+        oracle = GasOracle(SimpleNamespace(eth=eth), "ethereum", 1.5, {"block_count": 2, "max_age_seconds": 60})
+        
+        fees = oracle.fees()
+        assert fees == {"maxFeePerGas": 203, "maxPriorityFeePerGas": 3, "chainId": 1}
+        assert oracle.fees() == fees and calls == ["fee_history"]
+        print("✅ EIP-1559 fees from the fee history, served from cache")
+        
+        oracle.settings["max_age_seconds"] = -1
+        oracle.fees()
+        assert len(calls) == 2
+        print("✅ Stale suggestion refreshed before use")
+        
+        legacy = SimpleNamespace(fee_history=lambda *args: {"baseFeePerGas": [0, 0], "reward": [[0]]}, gas_price=50)
+        assert GasOracle(SimpleNamespace(eth=legacy), "binance_smart_chain", 1.1).fees() == {"gasPrice": 55}
+        print("✅ Legacy gas price on chains without a base fee")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Gas oracle test failed: {str(e)}")
+        return False
+
+
+def test_rpc_pool(config_path):
+    """Test the RPC provider pool against local mock RPC servers."""
+    print("\n=== Testing RPC Pool ===")
+    
+    servers = []
+    try:
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from web3 import Web3
+        from rpc_pool import ProviderPool
+        
+        def mock_rpc(block_number, delay=0.0, status=200):
+            """Start a JSON-RPC server answering eth_blockNumber after a delay."""
+            hits = []
+            
+            class Handler(BaseHTTPRequestHandler):
+                def do_POST(self):
+                    request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                    hits.append(request["method"])
+                    time.sleep(delay)
+                    body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": hex(block_number)}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                
+                def log_message(self, *args):
+                    pass
+            
+            server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            servers.append(server)
+            return f"http://127.0.0.1:{server.server_port}", hits
+        
+        slow_url, slow_hits = mock_rpc(1, delay=0.5)
+        fast_url, fast_hits = mock_rpc(2, delay=0.01)
+        pool = ProviderPool([slow_url, fast_url], "test", {"hedge_delay_seconds": 0.05})
+        w3 = Web3(pool)
+        
+        start = time.monotonic()
+        assert w3.eth.block_number == 2 and time.monotonic() - start < 0.4
+        assert slow_hits and fast_hits
+        print("✅ Slow read hedged to the second endpoint")
+        
+        time.sleep(0.6)
+        slow_stats, fast_stats = pool.stats()
+        assert fast_stats["latency"] < slow_stats["latency"]
+        w3.eth.block_number
+        assert len(slow_hits) == 1 and len(fast_hits) == 2
+        print("✅ Reads routed to the fastest endpoint")
+        
+        broken_url, broken_hits = mock_rpc(3, status=500)
+        pool = ProviderPool([broken_url, fast_url], "test", {"hedge_reads": False, "failure_threshold": 2})
+        w3 = Web3(pool)
+        assert [w3.eth.block_number for _ in range(4)] == [2, 2, 2, 2]
+        assert len(broken_hits) == 2 and pool.stats()[0]["open"]
+        print("✅ Failing endpoint taken out of rotation by the circuit breaker")
+        
+        return True
+    except Exception as e:
+        print(f"❌ RPC pool test failed: {str(e)}")
+        return False
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+def test_balance_tracker(config_path):
+    """Test block-driven balance tracking on a local test chain."""
+    print("\n=== Testing Balance Tracker ===")
+    
+    try:
+        from decimal import Decimal
+        from web3 import Web3, EthereumTesterProvider
+        from balance_tracker import BalanceTracker, TRANSFER_TOPIC, address_topic
+        from wallet import ERC20_ABI
+        
+        w3 = Web3(EthereumTesterProvider())
+        me, other = w3.eth.accounts[:2]
+        
+        # Minimal token: every call logs Transfer(caller, to, value) for calldata (to, value)
+        runtime = bytes.fromhex("602035600052600035337f" + TRANSFER_TOPIC[2:] + "60206000a300")
+        init = bytes.fromhex(f"60{len(runtime):02x}600c60003960{len(runtime):02x}6000f3") + runtime
+        tx_hash = w3.eth.send_transaction({"from": other, "data": init})
+        token = w3.eth.get_transaction_receipt(tx_hash)["contractAddress"]
+        
+        def transfer(sender, to, value):
+            data = bytes.fromhex(address_topic(to)[2:]) + value.to_bytes(32, "big")
+            w3.eth.send_transaction({"from": sender, "to": token, "data": data, "gas": 100000})
+        
+        tracker = BalanceTracker(w3, "test", me, {"TST": token}, ERC20_ABI)
+        tracker._read_token = lambda address, block: (0, 18)
+        tracker._decimals[token] = 18
+        assert tracker.poll() == 0 and tracker.synced
+        
+        w3.eth.send_transaction({"from": other, "to": me, "value": 10 ** 18})
+        w3.eth.send_transaction({"from": me, "to": other, "value": 3 * 10 ** 17})
+        transfer(other, me, 5 * 10 ** 18)
+        transfer(me, other, 2 * 10 ** 18)
+        transfer(other, other, 7 * 10 ** 18)
+        
+        assert tracker.poll() == 5 and tracker.poll() == 0
+        balances = tracker.balances()
+        assert balances["native_balance"] == Decimal(w3.eth.get_balance(me)) / Decimal(10 ** 18)
+        assert balances["tokens"]["TST"]["balance"] == Decimal(3)
+        print("✅ Native transfers, gas costs and token Transfer logs applied as deltas")
+        
+        # Only the blocks where the wallet's balance or nonce changed are fetched with their transactions
+        full_blocks = []
+        get_block = w3.eth.get_block
+        def counting_get_block(number, full_transactions=False):
+            if full_transactions:
+                full_blocks.append(number)
+            return get_block(number, full_transactions)
+        w3.eth.get_block = counting_get_block
+        third = w3.eth.accounts[2]
+        for _ in range(8):
+            w3.eth.send_transaction({"from": other, "to": third, "value": 10 ** 15})
+        w3.eth.send_transaction({"from": other, "to": me, "value": 10 ** 16})
+        transfer(other, me, 10 ** 18)
+        assert tracker.poll() == 10 and full_blocks == [tracker.last_block - 1]
+        assert tracker.balances()["native_balance"] == Decimal(w3.eth.get_balance(me)) / Decimal(10 ** 18)
+        assert tracker.balances()["tokens"]["TST"]["balance"] == Decimal(4)
+        w3.eth.get_block = get_block
+        print("✅ Blocks without native activity of the wallet not fetched in full")
+        
+        tracker._native += 1
+        tracker.reconcile()
+        assert tracker.balances()["native_balance"] == Decimal(w3.eth.get_balance(me)) / Decimal(10 ** 18)
+        print("✅ Reconcile replaces the ledger with the chain balances")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Balance tracker test failed: {str(e)}")
+        return False
+
+
+def test_event_index(config_path):
+    """Test the wallet event index on a local test chain."""
+    print("\n=== Testing Event Index ===")
+    
+    try:
+        import tempfile
+        from decimal import Decimal
+        from web3 import Web3, EthereumTesterProvider
+        from balance_tracker import BalanceTracker
+        from event_index import EventIndex, DAY_SECONDS
+        from records import TradeRecord, WalletEvent
+        from wallet import ERC20_ABI
+        
+        with tempfile.TemporaryDirectory() as directory:
+            w3 = Web3(EthereumTesterProvider())
+            me, other = w3.eth.accounts[:2]
+            
+            tracker = BalanceTracker(w3, "test", me, {}, ERC20_ABI)
+            live = EventIndex({"path": os.path.join(directory, "live.db")})
+            tracker.listeners.append(live)
+            tracker.poll()
+            
+            for _ in range(3):
+                w3.eth.send_transaction({"from": other, "to": me, "value": 10 ** 18})
+                w3.eth.send_transaction({"from": me, "to": other, "value": 10 ** 17})
+            tracker.poll()
+            
+            history = live.balance_history("test", "native")
+            assert len(history) == 6
+            assert abs(history[-1]["balance"] - float(tracker.balances()["native_balance"])) < 1e-9
+            assert history[0]["balance"] == 1000001.0
+            print("✅ Balance history anchored on the reconcile and built from indexed events")
+            
+            backfilled = EventIndex({"path": os.path.join(directory, "backfill.db"), "chunk_blocks": 2, "workers": 3})
+            assert backfilled.sync(tracker) == tracker.last_block + 1
+            assert backfilled.sync(tracker) == 0 and backfilled.missing_ranges("test", 0, tracker.last_block) == []
+            assert [p["block"] for p in backfilled.balance_history("test", "native")] == [p["block"] for p in history]
+            print("✅ Parallel backfill in block ranges, resumable without rescanning")
+            
+            day = 20000 * DAY_SECONDS
+            live.add([WalletEvent("test", 1, day + 100, "0x01", 0, "transfer", "TST", Decimal(5), 5)])
+            live.record_trade(TradeRecord("TST", "test", "buy", Decimal(5), 2.0, 10.0, timestamp=day + 200))
+            live.record_trade(TradeRecord("TST", "test", "sell", Decimal(1), 3.0, 3.0, timestamp=day + DAY_SECONDS + 1))
+            live.record_prices("test", day + 200, {"TST": 2.0})
+            live.record_prices("test", day + DAY_SECONDS + 1, {"TST": 3.0})
+            days = live.daily_values("test", day, day + DAY_SECONDS + 10)
+            assert [row["assets"]["TST"]["value_usd"] for row in days] == [10.0, 15.0]
+            assert days[1]["assets"]["TST"]["pnl_usd"] == 15.0 - 10.0 + 3.0
+            print("✅ Daily value and PnL from balances and recorded prices")
+            
+            # Native trades share the native asset, which is valued at the oracle's quotes from reconciles
+            class Oracle:
+                def snapshot(self, symbols):
+                    return {symbol: 2100.0 for symbol in symbols if symbol == "ETH"}
+            
+            class Chain:
+                chain = "native-test"
+            
+            native = EventIndex({"path": os.path.join(directory, "native.db")}, {"native-test": "ETH"}, Oracle())
+            native.add([WalletEvent("native-test", 1, day + 100, "0x02", -1, "native", "native", Decimal(2), 2)])
+            native.on_reconcile(Chain(), 1, day + 150, {"native": Decimal(2)})
+            native.record_trade(TradeRecord("ETH", "native-test", "buy", Decimal(1), 2000.0, 2000.0,
+                                            timestamp=day + 200))
+            row = native.daily_values("native-test", day, day + 1000)[0]
+            assert set(row["assets"]) == {"native"}
+            assert row["assets"]["native"] == {"balance": 2.0, "price": 2100.0, "value_usd": 4200.0,
+                                               "net_trades_usd": 2000.0, "pnl_usd": None}
+            assert row["value_usd"] == 4200.0
+            print("✅ Native token trades and balances valued together from price oracle quotes")
+            
+        
+        return True
+    except Exception as e:
+        print(f"❌ Event index test failed: {str(e)}")
+        return False
+
+
+def test_price_oracle(config_path):
+    """Test the batched price oracle against local mock price feeds."""
+    print("\n=== Testing Price Oracle ===")
+    
+    servers = []
+    try:
+        import threading
+        from decimal import Decimal
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from types import SimpleNamespace
+        from urllib.parse import parse_qs, urlparse
+        from price_oracle import PriceOracle
+        
+        def mock_feed(prices, status=200):
+            """Start a simple price server quoting the given USD prices by asset id."""
+            hits = []
+            
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    query = parse_qs(urlparse(self.path).query)
+                    ids = query["ids"][0].split(",")
+                    hits.append(ids)
+                    body = json.dumps({i: {"usd": prices[i]} for i in ids if i in prices}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                
+                def log_message(self, *args):
+                    pass
+            
+            server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            servers.append(server)
+            return f"http://127.0.0.1:{server.server_port}", hits
+        
+        main_url, main_hits = mock_feed({"ethereum": 2000.0, "binancecoin": 300.0})
+        backup_url, backup_hits = mock_feed({"bitcoin": 60000.0, "ethereum": 1.0})
+        sources = [
+            {"name": "main", "url": main_url, "ids": {"ETH": "ethereum", "BNB": "binancecoin", "BTC": "bitcoin"}},
+            {"name": "backup", "url": backup_url, "ids": {"BTC": "bitcoin", "ETH": "ethereum"}}
+        ]
+        oracle = PriceOracle({"sources": sources, "ttl_seconds": 60}, watched=["ETH", "BNB"])
+        
+        assert oracle.prices(["ETH", "BTC"]) == {"ETH": 2000.0, "BTC": 60000.0}
+        assert main_hits == [["binancecoin", "bitcoin", "ethereum"]] and backup_hits == [["bitcoin"]]
+        print("✅ All watched symbols quoted in one request per source, missing ones from the next source")
+        
+        assert oracle.snapshot() == {"ETH": 2000.0, "BNB": 300.0, "BTC": 60000.0}
+        assert oracle.prices(["BNB", "SOL"]) == {"BNB": 300.0} and len(main_hits) == 2
+        assert oracle.prices(["SOL"]) == {} and len(main_hits) == 2
+        print("✅ Snapshot cached until the TTL, refreshed once for a new symbol")
+        
+        oracle.sources = [{"name": "down", "url": mock_feed({}, status=500)[0], "ids": {"ETH": "ethereum"}}]
+        oracle.settings["ttl_seconds"] = -1
+        assert oracle.prices(["ETH"]) == {"ETH": 2000.0}
+        oracle.settings["max_age_seconds"] = -1
+        assert oracle.prices(["ETH"]) == {}
+        print("✅ Last quotes served while a source is down, until they are too old")
+        
+        strategy = TradingStrategy(config_path)
+        strategy.trade_history = []
+        strategy._save_trade_history = lambda: None
+        strategy.price_oracle.sources = sources
+        main_hits.clear()
+        
+        def ledger(native, tokens):
+            return lambda: {"native_balance": Decimal(native),
+                            "tokens": {symbol: {"balance": Decimal(balance), "address": "0x1"}
+                                       for symbol, balance in tokens.items()}}
+        
+        strategy.wallet.balance_trackers = {
+            "ethereum": SimpleNamespace(balances=ledger("1.5", {"BTC": "0.1", "XYZ": "7"})),
+            "binance_smart_chain": SimpleNamespace(balances=ledger("2", {}))
+        }
+        portfolio = strategy.check_portfolio()
+        assert portfolio["total_value_usd"] == Decimal("9600")
+        assert portfolio["chains"]["ethereum"]["native_symbol"] == "ETH"
+        assert portfolio["chains"]["binance_smart_chain"]["native_value_usd"] == Decimal("600")
+        assert portfolio["unpriced"] == ["XYZ"]
+        
+        token = {"symbol": "ETH", "address": "0x0000000000000000000000000000000000000000", "chain": "ethereum"}
+        trade = strategy.execute_trade(token, "buy", Decimal("0.5"))
+        assert trade.price == 2000.0 and trade.value_usd == 1000.0 and len(main_hits) == 1
+        print("✅ Portfolio valued and trades priced from one shared snapshot")
+        
+        unpriced = strategy.execute_trade({**token, "symbol": "XYZ"}, "buy", Decimal("1"))
+        assert not unpriced.success and "XYZ" not in strategy.active_trades
+        print("✅ No trade without a price")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Price oracle test failed: {str(e)}")
+        return False
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+
+def test_paper_exchange(config_path):
+    """Test the in-memory paper exchange."""
+    print("\n=== Testing Paper Exchange ===")
+    
+    try:
+        import threading
+        import time
+        from decimal import Decimal
+        from paper_exchange import PaperExchange
+        
+        prices = {"ETH": 1000.0}
+        settings = {"initial_balances": {"USD": 100000}, "fee_rate": 0.003, "liquidity_usd": 20000000,
+                    "latency_ms": 0, "latency_jitter_ms": 0}
+        exchange = PaperExchange(settings, prices.get, max_slippage=0.01)
+        
+        buy = exchange.execute("ETH", "ethereum", "buy", Decimal("10"))
+        assert buy.success and 1003.0 < buy.price < 1005.0 and abs(buy.fee_usd - buy.value_usd * 0.003) < 1e-9
+        again = exchange.execute("ETH", "ethereum", "buy", Decimal("10"))
+        assert again.price > buy.price
+        balances = exchange.balances()
+        assert balances["ETH"] == 20.0 and abs(balances["USD"] - (100000 - buy.value_usd - again.value_usd)) < 1e-6
+        print("✅ Fills move the pool price and pay fees from the paper balances")
+        
+        large = exchange.execute("ETH", "ethereum", "buy", Decimal("200"))
+        assert not large.success and "Slippage" in large.error
+        assert not exchange.execute("ETH", "ethereum", "sell", Decimal("21")).success
+        assert not exchange.execute("BTC", "ethereum", "buy", Decimal("1")).success
+        assert exchange.balances() == balances and exchange.rejected == 3
+        print("✅ Orders past the slippage limit, balance or price rejected")
+        
+        prices["ETH"] = 1100.0
+        sell = exchange.execute("ETH", "ethereum", "sell", Decimal("20"), price=1100.0)
+        assert sell.success and 1089.0 < sell.price < 1100.0
+        assert exchange.portfolio(prices)["value_usd"] == exchange.balances()["USD"]
+        print("✅ Pool re-anchored to the market price")
+        
+        settings.update(latency_ms=20, initial_balances={"USD": 10 ** 9})
+        exchange = PaperExchange(settings, prices.get)
+        start = time.monotonic()
+        threads = [threading.Thread(target=lambda: [exchange.execute("ETH", "ethereum", "buy", Decimal("0.01"))
+                                                    for _ in range(5)]) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert exchange.orders == 100 and exchange.rejected == 0 and time.monotonic() - start < 1.0
+        print("✅ Latencies of concurrent orders overlap")
+        
+        strategy = TradingStrategy(config_path)
+        strategy.paper_exchange = PaperExchange({**settings, "latency_ms": 0}, prices.get)
+        strategy.history_flush_seconds = 5
+        saves = []
+        strategy._save_trade_history = lambda: saves.append(len(strategy.trade_history))
+        strategy.trade_history = []
+        
+        token = {"symbol": "ETH", "address": "0x0000000000000000000000000000000000000000", "chain": "ethereum"}
+        trade = strategy.execute_trade(token, "buy", Decimal("1"), 1100.0)
+        assert trade.success and strategy.active_trades["ETH"].entry_price == trade.price
+        failed = strategy.execute_trade(token, "sell", Decimal("5"), 1100.0)
+        assert not failed.success and "ETH" in strategy.active_trades
+        assert saves == []
+        strategy.flush_trade_history()
+        strategy.flush_trade_history()
+        assert saves == [2]
+        print("✅ Strategy fills on the paper exchange and flushes the trade history in batches")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Paper exchange test failed: {str(e)}")
+        return False
+
+
+def test_replay(config_path):
+    """Test recording the agent's inputs and replaying them through run_once."""
+    print("\n=== Testing Record and Replay ===")
+    
+    cwd = os.getcwd()
+    directory = None
+    try:
+        import itertools
+        import random
+        import tempfile
+        import time
+        from datetime import datetime
+        from web3 import Web3, EthereumTesterProvider
+        from balance_tracker import BalanceTracker
+        from main import CryptoTradingAgent
+        from replay import Replayer
+        from wallet import ERC20_ABI
+        
+        # The agent writes its logs and event index next to the working directory
+        directory = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(directory.name, "run"))
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        config["event_index"]["path"] = os.path.join(directory.name, "events.db")
+        config["price_oracle"]["ttl_seconds"] = -1
+        replay_config = os.path.join(directory.name, "config.json")
+        with open(replay_config, 'w') as f:
+            json.dump(config, f)
+        os.chdir(os.path.join(directory.name, "run"))
+        
+        def build_agent(w3):
+            agent = CryptoTradingAgent(replay_config)
+            me = w3.eth.accounts[0] if w3 is not None else "0x" + "11" * 20
+            agent.wallet.wallets = {"ethereum": {"address": me, "private_key": None}}
+            agent.wallet.web3_connections = {"ethereum": w3 or Web3()}
+            tracker = BalanceTracker(agent.wallet.web3_connections["ethereum"], "ethereum", me, {}, ERC20_ABI)
+            tracker.listeners.append(agent.event_index)
+            agent.wallet.balance_trackers = {"ethereum": tracker}
+            return agent
+        
+        # Live inputs that differ on every call
+        def candles(token_symbol, timeframe="1h", limit=200):
+            interval = 3600000
+            start = int(time.time() * 1000) // interval * interval - (limit - 1) * interval
+            price = random.uniform(50, 150)
+            data = []
+            for i in range(limit):
+                price *= 1 + random.uniform(-0.02, 0.02)
+                data.append({"timestamp": start + i * interval, "open": price, "high": price * 1.01,
+                             "low": price * 0.99, "close": price, "volume": random.uniform(10, 100)})
+            return data
+        
+        # Tweet ids are unique, like real ones (scores are cached by id)
+        tweet_ids = itertools.count()
+        
+        def tweets(query, max_results=100, days_back=1):
+            texts = ["ETH is going to the moon, great news", "Terrible crash, selling everything", "Holding ETH"]
+            return [{"id": next(tweet_ids), "text": random.choice(texts), "created_at": datetime.utcnow(),
+                     "retweet_count": random.randint(0, 50), "like_count": random.randint(0, 100), "reply_count": 0,
+                     "author_id": i, "username": f"user{i}", "followers_count": 1000, "is_influencer": False}
+                    for i in range(random.randint(5, 15))]
+        
+        recording = os.path.join(directory.name, "agent.jsonl.gz")
+        agent = build_agent(Web3(EthereumTesterProvider()))
+        agent.token_delay_seconds = 0
+        agent.trading_strategy._get_price_data = candles
+        agent.trading_strategy.sentiment_analyzer.search_tweets = tweets
+        agent.trading_strategy.price_oracle._fetch = lambda source, symbols: {s: random.uniform(90, 110) for s in symbols}
+        agent.record_runs(recording, cycles=3, interval_minutes=0)
+        assert os.path.getsize(recording) > 0
+        print("✅ Candles, tweets, prices and RPC responses of 3 cycles recorded")
+        
+        replay_agent = build_agent(None)
+        start = time.monotonic()
+        summary = replay_agent.replay_runs(recording)
+        assert summary["cycles"] == 3 and summary["identical"] == 3 and summary["unused"] == 0, summary
+        assert time.monotonic() - start < 10
+        print(f"✅ Replay identical to the recording ({summary['seconds']:.2f}s, no network or sleeps)")
+        
+        changed = build_agent(None)
+        changed.wallet.native_symbols["ethereum"] = "WETH"
+        replayer = Replayer(recording)
+        replayer.attach(changed)
+        assert replayer.run(changed)["diverged"] == [0, 1, 2]
+        print("✅ Diverging results detected")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Replay test failed: {str(e)}")
+        return False
+    finally:
+        os.chdir(cwd)
+        if directory is not None:
+            directory.cleanup()
+
+
+def test_sentiment_aggregator(config_path):
+    """Test the rolling sentiment windows."""
+    print("\n=== Testing Sentiment Aggregator ===")
+    
+    try:
+        import random
+        from sentiment_aggregator import SentimentAggregator
+        
+        aggregator = SentimentAggregator({"bucket_seconds": 300, "windows_hours": [1, 6]})
+        now = 1700000000.0
+        
+        # Tweets over the last 11 hours, compared against a scan of the raw tweets
+        tweets = []
+        for i in range(2000):
+            created = now - random.uniform(0, 11 * 3600)
+            score = random.uniform(-1, 1)
+            label = "positive" if score > 0.6 else "negative" if score < 0.4 else "neutral"
+            influencer = random.random() < 0.1
+            weight = random.choice([1.0, 1.3, 2.0])
+            tweets.append((i, created, score, label, weight, influencer))
+            assert aggregator.add("ETH", i, created, score, label, weight, influencer)
+        
+        # The same tweets found by the next search are not counted again
+        assert not any(aggregator.add("ETH", i, created, score, label, weight, influencer)
+                       for i, created, score, label, weight, influencer in tweets[:100])
+        print("✅ Repeated tweet ids ignored")
+        
+        def expected(start, end):
+            selected = [t for t in tweets if start < t[1] // 300 <= end]
+            if not selected:
+                return 0, None
+            return len(selected), sum(t[2] * t[4] for t in selected) / len(selected)
+        
+        for later in (0, 1800, 4 * 3600):
+            windows = aggregator.window("ETH", now=now + later)
+            head = (now + later) // 300
+            for label, buckets in (("1h", 12), ("6h", 72)):
+                count, score = expected(head - buckets, head)
+                previous_count, previous_score = expected(head - 2 * buckets, head - buckets)
+                window = windows[label]
+                assert window["tweet_count"] == count, (label, later, window["tweet_count"], count)
+                assert abs(window["sentiment_score"] - (score or 0.0)) < 1e-9
+                assert (window["previous_score"] is None) == (previous_score is None)
+                if previous_score is not None and score is not None:
+                    assert abs(window["change"] - (score - previous_score)) < 1e-9
+                assert window["positive_count"] + window["negative_count"] + window["neutral_count"] == count
+        print("✅ Window scores, counts and changes match a full scan as the windows slide")
+        
+        # A day later everything has left the windows
+        windows = aggregator.window("ETH", now=now + 86400)
+        assert windows["6h"]["tweet_count"] == 0 and windows["6h"]["change"] is None
+        assert aggregator.add("ETH", 0, now + 86400, 0.5, "neutral")
+        print("✅ Expired buckets and tweet ids forgotten")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Sentiment aggregator test failed: {str(e)}")
+        return False
+
+
+def test_fetch_scheduler(config_path):
+    """Test the X API quota pacing and the stale sentiment results."""
+    print("\n=== Testing Fetch Scheduler ===")
+    
+    try:
+        from types import SimpleNamespace
+        from fetch_scheduler import FetchScheduler
+        
+        now = [1000.0]
+        scheduler = FetchScheduler({"limit": 100, "window_seconds": 900, "burst": 2, "reserve_requests": 5},
+                                   clock=lambda: now[0])
+        
+        # The headers set the quota: 45 requests left for 450s, i.e. one every 10s
+        scheduler.update({"x-rate-limit-limit": "450", "x-rate-limit-remaining": "45", "x-rate-limit-reset": "1450"})
+        assert scheduler.acquire("ETH") and scheduler.acquire("ETH") and not scheduler.acquire("ETH")
+        now[0] += 5
+        assert not scheduler.acquire("ETH")
+        now[0] += 6
+        assert scheduler.acquire("ETH")
+        print("✅ Requests paced to spread the remaining quota over the window")
+        
+        # Priority tokens go ahead of the pace, and the reserve is left to them
+        scheduler.set_active(["BNB"])
+        assert scheduler.acquire("BNB") and scheduler.acquire("BNB")
+        scheduler.set_volatility("BTC", 0.05)
+        assert scheduler.is_priority("BTC") and not scheduler.is_priority("ETH")
+        scheduler.update({"x-rate-limit-remaining": "5"})
+        now[0] += 100
+        assert not scheduler.acquire("ETH") and scheduler.acquire("BTC")
+        print("✅ Active and volatile tokens prioritized, reserve kept for them")
+        
+        # Nothing goes out after a 429 until the window resets
+        scheduler.rate_limited({"x-rate-limit-reset": "1500"})
+        assert not scheduler.acquire("BTC")
+        now[0] = 1500
+        assert scheduler.acquire("ETH") and scheduler.status()["remaining"] == 449
+        print("✅ Rate-limited window waited out")
+        
+        analyzer = SentimentAnalyzer(config_path)
+        analyzer._on_response(SimpleNamespace(url="https://api.twitter.com/2/tweets/search/recent",
+                                              headers={"x-rate-limit-remaining": "0", "x-rate-limit-reset": "9999999999"}))
+        never = analyzer.analyze_sentiment("ETH")
+        assert never["stale"] and never["stale_reason"] == "deferred" and never["sentiment"] == "unknown"
+        
+        analyzer.fetch_scheduler.update({"x-rate-limit-remaining": "100"})
+        analyzer.search_tweets = lambda query, max_results=100, days_back=1: [
+            {"id": 1, "text": "Great news, ETH is amazing", "created_at": None, "like_count": 5}]
+        fresh = analyzer.analyze_sentiment("ETH")
+        assert not fresh["stale"] and fresh["tweet_count"] == 1
+        
+        analyzer.search_tweets = lambda query, max_results=100, days_back=1: None
+        failed = analyzer.analyze_sentiment("ETH")
+        assert failed["stale"] and failed["stale_reason"] == "error"
+        assert failed["sentiment_score"] == fresh["sentiment_score"] and failed["timestamp"] == fresh["timestamp"]
+        print("✅ Deferred and failed searches reported as stale, not neutral")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Fetch scheduler test failed: {str(e)}")
+        return False
+
+
+def test_x_search(config_path):
+    """Test the paginated, concurrent X search client against a local search endpoint."""
+    print("\n=== Testing X Search Client ===")
+    
+    server = None
+    client = None
+    try:
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlparse
+        from fetch_scheduler import FetchScheduler
+        from x_search import AsyncSearchClient
+        
+        # 250 tweets per query, served 100 per page; authors appear in includes on their first page only
+        requests_seen = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                requests_seen.append(query)
+                time.sleep(0.2)
+                start = int(query.get("next_token", 0))
+                end = min(start + int(query["max_results"]), 250)
+                body = {
+                    "data": [{"id": str(i), "text": f"{query['query']} tweet {i}", "author_id": str(i % 20),
+                              "created_at": "2024-01-01T00:00:00.000Z",
+                              "public_metrics": {"retweet_count": 1, "like_count": 2, "reply_count": 0}}
+                             for i in range(start, end)],
+                    "includes": {"users": [{"id": str(a), "username": f"user{a}", "public_metrics": {"followers_count": a}}
+                                           for a in range(20) if start == 0]},
+                    "meta": {"next_token": str(end)} if end < 250 else {}
+                }
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("x-rate-limit-limit", "450")
+                self.send_header("x-rate-limit-remaining", str(450 - len(requests_seen)))
+                self.send_header("x-rate-limit-reset", str(int(time.time()) + 900))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        
+        scheduler = FetchScheduler()
+        client = AsyncSearchClient("token", {"concurrency": 4}, scheduler, influencers=["user3"],
+                                   url=f"http://127.0.0.1:{server.server_port}/2/tweets/search/recent")
+        
+        tweets = client.search("ETH", max_results=200)
+        assert len(tweets) == 200 and len({tweet["id"] for tweet in tweets}) == 200
+        assert [int(r["max_results"]) for r in requests_seen] == [100, 100] and requests_seen[1]["next_token"] == "100"
+        assert all(tweet["username"] == f"user{tweet['author_id']}" for tweet in tweets)
+        assert any(tweet["is_influencer"] for tweet in tweets) and tweets[0]["created_at"].year == 2024
+        assert scheduler.status()["remaining"] == 448
+        print("✅ Pages followed with next_token, authors resolved from the cached users expansion")
+        
+        # Three tokens' searches of 3 pages each overlap instead of taking 9 sequential round trips
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(lambda query: client.search(query, max_results=300), ["BTC", "BNB", "SOL"]))
+        elapsed = time.perf_counter() - start
+        assert [len(result) for result in results] == [250, 250, 250]
+        assert elapsed < 1.2, elapsed
+        print(f"✅ Searches for 3 tokens ran concurrently ({elapsed:.2f}s for 9 pages of 0.2s)")
+        
+        client.url = "http://127.0.0.1:1/2/tweets/search/recent"
+        assert client.search("ETH", max_results=200) is None
+        print("✅ Failed search reported as None")
+        
+        return True
+    except Exception as e:
+        print(f"❌ X search client test failed: {str(e)}")
+        return False
+    finally:
+        if client is not None:
+            client.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def test_x_stream(config_path):
+    """Test the filtered-stream sentiment mode against the stand-in stream server."""
+    print("\n=== Testing X Filtered Stream ===")
+    
+    server = None
+    analyzer = None
+    try:
+        import time
+        from x_stream_server import StandInStreamServer
+        
+        def wait_for(condition, timeout=10):
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                if condition():
+                    return True
+                time.sleep(0.05)
+            return False
+        
+        server = StandInStreamServer(keepalive_seconds=0.5)
+        server.start()
+        
+        analyzer = SentimentAnalyzer(config_path)
+        analyzer.stream_config = {**analyzer.stream_config, "enabled": True, "url": server.url,
+                                  "reconnect_min_seconds": 0.1, "stall_seconds": 5}
+        assert analyzer.start_stream(["ETH", "BNB"])
+        assert wait_for(lambda: analyzer.stream.healthy and server.connections == 1)
+        assert sorted(rule["tag"] for rule in server.rules) == ["BNB", "ETH", "influencers"]
+        print("✅ Stream connected with rules for each token and the influencers")
+        
+        # While streaming, results come from the windows and nothing is searched
+        def no_search(*args, **kwargs):
+            raise AssertionError("searched while streaming")
+        analyzer.search_tweets = no_search
+        
+        server.publish("ETH is going to the moon, great news", like_count=20)
+        server.publish("Terrible day, selling all my bnb", username="cz_binance", followers=500000)
+        assert wait_for(lambda: analyzer.aggregator.window("BNB")["1h"]["tweet_count"] == 1)
+        result = analyzer.analyze_sentiment("ETH")
+        assert result["source"] == "stream" and result["tweet_count"] == 1 and not result["stale"]
+        assert result["sentiment"] == "positive" and result["recent_tweets"][0]["like_count"] == 20
+        bnb = analyzer.analyze_sentiment("BNB")
+        assert bnb["sentiment"] == "negative" and bnb["windows"]["1h"]["influencer_count"] == 1
+        print("✅ Streamed tweets scored on arrival into their tokens' windows")
+        
+        # A dropped connection is reopened and asks for the missed tweets
+        server.drop_connections()
+        assert wait_for(lambda: analyzer.stream.connections == 2 and analyzer.stream.healthy)
+        assert "backfill_minutes" not in server.connects[0] and server.connects[-1]["backfill_minutes"] == "5"
+        server.publish("Bought more ETH, amazing project")
+        assert wait_for(lambda: analyzer.aggregator.window("ETH")["1h"]["tweet_count"] == 2)
+        print("✅ Reconnected after a dropped connection, with backfill")
+        
+        analyzer.stop_stream()
+        assert analyzer.stream is None and wait_for(lambda: server.connections == 0)
+        print("✅ Stream stopped")
+        
+        return True
+    except Exception as e:
+        print(f"❌ X filtered stream test failed: {str(e)}")
+        return False
+    finally:
+        if analyzer is not None:
+            analyzer.stop_stream()
+        if server is not None:
+            server.stop()
+    
+
+def test_score_cache(config_path):
+    """Test that tweets are scored once, by id and content hash, and that scores persist."""
+    print("\n=== Testing Score Cache ===")
+    
+    try:
+        import tempfile
+        from datetime import datetime
+        import sentiment_analysis
+        from score_cache import ScoreCache
+        
+        analyzer = SentimentAnalyzer(config_path)
+        scored = []
+        real_textblob = sentiment_analysis.TextBlob
+        
+        def counting_textblob(text):
+            scored.append(text)
+            return real_textblob(text)
+        
+        sentiment_analysis.TextBlob = counting_textblob
+        try:
+            tweets = [
+                {"id": 1, "text": "ETH is going to the moon, great news https://t.co/x"},
+                {"id": 2, "text": "Terrible day for ETH, selling everything"},
+                {"id": 3, "text": "RT @someone: ETH is going to the moon, great news"},
+                {"id": 4, "text": "ETH is going to the moon, great news!!! #eth"},
+                {"id": 5, "text": "Holding ETH for now"}
+            ]
+            for tweet in tweets:
+                tweet.update(created_at=datetime.utcnow(), like_count=1, retweet_count=0, reply_count=0)
+            analyzer.search_tweets = lambda query, max_results=100, days_back=1: tweets
+            analyzer.fetch_scheduler.acquire = lambda token_symbol, requests=1: True
+            
+            first = analyzer.analyze_sentiment("ETH")
+            assert len(scored) == 3, scored
+            print("✅ Retweets and copies scored once by content hash (3 of 5 tweets scored)")
+            
+            second = analyzer.analyze_sentiment("BNB")
+            assert len(scored) == 3 and second["sentiment_score"] == first["sentiment_score"]
+            score, sentiment = analyzer._get_tweet_sentiment("something else entirely", tweet_id=2)
+            assert len(scored) == 3 and sentiment == "negative"
+            print("✅ Tweets seen in an earlier search not scored again")
+        finally:
+            sentiment_analysis.TextBlob = real_textblob
+        
+        # Bounded LRU, and persisted across restarts
+        cache = ScoreCache({"capacity": 4})
+        for i in range(3):
+            cache.put(i, f"text {i}", i / 10)
+        assert len(cache) == 4 and cache.get(0) is None and cache.get(2) == 0.2
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scores.db")
+            cache = ScoreCache({"path": path, "flush_every": 2})
+            cache.put(10, "to the moon", 0.5)
+            cache.put(11, "rug pull", -0.7)
+            assert cache.get(None, "rug pull") == -0.7
+            cache.flush()
+            reloaded = ScoreCache({"path": path, "capacity": 2})
+            assert len(reloaded) == 2 and reloaded.get(None, "rug pull") == -0.7 and reloaded.get(10) is None
+        print("✅ Least recently used scores evicted, scores reloaded from the database")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Score cache test failed: {str(e)}")
+        return False
+    
+
+def test_near_duplicates(config_path):
+    """Test that near-duplicate tweets are clustered and scored once per cluster."""
+    print("\n=== Testing Near-Duplicate Suppression ===")
+    
+    try:
+        from datetime import datetime
+        from near_duplicates import NearDuplicateDetector
+        
+        detector = NearDuplicateDetector()
+        texts = [
+            "$PEPE2 is the next 100x gem!!! Buy now before it's too late https://t.co/a1",
+            "RT @shill_bot: $PEPE2 is the next 100x gem!!! Buy now before it's too late https://t.co/b2",
+            "$pepe2 is the next 100x gem, buy now before its too late 🚀🚀🚀",
+            "@someone $PEPE2 is the next 1000x gem!!! Buy now before it is too late",
+            "Terrible day for ETH, selling everything",
+            "Holding ETH for now, waiting for the merge",
+            "ETH gas fees are terrible today"
+        ]
+        clusters = detector.cluster(texts)
+        assert clusters == [[0, 1, 2, 3], [4], [5], [6]], clusters
+        assert NearDuplicateDetector({"enabled": False}).cluster(texts) == [[i] for i in range(7)]
+        print("✅ Copies with edited links, mentions, case and numbers clustered, distinct tweets kept apart")
+        
+        # 40 copies of a shilling tweet don't outweigh 3 critical tweets
+        analyzer = SentimentAnalyzer(config_path)
+        tweets = [{"id": i, "text": f"@bot{i} Amazing ETH giveaway, the best deal ever, great gains! https://t.co/{i}",
+                   "like_count": i % 5, "retweet_count": 0, "reply_count": 0} for i in range(40)]
+        tweets += [{"id": 100 + i, "text": text, "like_count": 3, "retweet_count": 0, "reply_count": 0}
+                   for i, text in enumerate(["Terrible ETH fees, awful network today",
+                                             "ETH dumping hard, this is bad",
+                                             "Worst week for ETH holders, horrible"])]
+        for tweet in tweets:
+            tweet["created_at"] = datetime.utcnow()
+        analyzer.search_tweets = lambda query, max_results=100, days_back=1: tweets
+        analyzer.fetch_scheduler.acquire = lambda token_symbol, requests=1: True
+        
+        scored = []
+        get_tweet_sentiment = analyzer._get_tweet_sentiment
+        
+        def counting_sentiment(text, tweet_id=None):
+            scored.append(text)
+            return get_tweet_sentiment(text, tweet_id)
+        
+        analyzer._get_tweet_sentiment = counting_sentiment
+        result = analyzer.analyze_sentiment("ETH")
+        assert len(scored) == 4 and result["tweet_count"] == 43 and result["unique_tweet_count"] == 4
+        assert result["duplicate_count"] == 39 and result["largest_cluster"] == 40
+        assert result["sentiment"] == "negative" and result["positive_count"] == 1 and result["negative_count"] == 3
+        assert result["recent_tweets"][0]["cluster_size"] == 40 and result["recent_tweets"][0]["like_count"] == 4
+        assert all(tweet["sentiment"] == "positive" for tweet in tweets[:40])
+        print(f"✅ 43 tweets scored as 4 clusters; the spam cluster counted once "
+              f"(sentiment {result['sentiment_score']:.2f})")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Near-duplicate suppression test failed: {str(e)}")
+        return False
+    
+
 def main():
     """Main entry point for the test script."""
     # Parse command-line arguments
@@ -169,6 +1740,30 @@ def main():
     technical_success = test_technical_analysis(args.config)
     sentiment_success = test_sentiment_analysis(args.config)
     strategy_success = test_trading_strategy(args.config)
+    metrics_success = test_metrics(args.config)
+    scheduler_success = test_scheduler(args.config)
+    publisher_success = test_publisher(args.config)
+    chart_success = test_chart_data(args.config)
+    store_success = test_state_store(args.config)
+    http_success = test_http_caching(args.config)
+    records_success = test_records(args.config)
+    history_success = test_signal_history(args.config)
+    resampler_success = test_resampler(args.config)
+    indicators_success = test_indicators(args.config)
+    risk_success = test_risk_monitor(args.config)
+    gas_success = test_gas_oracle(args.config)
+    rpc_success = test_rpc_pool(args.config)
+    balance_success = test_balance_tracker(args.config)
+    event_index_success = test_event_index(args.config)
+    price_oracle_success = test_price_oracle(args.config)
+    paper_exchange_success = test_paper_exchange(args.config)
+    replay_success = test_replay(args.config)
+    sentiment_aggregator_success = test_sentiment_aggregator(args.config)
+    fetch_scheduler_success = test_fetch_scheduler(args.config)
+    x_search_success = test_x_search(args.config)
+    x_stream_success = test_x_stream(args.config)
+    score_cache_success = test_score_cache(args.config)
+    near_duplicates_success = test_near_duplicates(args.config)
     
     # Print summary
     print("\n=== Test Summary ===")
@@ -176,9 +1771,40 @@ def main():
     print(f"Technical Analysis Module: {'✅ Passed' if technical_success else '❌ Failed'}")
     print(f"Sentiment Analysis Module: {'✅ Passed' if sentiment_success else '❌ Failed'}")
     print(f"Trading Strategy Module: {'✅ Passed' if strategy_success else '❌ Failed'}")
+    print(f"Metrics Module: {'✅ Passed' if metrics_success else '❌ Failed'}")
+    print(f"Scheduler Module: {'✅ Passed' if scheduler_success else '❌ Failed'}")
+    print(f"Update Publisher: {'✅ Passed' if publisher_success else '❌ Failed'}")
+    print(f"Chart Data Service: {'✅ Passed' if chart_success else '❌ Failed'}")
+    print(f"State Store: {'✅ Passed' if store_success else '❌ Failed'}")
+    print(f"HTTP Caching: {'✅ Passed' if http_success else '❌ Failed'}")
+    print(f"Records: {'✅ Passed' if records_success else '❌ Failed'}")
+    print(f"Signal History: {'✅ Passed' if history_success else '❌ Failed'}")
+    print(f"Candle Resampler: {'✅ Passed' if resampler_success else '❌ Failed'}")
+    print(f"Indicator Graph: {'✅ Passed' if indicators_success else '❌ Failed'}")
+    print(f"Risk Monitor: {'✅ Passed' if risk_success else '❌ Failed'}")
+    print(f"Gas Oracle: {'✅ Passed' if gas_success else '❌ Failed'}")
+    print(f"RPC Pool: {'✅ Passed' if rpc_success else '❌ Failed'}")
+    print(f"Balance Tracker: {'✅ Passed' if balance_success else '❌ Failed'}")
+    print(f"Event Index: {'✅ Passed' if event_index_success else '❌ Failed'}")
+    print(f"Price Oracle: {'✅ Passed' if price_oracle_success else '❌ Failed'}")
+    print(f"Paper Exchange: {'✅ Passed' if paper_exchange_success else '❌ Failed'}")
+    print(f"Record and Replay: {'✅ Passed' if replay_success else '❌ Failed'}")
+    print(f"Sentiment Aggregator: {'✅ Passed' if sentiment_aggregator_success else '❌ Failed'}")
+    print(f"Fetch Scheduler: {'✅ Passed' if fetch_scheduler_success else '❌ Failed'}")
+    print(f"X Search Client: {'✅ Passed' if x_search_success else '❌ Failed'}")
+    print(f"X Filtered Stream: {'✅ Passed' if x_stream_success else '❌ Failed'}")
+    print(f"Score Cache: {'✅ Passed' if score_cache_success else '❌ Failed'}")
+    print(f"Near-Duplicate Suppression: {'✅ Passed' if near_duplicates_success else '❌ Failed'}")
     
     # Overall result
-    if wallet_success and technical_success and sentiment_success and strategy_success:
+    if (wallet_success and technical_success and sentiment_success and strategy_success and
+            metrics_success and scheduler_success and publisher_success and chart_success and
+            store_success and http_success and records_success and history_success and
+            resampler_success and indicators_success and risk_success and gas_success and
+            rpc_success and balance_success and event_index_success and price_oracle_success and
+            paper_exchange_success and replay_success and sentiment_aggregator_success and
+            fetch_scheduler_success and x_search_success and x_stream_success and
+            score_cache_success and near_duplicates_success):
         print("\n✅ All tests passed! The agent is ready to use.")
         return 0
     else: